@@ -7,6 +7,7 @@ import ssl
 
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F
 from django.utils import timezone
 
 from .models import EmailLog, SMTPConfiguration
@@ -187,6 +188,151 @@ def send_email(
         return False, error_msg, email_logs
 
 
+def send_mass_email(messages, email_type="", fail_silently=True):
+    """
+    Send many emails over a single SMTP connection
+
+    Unlike ``send_email``, which opens a connection per call, the connection is opened once
+    for the whole batch and the email logs are written with one query. Messages beyond the
+    daily limit of the SMTP configuration are logged as failed.
+
+    Args:
+        messages: List of dicts with ``subject``, ``message``, ``recipient`` and optionally
+            ``html_message``, ``related_object_type`` and ``related_object_id``
+        email_type: Type of email (e.g., 'reminder', 'notification')
+        fail_silently: If True, don't raise exceptions on failure
+
+    Returns:
+        tuple: (sent_count: int, email_logs: list)
+    """
+    if not messages:
+        return 0, []
+
+    smtp_config = SMTPConfiguration.get_active_config()
+    if not smtp_config:
+        error_msg = "No active SMTP configuration found"
+        logger.error(error_msg)
+        if not fail_silently:
+            raise Exception(error_msg)
+        return 0, []
+
+    allowed = _daily_allowance(smtp_config, len(messages))
+    email_logs = _create_email_logs(smtp_config, messages, email_type)
+
+    from_email = f"{smtp_config.from_name} <{smtp_config.from_email}>"
+    reply_to = [smtp_config.reply_to_email] if smtp_config.reply_to_email else None
+
+    sent_count = 0
+    now = timezone.now()
+    connection = _smtp_connection(smtp_config, fail_silently)
+    try:
+        connection.open()
+        for index, (item, email_log) in enumerate(zip(messages, email_logs)):
+            if index >= allowed:
+                email_log.status = "failed"
+                email_log.error_message = f"Daily email limit reached for {smtp_config.name}"
+                continue
+            email = _build_email(item, from_email, reply_to, connection)
+            sent_count += _send_logged(email, email_log, now, fail_silently)
+    except Exception as e:
+        logger.error(f"Error sending emails: {str(e)}")
+        _fail_pending(email_logs, str(e))
+        if not fail_silently:
+            raise
+    finally:
+        connection.close()
+        EmailLog.objects.bulk_update(email_logs, ["status", "sent_at", "error_message"])
+        if sent_count:
+            SMTPConfiguration.objects.filter(pk=smtp_config.pk).update(
+                emails_sent_today=F("emails_sent_today") + sent_count, last_reset_date=now.date()
+            )
+
+    logger.info(f"Mass email sent: {sent_count}/{len(messages)} email(s), type={email_type}")
+    return sent_count, email_logs
+
+
+def _create_email_logs(smtp_config, messages, email_type):
+    """Pending email logs of a batch, written with one query"""
+    return EmailLog.objects.bulk_create(
+        [
+            EmailLog(
+                smtp_config=smtp_config,
+                recipient=item["recipient"],
+                subject=item["subject"],
+                body=item["message"],
+                html_body=item.get("html_message") or "",
+                status="pending",
+                email_type=email_type,
+                related_object_type=item.get("related_object_type", ""),
+                related_object_id=str(item.get("related_object_id", "")),
+            )
+            for item in messages
+        ]
+    )
+
+
+def _fail_pending(email_logs, error_message):
+    """Mark the messages of a batch that were not attempted as failed"""
+    for email_log in email_logs:
+        if email_log.status == "pending":
+            email_log.status = "failed"
+            email_log.error_message = error_message
+
+
+def _daily_allowance(smtp_config, count):
+    """Number of the ``count`` messages the daily limit of ``smtp_config`` still allows"""
+    if not smtp_config.daily_limit:
+        return count
+    if smtp_config.can_send_email():
+        return smtp_config.daily_limit - smtp_config.emails_sent_today
+    return 0
+
+
+def _smtp_connection(smtp_config, fail_silently):
+    """SMTP connection (not yet opened) for ``smtp_config``"""
+    return get_connection(
+        backend="administration.email_backend.SSLIgnoreEmailBackend",
+        host=smtp_config.host,
+        port=smtp_config.port,
+        username=smtp_config.username,
+        password=smtp_config.password,
+        use_tls=smtp_config.encryption == "tls" and smtp_config.port != 465,
+        use_ssl=smtp_config.encryption == "ssl" or smtp_config.port == 465,
+        timeout=10,
+        fail_silently=fail_silently,
+    )
+
+
+def _build_email(item, from_email, reply_to, connection):
+    email = EmailMultiAlternatives(
+        subject=item["subject"],
+        body=item["message"],
+        from_email=from_email,
+        to=[item["recipient"]],
+        reply_to=reply_to,
+        connection=connection,
+    )
+    if item.get("html_message"):
+        email.attach_alternative(item["html_message"], "text/html")
+    return email
+
+
+def _send_logged(email, email_log, now, fail_silently):
+    """Send one message of a batch and record the outcome on its log; returns 1 if sent"""
+    try:
+        email.send(fail_silently=False)
+    except Exception as e:
+        email_log.status = "failed"
+        email_log.error_message = str(e)
+        logger.error(f"Failed to send email to {email_log.recipient}: {str(e)}")
+        if not fail_silently:
+            raise
+        return 0
+    email_log.status = "sent"
+    email_log.sent_at = now
+    return 1
+
+
 def send_template_email(
     template_name,
     context,
@@ -3,6 +3,10 @@ from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 import uuid
 
+from core.utils.config_cache import ConfigCache
+
+SMTP_COUNTER_FIELDS = ['emails_sent_today', 'last_reset_date']
+
 class AgentVerification(models.Model):
     """Verification agents for QR code validation"""
     
@@ -636,14 +640,17 @@ class SMTPConfiguration(models.Model):
     
     @classmethod
     def get_active_config(cls):
-        """Get the currently active SMTP configuration"""
-        return cls.objects.filter(is_active=True).first()
+        """Get the currently active SMTP configuration (kept in memory, see core.utils.config_cache)"""
+        return _smtp_config_cache.get()
     
     def can_send_email(self):
         """Check if daily limit is reached"""
         if self.daily_limit == 0:
             return True
         
+        # The instance may be the cached copy: read the counter other processes have incremented
+        self.refresh_from_db(fields=SMTP_COUNTER_FIELDS)
+        
         # Reset counter if new day
         from django.utils import timezone
         today = timezone.now().date()
@@ -708,6 +715,14 @@ class SMTPConfiguration(models.Model):
             return False, error_msg
 
 
+_smtp_config_cache = ConfigCache(
+    SMTPConfiguration,
+    lambda: SMTPConfiguration.objects.filter(is_active=True).first(),
+    # Counter updates after each email do not change the configuration
+    ignored_fields=SMTP_COUNTER_FIELDS,
+)
+
+
 class EmailLog(models.Model):
     """Log of sent emails"""
     
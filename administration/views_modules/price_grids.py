@@ -17,6 +17,7 @@ from django.urls import reverse_lazy
 from django.utils import timezone
 from django.views.generic import CreateView, DeleteView, DetailView, ListView, UpdateView
 
+from core.utils.conditional import bump_resource_version
 from vehicles.models import GrilleTarifaire
 
 from ..decorators import admin_required
@@ -185,6 +186,9 @@ def price_grid_bulk_update(request):
         else:
             return JsonResponse({"success": False, "message": f"Unknown action: {action}"}, status=400)
 
+        # Queryset updates do not send post_save
+        bump_resource_version("price_grids")
+
         return JsonResponse({"success": True, "message": message, "count": count})
 
     except json.JSONDecodeError:
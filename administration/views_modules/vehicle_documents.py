@@ -26,8 +26,10 @@ class VehicleDocumentListView(AdminRequiredMixin, ListView):
         return page_size if page_size in (25, 50, 100) else self.paginate_by
 
     def get_queryset(self):
-        qs = DocumentVehicule.objects.select_related("vehicule", "uploaded_by", "vehicule__type_vehicule").order_by(
-            "-created_at"
+        qs = (
+            DocumentVehicule.objects.select_related("vehicule", "uploaded_by", "vehicule__type_vehicule")
+            .prefetch_related("variants")
+            .order_by("-created_at")
         )
 
         params = self.request.GET
@@ -3,10 +3,12 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 
 from api.models import APIVersion
+from core.utils.conditional import ConditionalResponseMixin
 
 
-class APIChangelogView(APIView):
+class APIChangelogView(ConditionalResponseMixin, APIView):
     permission_classes = [AllowAny]
+    conditional_resource = "api_changelog"
 
     def get(self, request):
         versions = APIVersion.objects.all().values(
@@ -0,0 +1,79 @@
+"""
+Management command to export the monthly payment statistics as open data
+
+One row per (month, payment type, payment method) group of at least k paid payments, with the
+payment count and the total paid, both with differential privacy noise. Groups are computed
+in the database and streamed to the CSV file; each export spends ``--epsilon`` of the
+``payments_monthly_<year>`` privacy budget.
+"""
+
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models.functions import TruncMonth
+
+from api.utils.anonymization import PrivacyBudgetExceeded, export_private_aggregates
+from payments.models import PaiementTaxe
+
+
+class Command(BaseCommand):
+    help = "Export the monthly payment statistics of a year as k-anonymous, differentially private open data"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, required=True, help="Year of the payments (by payment date)")
+        parser.add_argument(
+            "--epsilon", type=float, default=1.0, help="Privacy budget spent by the export (default: 1.0)"
+        )
+        parser.add_argument(
+            "--k", type=int, help="Minimum payments per published group (default: OPEN_DATA_K_ANONYMITY)"
+        )
+        parser.add_argument(
+            "--max-amount",
+            type=int,
+            default=5_000_000,
+            help="Payment amounts are clipped to this value (Ariary) before summing (default: 5000000)",
+        )
+        parser.add_argument("--output", help="CSV file to write (default: standard output)")
+
+    def handle(self, *args, **options):
+        year = options["year"]
+        payments = PaiementTaxe.objects.filter(statut="PAYE", date_paiement__year=year)
+
+        try:
+            rows = export_private_aggregates(
+                payments,
+                dataset=f"payments_monthly_{year}",
+                quasi_identifiers={
+                    "month": TruncMonth("date_paiement"),
+                    "type_paiement": "type_paiement",
+                    "methode_paiement": "methode_paiement",
+                },
+                epsilon=options["epsilon"],
+                k=options["k"],
+                sums={"total_paye_ariary": ("montant_paye_ariary", 0, options["max_amount"])},
+            )
+        except PrivacyBudgetExceeded as e:
+            raise CommandError(str(e))
+
+        output = open(options["output"], "w", newline="") if options["output"] else sys.stdout
+        try:
+            writer = csv.writer(output)
+            writer.writerow(["month", "type_paiement", "methode_paiement", "payment_count", "total_paye_ariary"])
+            count = 0
+            for row in rows:
+                writer.writerow(
+                    [
+                        row["month"].strftime("%Y-%m"),
+                        row["type_paiement"],
+                        row["methode_paiement"] or "",
+                        row["record_count"],
+                        row["total_paye_ariary"],
+                    ]
+                )
+                count += 1
+        finally:
+            if options["output"]:
+                output.close()
+
+        self.stderr.write(self.style.SUCCESS(f"Exported {count} group(s) of {year} payments"))
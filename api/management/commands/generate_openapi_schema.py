@@ -0,0 +1,34 @@
+"""
+Management command to pre-generate the OpenAPI schema
+
+Run once per deploy (after collectstatic) so /api/schema/ is served from the generated file
+instead of introspecting every viewset on the first request of each process.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.openapi_schema import code_fingerprint, get_schema_path, read_schema_artifact, write_schema_artifact
+
+
+class Command(BaseCommand):
+    help = "Generate the OpenAPI schema served by /api/schema/"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help="Schema file to write (default: OPENAPI_SCHEMA_PATH)")
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only check that the schema file matches the current code; exit with an error if not",
+        )
+
+    def handle(self, *args, **options):
+        path = options["output"] or get_schema_path()
+
+        if options["check"]:
+            if read_schema_artifact(path) is None:
+                raise CommandError(f"OpenAPI schema at {path} is missing or stale (code {code_fingerprint()})")
+            self.stdout.write(self.style.SUCCESS(f"OpenAPI schema at {path} is up to date"))
+            return
+
+        path = write_schema_artifact(path)
+        self.stdout.write(self.style.SUCCESS(f"OpenAPI schema written to {path} (code {code_fingerprint()})"))
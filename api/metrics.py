@@ -1,5 +1,23 @@
+"""
+Prometheus metrics for API requests
+
+Labels are kept to a bounded set so the number of time series does not grow with traffic:
+the endpoint is the resolved URL route template (``/api/v1/vehicles/<plaque_immatriculation>/``)
+rather than the raw path, and API keys are reported as one of ``API_METRICS_KEY_BUCKETS``
+hashed buckets rather than the secret key itself.
+"""
+
+import hashlib
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
 from prometheus_client import Counter, Histogram
 
+UNMATCHED_ENDPOINT = "<unmatched>"
+
 REQUEST_COUNT = Counter(
     "api_request_total",
     "Total API requests",
@@ -15,7 +33,7 @@ ERROR_COUNT = Counter(
 RESPONSE_TIME = Histogram(
     "api_response_time_seconds",
     "API response time",
-    ["endpoint", "method", "status_code", "api_key"],
+    ["endpoint", "method"],
     buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10),
 )
 
@@ -24,3 +42,69 @@ RATE_LIMITED_COUNT = Counter(
     "Total rate-limited responses",
     ["endpoint", "method", "api_key"],
 )
+
+DB_QUERY_COUNT = Histogram(
+    "api_db_queries_per_request",
+    "Database queries executed per request",
+    ["endpoint", "method"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+
+DB_TIME = Histogram(
+    "api_db_time_seconds",
+    "Time spent in database queries per request",
+    ["endpoint", "method"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5),
+)
+
+_GROUP_RE = re.compile(r"\(\?P<(\w+)>[^)]*\)")
+
+
+@lru_cache(maxsize=1024)
+def normalize_route(route):
+    """Turn a resolved route (path converter or regex) into a readable template"""
+    template = _GROUP_RE.sub(r"<\1>", route)
+    template = template.replace("/?", "/").replace("\\", "").strip("^$")
+    return "/" + template.lstrip("/")
+
+
+def endpoint_label(request):
+    """Route template of the request, never the raw path"""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return UNMATCHED_ENDPOINT
+    return normalize_route(match.route) if match.route else UNMATCHED_ENDPOINT
+
+
+def api_key_label(api_key_id):
+    """Hash an API key id into one of a fixed number of buckets"""
+    if api_key_id is None:
+        return ""
+    buckets = getattr(settings, "API_METRICS_KEY_BUCKETS", 32)
+    digest = hashlib.sha256(str(api_key_id).encode("utf-8")).digest()
+    return f"key-{int.from_bytes(digest[:4], 'big') % buckets:02d}"
+
+
+def record_request(request, status_code, duration_seconds=None, api_key_id=None, error_type=None):
+    """Record request, error and latency metrics for a finished request"""
+    endpoint = endpoint_label(request)
+    key = api_key_label(api_key_id)
+    REQUEST_COUNT.labels(endpoint=endpoint, method=request.method, status_code=str(status_code), api_key=key).inc()
+    if duration_seconds is not None:
+        RESPONSE_TIME.labels(endpoint=endpoint, method=request.method).observe(duration_seconds)
+    if status_code >= 400:
+        ERROR_COUNT.labels(
+            endpoint=endpoint, method=request.method, error_type=str(error_type or status_code), api_key=key
+        ).inc()
+    if status_code == 429:
+        RATE_LIMITED_COUNT.labels(endpoint=endpoint, method=request.method, api_key=key).inc()
+
+
+def record_queries(request, stats):
+    """Record the number of queries and database time of a finished request"""
+    endpoint = endpoint_label(request)
+    DB_QUERY_COUNT.labels(endpoint=endpoint, method=request.method).observe(stats.count)
+    DB_TIME.labels(endpoint=endpoint, method=request.method).observe(stats.duration)
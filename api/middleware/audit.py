@@ -6,7 +6,7 @@ from django.utils.deprecation import MiddlewareMixin
 import logging
 
 from api.models import APIAuditLog, APIKey
-from api.metrics import REQUEST_COUNT, ERROR_COUNT, RESPONSE_TIME, RATE_LIMITED_COUNT
+from api.metrics import record_request
 from api.utils.masking import mask_payload
 
 
@@ -86,6 +86,7 @@ class AuditLoggingMiddleware(MiddlewareMixin):
             except Exception:
                 pass
 
+            error_code = None
             try:
                 sc = int(getattr(response, 'status_code', 0))
                 if sc >= 400:
@@ -99,12 +100,7 @@ class AuditLoggingMiddleware(MiddlewareMixin):
                         'code': code,
                     }
                     logging.getLogger('api.errors').info(json.dumps(log_payload))
-                    ERROR_COUNT.labels(
-                        endpoint=request.path,
-                        method=request.method,
-                        error_type=str(code or sc),
-                        api_key=(api_key_obj.key if api_key_obj else ""),
-                    ).inc()
+                    error_code = code
             except Exception:
                 pass
 
@@ -138,26 +134,13 @@ class AuditLoggingMiddleware(MiddlewareMixin):
             )
 
             try:
-                sc = int(getattr(response, 'status_code', 0))
-                REQUEST_COUNT.labels(
-                    endpoint=request.path,
-                    method=request.method,
-                    status_code=str(sc),
-                    api_key=(api_key_obj.key if api_key_obj else ""),
-                ).inc()
-                if duration_ms is not None:
-                    RESPONSE_TIME.labels(
-                        endpoint=request.path,
-                        method=request.method,
-                        status_code=str(sc),
-                        api_key=(api_key_obj.key if api_key_obj else ""),
-                    ).observe(duration_ms / 1000.0)
-                if sc == 429:
-                    RATE_LIMITED_COUNT.labels(
-                        endpoint=request.path,
-                        method=request.method,
-                        api_key=(api_key_obj.key if api_key_obj else ""),
-                    ).inc()
+                record_request(
+                    request,
+                    int(getattr(response, 'status_code', 0)),
+                    duration_seconds=(duration_ms / 1000.0 if duration_ms is not None else None),
+                    api_key_id=(api_key_obj.pk if api_key_obj else None),
+                    error_type=error_code,
+                )
             except Exception:
                 pass
 
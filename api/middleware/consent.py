@@ -6,7 +6,8 @@ Implements GDPR-compliant consent verification for personal data endpoints.
 
 from django.utils.deprecation import MiddlewareMixin
 from django.http import JsonResponse
-from api.models_consent import DataConsent, DataAccessLog
+from api.models_consent import DataConsent
+from api.utils.access_log import access_log_buffer
 import re
 
 
@@ -20,6 +21,24 @@ CONSENT_REQUIRED_ENDPOINTS = {
     r'^/api/v1/users/\d+/payments/$': 'payment_history',
 }
 
+_CONSENT_ROUTES = [(re.compile(pattern), consent_type) for pattern, consent_type in CONSENT_REQUIRED_ENDPOINTS.items()]
+
+# Access type from HTTP method
+ACCESS_TYPE_MAP = {
+    'GET': 'read',
+    'POST': 'modify',
+    'PUT': 'modify',
+    'PATCH': 'modify',
+    'DELETE': 'delete',
+}
+
+# Data type from consent type
+DATA_TYPE_MAP = {
+    'profile_access': 'profile',
+    'vehicle_data': 'vehicle',
+    'payment_history': 'payment',
+}
+
 
 class ConsentVerificationMiddleware(MiddlewareMixin):
     """
@@ -66,49 +85,25 @@ class ConsentVerificationMiddleware(MiddlewareMixin):
     
     def _get_required_consent_type(self, path):
         """Determine if path requires consent and what type"""
-        for pattern, consent_type in CONSENT_REQUIRED_ENDPOINTS.items():
-            if re.match(pattern, path):
+        for pattern, consent_type in _CONSENT_ROUTES:
+            if pattern.match(path):
                 return consent_type
         return None
     
     def _log_data_access(self, request, consent_type):
-        """Log access to personal data"""
-        try:
-            # Determine access type from HTTP method
-            access_type_map = {
-                'GET': 'read',
-                'POST': 'modify',
-                'PUT': 'modify',
-                'PATCH': 'modify',
-                'DELETE': 'delete',
-            }
-            access_type = access_type_map.get(request.method, 'read')
-            
-            # Determine data type from consent type
-            data_type_map = {
-                'profile_access': 'profile',
-                'vehicle_data': 'vehicle',
-                'payment_history': 'payment',
-            }
-            data_type = data_type_map.get(consent_type, 'unknown')
-            
-            DataAccessLog.objects.create(
-                user=request.user,
-                accessed_by=request.user,
-                access_type=access_type,
-                data_type=data_type,
-                endpoint=request.path,
-                ip_address=request.META.get('HTTP_X_FORWARDED_FOR') or request.META.get('REMOTE_ADDR'),
-                user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                consent_verified=True,
-                consent_type=consent_type,
-                metadata={
-                    'method': request.method,
-                    'correlation_id': getattr(request, 'correlation_id', None),
-                }
-            )
-        except Exception as e:
-            # Don't fail the request if logging fails
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Failed to log data access: {str(e)}")
+        """Log access to personal data (buffered, see api.utils.access_log)"""
+        access_log_buffer.add(
+            user_id=request.user.pk,
+            accessed_by_id=request.user.pk,
+            access_type=ACCESS_TYPE_MAP.get(request.method, 'read'),
+            data_type=DATA_TYPE_MAP.get(consent_type, 'unknown'),
+            endpoint=request.path,
+            ip_address=request.META.get('HTTP_X_FORWARDED_FOR') or request.META.get('REMOTE_ADDR'),
+            user_agent=request.META.get('HTTP_USER_AGENT', ''),
+            consent_verified=True,
+            consent_type=consent_type,
+            metadata={
+                'method': request.method,
+                'correlation_id': getattr(request, 'correlation_id', None),
+            },
+        )
@@ -0,0 +1,36 @@
+import logging
+
+from django.conf import settings
+
+from api.metrics import endpoint_label, record_queries
+from core.utils.query_budget import QueryInspector
+
+logger = logging.getLogger(__name__)
+
+
+class QueryMetricsMiddleware:
+    """
+    Record the number of database queries and the database time of each request,
+    per route template, so N+1 regressions show up in production metrics.
+
+    Requests over ``QUERY_BUDGET_REQUEST`` queries or repeating a query shape are reported
+    on the ``query_budget`` logger. With ``QUERY_COUNT_HEADER`` enabled (the default in
+    DEBUG) the response carries ``X-Query-Count`` and ``X-Query-Duplicates`` headers.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        inspector = QueryInspector()
+        with inspector.track():
+            response = self.get_response(request)
+        try:
+            record_queries(request, inspector)
+            inspector.report("request", f"{request.method} {endpoint_label(request)}")
+            if getattr(settings, "QUERY_COUNT_HEADER", settings.DEBUG):
+                response["X-Query-Count"] = str(inspector.count)
+                response["X-Query-Duplicates"] = str(sum(n for _, n in inspector.duplicates()))
+        except Exception:
+            logger.debug("Could not record query metrics", exc_info=True)
+        return response
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0007_dataaccesslog_dataconsent_datadeletionrequest_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="webhookdelivery",
+            index=models.Index(fields=["status", "next_attempt_at"], name="webhook_deliveries_due_idx"),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 03:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0008_webhook_delivery_due_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PrivacyBudget",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("dataset", models.CharField(db_index=True, max_length=100, unique=True)),
+                ("epsilon_limit", models.FloatField(help_text="Total epsilon the dataset may spend over all releases")),
+                ("epsilon_spent", models.FloatField(default=0)),
+                ("release_count", models.IntegerField(default=0)),
+                ("last_release_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Privacy Budget",
+                "verbose_name_plural": "Privacy Budgets",
+                "db_table": "api_privacy_budget",
+                "ordering": ["dataset"],
+            },
+        ),
+    ]
@@ -424,6 +424,8 @@ class WebhookDelivery(models.Model):
         indexes = [
             models.Index(fields=["status"]),
             models.Index(fields=["event_type"]),
+            # Retry sweep over due deliveries
+            models.Index(fields=["status", "next_attempt_at"], name="webhook_deliveries_due_idx"),
         ]
 
     def __str__(self):
@@ -458,6 +460,7 @@ from api.models_consent import (
     DataAccessLog,
     DataRetentionPolicy,
     DataDeletionRequest,
+    PrivacyBudget,
 )
 
 # Make them available from api.models
@@ -474,4 +477,5 @@ __all__ = [
     'DataAccessLog',
     'DataRetentionPolicy',
     'DataDeletionRequest',
+    'PrivacyBudget',
 ]
@@ -4,7 +4,9 @@ Data Protection and Consent Management Models
 This module implements GDPR-compliant consent tracking and data protection features.
 """
 
-from django.db import models
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 import uuid
@@ -66,6 +68,10 @@ class DataConsent(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.get_consent_type_display()} ({self.status})"
     
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        DataConsent.invalidate_cache(self.user_id)
+    
     def is_valid(self):
         """Check if consent is currently valid"""
         if self.status != 'granted':
@@ -87,14 +93,44 @@ class DataConsent(models.Model):
             self.metadata['revocation_reason'] = reason
         self.save(update_fields=['status', 'revoked_at', 'metadata'])
     
+    @staticmethod
+    def _cache_key(user_id):
+        return f"consent:granted:{user_id}"
+    
+    @classmethod
+    def invalidate_cache(cls, user_id):
+        """Drop the cached consents of a user, again once the current transaction commits"""
+        key = cls._cache_key(user_id)
+        cache.delete(key)
+        transaction.on_commit(lambda: cache.delete(key))
+    
+    @classmethod
+    def granted_consents(cls, user_id):
+        """Granted consent types of a user mapped to their expiry date, cached for CONSENT_CACHE_TIMEOUT"""
+        key = cls._cache_key(user_id)
+        granted = cache.get(key)
+        if granted is None:
+            granted = dict(
+                cls.objects.filter(user_id=user_id, status='granted').values_list('consent_type', 'expires_at')
+            )
+            cache.set(key, granted, getattr(settings, 'CONSENT_CACHE_TIMEOUT', 300))
+        return granted
+    
     @classmethod
     def has_consent(cls, user, consent_type):
         """Check if user has valid consent for a specific type"""
-        try:
-            consent = cls.objects.get(user=user, consent_type=consent_type)
-            return consent.is_valid()
-        except cls.DoesNotExist:
+        granted = cls.granted_consents(user.pk)
+        if consent_type not in granted:
             return False
+        
+        expires_at = granted[consent_type]
+        if expires_at and timezone.now() > expires_at:
+            # Let is_valid() record the expiry
+            try:
+                return cls.objects.get(user=user, consent_type=consent_type).is_valid()
+            except cls.DoesNotExist:
+                return False
+        return True
     
     @classmethod
     def grant_consent(cls, user, consent_type, purpose, granted_via='web', ip_address=None, user_agent='', expires_at=None):
@@ -253,3 +289,35 @@ class DataDeletionRequest(models.Model):
     
     def __str__(self):
         return f"Deletion request for {self.user.username} - {self.status}"
+
+
+class PrivacyBudget(models.Model):
+    """
+    Differential privacy budget of a published dataset
+
+    Every noisy release of the dataset spends part of ``epsilon_limit``; the privacy loss of
+    successive releases adds up, so no release is allowed once the budget is spent.
+    """
+    
+    dataset = models.CharField(max_length=100, unique=True, db_index=True)
+    epsilon_limit = models.FloatField(help_text="Total epsilon the dataset may spend over all releases")
+    epsilon_spent = models.FloatField(default=0)
+    release_count = models.IntegerField(default=0)
+    last_release_at = models.DateTimeField(null=True, blank=True)
+    
+    # Metadata
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'api_privacy_budget'
+        verbose_name = 'Privacy Budget'
+        verbose_name_plural = 'Privacy Budgets'
+        ordering = ['dataset']
+    
+    def __str__(self):
+        return f"{self.dataset} - {self.epsilon_spent:g}/{self.epsilon_limit:g}"
+    
+    @property
+    def epsilon_remaining(self):
+        return max(self.epsilon_limit - self.epsilon_spent, 0)
@@ -0,0 +1,160 @@
+"""
+Pre-generated OpenAPI schema
+
+Introspecting every viewset and serializer (and running the post-processing hooks over all
+error codes and examples) takes seconds, so the schema is generated once per deploy with
+``manage.py generate_openapi_schema`` and written to ``OPENAPI_SCHEMA_PATH`` together with a
+fingerprint of the code it was generated from.
+
+``CachedSpectacularAPIView`` serves that file from memory, rendered once per format, with
+the fingerprint as ETag. If the file is missing or was generated from other code (the
+fingerprints differ), the schema is generated once in the process instead.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.http import parse_etags
+
+import drf_spectacular
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.views import SpectacularAPIView
+
+logger = logging.getLogger(__name__)
+
+SKIPPED_DIRECTORIES = {"migrations", "tests", "__pycache__"}
+
+
+def get_schema_path():
+    return Path(getattr(settings, "OPENAPI_SCHEMA_PATH", Path(settings.BASE_DIR) / "openapi" / "schema.json"))
+
+
+@lru_cache(maxsize=1)
+def code_fingerprint():
+    """Hash of the project's Python sources, drf-spectacular version and schema settings"""
+    digest = hashlib.sha256()
+    digest.update(drf_spectacular.__version__.encode())
+    digest.update(repr(sorted((k, repr(v)) for k, v in settings.SPECTACULAR_SETTINGS.items())).encode())
+
+    base_dir = Path(settings.BASE_DIR).resolve()
+    for app_config in sorted(apps.get_app_configs(), key=lambda config: config.name):
+        app_path = Path(app_config.path).resolve()
+        if base_dir not in app_path.parents:
+            continue
+        for source in sorted(app_path.rglob("*.py")):
+            if SKIPPED_DIRECTORIES.intersection(source.relative_to(app_path).parts):
+                continue
+            digest.update(str(source.relative_to(base_dir)).encode())
+            digest.update(source.read_bytes())
+    return digest.hexdigest()[:32]
+
+
+def generate_schema():
+    """Generate the public schema the same way ``SpectacularAPIView`` does"""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS(urlconf=spectacular_settings.SERVE_URLCONF)
+    return generator.get_schema(request=None, public=True)
+
+
+def write_schema_artifact(path=None):
+    """Generate the schema and write it with its code fingerprint; returns the path"""
+    path = Path(path or get_schema_path())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    artifact = {
+        "fingerprint": code_fingerprint(),
+        "generated_at": timezone.now().isoformat(),
+        "schema": generate_schema(),
+    }
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(artifact, cls=_SchemaEncoder), encoding="utf-8")
+    tmp_path.replace(path)
+    return path
+
+
+def read_schema_artifact(path=None):
+    """The schema artifact on disk, or None if it is missing or was generated from other code"""
+    path = Path(path or get_schema_path())
+    try:
+        artifact = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if artifact.get("fingerprint") != code_fingerprint():
+        return None
+    return artifact
+
+
+class _SchemaEncoder(json.JSONEncoder):
+    def default(self, o):
+        # Lazy translation strings and other objects the YAML/JSON renderers would stringify
+        return str(o)
+
+
+@dataclass
+class SchemaArtifact:
+    schema: dict
+    etag: str
+    rendered: dict = field(default_factory=dict)
+
+
+_lock = threading.Lock()
+_artifact = None
+
+
+def get_schema_artifact():
+    """The schema served by this process, loaded or generated on first use"""
+    global _artifact
+    if _artifact is None:
+        with _lock:
+            if _artifact is None:
+                stored = read_schema_artifact()
+                if stored is None:
+                    logger.warning(
+                        "OpenAPI schema at %s is missing or stale, generating it in-process; "
+                        "run generate_openapi_schema when deploying",
+                        get_schema_path(),
+                    )
+                    schema = json.loads(json.dumps(generate_schema(), cls=_SchemaEncoder))
+                else:
+                    schema = stored["schema"]
+                _artifact = SchemaArtifact(schema=schema, etag=f'"{code_fingerprint()}"')
+    return _artifact
+
+
+def reset_schema_artifact():
+    global _artifact
+    _artifact = None
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """``SpectacularAPIView`` serving the pre-generated schema, rendered once per format"""
+
+    def _get_schema_response(self, request):
+        if request.GET.get("lang") or request.GET.get("version"):
+            # Translated or versioned variants are not pre-generated
+            return super()._get_schema_response(request)
+
+        artifact = get_schema_artifact()
+        if artifact.etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = HttpResponseNotModified()
+            response["ETag"] = artifact.etag
+            return response
+
+        renderer, media_type = self.perform_content_negotiation(request)
+        content = artifact.rendered.get(media_type)
+        if content is None:
+            content = renderer.render(artifact.schema, media_type, self.get_renderer_context())
+            artifact.rendered[media_type] = content
+
+        response = HttpResponse(content, content_type=media_type)
+        response["ETag"] = artifact.etag
+        response["Content-Disposition"] = f'inline; filename="{self._get_filename(request, None)}"'
+        response["Cache-Control"] = f"public, max-age={getattr(settings, 'API_REFERENCE_MAX_AGE', 300)}"
+        return response
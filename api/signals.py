@@ -10,8 +10,10 @@ from django.dispatch import receiver
 from django.db import connection
 from django.db.models.fields.files import FieldFile
 
-from api.models import DataChangeLog, APIAuditLog, APIVersion
+from api.models import DataChangeLog, APIAuditLog, APIVersion, DataConsent, WebhookSubscription
 from api.utils.masking import mask_payload
+from core.utils.conditional import bump_resource_version
+from vehicles.models import GrilleTarifaire, VehicleType
 
 
 def _instance_to_dict(instance) -> dict:
@@ -114,6 +116,31 @@ def log_post_delete(sender, instance, **kwargs):
         pass
 
 
+@receiver([post_save, post_delete], sender=VehicleType)
+def bump_vehicle_types_version(sender, **kwargs):
+    bump_resource_version("vehicle_types")
+
+
+@receiver([post_save, post_delete], sender=GrilleTarifaire)
+def bump_price_grids_version(sender, **kwargs):
+    bump_resource_version("price_grids")
+
+
+@receiver([post_save, post_delete], sender=APIVersion)
+def bump_api_changelog_version(sender, **kwargs):
+    bump_resource_version("api_changelog")
+
+
+@receiver([post_save, post_delete], sender=WebhookSubscription)
+def bump_webhook_subscriptions_version(sender, **kwargs):
+    bump_resource_version("webhook_subscriptions")
+
+
+@receiver(post_delete, sender=DataConsent)
+def invalidate_consent_cache(sender, instance, **kwargs):
+    DataConsent.invalidate_cache(instance.user_id)
+
+
 @receiver(pre_save)
 def capture_pre_save(sender, instance, **kwargs):
     if _should_skip(sender) or ('migrate' in sys.argv) or (not _logging_available()):
@@ -1,89 +1,42 @@
 import csv
 import os
-import json
-import time
 from datetime import datetime, timedelta
-import hashlib
-import hmac
-
-import requests
 
 from celery import shared_task
 from django.conf import settings
 from django.db.models import Count
 
-from django.utils import timezone
-
 from api.models import APIAuditLog, WebhookDelivery
 
 
-BACKOFF_SCHEDULE = [5, 30, 120]
-
-
-def _compute_signature(secret: str, body_bytes: bytes) -> str:
-    return hmac.new(secret.encode("utf-8"), body_bytes, hashlib.sha256).hexdigest()
-
-
-@shared_task(bind=True)
-def deliver_webhook_event(self, delivery_id: str):
-    try:
-        delivery = WebhookDelivery.objects.select_related("subscription").get(id=delivery_id)
-    except WebhookDelivery.DoesNotExist:
-        return
-
-    sub = delivery.subscription
-    url = sub.target_url
-    body_bytes = json.dumps(delivery.payload, separators=(",", ":"), sort_keys=True).encode("utf-8")
-    signature = _compute_signature(sub.secret, body_bytes)
-
-    # Update signature in case payload changed
-    if delivery.signature != signature:
-        delivery.signature = signature
-        delivery.save(update_fields=["signature"])
-
-    headers = {
-        "Content-Type": "application/json",
-        "X-TC-Signature": signature,
-        "X-TC-Event": delivery.event_type,
-        "X-TC-Timestamp": str(int(time.time())),
-    }
-
-    try:
-        resp = requests.post(url, data=body_bytes, headers=headers, timeout=10)
-        delivery.response_code = resp.status_code
-        # Avoid logging huge bodies
-        delivery.response_body = resp.text[:4000] if resp.text else ""
-        delivery.attempt_count = (delivery.attempt_count or 0) + 1
-
-        if 200 <= resp.status_code < 300:
-            delivery.status = WebhookDelivery.STATUS_SUCCESS
-            delivery.error_message = ""
-            delivery.next_attempt_at = None
-        else:
-            delivery.status = WebhookDelivery.STATUS_FAILED
-            delivery.error_message = f"HTTP {resp.status_code}"
-            # Schedule retry if attempts remain
-            attempts = delivery.attempt_count
-            if attempts < 3:
-                delay = BACKOFF_SCHEDULE[min(attempts - 1, len(BACKOFF_SCHEDULE) - 1)]
-                delivery.next_attempt_at = timezone.now() + timedelta(seconds=delay)
-                delivery.save()
-                deliver_webhook_event.apply_async(args=[delivery_id], countdown=delay)
-                return
-        delivery.save()
-    except Exception as e:
-        delivery.attempt_count = (delivery.attempt_count or 0) + 1
-        delivery.status = WebhookDelivery.STATUS_FAILED
-        delivery.error_message = str(e)[:2000]
-        attempts = delivery.attempt_count
-        if attempts < 3:
-            delay = BACKOFF_SCHEDULE[min(attempts - 1, len(BACKOFF_SCHEDULE) - 1)]
-            delivery.next_attempt_at = timezone.now() + timedelta(seconds=delay)
-            delivery.save()
-            deliver_webhook_event.apply_async(args=[delivery_id], countdown=delay)
-            return
-        delivery.next_attempt_at = None
-        delivery.save()
+@shared_task
+def deliver_webhook_event(delivery_id: str):
+    """Send one delivery now, whatever its next attempt time (manual retry)"""
+    from api.utils.webhooks import delivery_engine
+
+    deliveries = delivery_engine.claim(
+        WebhookDelivery.objects.filter(id=delivery_id).exclude(status=WebhookDelivery.STATUS_SUCCESS)
+    )
+    return delivery_engine.deliver_batch(deliveries)
+
+
+@shared_task
+def deliver_webhook_batch(delivery_ids):
+    """Send the due deliveries among ``delivery_ids`` (queued by ``dispatch_webhook_event``)"""
+    from api.utils.webhooks import delivery_engine
+
+    deliveries = delivery_engine.claim(delivery_engine.due().filter(id__in=delivery_ids))
+    return delivery_engine.deliver_batch(deliveries)
+
+
+@shared_task
+def retry_webhook_deliveries(batch_size=None):
+    """Sweep deliveries whose next attempt is due: retries, deferred and lost deliveries"""
+    from api.utils.webhooks import delivery_engine
+
+    batch_size = batch_size or getattr(settings, "WEBHOOK_DELIVERY_BATCH_SIZE", 100)
+    deliveries = delivery_engine.claim(delivery_engine.due(), limit=batch_size)
+    return delivery_engine.deliver_batch(deliveries)
 
 
 @shared_task
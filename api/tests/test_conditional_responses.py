@@ -0,0 +1,56 @@
+"""
+Tests for ETag/Last-Modified handling of reference data endpoints
+"""
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from rest_framework.test import APIClient
+
+from vehicles.models import VehicleType
+
+
+class ConditionalReferenceDataTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        VehicleType.objects.create(nom="Voiture", est_actif=True)
+
+    def test_unchanged_vehicle_types_are_not_modified(self):
+        response = self.client.get("/api/v1/vehicle-types/")
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("Last-Modified", response)
+
+        # Only the audit log insert of the API middleware
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/v1/vehicle-types/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        # Another page or filter is another representation
+        response = self.client.get("/api/v1/vehicle-types/?page=1", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_saving_a_vehicle_type_changes_the_etag(self):
+        etag = self.client.get("/api/v1/vehicle-types/")["ETag"]
+
+        VehicleType.objects.create(nom="Moto", est_actif=True)
+        response = self.client.get("/api/v1/vehicle-types/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_cylindree_conversion_by_get(self):
+        response = self.client.get("/api/v1/convert-cylindree/", {"cylindree": 1500})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["cv_suggere"], 13)
+
+        response = self.client.get(
+            "/api/v1/convert-cylindree/", {"cylindree": 1500}, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get("/api/v1/convert-cylindree/", {"cylindree": 0})
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn("ETag", response)
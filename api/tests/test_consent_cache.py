@@ -0,0 +1,87 @@
+"""
+Tests for the consent cache and buffered data access logging
+"""
+
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, override_settings
+
+import pytest
+
+from api.middleware.consent import ConsentVerificationMiddleware
+from api.models_consent import DataAccessLog, DataConsent
+from api.utils.access_log import access_log_buffer
+
+
+@pytest.fixture
+def user(db):
+    cache.clear()
+    return User.objects.create_user(username="consent-user", password="testpass123")
+
+
+def vehicle_request(user):
+    request = RequestFactory().get("/api/v1/vehicles/")
+    request.user = user
+    return request
+
+
+@pytest.mark.django_db
+class TestConsentCache:
+    def test_consent_checks_are_cached_until_revoked(self, user, django_assert_num_queries):
+        consent = DataConsent.grant_consent(user=user, consent_type="vehicle_data", purpose="Test", granted_via="test")
+        assert DataConsent.has_consent(user, "vehicle_data")
+
+        with django_assert_num_queries(0):
+            assert DataConsent.has_consent(user, "vehicle_data")
+            assert not DataConsent.has_consent(user, "payment_history")
+
+        consent.revoke(reason="Test")
+        assert not DataConsent.has_consent(user, "vehicle_data")
+
+        DataConsent.grant_consent(user=user, consent_type="vehicle_data", purpose="Test", granted_via="test")
+        assert DataConsent.has_consent(user, "vehicle_data")
+
+    def test_deleting_a_consent_invalidates_the_cache(self, user):
+        consent = DataConsent.grant_consent(user=user, consent_type="vehicle_data", purpose="Test", granted_via="test")
+        assert DataConsent.has_consent(user, "vehicle_data")
+
+        consent.delete()
+        assert not DataConsent.has_consent(user, "vehicle_data")
+
+
+@pytest.mark.django_db
+class TestBufferedAccessLog:
+    @override_settings(CONSENT_ACCESS_LOG_BATCH_SIZE=3, CONSENT_ACCESS_LOG_FLUSH_SECONDS=3600)
+    def test_access_logs_are_written_in_batches(self, user, django_assert_num_queries):
+        DataConsent.grant_consent(user=user, consent_type="vehicle_data", purpose="Test", granted_via="test")
+        middleware = ConsentVerificationMiddleware(lambda r: None)
+        middleware.process_request(vehicle_request(user))
+
+        with django_assert_num_queries(0):
+            assert middleware.process_request(vehicle_request(user)) is None
+        assert DataAccessLog.objects.count() == 0
+
+        with django_assert_num_queries(1):
+            middleware.process_request(vehicle_request(user))
+        assert len(access_log_buffer) == 0
+        logs = DataAccessLog.objects.filter(user=user)
+        assert logs.count() == 3
+        assert {log.data_type for log in logs} == {"vehicle"}
+
+    @override_settings(CONSENT_ACCESS_LOG_BATCH_SIZE=50, CONSENT_ACCESS_LOG_FLUSH_SECONDS=2)
+    def test_idle_worker_flushes_after_the_delay(self, user):
+        DataConsent.grant_consent(user=user, consent_type="vehicle_data", purpose="Test", granted_via="test")
+        middleware = ConsentVerificationMiddleware(lambda r: None)
+
+        with mock.patch("api.utils.access_log.threading.Timer") as timer:
+            middleware.process_request(vehicle_request(user))
+            middleware.process_request(vehicle_request(user))
+
+        # One timer per batch, armed by its first entry
+        timer.assert_called_once_with(2, access_log_buffer._flush_from_timer)
+        timer.return_value.start.assert_called_once_with()
+        assert DataAccessLog.objects.count() == 0
+        access_log_buffer.flush()
+        assert DataAccessLog.objects.filter(user=user).count() == 2
@@ -30,3 +30,37 @@ def test_prometheus_metrics_endpoint_records_requests_without_db(monkeypatch):
     assert 'endpoint="/api/v1/health/"' in body
     assert 'method="GET"' in body
     assert 'status_code="200"' in body
+
+
+def test_metrics_use_route_template_and_hashed_api_key(monkeypatch):
+    from api.metrics import api_key_label, record_request
+
+    rf = RequestFactory()
+    for plate in ("1234TAA", "5678TBB"):
+        record_request(rf.get(f"/api/v1/vehicles/{plate}/"), 200, duration_seconds=0.01, api_key_id=7)
+    record_request(rf.get("/no/such/route/42/"), 404)
+
+    body = ExportToDjangoView(rf.get("/api/metrics/")).content.decode("utf-8")
+    assert 'endpoint="/api/v1/vehicles/<plaque_immatriculation>/"' in body
+    assert "1234TAA" not in body and "5678TBB" not in body
+    assert 'endpoint="<unmatched>"' in body
+    assert f'api_key="{api_key_label(7)}"' in body
+    assert api_key_label(7).startswith("key-")
+
+
+def test_query_metrics_middleware_records_db_queries(db):
+    from django.contrib.auth.models import User
+
+    from api.middleware.metrics import QueryMetricsMiddleware
+
+    def view(request):
+        list(User.objects.all())
+        list(User.objects.all())
+        return JsonResponse({})
+
+    req = RequestFactory().get("/api/v1/health/")
+    QueryMetricsMiddleware(view)(req)
+
+    body = ExportToDjangoView(req).content.decode("utf-8")
+    assert 'api_db_queries_per_request_bucket{endpoint="/api/v1/health/",le="2.0",method="GET"}' in body
+    assert 'api_db_time_seconds_count{endpoint="/api/v1/health/",method="GET"}' in body
@@ -0,0 +1,119 @@
+from datetime import datetime
+from decimal import Decimal
+from importlib.util import find_spec
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.db.models.functions import TruncMonth
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.models import PrivacyBudget
+from api.utils.anonymization import (
+    PrivacyBudgetExceeded,
+    export_private_aggregates,
+    k_anonymize_dataset,
+    k_anonymous_groups,
+    spend_privacy_budget,
+)
+from payments.models import PaiementTaxe
+from vehicles.models import VehicleType, Vehicule
+
+
+class OpenDataExportTest(TestCase):
+    """
+    Open data exports group payments in the database and spend a privacy budget per dataset
+    """
+
+    def setUp(self):
+        owner = User.objects.create_user(username="owner", password="pw")
+        self.vehicle = Vehicule.objects.create(
+            plaque_immatriculation="1234TAA",
+            proprietaire=owner,
+            marque="Toyota",
+            puissance_fiscale_cv=13,
+            cylindree_cm3=1800,
+            source_energie="Essence",
+            date_premiere_circulation="2020-01-01",
+            type_vehicule=VehicleType.objects.create(nom="Voiture"),
+        )
+        # March: 5 MVola payments and 2 cash payments; April: 5 cash payments
+        self.fiscal_year = 2000
+        for month, method, count in ((3, "mvola", 5), (3, "cash", 2), (4, "cash", 5)):
+            for _ in range(count):
+                self.pay(datetime(2025, month, 10, 12), method, Decimal("100000"))
+
+    def pay(self, paid_at, method, amount):
+        self.fiscal_year += 1
+        return PaiementTaxe.objects.create(
+            type_paiement="TAXE_VEHICULE",
+            vehicule_plaque=self.vehicle,
+            annee_fiscale=self.fiscal_year,
+            montant_du_ariary=amount,
+            montant_paye_ariary=amount,
+            statut="PAYE",
+            date_paiement=timezone.make_aware(paid_at),
+            methode_paiement=method,
+        )
+
+    def test_groups_smaller_than_k_are_suppressed_in_the_database(self):
+        with self.assertNumQueries(1):
+            groups = list(
+                k_anonymous_groups(
+                    PaiementTaxe.objects.all(),
+                    {"month": TruncMonth("date_paiement"), "methode_paiement": "methode_paiement"},
+                    k=5,
+                )
+            )
+
+        self.assertEqual(
+            [(group["month"].month, group["methode_paiement"], group["record_count"]) for group in groups],
+            [(3, "mvola", 5), (4, "cash", 5)],
+        )
+
+    def test_k_anonymize_dataset_keeps_records_of_large_groups(self):
+        records = k_anonymize_dataset(PaiementTaxe.objects.all(), k=5, quasi_identifiers=["methode_paiement"])
+
+        self.assertEqual(records.count(), 12)
+        self.assertEqual(k_anonymize_dataset(PaiementTaxe.objects.filter(methode_paiement="cash"), k=8).count(), 0)
+
+    @override_settings(OPEN_DATA_EPSILON_BUDGET=1.0)
+    def test_privacy_budget_cannot_be_overspent(self):
+        spend_privacy_budget("payments_monthly_2025", 0.6)
+        budget = spend_privacy_budget("payments_monthly_2025", 0.4)
+
+        self.assertEqual(budget.release_count, 2)
+        self.assertAlmostEqual(budget.epsilon_remaining, 0)
+        with self.assertRaises(PrivacyBudgetExceeded):
+            spend_privacy_budget("payments_monthly_2025", 0.1)
+        self.assertEqual(PrivacyBudget.objects.get(dataset="payments_monthly_2025").release_count, 2)
+
+    @skipUnless(find_spec("numpy"), "numpy is not installed")
+    def test_export_streams_noisy_groups_and_spends_budget(self):
+        import numpy as np
+
+        rows = export_private_aggregates(
+            PaiementTaxe.objects.filter(statut="PAYE"),
+            dataset="payments_monthly_2025",
+            quasi_identifiers={"month": TruncMonth("date_paiement"), "methode_paiement": "methode_paiement"},
+            epsilon=1.0,
+            k=5,
+            sums={"total_paye_ariary": ("montant_paye_ariary", 0, 200000)},
+            chunk_size=1,
+            rng=np.random.default_rng(42),
+        )
+        self.assertEqual(PrivacyBudget.objects.get(dataset="payments_monthly_2025").epsilon_spent, 1.0)
+
+        rows = list(rows)
+        self.assertEqual([(row["month"].month, row["methode_paiement"]) for row in rows], [(3, "mvola"), (4, "cash")])
+        for row in rows:
+            self.assertGreaterEqual(row["record_count"], 0)
+            self.assertNotEqual(row["total_paye_ariary"], 500000)
+
+        with self.assertRaises(PrivacyBudgetExceeded):
+            export_private_aggregates(
+                PaiementTaxe.objects.all(),
+                dataset="payments_monthly_2025",
+                quasi_identifiers=["methode_paiement"],
+                epsilon=100.0,
+            )
@@ -0,0 +1,54 @@
+"""
+Tests for the pre-generated OpenAPI schema
+"""
+
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from rest_framework.test import APIClient
+
+from api.openapi_schema import code_fingerprint, read_schema_artifact, reset_schema_artifact
+
+
+class PregeneratedSchemaTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "schema.json"
+        reset_schema_artifact()
+        self.addCleanup(reset_schema_artifact)
+        self.addCleanup(self.tmp.cleanup)
+
+    def write_artifact(self, fingerprint, schema):
+        self.path.write_text(json.dumps({"fingerprint": fingerprint, "schema": schema}))
+
+    def test_command_writes_a_fresh_schema(self):
+        call_command("generate_openapi_schema", output=str(self.path), stdout=StringIO())
+
+        artifact = read_schema_artifact(self.path)
+        self.assertEqual(artifact["fingerprint"], code_fingerprint())
+        self.assertIn("/vehicle-types/", artifact["schema"]["paths"])
+        call_command("generate_openapi_schema", output=str(self.path), check=True, stdout=StringIO())
+
+    def test_stale_schema_is_ignored(self):
+        self.write_artifact("other-code", {"openapi": "3.0.3", "paths": {}})
+
+        self.assertIsNone(read_schema_artifact(self.path))
+        with self.assertRaises(CommandError):
+            call_command("generate_openapi_schema", output=str(self.path), check=True)
+
+    def test_view_serves_the_pregenerated_schema(self):
+        self.write_artifact(code_fingerprint(), {"openapi": "3.0.3", "info": {"title": "Pre-generated"}, "paths": {}})
+        client = APIClient()
+
+        with override_settings(OPENAPI_SCHEMA_PATH=str(self.path)):
+            response = client.get("/api/schema/", HTTP_ACCEPT="application/json")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.content)["info"]["title"], "Pre-generated")
+
+            response = client.get("/api/schema/", HTTP_IF_NONE_MATCH=response["ETag"])
+            self.assertEqual(response.status_code, 304)
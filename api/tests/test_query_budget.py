@@ -0,0 +1,42 @@
+"""
+Query budgets of API list endpoints
+"""
+
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.testing import QueryBudgetTestMixin
+from vehicles.models import VehicleType, Vehicule
+
+
+class VehicleListQueryBudgetTestCase(QueryBudgetTestMixin, TestCase):
+    """Lock in the number of queries of the vehicle list endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="budget", password="testpass123")
+        vehicle_type = VehicleType.objects.create(nom="Voiture", est_actif=True)
+        for i in range(15):
+            Vehicule.objects.create(
+                plaque_immatriculation=f"{1000 + i}TAA",
+                proprietaire=self.user,
+                marque="Toyota",
+                puissance_fiscale_cv=13,
+                cylindree_cm3=1500,
+                source_energie="Essence",
+                date_premiere_circulation=date(2020, 1, 1),
+                type_vehicule=vehicle_type,
+            )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+
+    def test_list_vehicles_query_budget(self):
+        with self.assertQueryBudget(4, max_repeats=1):
+            response = self.client.get("/api/v1/vehicles/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["data"]), 15)
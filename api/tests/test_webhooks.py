@@ -54,7 +54,7 @@ class WebhookEventDeliveryPropertyTest(TestCase):
             created_by=self.user,
         )
 
-    @patch("api.utils.webhooks.deliver_webhook_event.delay")
+    @patch("api.utils.webhooks.deliver_webhook_batch.delay")
     def test_dispatch_creates_delivery(self, mock_delay):
         payload = {"hello": "world"}
         dispatch_webhook_event("test.event", payload)
@@ -97,7 +97,7 @@ class WebhookRetryBackoffPropertyTest(TestCase):
             created_by=self.user,
         )
 
-    @patch("api.tasks.requests.post")
+    @patch("api.utils.webhooks.requests.Session.post")
     def test_retry_exponential_backoff(self, mock_post):
         mock_resp = Mock()
         mock_resp.status_code = 500
@@ -138,3 +138,115 @@ class WebhookRetryBackoffPropertyTest(TestCase):
         post_save.connect(log_post_save)
         post_delete.connect(log_post_delete)
         pre_save.connect(capture_pre_save)
+
+
+class WebhookDeliveryEngineTest(TestCase):
+    """Subscription lookup, circuit breaker and retry sweep of the delivery engine"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="admin3", password="pass")
+        self.sub = WebhookSubscription.objects.create(
+            name="Payments",
+            target_url="http://hooks.example.com/payments",
+            is_active=True,
+            event_types=["payment.completed"],
+            secret="secret789",
+            created_by=self.user,
+        )
+        self.catch_all = WebhookSubscription.objects.create(
+            name="All", target_url="http://hooks.example.com/all", is_active=True, event_types=[], secret="s"
+        )
+        WebhookSubscription.objects.create(
+            name="Other", target_url="http://other.example.com/", is_active=True, event_types=["test.event"], secret="o"
+        )
+
+    def _response(self, status_code):
+        resp = Mock()
+        resp.status_code = status_code
+        resp.text = ""
+        return resp
+
+    def test_dispatch_matches_event_type_and_catch_all(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            deliveries = dispatch_webhook_event("payment.completed", {"payment_id": "1"})
+
+        self.assertEqual({d.subscription_id for d in deliveries}, {self.sub.id, self.catch_all.id})
+        self.assertEqual(len(callbacks), 1)
+        body = json.dumps({"payment_id": "1"}, separators=(",", ":"), sort_keys=True).encode("utf-8")
+        stored = WebhookDelivery.objects.get(subscription=self.sub)
+        self.assertEqual(stored.signature, generate_signature("secret789", body))
+
+    def test_subscription_index_follows_changes(self):
+        from api.utils.webhooks import subscription_index
+
+        with self.settings(WEBHOOK_SUBSCRIPTION_CACHE=True):
+            self.assertEqual(len(subscription_index.get("payment.completed")), 2)
+            with self.assertNumQueries(0):
+                subscription_index.get("payment.completed")
+
+            self.sub.is_active = False
+            self.sub.save()
+            self.assertEqual(subscription_index.get("payment.completed"), [self.catch_all])
+
+    @patch("api.utils.webhooks.requests.Session.post")
+    def test_sweep_retries_due_deliveries(self, mock_post):
+        from api.tasks import retry_webhook_deliveries
+
+        mock_post.side_effect = [self._response(503), self._response(200)]
+        dispatch_webhook_event("payment.completed", {"payment_id": "2"})
+        WebhookDelivery.objects.exclude(subscription=self.sub).delete()
+
+        self.assertEqual(retry_webhook_deliveries(), 0)
+        delivery = WebhookDelivery.objects.get(subscription=self.sub)
+        self.assertEqual(delivery.status, WebhookDelivery.STATUS_FAILED)
+
+        # Not due yet
+        self.assertEqual(retry_webhook_deliveries(), 0)
+        WebhookDelivery.objects.filter(id=delivery.id).update(next_attempt_at=timezone.now())
+        self.assertEqual(retry_webhook_deliveries(), 1)
+
+        delivery.refresh_from_db()
+        self.assertEqual(delivery.status, WebhookDelivery.STATUS_SUCCESS)
+        self.assertEqual(delivery.attempt_count, 2)
+        self.assertIsNone(delivery.next_attempt_at)
+
+    @patch("api.utils.webhooks.requests.Session.post")
+    def test_circuit_opens_after_consecutive_failures(self, mock_post):
+        from api.utils.webhooks import delivery_engine
+
+        mock_post.return_value = self._response(500)
+        with self.settings(WEBHOOK_CIRCUIT_FAILURE_THRESHOLD=2, WEBHOOK_MAX_ATTEMPTS=10):
+            for _ in range(3):
+                dispatch_webhook_event("payment.completed", {"payment_id": "3"})
+            deliveries = list(WebhookDelivery.objects.select_related("subscription").filter(subscription=self.sub))
+            delivery_engine.deliver_batch(deliveries)
+
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertIsNotNone(delivery_engine.circuit_open_until(self.sub.id))
+        skipped = WebhookDelivery.objects.get(subscription=self.sub, attempt_count=0)
+        self.assertGreater(skipped.next_attempt_at, timezone.now() + timedelta(seconds=200))
+
+    @patch("api.utils.webhooks.requests.Session.post")
+    def test_delivery_reclaimed_after_lease_is_not_sent_twice(self, mock_post):
+        from api.utils.webhooks import delivery_engine
+
+        mock_post.return_value = self._response(200)
+        dispatch_webhook_event("payment.completed", {"payment_id": "4"})
+        WebhookDelivery.objects.exclude(subscription=self.sub).delete()
+        stale = delivery_engine.claim(delivery_engine.due())
+        # The lease expired while the first worker was busy; a second worker claims the delivery
+        WebhookDelivery.objects.update(next_attempt_at=timezone.now())
+        fresh = delivery_engine.claim(delivery_engine.due())
+
+        self.assertEqual(delivery_engine.deliver_batch(stale), 0)
+        self.assertEqual(delivery_engine.deliver_batch(fresh), 1)
+        self.assertEqual(mock_post.call_count, 1)
+        delivery = WebhookDelivery.objects.get()
+        self.assertEqual((delivery.status, delivery.attempt_count), (WebhookDelivery.STATUS_SUCCESS, 1))
+
+    def test_session_is_shared_per_host(self):
+        from api.utils.webhooks import delivery_engine
+
+        session = delivery_engine.get_session("http://hooks.example.com/payments")
+        self.assertIs(delivery_engine.get_session("http://hooks.example.com/all"), session)
+        self.assertIsNot(delivery_engine.get_session("http://other.example.com/"), session)
@@ -0,0 +1,77 @@
+"""
+Buffered personal data access logging
+
+``DataAccessLog`` rows are collected in process memory and written with one ``bulk_create``
+once ``CONSENT_ACCESS_LOG_BATCH_SIZE`` entries are pending or the oldest pending entry is
+older than ``CONSENT_ACCESS_LOG_FLUSH_SECONDS``. The first entry of a batch also arms a timer
+flushing it after that delay, so entries do not wait for further traffic on an idle worker.
+Pending entries are also flushed when the process exits. A batch size of 1 writes every entry
+immediately.
+"""
+
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class DataAccessLogBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = []
+        self._oldest = None
+
+    def add(self, **fields):
+        """Queue one ``DataAccessLog`` row, flushing the buffer if it is due"""
+        fields.setdefault("metadata", {})["requested_at"] = timezone.now().isoformat()
+        flush_seconds = getattr(settings, "CONSENT_ACCESS_LOG_FLUSH_SECONDS", 2)
+        with self._lock:
+            first = not self._pending
+            if first:
+                self._oldest = time.monotonic()
+            self._pending.append(fields)
+            due = len(self._pending) >= getattr(settings, "CONSENT_ACCESS_LOG_BATCH_SIZE", 50) or (
+                time.monotonic() - self._oldest >= flush_seconds
+            )
+        if due:
+            self.flush()
+        elif first:
+            timer = threading.Timer(flush_seconds, self._flush_from_timer)
+            timer.daemon = True
+            timer.start()
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # The timer thread opened its own database connection
+            connections.close_all()
+
+    def flush(self):
+        """Write all pending rows; returns the number of rows written"""
+        from api.models_consent import DataAccessLog
+
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+        try:
+            DataAccessLog.objects.bulk_create([DataAccessLog(**fields) for fields in pending])
+        except Exception:
+            # Don't fail the request if logging fails
+            logger.exception("Failed to write %d data access logs", len(pending))
+            return 0
+        return len(pending)
+
+    def __len__(self):
+        return len(self._pending)
+
+
+access_log_buffer = DataAccessLogBuffer()
+atexit.register(access_log_buffer.flush)
@@ -3,12 +3,29 @@ Data Anonymization Utilities
 
 Provides utilities for anonymizing personal data while preserving statistical value.
 Implements GDPR-compliant data anonymization techniques.
+
+Open data exports never load the records: ``k_anonymous_groups`` groups them by their
+quasi-identifiers in the database (GROUP BY ... HAVING COUNT(*) >= k) and
+``export_private_aggregates`` streams the qualifying groups in chunks, adding Laplace noise
+to the cells of each chunk with one vectorized numpy draw. Every release spends part of the
+dataset's ``PrivacyBudget``.
 """
 
 import hashlib
 import random
 import string
 from datetime import datetime, timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, F, FloatField, OuterRef, Sum
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+
+class PrivacyBudgetExceeded(Exception):
+    """The release would spend more than the remaining privacy budget of the dataset"""
 
 
 def anonymize_email(email):
@@ -223,12 +240,46 @@ def anonymize_vehicle_data(vehicle):
     return report
 
 
+def k_anonymous_groups(queryset, quasi_identifiers, k=5, **aggregates):
+    """
+    Groups of at least k records sharing the same quasi-identifiers, computed in the database
+    
+    Args:
+        queryset: Django queryset
+        quasi_identifiers: Field names, or a dict of alias -> field name or expression
+            (e.g. TruncMonth)
+        k: Minimum group size
+        **aggregates: Extra aggregates computed per group
+    
+    Returns:
+        QuerySet: One dict per group, with the quasi-identifiers, ``record_count`` and the
+        extra aggregates
+    """
+    if isinstance(quasi_identifiers, dict):
+        fields = [alias for alias, value in quasi_identifiers.items() if value == alias]
+        expressions = {
+            alias: F(value) if isinstance(value, str) else value
+            for alias, value in quasi_identifiers.items()
+            if alias not in fields
+        }
+        groups = queryset.order_by().values(*fields, **expressions)
+    else:
+        groups = queryset.order_by().values(*quasi_identifiers)
+    
+    return (
+        groups.annotate(record_count=Count('pk'), **aggregates)
+        .filter(record_count__gte=k)
+        .order_by(*quasi_identifiers)
+    )
+
+
 def k_anonymize_dataset(queryset, k=5, quasi_identifiers=None):
     """
     Apply k-anonymity to a dataset
     
     K-anonymity ensures that each record is indistinguishable from at least k-1 other records
-    with respect to quasi-identifiers.
+    with respect to quasi-identifiers. Group sizes are counted in the database; records with
+    an empty quasi-identifier are suppressed.
     
     Args:
         queryset: Django queryset
@@ -236,26 +287,36 @@ def k_anonymize_dataset(queryset, k=5, quasi_identifiers=None):
         quasi_identifiers: List of field names that are quasi-identifiers
     
     Returns:
-        list: Anonymized records
+        QuerySet: Records of the groups of at least k records (iterate it with
+        ``.iterator()`` to stream large datasets)
     """
     if not quasi_identifiers:
-        quasi_identifiers = []
+        return queryset if queryset.count() >= k else queryset.none()
     
-    # Group records by quasi-identifiers
-    groups = {}
-    for record in queryset:
-        key = tuple(getattr(record, field, None) for field in quasi_identifiers)
-        if key not in groups:
-            groups[key] = []
-        groups[key].append(record)
+    same_group = k_anonymous_groups(
+        queryset.filter(**{field: OuterRef(field) for field in quasi_identifiers}), quasi_identifiers, k
+    )
+    return queryset.filter(Exists(same_group))
+
+
+def add_laplace_noise(values, epsilon=1.0, sensitivity=1.0, rng=None):
+    """
+    Add Laplace noise to an array of values in one vectorized draw
+    
+    Args:
+        values: Sequence (or array) of numeric values
+        epsilon: Privacy parameter (smaller = more privacy)
+        sensitivity: Sensitivity of the query producing each value
+        rng: numpy Generator (a fresh one by default)
     
-    # Filter out groups smaller than k
-    anonymized = []
-    for group in groups.values():
-        if len(group) >= k:
-            anonymized.extend(group)
+    Returns:
+        numpy.ndarray: Noisy values
+    """
+    import numpy as np
     
-    return anonymized
+    values = np.asarray(values, dtype=float)
+    rng = rng or np.random.default_rng()
+    return values + rng.laplace(0, sensitivity / epsilon, size=values.shape)
 
 
 def differential_privacy_noise(value, epsilon=1.0, sensitivity=1.0):
@@ -270,38 +331,154 @@ def differential_privacy_noise(value, epsilon=1.0, sensitivity=1.0):
     Returns:
         float: Noisy value
     """
-    import numpy as np
+    return float(add_laplace_noise([float(value)], epsilon, sensitivity)[0])
+
+
+def _clipped(field, lower, upper):
+    """``field`` clipped to [lower, upper] in the database"""
+    return Greatest(Least(F(field), upper, output_field=FloatField()), lower, output_field=FloatField())
+
+
+@transaction.atomic
+def spend_privacy_budget(dataset, epsilon):
+    """
+    Record a release of ``dataset`` spending ``epsilon``
+    
+    The budget is created with ``OPEN_DATA_EPSILON_BUDGET`` the first time the dataset is
+    released. The check and the update are a single conditional UPDATE, so concurrent
+    releases cannot overspend it.
+    
+    Returns:
+        PrivacyBudget: The budget after the release
+    
+    Raises:
+        PrivacyBudgetExceeded: If the remaining budget is smaller than ``epsilon``
+    """
+    from api.models import PrivacyBudget
     
-    scale = sensitivity / epsilon
-    noise = np.random.laplace(0, scale)
+    if epsilon <= 0:
+        raise ValueError("epsilon must be positive")
     
-    return value + noise
+    budget, _ = PrivacyBudget.objects.get_or_create(
+        dataset=dataset,
+        defaults={'epsilon_limit': getattr(settings, 'OPEN_DATA_EPSILON_BUDGET', 10.0)},
+    )
+    # Tolerance for the rounding of float sums (e.g. 0.1 + 0.2)
+    spent = PrivacyBudget.objects.filter(
+        pk=budget.pk, epsilon_spent__lte=F('epsilon_limit') - epsilon + 1e-9
+    ).update(
+        epsilon_spent=F('epsilon_spent') + epsilon,
+        release_count=F('release_count') + 1,
+        last_release_at=timezone.now(),
+    )
+    budget.refresh_from_db()
+    if not spent:
+        raise PrivacyBudgetExceeded(
+            f"Dataset {dataset!r} has {budget.epsilon_remaining:g} epsilon left, release needs {epsilon:g}"
+        )
+    return budget
 
 
-def aggregate_with_privacy(queryset, field, epsilon=1.0):
+def aggregate_with_privacy(queryset, field, epsilon=1.0, dataset=None, bounds=None):
     """
     Compute aggregate statistics with differential privacy
     
+    The count and the sum each get half of ``epsilon``; the average is derived from them.
+    
     Args:
         queryset: Django queryset
         field: Field to aggregate
         epsilon: Privacy parameter
+        dataset: Name of the dataset whose privacy budget the release spends (optional)
+        bounds: (lower, upper) clipping the values before summing; the sum sensitivity is
+            the largest absolute bound (1 when omitted)
     
     Returns:
         dict: Noisy statistics
     """
-    from django.db.models import Count, Avg, Sum
+    if dataset:
+        spend_privacy_budget(dataset, epsilon)
+    
+    value = F(field)
+    sensitivity = 1.0
+    if bounds:
+        value = _clipped(field, *bounds)
+        sensitivity = float(max(abs(bounds[0]), abs(bounds[1])))
     
     # Compute true statistics
-    stats = queryset.aggregate(
-        count=Count(field),
-        avg=Avg(field),
-        sum=Sum(field)
-    )
+    stats = queryset.aggregate(count=Count(field), sum=Sum(value))
     
     # Add noise for privacy
+    count = max(float(add_laplace_noise([stats['count'] or 0], epsilon / 2)[0]), 0)
+    total = float(add_laplace_noise([float(stats['sum'] or 0)], epsilon / 2, sensitivity)[0])
     return {
-        'count': int(differential_privacy_noise(stats['count'] or 0, epsilon)),
-        'avg': differential_privacy_noise(stats['avg'] or 0, epsilon),
-        'sum': differential_privacy_noise(stats['sum'] or 0, epsilon),
+        'count': int(round(count)),
+        'avg': total / count if count >= 1 else 0,
+        'sum': total,
     }
+
+
+def export_private_aggregates(
+    queryset, dataset, quasi_identifiers, epsilon, k=None, sums=None, chunk_size=2000, rng=None
+):
+    """
+    Stream the noisy per-group statistics of a k-anonymous dataset
+    
+    Groups are computed in the database and read ``chunk_size`` at a time; the record count
+    and the clipped sums of a chunk get their Laplace noise in one vectorized draw. Each
+    record belongs to one group, so the release costs ``epsilon`` once for the whole
+    dataset, split evenly between the count and the sums. Suppression of the groups smaller
+    than k uses the true counts.
+    
+    Args:
+        queryset: Records to publish
+        dataset: Name of the dataset whose privacy budget the release spends
+        quasi_identifiers: Field names, or a dict of alias -> field name or expression
+        epsilon: Privacy parameter of the release
+        k: Minimum group size (``OPEN_DATA_K_ANONYMITY`` by default)
+        sums: Dict of output name -> (field, lower, upper); values are clipped to the bounds
+            in the database, which bounds the sensitivity of each sum
+        chunk_size: Groups read and noised at a time
+        rng: numpy Generator (a fresh one by default)
+    
+    Returns:
+        Generator of dicts: quasi-identifiers, ``record_count`` and the sums, noised
+    
+    Raises:
+        PrivacyBudgetExceeded: Before anything is read, if the budget is spent
+    """
+    import numpy as np
+    
+    k = k or getattr(settings, 'OPEN_DATA_K_ANONYMITY', 5)
+    sums = sums or {}
+    rng = rng or np.random.default_rng()
+    epsilon_per_measure = epsilon / (1 + len(sums))
+    sensitivities = np.array(
+        [1.0] + [float(max(abs(lower), abs(upper))) for _, lower, upper in sums.values()]
+    )
+    
+    groups = k_anonymous_groups(
+        queryset,
+        quasi_identifiers,
+        k,
+        **{
+            name: Sum(_clipped(field, lower, upper))
+            for name, (field, lower, upper) in sums.items()
+        },
+    )
+    spend_privacy_budget(dataset, epsilon)
+    
+    def rows():
+        measures = ['record_count', *sums]
+        iterator = groups.iterator(chunk_size=chunk_size)
+        while chunk := list(islice(iterator, chunk_size)):
+            cells = np.array([[float(row[name] or 0) for name in measures] for row in chunk])
+            cells += rng.laplace(0, sensitivities / epsilon_per_measure, size=cells.shape)
+            cells[:, 0] = np.maximum(np.rint(cells[:, 0]), 0)
+            for row, noisy in zip(chunk, cells):
+                row['record_count'] = int(noisy[0])
+                for name, value in zip(sums, noisy[1:]):
+                    row[name] = round(float(value), 2)
+                yield row
+    
+    return rows()
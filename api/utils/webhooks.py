@@ -1,40 +1,325 @@
+"""
+Webhook dispatch and delivery
+
+Dispatching an event looks up the active subscriptions of its type in an in-process index
+(rebuilt when a subscription changes, see ``api.signals``; ``WEBHOOK_SUBSCRIPTION_CACHE`` =
+False reads them on every event instead), encodes the payload once, signs it per subscriber
+and writes all deliveries with one ``bulk_create``. A single ``deliver_webhook_batch`` task
+is queued once the transaction commits.
+
+Deliveries are sent over one keep-alive ``requests.Session`` per target host. At most
+``WEBHOOK_MAX_CONCURRENCY_PER_SUBSCRIBER`` deliveries of a subscriber are in flight across
+workers, and a subscriber failing ``WEBHOOK_CIRCUIT_FAILURE_THRESHOLD`` times in a row is
+skipped for ``WEBHOOK_CIRCUIT_RESET_SECONDS`` (circuit breaker). Failed or deferred
+deliveries keep a ``next_attempt_at`` and are sent again by the ``retry_webhook_deliveries``
+sweep scheduled in Celery beat.
+"""
+
 import hashlib
 import hmac
 import json
+import logging
+import threading
+import time
+from datetime import timedelta
 from typing import Dict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
 
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 
 from api.models import WebhookSubscription, WebhookDelivery
-from api.tasks import deliver_webhook_event
+from api.tasks import deliver_webhook_batch
+from core.utils.conditional import get_resource_version
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_SCHEDULE = [5, 30, 120]
+SUBSCRIPTIONS_RESOURCE = "webhook_subscriptions"
+ALL_EVENTS = "*"
 
 
 def generate_signature(secret: str, body_bytes: bytes) -> str:
     return hmac.new(secret.encode("utf-8"), body_bytes, hashlib.sha256).hexdigest()
 
 
+def encode_payload(payload: Dict) -> bytes:
+    return json.dumps(payload, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+
+class SubscriptionIndex:
+    """Active subscriptions by event type, reloaded when the subscriptions version changes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._by_event = {}
+
+    def get(self, event_type: str):
+        if not getattr(settings, "WEBHOOK_SUBSCRIPTION_CACHE", True):
+            by_event = self._load()
+        else:
+            version = get_resource_version(SUBSCRIPTIONS_RESOURCE)
+            if version is None or version != self._version:
+                by_event = self._load()
+                with self._lock:
+                    self._version, self._by_event = version, by_event
+            by_event = self._by_event
+        return by_event.get(event_type, []) + by_event.get(ALL_EVENTS, [])
+
+    @staticmethod
+    def _load():
+        by_event = {}
+        for sub in WebhookSubscription.objects.filter(is_active=True).only("id", "secret", "event_types"):
+            # A subscription without event types receives every event
+            for subscribed in sub.event_types or [ALL_EVENTS]:
+                by_event.setdefault(subscribed, []).append(sub)
+        return by_event
+
+
+subscription_index = SubscriptionIndex()
+
+
 def dispatch_webhook_event(event_type: str, payload: Dict):
+    subs = subscription_index.get(event_type)
+    if not subs:
+        return []
+
     now = timezone.now()
-    subs = WebhookSubscription.objects.filter(is_active=True)
-    for sub in subs:
-        if sub.event_types and event_type not in sub.event_types:
-            continue
-
-        body = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode("utf-8")
-        signature = generate_signature(sub.secret, body)
-
-        delivery = WebhookDelivery.objects.create(
-            subscription=sub,
-            event_type=event_type,
-            payload=payload,
-            signature=signature,
-            status=WebhookDelivery.STATUS_PENDING,
-            attempt_count=0,
-            next_attempt_at=now,
-        )
+    body = encode_payload(payload)
+    deliveries = WebhookDelivery.objects.bulk_create(
+        [
+            WebhookDelivery(
+                subscription_id=sub.id,
+                event_type=event_type,
+                payload=payload,
+                signature=generate_signature(sub.secret, body),
+                status=WebhookDelivery.STATUS_PENDING,
+                attempt_count=0,
+                next_attempt_at=now,
+            )
+            for sub in subs
+        ]
+    )
 
-        deliver_webhook_event.delay(str(delivery.id))
+    delivery_ids = [str(delivery.id) for delivery in deliveries]
+    transaction.on_commit(lambda: deliver_webhook_batch.delay(delivery_ids), robust=True)
+    return deliveries
 
 
 def verify_signature(secret: str, body_bytes: bytes, signature: str) -> bool:
     return hmac.new(secret.encode("utf-8"), body_bytes, hashlib.sha256).hexdigest() == signature
+
+
+class WebhookDeliveryEngine:
+    """Send webhook deliveries with pooled connections, concurrency limits and circuit breakers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    # Connections
+
+    def get_session(self, url: str) -> requests.Session:
+        """Keep-alive session of the target host, shared by all deliveries of this process"""
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    pool_size = getattr(settings, "WEBHOOK_MAX_CONCURRENCY_PER_SUBSCRIBER", 4)
+                    session = requests.Session()
+                    session.mount(host, HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+                    self._sessions[host] = session
+        return session
+
+    # Per-subscriber concurrency
+
+    def _acquire_slot(self, subscription_id) -> bool:
+        key = f"webhooks:inflight:{subscription_id}"
+        timeout = getattr(settings, "WEBHOOK_TIMEOUT_SECONDS", 10) * 2
+        cache.add(key, 0, timeout=timeout)
+        try:
+            inflight = cache.incr(key)
+        except ValueError:
+            # Key expired between add and incr
+            cache.add(key, 1, timeout=timeout)
+            return True
+        if inflight > getattr(settings, "WEBHOOK_MAX_CONCURRENCY_PER_SUBSCRIBER", 4):
+            self._release_slot(subscription_id)
+            return False
+        return True
+
+    def _release_slot(self, subscription_id):
+        try:
+            cache.decr(f"webhooks:inflight:{subscription_id}")
+        except ValueError:
+            pass
+
+    # Circuit breaker
+
+    def _circuit_key(self, subscription_id):
+        return f"webhooks:circuit:{subscription_id}"
+
+    def circuit_open_until(self, subscription_id):
+        """Time until which deliveries to the subscriber are skipped, or None if it is closed"""
+        state = cache.get(self._circuit_key(subscription_id)) or {}
+        open_until = state.get("open_until")
+        if open_until and open_until > time.time():
+            return open_until
+        return None
+
+    def _record_result(self, subscription_id, success: bool):
+        key = self._circuit_key(subscription_id)
+        if success:
+            cache.delete(key)
+            return
+        state = cache.get(key) or {"failures": 0}
+        state["failures"] += 1
+        if state["failures"] >= getattr(settings, "WEBHOOK_CIRCUIT_FAILURE_THRESHOLD", 5):
+            reset = getattr(settings, "WEBHOOK_CIRCUIT_RESET_SECONDS", 300)
+            state["open_until"] = time.time() + reset
+            logger.warning(f"Webhook circuit opened: subscription={subscription_id}, failures={state['failures']}")
+        cache.set(key, state, timeout=None)
+
+    # Claiming
+
+    def claim(self, queryset, limit=None):
+        """
+        Lease deliveries of ``queryset`` to this worker; returns them with their subscription.
+
+        A claimed delivery gets ``next_attempt_at`` pushed back by the lease, so the sweep and
+        other workers skip it until it was attempted (or the worker died). A batch can outlast
+        its lease, so each delivery is leased again just before it is attempted (``_renew``).
+        """
+        lease = timedelta(seconds=getattr(settings, "WEBHOOK_DELIVERY_LEASE_SECONDS", 120))
+        with transaction.atomic():
+            ids = queryset.select_for_update(skip_locked=True).order_by("next_attempt_at").values_list("id", flat=True)
+            ids = list(ids[:limit] if limit else ids)
+            if ids:
+                WebhookDelivery.objects.filter(id__in=ids).update(next_attempt_at=timezone.now() + lease)
+        return list(WebhookDelivery.objects.select_related("subscription").filter(id__in=ids))
+
+    @staticmethod
+    def due():
+        return WebhookDelivery.objects.filter(
+            Q(status=WebhookDelivery.STATUS_PENDING) | Q(status=WebhookDelivery.STATUS_FAILED),
+            next_attempt_at__lte=timezone.now(),
+        )
+
+    # Delivery
+
+    def deliver_batch(self, deliveries):
+        """Attempt each delivery; returns the number delivered successfully"""
+        return sum(1 for delivery in deliveries if self.deliver(delivery))
+
+    def _renew(self, delivery) -> bool:
+        """
+        Lease ``delivery`` again for one attempt, if nobody re-claimed it since it was loaded.
+
+        The conditional UPDATE on the ``next_attempt_at`` this worker saw fails once the batch
+        lease expired and another worker claimed the delivery, which then is not sent twice.
+        """
+        lease_until = timezone.now() + timedelta(seconds=getattr(settings, "WEBHOOK_DELIVERY_LEASE_SECONDS", 120))
+        renewed = WebhookDelivery.objects.filter(id=delivery.id, next_attempt_at=delivery.next_attempt_at).update(
+            next_attempt_at=lease_until
+        )
+        if renewed:
+            delivery.next_attempt_at = lease_until
+        return bool(renewed)
+
+    def deliver(self, delivery) -> bool:
+        if not self._renew(delivery):
+            logger.info(f"Webhook delivery {delivery.id} re-claimed by another worker, skipped")
+            return False
+
+        sub = delivery.subscription
+        if not sub.is_active:
+            delivery.next_attempt_at = None
+            delivery.error_message = "Subscription inactive"
+            delivery.save(update_fields=["next_attempt_at", "error_message", "updated_at"])
+            return False
+
+        open_until = self.circuit_open_until(sub.id)
+        if open_until:
+            return self._defer(delivery, timezone.now() + timedelta(seconds=open_until - time.time()))
+        if not self._acquire_slot(sub.id):
+            return self._defer(delivery, timezone.now() + timedelta(seconds=BACKOFF_SCHEDULE[0]))
+
+        try:
+            return self._send(delivery)
+        finally:
+            self._release_slot(sub.id)
+
+    def _defer(self, delivery, when) -> bool:
+        # Not an attempt: the delivery keeps its attempt count
+        delivery.next_attempt_at = when
+        delivery.save(update_fields=["next_attempt_at", "updated_at"])
+        return False
+
+    def _send(self, delivery) -> bool:
+        sub = delivery.subscription
+        body_bytes = encode_payload(delivery.payload)
+        if not delivery.signature:
+            delivery.signature = generate_signature(sub.secret, body_bytes)
+
+        headers = {
+            "Content-Type": "application/json",
+            "X-TC-Signature": delivery.signature,
+            "X-TC-Event": delivery.event_type,
+            "X-TC-Timestamp": str(int(time.time())),
+        }
+
+        delivery.attempt_count = (delivery.attempt_count or 0) + 1
+        try:
+            resp = self.get_session(sub.target_url).post(
+                sub.target_url,
+                data=body_bytes,
+                headers=headers,
+                timeout=getattr(settings, "WEBHOOK_TIMEOUT_SECONDS", 10),
+            )
+            delivery.response_code = resp.status_code
+            # Avoid logging huge bodies
+            delivery.response_body = resp.text[:4000] if resp.text else ""
+            success = 200 <= resp.status_code < 300
+            delivery.error_message = "" if success else f"HTTP {resp.status_code}"
+        except Exception as e:
+            success = False
+            delivery.error_message = str(e)[:2000]
+
+        self._record_result(sub.id, success)
+        if success:
+            delivery.status = WebhookDelivery.STATUS_SUCCESS
+            delivery.next_attempt_at = None
+        else:
+            delivery.status = WebhookDelivery.STATUS_FAILED
+            attempts = delivery.attempt_count
+            if attempts < getattr(settings, "WEBHOOK_MAX_ATTEMPTS", 3):
+                delay = BACKOFF_SCHEDULE[min(attempts - 1, len(BACKOFF_SCHEDULE) - 1)]
+                delivery.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+            else:
+                delivery.next_attempt_at = None
+        delivery.save(
+            update_fields=[
+                "signature",
+                "attempt_count",
+                "response_code",
+                "response_body",
+                "error_message",
+                "status",
+                "next_attempt_at",
+                "updated_at",
+            ]
+        )
+        return success
+
+
+delivery_engine = WebhookDeliveryEngine()
@@ -399,6 +399,8 @@ class VehicleDocumentSerializer(serializers.ModelSerializer):
     vehicule = VehicleSerializer(read_only=True)
     vehicule_plaque = serializers.CharField(source="vehicule.plaque_immatriculation", read_only=True)
     uploaded_by = UserSerializer(read_only=True)
+    thumbnail_url = serializers.CharField(read_only=True)
+    preview_url = serializers.CharField(read_only=True)
 
     class Meta:
         model = DocumentVehicule
@@ -409,6 +411,9 @@ class VehicleDocumentSerializer(serializers.ModelSerializer):
             "uploaded_by",
             "document_type",
             "fichier",
+            "thumbnail_url",
+            "preview_url",
+            "variants_status",
             "note",
             "expiration_date",
             "verification_status",
@@ -416,7 +421,7 @@ class VehicleDocumentSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
-        read_only_fields = ["id", "uploaded_by", "created_at", "updated_at"]
+        read_only_fields = ["id", "uploaded_by", "variants_status", "created_at", "updated_at"]
 
 
 class PriceGridSerializer(serializers.ModelSerializer):
@@ -21,7 +21,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiExample
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse, OpenApiExample
 
 from administration.models import AgentVerification, VerificationQR
 from administration.permissions import IsAgentGovernment, IsAgentPartenaire
@@ -29,12 +29,13 @@ from contraventions.models import Conducteur, Contravention, PhotoContravention
 from contraventions.serializers import ContraventionDetailSerializer, ContraventionListSerializer
 from core.models import UserProfile
 from core.utils import is_agent_government, is_agent_partenaire
+from core.utils.conditional import ConditionalResponseMixin
 from notifications.models import Notification
 from payments.models import AgentPartenaireProfile, PaiementTaxe, QRCode
 from vehicles.models import DocumentVehicule, GrilleTarifaire, VehicleType, Vehicule
 from api.models import WebhookSubscription, WebhookDelivery
 from vehicles.services import TaxCalculationService
-from vehicles.utils import get_conversion_info
+from vehicles.utils import CONVERSION_TABLE_VERSION, get_conversion_info
 
 from .exceptions import NotFoundError, APIValidationError
 from .pagination import StandardResultsSetPagination
@@ -328,11 +329,12 @@ class UserProfileViewSet(viewsets.ModelViewSet):
         return Response({"success": True, "data": serializer.data})
 
 
-class VehicleTypeViewSet(viewsets.ReadOnlyModelViewSet):
+class VehicleTypeViewSet(ConditionalResponseMixin, viewsets.ReadOnlyModelViewSet):
     """
     Vehicle type endpoints - read-only
     """
 
+    conditional_resource = "vehicle_types"
     queryset = VehicleType.objects.filter(est_actif=True)
     serializer_class = VehicleTypeSerializer
     permission_classes = [AllowAny]
@@ -612,7 +614,7 @@ class VehicleDocumentViewSet(viewsets.ModelViewSet):
         """
         Filter documents by vehicle owner
         """
-        queryset = DocumentVehicule.objects.select_related("vehicule", "uploaded_by")
+        queryset = DocumentVehicule.objects.select_related("vehicule", "uploaded_by").prefetch_related("variants")
 
         if self.request.user.is_staff or self.request.user.is_superuser:
             return queryset
@@ -626,11 +628,12 @@ class VehicleDocumentViewSet(viewsets.ModelViewSet):
         serializer.save(uploaded_by=self.request.user)
 
 
-class PriceGridViewSet(viewsets.ReadOnlyModelViewSet):
+class PriceGridViewSet(ConditionalResponseMixin, viewsets.ReadOnlyModelViewSet):
     """
     Price grid (tax rate) endpoints - read-only
     """
 
+    conditional_resource = "price_grids"
     queryset = GrilleTarifaire.objects.filter(est_active=True)
     serializer_class = PriceGridSerializer
     permission_classes = [AllowAny]
@@ -1093,7 +1096,7 @@ class DashboardViewSet(viewsets.ViewSet):
         )
 
 
-class ConvertCylindreeView(APIView):
+class ConvertCylindreeView(ConditionalResponseMixin, APIView):
     """
     Convert cylindree to CV endpoint
     """
@@ -1101,6 +1104,9 @@ class ConvertCylindreeView(APIView):
     permission_classes = [AllowAny]
     throttle_classes = [AnonBurstThrottle, AnonSustainedThrottle]
 
+    def get_resource_version(self):
+        return CONVERSION_TABLE_VERSION
+
     @extend_schema(
         summary="Convert cylindree to CV",
         responses={
@@ -1142,6 +1148,7 @@ class ConvertCylindreeView(APIView):
 
     @extend_schema(
         summary="Convert cylindree to CV (GET)",
+        parameters=[OpenApiParameter("cylindree", int, required=True, description="Cylindrée en cm³")],
         responses={
             200: OpenApiResponse(description="Conversion success"),
             400: OpenApiResponse(description="Invalid input"),
@@ -1225,11 +1232,9 @@ class AgentPartenaireViewSet(viewsets.ViewSet):
                         "opening_balance": float(session.opening_balance) if session.opening_balance else 0,
                         "closing_balance": float(session.closing_balance) if session.closing_balance else None,
                         "status": session.status,
-                        "transaction_count": session.transactions.count() if hasattr(session, "transactions") else 0,
-                        "total_collected": float(session.total_collected) if hasattr(session, "total_collected") else 0,
-                        "total_commission": (
-                            float(session.total_commission) if hasattr(session, "total_commission") else 0
-                        ),
+                        "transaction_count": session.transaction_count,
+                        "total_collected": float(session.total_tax_collected),
+                        "total_commission": float(session.total_commission),
                     }
                 )
 
@@ -5,3 +5,6 @@ class CmsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "cms"
     verbose_name = "Content Management System"
+
+    def ready(self):
+        import cms.signals  # noqa: F401
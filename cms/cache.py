@@ -0,0 +1,70 @@
+"""
+Cache of the CMS site chrome (settings and menus) shown on every page
+
+The context built by ``cms.views.build_cms_context`` is stored in the shared cache under a
+version number, and kept in process memory for the same version. Saving or deleting any CMS
+settings or menu item bumps the version (see ``cms.signals``), so every process picks up the
+change after at most ``CMS_CONTEXT_LOCAL_TTL`` seconds, the interval at which a process
+re-reads the shared version.
+
+``CMS_CONTEXT_CACHE_TIMEOUT`` is the shared cache lifetime in seconds; 0 disables caching.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_KEY = "cms:context:version"
+
+_process = {"version": None, "checked": 0.0, "contexts": {}}
+
+
+def _get_timeout():
+    return getattr(settings, "CMS_CONTEXT_CACHE_TIMEOUT", 3600)
+
+
+def get_version():
+    """Current CMS context version, re-read from the shared cache every few seconds"""
+    now = time.monotonic()
+    if _process["version"] is not None and now - _process["checked"] < getattr(settings, "CMS_CONTEXT_LOCAL_TTL", 5):
+        return _process["version"]
+
+    cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+    version = cache.get(VERSION_KEY)
+    if version != _process["version"]:
+        _process["contexts"] = {}
+    _process.update(version=version, checked=now)
+    return version
+
+
+def invalidate_cms_context():
+    """Discard the cached CMS context in every process"""
+    cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+    _process.update(version=None, checked=0.0, contexts={})
+
+
+def get_cached_cms_context(language, build):
+    """
+    Return the CMS context of ``language``, calling ``build()`` only on a cache miss.
+
+    A shallow copy is returned so callers can add keys without touching the cached context.
+    """
+    timeout = _get_timeout()
+    if not timeout:
+        return build()
+
+    version = get_version()
+    if version is None:
+        # Shared cache unavailable
+        return build()
+
+    context = _process["contexts"].get(language)
+    if context is None:
+        key = f"cms:context:{version}:{language}"
+        context = cache.get(key)
+        if context is None:
+            context = build()
+            cache.set(key, context, timeout)
+        _process["contexts"][language] = context
+    return dict(context)
@@ -0,0 +1,19 @@
+"""
+Signal handlers keeping the cached CMS context up to date
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_cms_context
+from .models import FooterSettings, HeaderSettings, MenuItem, SiteSettings, ThemeSettings
+
+
+@receiver([post_save, post_delete], sender=SiteSettings)
+@receiver([post_save, post_delete], sender=HeaderSettings)
+@receiver([post_save, post_delete], sender=FooterSettings)
+@receiver([post_save, post_delete], sender=ThemeSettings)
+@receiver([post_save, post_delete], sender=MenuItem)
+def invalidate_cms_context_on_change(sender, **kwargs):
+    """Any change to the site chrome invalidates the cached CMS context"""
+    invalidate_cms_context()
@@ -1,7 +1,9 @@
-from django.test import RequestFactory, TestCase
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
 
+from cms.cache import invalidate_cms_context
 from cms.context_processors import cms_context
-from cms.models import FooterSettings, HeaderSettings, SiteSettings, ThemeSettings
+from cms.models import FooterSettings, HeaderSettings, MenuItem, SiteSettings, ThemeSettings
 
 
 class CMSContextProcessorTest(TestCase):
@@ -29,3 +31,26 @@ class CMSContextProcessorTest(TestCase):
         self.assertEqual(context["footer_settings"], footer)
         self.assertEqual(context["header_settings"].site_name, "Test Site")
         self.assertEqual(context["footer_settings"].copyright_text, "Test Copyright")
+
+
+@override_settings(CMS_CONTEXT_CACHE_TIMEOUT=3600)
+class CMSContextCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_cms_context()
+        self.request = RequestFactory().get("/")
+
+    def test_cached_context_is_served_without_queries(self):
+        MenuItem.objects.create(title="Accueil", url="/", menu_location="header", order=1)
+        cms_context(self.request)
+
+        with self.assertNumQueries(0):
+            context = cms_context(self.request)
+            self.assertEqual([item.title for item in context["header_menu_items"]], ["Accueil"])
+            self.assertFalse(context["header_menu_items"][0].children.exists())
+
+    def test_saving_cms_settings_invalidates_the_cache(self):
+        self.assertIsNone(cms_context(self.request)["header_settings"])
+
+        header = HeaderSettings.objects.create(site_name="Nouveau site", is_active=True)
+        self.assertEqual(cms_context(self.request)["header_settings"], header)
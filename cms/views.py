@@ -8,6 +8,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.views.generic import DetailView, TemplateView
 
+from .cache import get_cached_cms_context
 from .models import FooterSettings, HeaderSettings, MenuItem, Page, PageSection, SiteSettings, ThemeSettings
 
 
@@ -106,7 +107,11 @@ class CMSPageDetailView(DetailView):
 def get_cms_context():
     """Helper function to get CMS context for any view"""
     language = get_language()
+    return get_cached_cms_context(language, lambda: build_cms_context(language))
 
+
+def build_cms_context(language):
+    """Load the CMS settings and menus; menus are evaluated so the context can be cached"""
     try:
         site_settings = SiteSettings.objects.filter(is_active=True).first()
     except SiteSettings.DoesNotExist:
@@ -127,13 +132,13 @@ def get_cms_context():
     except ThemeSettings.DoesNotExist:
         theme_settings = None
 
-    header_menu_items = (
+    header_menu_items = list(
         MenuItem.objects.filter(menu_location__in=["header", "both"], is_active=True, parent=None)
         .order_by("order")
         .prefetch_related("children")
     )
 
-    footer_menu_items = (
+    footer_menu_items = list(
         MenuItem.objects.filter(menu_location__in=["footer", "both"], is_active=True, parent=None)
         .order_by("order")
         .prefetch_related("children")
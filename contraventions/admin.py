@@ -12,6 +12,7 @@ from contraventions.models import (
     ContraventionAuditLog,
     DossierFourriere,
     PhotoContravention,
+    RappelPaiement,
     TypeInfraction,
 )
 
@@ -179,7 +180,7 @@ class DossierFourriereAdmin(admin.ModelAdmin):
     ]
     list_filter = ["statut", "date_mise_fourriere"]
     search_fields = ["numero_dossier", "contravention__numero_pv"]
-    readonly_fields = ["numero_dossier", "created_at", "frais_totaux_ariary"]
+    readonly_fields = ["numero_dossier", "created_at", "frais_totaux_ariary", "date_notification_vente"]
     ordering = ["-created_at"]
 
     fieldsets = (
@@ -197,7 +198,10 @@ class DossierFourriereAdmin(admin.ModelAdmin):
                 )
             },
         ),
-        ("Sortie", {"fields": ("date_sortie_fourriere", "bon_sortie_numero", "statut")}),
+        (
+            "Sortie",
+            {"fields": ("date_sortie_fourriere", "bon_sortie_numero", "statut", "date_notification_vente")},
+        ),
         ("Notes", {"fields": ("notes",)}),
     )
 
@@ -270,6 +274,21 @@ class ContraventionAuditLogAdmin(admin.ModelAdmin):
         return False
 
 
+@admin.register(RappelPaiement)
+class RappelPaiementAdmin(admin.ModelAdmin):
+    list_display = ["contravention", "type_rappel", "destinataire", "email", "date_envoi"]
+    list_filter = ["type_rappel", "date_envoi"]
+    search_fields = ["contravention__numero_pv", "destinataire__username", "email"]
+    readonly_fields = ["contravention", "type_rappel", "destinataire", "email", "date_envoi"]
+    ordering = ["-date_envoi"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(ConfigurationSysteme)
 class ConfigurationSystemeAdmin(admin.ModelAdmin):
     def has_add_permission(self, request):
@@ -289,6 +308,7 @@ class ConfigurationSystemeAdmin(admin.ModelAdmin):
                     "frais_gardiennage_journalier_ariary",
                     "duree_minimale_fourriere_jours",
                     "duree_minimale_fourriere_perissable_jours",
+                    "duree_maximale_fourriere_jours",
                 )
             },
         ),
@@ -9,9 +9,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from vehicles.models import Vehicule
-
-from .models import Conducteur, Contestation, Contravention, ContraventionAuditLog, DossierFourriere, TypeInfraction
+from .models import Contestation, Contravention, ContraventionAuditLog, DossierFourriere, TypeInfraction
 from .serializers import (
     AgentStatsSerializer,
     ConducteurSerializer,
@@ -25,6 +23,8 @@ from .serializers import (
     TypeInfractionSerializer,
     VehiculeSummarySerializer,
 )
+from .services.recidive_service import RecidiveService
+from .services.search_service import SearchService
 
 
 class APIContraventionListView(generics.ListAPIView):
@@ -348,9 +348,7 @@ class APIVehicleSearchView(APIView):
             )
 
         # Search by plaque or chassis
-        vehicles = Vehicule.objects.filter(
-            Q(plaque_immatriculation__icontains=query) | Q(numero_chassis__icontains=query)
-        ).select_related("proprietaire")[:10]
+        vehicles = SearchService.rechercher_vehicules(query, user=request.user)
 
         serializer = VehiculeSummarySerializer(vehicles, many=True)
         return Response({"success": True, "vehicles": serializer.data}, status=status.HTTP_200_OK)
@@ -372,10 +370,8 @@ class APIConducteurSearchView(APIView):
                 {"error": "La recherche doit contenir au moins 2 caractères"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Search by name, first name, or permit number
-        conducteurs = Conducteur.objects.filter(
-            Q(nom_complet__icontains=query) | Q(cin__icontains=query) | Q(numero_permis__icontains=query)
-        )[:10]
+        # Search by name, CIN, or permit number
+        conducteurs = SearchService.rechercher_conducteurs(query, user=request.user)
 
         serializer = ConducteurSerializer(conducteurs, many=True)
         return Response({"success": True, "conducteurs": serializer.data}, status=status.HTTP_200_OK)
@@ -394,32 +390,16 @@ def check_recidive(request):
     if not vehicule_id and not conducteur_id:
         return Response({"error": "Véhicule ou conducteur requis"}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Check for recent contraventions (last 12 months)
-    date_limit = timezone.now() - timedelta(days=365)
-
-    query = Q(date_heure_infraction__gte=date_limit)
-
-    if vehicule_id:
-        query &= Q(vehicule_id=vehicule_id)
-
-    if conducteur_id:
-        query &= Q(conducteur_id=conducteur_id)
-
+    type_infraction = None
     if type_infraction_id:
-        query &= Q(type_infraction_id=type_infraction_id)
-
-    recent_contraventions = Contravention.objects.filter(query).exclude(statut="ANNULEE")
-    recidive_count = recent_contraventions.count()
+        type_infraction = TypeInfraction.objects.filter(id=type_infraction_id).first()
 
-    # Calculate majoration (example: 50% for each récidive)
-    majoration = 0
-    if recidive_count > 0 and type_infraction_id:
-        try:
-            type_infraction = TypeInfraction.objects.get(id=type_infraction_id)
-            base_amount = type_infraction.montant_min_ariary
-            majoration = base_amount * Decimal("0.5") * recidive_count
-        except TypeInfraction.DoesNotExist:
-            pass
+    # Contraventions of the last 12 months, read from the driver's and vehicle's summaries
+    result = RecidiveService.verifier(
+        conducteur=conducteur_id or None, vehicule=vehicule_id or None, type_infraction=type_infraction
+    )
+    recidive_count = result["recidive_count"]
+    majoration = result["majoration"]
 
     return Response(
         {
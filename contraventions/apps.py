@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ContraventionsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "contraventions"
+
+    def ready(self):
+        """Import signal handlers when app is ready"""
+        import contraventions.signals  # noqa: F401
@@ -226,6 +226,7 @@ class ConfigurationSystemeForm(forms.ModelForm):
             "frais_gardiennage_journalier_ariary",
             "duree_minimale_fourriere_jours",
             "duree_minimale_fourriere_perissable_jours",
+            "duree_maximale_fourriere_jours",
             "delai_annulation_directe_heures",
             "delai_contestation_jours",
         ]
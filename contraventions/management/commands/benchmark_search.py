@@ -0,0 +1,172 @@
+"""
+Management command to benchmark agent vehicle and driver search
+
+Loads a synthetic dataset (500k vehicles and 100k drivers by default) inside a transaction that
+is rolled back at the end, then replays agents typing plates, chassis, CIN and names one
+keystroke at a time, each keystroke followed by one autocomplete request. Compares the legacy
+``icontains`` lookups with SearchService, without and with its per-agent result cache.
+
+Run it against PostgreSQL: the prefix and trigram indexes do not exist on SQLite.
+"""
+
+import random
+import statistics
+import string
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test.utils import override_settings
+
+from contraventions.models import Conducteur
+from contraventions.services.search_service import SearchService
+from core.utils.search import normalize_search_key, normalize_search_text
+from vehicles.models import VehicleType, Vehicule
+
+FIRST_NAMES = ["Jean", "Hery", "Rivo", "Fara", "Noro", "Tiana", "Mamy", "Lova", "Haja", "Voahangy", "Noël", "Zo"]
+LAST_NAMES = ["Rakoto", "Rabe", "Randria", "Razafy", "Rasoa", "Andria", "Ravelo", "Rajaona", "Rakotomalala"]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark vehicle/driver autocomplete on a synthetic dataset (rolled back afterwards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--vehicles", type=int, default=500_000, help="Synthetic vehicles (default: 500000)")
+        parser.add_argument("--drivers", type=int, default=100_000, help="Synthetic drivers (default: 100000)")
+        parser.add_argument("--searches", type=int, default=50, help="Values typed per field (default: 50)")
+        parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        try:
+            with transaction.atomic():
+                agent = self.load(rng, options)
+                self.benchmark(rng, agent, options)
+                raise Rollback
+        except Rollback:
+            self.stdout.write("Synthetic dataset rolled back")
+
+    def load(self, rng, options):
+        start = time.perf_counter()
+        agent = User.objects.create_user(username=f"benchmark-{rng.getrandbits(32):08x}")
+        vehicle_type = VehicleType.objects.create(nom=f"Benchmark {agent.username}")
+
+        plates = set(Vehicule.objects.values_list("plaque_immatriculation", flat=True))
+        vehicles = []
+        while len(vehicles) < options["vehicles"]:
+            plate = (
+                f"{rng.randint(1, 9999):04d}T{rng.choice(string.ascii_uppercase)}{rng.choice(string.ascii_uppercase)}"
+            )
+            if plate in plates:
+                continue
+            plates.add(plate)
+            vin = "".join(rng.choices(string.ascii_uppercase + string.digits, k=17))
+            vehicles.append(
+                Vehicule(
+                    plaque_immatriculation=plate,
+                    proprietaire=agent,
+                    nom_proprietaire=self.name(rng),
+                    marque="TOYOTA",
+                    vin=vin,
+                    vin_normalise=normalize_search_key(vin),
+                    puissance_fiscale_cv=13,
+                    cylindree_cm3=1800,
+                    source_energie="Essence",
+                    date_premiere_circulation=date(2015, 1, 1),
+                    categorie_vehicule="Personnel",
+                    type_vehicule=vehicle_type,
+                )
+            )
+        Vehicule.objects.bulk_create(vehicles, batch_size=5000)
+
+        drivers = []
+        for _ in range(options["drivers"]):
+            nom = self.name(rng)
+            permis = f"{rng.randint(0, 999999):06d}/{rng.choice(string.ascii_uppercase)}"
+            drivers.append(
+                Conducteur(
+                    cin="".join(rng.choices(string.digits, k=12)),
+                    nom_complet=nom,
+                    numero_permis=permis,
+                    nom_normalise=normalize_search_text(nom),
+                    permis_normalise=normalize_search_key(permis),
+                )
+            )
+        Conducteur.objects.bulk_create(drivers, batch_size=5000)
+
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE vehicles_vehicule")
+                cursor.execute("ANALYZE contraventions_conducteur")
+        else:
+            self.stdout.write(self.style.WARNING(f"{connection.vendor}: no prefix/trigram indexes, expect scans"))
+
+        self.stdout.write(
+            f"Loaded {len(vehicles)} vehicles and {len(drivers)} drivers in {time.perf_counter() - start:.1f} s"
+        )
+        return agent
+
+    @staticmethod
+    def name(rng):
+        return f"{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)}"
+
+    def benchmark(self, rng, agent, options):
+        count = options["searches"]
+        vehicles = list(Vehicule.objects.filter(proprietaire=agent).values_list("plaque_immatriculation", "vin"))
+        drivers = list(Conducteur.objects.values_list("cin", "nom_complet", "numero_permis"))
+        typed = {
+            "vehicle": [value for plate, vin in rng.sample(vehicles, count) for value in (plate, vin[:8])],
+            "driver": [value for cin, nom, permis in rng.sample(drivers, count) for value in (cin, nom, permis)],
+        }
+
+        def legacy_vehicle(query):
+            return list(
+                Vehicule.objects.filter(Q(plaque_immatriculation__icontains=query) | Q(vin__icontains=query))[
+                    : SearchService.get_limit()
+                ]
+            )
+
+        def legacy_driver(query):
+            return list(
+                Conducteur.objects.filter(
+                    Q(nom_complet__icontains=query) | Q(cin__icontains=query) | Q(numero_permis__icontains=query)
+                )[: SearchService.get_limit()]
+            )
+
+        searches = {
+            "vehicle": (legacy_vehicle, lambda query: SearchService.rechercher_vehicules(query, user=agent)),
+            "driver": (legacy_driver, lambda query: SearchService.rechercher_conducteurs(query, user=agent)),
+        }
+        for kind, (legacy, indexed) in searches.items():
+            self.stdout.write(self.style.SUCCESS(f"{kind} search, {len(typed[kind])} values typed:"))
+            with override_settings(CONTRAVENTION_SEARCH_CACHE_SECONDS=0):
+                self.report("icontains", self.run(legacy, typed[kind]))
+                self.report("indexed", self.run(indexed, typed[kind]))
+            self.report("indexed + cache", self.run(indexed, typed[kind]))
+
+    def run(self, search, values):
+        """Type each value one keystroke at a time, with a backspace and retype of the last one"""
+        latencies = []
+        for value in values:
+            keystrokes = [value[:i] for i in range(2, len(value) + 1)]
+            keystrokes += [value[:-1], value]
+            for query in keystrokes:
+                start = time.perf_counter()
+                search(query)
+                latencies.append(time.perf_counter() - start)
+        return latencies
+
+    def report(self, name, latencies):
+        latencies = sorted(latencies)
+        p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+        self.stdout.write(
+            f"  {name:>16}: {len(latencies)} requests, mean {statistics.mean(latencies) * 1000:.2f} ms, "
+            f"p50 {statistics.median(latencies) * 1000:.2f} ms, p95 {p95 * 1000:.2f} ms"
+        )
@@ -4,22 +4,24 @@ Management command to generate daily reports for contraventions.
 
 import json
 from datetime import datetime, timedelta
-from decimal import Decimal
 
-from django.contrib.auth.models import Group, User
+from django.contrib.auth.models import Group
 from django.core.management.base import BaseCommand
-from django.db.models import Avg, Count, Q, Sum
 from django.utils import timezone
 
-from contraventions.models import AgentControleurProfile, Contestation, Contravention, DossierFourriere, TypeInfraction
+from contraventions.services.rapport_service import RapportService
+from core.db_routers import ReplicaReadCommandMixin
 
 
-class Command(BaseCommand):
+class Command(ReplicaReadCommandMixin, BaseCommand):
     help = "Génère un rapport quotidien des contraventions"
 
     def add_arguments(self, parser):
         parser.add_argument("--date", type=str, help="Date du rapport (format: YYYY-MM-DD). Par défaut: hier")
         parser.add_argument("--send-email", action="store_true", help="Envoie le rapport par email aux administrateurs")
+        parser.add_argument(
+            "--refresh", action="store_true", help="Recalcule le rapport au lieu de relire l'instantané enregistré"
+        )
         parser.add_argument(
             "--format",
             type=str,
@@ -45,7 +47,7 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS(f"Génération du rapport quotidien pour le {report_date}..."))
 
         # Generate report data
-        report_data = self._generate_report_data(report_date)
+        report_data = self._generate_report_data(report_date, refresh=options["refresh"])
 
         # Format and display report
         if report_format == "json":
@@ -63,111 +65,9 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS("\n✓ Rapport quotidien généré avec succès"))
 
-    def _generate_report_data(self, report_date):
-        """Generate comprehensive report data"""
-        start_datetime = timezone.make_aware(datetime.combine(report_date, datetime.min.time()))
-        end_datetime = timezone.make_aware(datetime.combine(report_date, datetime.max.time()))
-
-        # Get contraventions for the day
-        daily_contraventions = Contravention.objects.filter(created_at__range=(start_datetime, end_datetime))
-
-        # Overall statistics
-        total_created = daily_contraventions.count()
-        total_paid = daily_contraventions.filter(statut="PAYEE").count()
-        total_contested = daily_contraventions.filter(statut="CONTESTEE").count()
-        total_cancelled = daily_contraventions.filter(statut="ANNULEE").count()
-        total_unpaid = daily_contraventions.filter(statut="IMPAYEE").count()
-
-        # Financial statistics
-        total_amount = daily_contraventions.aggregate(total=Sum("montant_amende_ariary"))["total"] or Decimal("0")
-
-        paid_amount = daily_contraventions.filter(statut="PAYEE").aggregate(total=Sum("montant_amende_ariary"))[
-            "total"
-        ] or Decimal("0")
-
-        # Payment rate
-        payment_rate = (total_paid / total_created * 100) if total_created > 0 else 0
-
-        # Statistics by infraction type
-        by_infraction = (
-            daily_contraventions.values("type_infraction__nom", "type_infraction__article_code")
-            .annotate(count=Count("id"), total_amount=Sum("montant_amende_ariary"))
-            .order_by("-count")[:10]
-        )
-
-        # Statistics by agent
-        by_agent = (
-            daily_contraventions.values(
-                "agent_controleur__matricule", "agent_controleur__nom_complet", "agent_controleur__unite_affectation"
-            )
-            .annotate(count=Count("id"), total_amount=Sum("montant_amende_ariary"))
-            .order_by("-count")[:10]
-        )
-
-        # Statistics by status
-        by_status = daily_contraventions.values("statut").annotate(count=Count("id")).order_by("-count")
-
-        # Fourrière statistics
-        fourriere_created = DossierFourriere.objects.filter(
-            date_mise_fourriere__range=(start_datetime, end_datetime)
-        ).count()
-
-        fourriere_released = DossierFourriere.objects.filter(
-            date_sortie_fourriere__range=(start_datetime, end_datetime), statut="RESTITUE"
-        ).count()
-
-        # Contestation statistics
-        contestations_created = Contestation.objects.filter(
-            date_soumission__range=(start_datetime, end_datetime)
-        ).count()
-
-        contestations_accepted = Contestation.objects.filter(
-            date_examen__range=(start_datetime, end_datetime), statut="ACCEPTEE"
-        ).count()
-
-        contestations_rejected = Contestation.objects.filter(
-            date_examen__range=(start_datetime, end_datetime), statut="REJETEE"
-        ).count()
-
-        # Cumulative statistics (all time)
-        cumulative_total = Contravention.objects.count()
-        cumulative_paid = Contravention.objects.filter(statut="PAYEE").count()
-        cumulative_unpaid = Contravention.objects.filter(statut="IMPAYEE").count()
-
-        cumulative_amount = Contravention.objects.aggregate(total=Sum("montant_amende_ariary"))["total"] or Decimal("0")
-
-        cumulative_paid_amount = Contravention.objects.filter(statut="PAYEE").aggregate(
-            total=Sum("montant_amende_ariary")
-        )["total"] or Decimal("0")
-
-        return {
-            "report_date": report_date,
-            "daily": {
-                "total_created": total_created,
-                "total_paid": total_paid,
-                "total_contested": total_contested,
-                "total_cancelled": total_cancelled,
-                "total_unpaid": total_unpaid,
-                "total_amount": float(total_amount),
-                "paid_amount": float(paid_amount),
-                "payment_rate": round(payment_rate, 2),
-                "by_infraction": list(by_infraction),
-                "by_agent": list(by_agent),
-                "by_status": list(by_status),
-                "fourriere_created": fourriere_created,
-                "fourriere_released": fourriere_released,
-                "contestations_created": contestations_created,
-                "contestations_accepted": contestations_accepted,
-                "contestations_rejected": contestations_rejected,
-            },
-            "cumulative": {
-                "total": cumulative_total,
-                "paid": cumulative_paid,
-                "unpaid": cumulative_unpaid,
-                "total_amount": float(cumulative_amount),
-                "paid_amount": float(cumulative_paid_amount),
-            },
-        }
+    def _generate_report_data(self, report_date, refresh=False):
+        """Generate comprehensive report data (read from its snapshot for a past day)"""
+        return RapportService.generer_rapport_journalier(report_date, refresh=refresh)
 
     def _format_text(self, data):
         """Format report as text"""
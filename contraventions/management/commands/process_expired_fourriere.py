@@ -3,10 +3,11 @@ from datetime import timedelta
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
-from contraventions.models import Contravention, DossierFourriere
+from contraventions.services.fourriere_service import FourriereService
+from core.utils.query_budget import QueryBudgetCommandMixin
 
 
-class Command(BaseCommand):
+class Command(QueryBudgetCommandMixin, BaseCommand):
     help = "Traite les dossiers de fourrière arrivés à échéance"
 
     def add_arguments(self, parser):
@@ -14,51 +15,37 @@ class Command(BaseCommand):
         parser.add_argument(
             "--days-before", type=int, default=0, help="Nombre de jours avant l'échéance pour traiter (par défaut: 0)"
         )
+        parser.add_argument("--batch-size", type=int, default=500, help="Dossiers traités par lot (défaut: 500)")
 
     def handle(self, *args, **options):
-        dry_run = options["dry_run"]
-        days_before = options["days_before"]
+        self.dry_run = dry_run = options["dry_run"]
 
         self.stdout.write("Traitement des dossiers de fourrière...")
 
-        # Calculate the deadline date
-        deadline_date = timezone.now() + timedelta(days=days_before)
-
-        # Find fourrière cases that have reached their maximum duration
-        expired_fourrieres = DossierFourriere.objects.filter(
-            statut="en_fourriere", date_mise_fourriere__lte=deadline_date - timedelta(days=30)  # 30 days max duration
+        run = FourriereService.traiter_dossiers_expires(
+            maintenant=timezone.now() + timedelta(days=options["days_before"]),
+            dry_run=dry_run,
+            batch_size=options["batch_size"],
+            on_batch=self.report_batch,
         )
 
-        self.stdout.write(f"{expired_fourrieres.count()} dossiers trouvés")
-
-        for fourriere in expired_fourrieres:
-            days_elapsed = (timezone.now() - fourriere.date_mise_fourriere).days
-
-            if days_elapsed >= fourriere.duree_maximale_jours:
-                if dry_run:
-                    self.stdout.write(
-                        self.style.WARNING(
-                            f"[DRY RUN] Dossier {fourriere.numero_dossier} expiré " f"({days_elapsed} jours écoulés)"
-                        )
-                    )
-                else:
-                    # Mark for sale notification
-                    fourriere.observations += f'\n\n[SYSTEM] Dossier expiré le {timezone.now().strftime("%d/%m/%Y")}. '
-                    fourriere.observations += "Notification de vente envoyée."
-                    fourriere.save()
-
-                    # Here you would typically:
-                    # 1. Send notification to vehicle owner
-                    # 2. Create sale process
-                    # 3. Update status to 'a_vendre'
-
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f"Dossier {fourriere.numero_dossier} marqué pour vente " f"({days_elapsed} jours écoulés)"
-                        )
-                    )
-
         if not dry_run:
-            self.stdout.write(self.style.SUCCESS("Traitement des dossiers de fourrière terminé"))
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Traitement des dossiers de fourrière terminé: {run.dossiers} dossiers marqués pour vente, "
+                    f"{run.notifications} propriétaires avisés"
+                )
+            )
         else:
-            self.stdout.write(self.style.WARNING("Mode dry-run - aucune modification effectuée"))
+            self.stdout.write(
+                self.style.WARNING(f"Mode dry-run - {run.dossiers} dossiers, aucune modification effectuée")
+            )
+
+    def report_batch(self, lignes):
+        prefix = "[DRY RUN] " if self.dry_run else ""
+        for ligne in lignes:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{prefix}Dossier {ligne['numero_dossier']} expiré ({ligne['jours_gardiennage']} jours écoulés)"
+                )
+            )
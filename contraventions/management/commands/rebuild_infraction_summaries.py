@@ -0,0 +1,18 @@
+"""
+Management command to rebuild the per-driver and per-vehicle infraction summaries used for
+recidivism checks (after deployment, or after contraventions were changed outside the ORM).
+"""
+
+from django.core.management.base import BaseCommand
+
+from contraventions.services.recidive_service import RecidiveService
+from core.utils.query_budget import QueryBudgetCommandMixin
+
+
+class Command(QueryBudgetCommandMixin, BaseCommand):
+    help = "Recalcule les résumés d'infractions des conducteurs et véhicules (détection des récidives)"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Recalcul des résumés d'infractions...")
+        count = RecidiveService.reconstruire()
+        self.stdout.write(self.style.SUCCESS(f"✓ {count} résumés d'infractions recalculés"))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contraventions", "0003_agentcontroleurprofile_conducteur_contestation_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contravention",
+            name="date_derniere_penalite",
+            field=models.DateField(
+                blank=True,
+                help_text="Une pénalité de retard est appliquée au plus une fois par jour",
+                null=True,
+                verbose_name="Date de la dernière pénalité",
+            ),
+        ),
+    ]
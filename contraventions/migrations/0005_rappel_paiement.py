@@ -0,0 +1,64 @@
+# Generated by Django 5.2.7 on 2026-10-19 03:02
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contraventions", "0004_contravention_date_derniere_penalite"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RappelPaiement",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                (
+                    "type_rappel",
+                    models.CharField(
+                        choices=[
+                            ("approaching_due", "Échéance proche"),
+                            ("past_due", "Échéance dépassée"),
+                            ("very_overdue", "Très en retard"),
+                        ],
+                        max_length=20,
+                        verbose_name="Type de rappel",
+                    ),
+                ),
+                ("email", models.EmailField(blank=True, max_length=254, verbose_name="Email")),
+                ("date_envoi", models.DateTimeField(auto_now_add=True, verbose_name="Date d'envoi")),
+                (
+                    "contravention",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rappels",
+                        to="contraventions.contravention",
+                        verbose_name="Contravention",
+                    ),
+                ),
+                (
+                    "destinataire",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Destinataire",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Rappel de paiement",
+                "verbose_name_plural": "Rappels de paiement",
+                "ordering": ["-date_envoi"],
+                "constraints": [
+                    models.UniqueConstraint(fields=("contravention", "type_rappel"), name="unique_rappel_par_type")
+                ],
+            },
+        ),
+    ]
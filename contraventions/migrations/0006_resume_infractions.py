@@ -0,0 +1,76 @@
+# Generated by Django 5.2.7 on 2026-10-19 03:08
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contraventions", "0005_rappel_paiement"),
+        ("payments", "0011_payment_outbox"),
+        ("vehicles", "0019_document_variants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResumeInfractions",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("infractions", models.JSONField(blank=True, default=list, verbose_name="Infractions récentes")),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Résumé des infractions",
+                "verbose_name_plural": "Résumés des infractions",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="contravention",
+            index=models.Index(
+                fields=["conducteur", "type_infraction", "date_heure_infraction"], name="contraventi_conduct_fdafbc_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="contravention",
+            index=models.Index(
+                fields=["vehicule", "type_infraction", "date_heure_infraction"], name="contraventi_vehicul_561bc5_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="resumeinfractions",
+            name="conducteur",
+            field=models.OneToOneField(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="resume_infractions",
+                to="contraventions.conducteur",
+                verbose_name="Conducteur",
+            ),
+        ),
+        migrations.AddField(
+            model_name="resumeinfractions",
+            name="vehicule",
+            field=models.OneToOneField(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="resume_infractions",
+                to="vehicles.vehicule",
+                verbose_name="Véhicule",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="resumeinfractions",
+            constraint=models.CheckConstraint(
+                condition=models.Q(
+                    models.Q(("conducteur__isnull", False), ("vehicule__isnull", True)),
+                    models.Q(("conducteur__isnull", True), ("vehicule__isnull", False)),
+                    _connector="OR",
+                ),
+                name="resume_infractions_un_contrevenant",
+            ),
+        ),
+    ]
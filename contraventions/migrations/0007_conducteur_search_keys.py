@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-19 03:13
+
+from django.db import migrations, models
+
+from core.utils.search import normalize_search_key, normalize_search_text, trigram_indexes
+
+
+def populate_search_keys(apps, schema_editor):
+    Conducteur = apps.get_model("contraventions", "Conducteur")
+    batch = []
+    for conducteur in Conducteur.objects.only("pk", "nom_complet", "numero_permis").iterator(chunk_size=2000):
+        conducteur.nom_normalise = normalize_search_text(conducteur.nom_complet)
+        conducteur.permis_normalise = normalize_search_key(conducteur.numero_permis)
+        batch.append(conducteur)
+        if len(batch) >= 2000:
+            Conducteur.objects.bulk_update(batch, ["nom_normalise", "permis_normalise"])
+            batch = []
+    Conducteur.objects.bulk_update(batch, ["nom_normalise", "permis_normalise"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contraventions", "0006_resume_infractions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="conducteur",
+            name="nom_normalise",
+            field=models.CharField(blank=True, default="", editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name="conducteur",
+            name="permis_normalise",
+            field=models.CharField(blank=True, default="", editable=False, max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name="conducteur",
+            index=models.Index(fields=["cin"], name="idx_conducteur_cin_prefix", opclasses=["varchar_pattern_ops"]),
+        ),
+        migrations.AddIndex(
+            model_name="conducteur",
+            index=models.Index(
+                fields=["nom_normalise"], name="idx_conducteur_nom_prefix", opclasses=["varchar_pattern_ops"]
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="conducteur",
+            index=models.Index(
+                fields=["permis_normalise"], name="idx_conducteur_permis_prefix", opclasses=["varchar_pattern_ops"]
+            ),
+        ),
+        migrations.RunPython(populate_search_keys, migrations.RunPython.noop),
+        trigram_indexes("contraventions_conducteur", ["cin", "nom_normalise", "permis_normalise"]),
+    ]
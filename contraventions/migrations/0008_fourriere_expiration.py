@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 03:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contraventions", "0007_conducteur_search_keys"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="configurationsysteme",
+            name="duree_maximale_fourriere_jours",
+            field=models.IntegerField(
+                default=30,
+                help_text="Au-delà, le dossier expire et le véhicule peut être mis en vente",
+                verbose_name="Durée maximale fourrière (jours)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="dossierfourriere",
+            name="date_notification_vente",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Renseignée quand le dossier expire et que le propriétaire est avisé de la vente",
+                null=True,
+                verbose_name="Date de notification de vente",
+            ),
+        ),
+    ]
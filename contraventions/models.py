@@ -13,9 +13,13 @@ from decimal import Decimal
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, RegexValidator
-from django.db import models
+from django.db import connection, models, transaction
 from django.utils import timezone
 
+from core.utils.config_cache import ConfigCache
+from core.utils.identifiers import next_identifier
+from core.utils.search import normalize_search_key, normalize_search_text
+
 
 class TypeInfraction(models.Model):
     """Catalogue des infractions conformes à la Loi n°2017-002"""
@@ -188,6 +192,9 @@ class Conducteur(models.Model):
         max_length=20, blank=True, verbose_name="Catégorie de permis", help_text="Ex: A, B, C, D, E"
     )
     date_delivrance_permis = models.DateField(null=True, blank=True, verbose_name="Date de délivrance du permis")
+    # Copies normalisées pour la recherche par préfixe/trigramme (voir core.utils.search)
+    nom_normalise = models.CharField(max_length=200, blank=True, default="", editable=False)
+    permis_normalise = models.CharField(max_length=50, blank=True, default="", editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -198,11 +205,25 @@ class Conducteur(models.Model):
         indexes = [
             models.Index(fields=["cin"]),
             models.Index(fields=["numero_permis"]),
+            # Recherche par préfixe (LIKE 'X%') ; les index trigrammes sont créés par migration
+            models.Index(fields=["cin"], name="idx_conducteur_cin_prefix", opclasses=["varchar_pattern_ops"]),
+            models.Index(fields=["nom_normalise"], name="idx_conducteur_nom_prefix", opclasses=["varchar_pattern_ops"]),
+            models.Index(
+                fields=["permis_normalise"], name="idx_conducteur_permis_prefix", opclasses=["varchar_pattern_ops"]
+            ),
         ]
 
     def __str__(self):
         return f"{self.nom_complet} (CIN: {self.cin})"
 
+    def save(self, *args, **kwargs):
+        self.nom_normalise = normalize_search_text(self.nom_complet)
+        self.permis_normalise = normalize_search_key(self.numero_permis)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "nom_normalise", "permis_normalise"}
+        super().save(*args, **kwargs)
+
 
 class Contravention(models.Model):
     """Enregistrement principal d'une contravention"""
@@ -290,6 +311,12 @@ class Contravention(models.Model):
     delai_paiement_jours = models.IntegerField(default=15, verbose_name="Délai de paiement (jours)")
     date_limite_paiement = models.DateField(verbose_name="Date limite de paiement")
     date_paiement = models.DateTimeField(null=True, blank=True, verbose_name="Date de paiement")
+    date_derniere_penalite = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name="Date de la dernière pénalité",
+        help_text="Une pénalité de retard est appliquée au plus une fois par jour",
+    )
     signature_electronique_conducteur = models.TextField(
         blank=True, verbose_name="Signature électronique", help_text="Signature en base64"
     )
@@ -315,29 +342,16 @@ class Contravention(models.Model):
             models.Index(fields=["conducteur", "statut"]),
             models.Index(fields=["statut", "date_limite_paiement"]),
             models.Index(fields=["date_heure_infraction"]),
+            models.Index(fields=["conducteur", "type_infraction", "date_heure_infraction"]),
+            models.Index(fields=["vehicule", "type_infraction", "date_heure_infraction"]),
         ]
 
     def __str__(self):
         return f"{self.numero_pv} - {self.statut}"
 
     def generate_numero_pv(self):
-        """Génère un numéro PV unique"""
-        from django.utils import timezone
-
-        date_str = timezone.now().strftime("%Y%m%d")
-
-        # Générer un identifiant aléatoire de 6 caractères
-        alphabet = string.ascii_uppercase + string.digits
-        random_id = "".join(secrets.choice(alphabet) for _ in range(6))
-
-        numero = f"PV-{date_str}-{random_id}"
-
-        # Vérifier l'unicité
-        while Contravention.objects.filter(numero_pv=numero).exists():
-            random_id = "".join(secrets.choice(alphabet) for _ in range(6))
-            numero = f"PV-{date_str}-{random_id}"
-
-        return numero
+        """Génère un numéro PV unique (voir core.utils.identifiers)"""
+        return next_identifier("pv")
 
     def calculer_date_limite(self):
         """Calcule la date limite de paiement"""
@@ -426,6 +440,12 @@ class DossierFourriere(models.Model):
     statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default="EN_FOURRIERE", verbose_name="Statut")
     bon_sortie_numero = models.CharField(max_length=50, blank=True, verbose_name="Numéro de bon de sortie")
     notes = models.TextField(blank=True, verbose_name="Notes")
+    date_notification_vente = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Date de notification de vente",
+        help_text="Renseignée quand le dossier expire et que le propriétaire est avisé de la vente",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -724,6 +744,18 @@ class ContraventionAuditLog(models.Model):
     def __str__(self):
         return f"{self.action_type} - {self.timestamp}"
 
+    @classmethod
+    def lock_chain(cls):
+        """
+        Sérialise les ajouts au journal jusqu'à la fin de la transaction en cours.
+
+        Sans ce verrou, deux ajouts concurrents liraient le même dernier hash et la chaîne
+        bifurquerait. SQLite sérialise déjà les écritures.
+        """
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [cls._meta.db_table])
+
     @classmethod
     def get_last_hash(cls):
         """Récupère le hash du dernier enregistrement pour chaînage"""
@@ -744,22 +776,128 @@ class ContraventionAuditLog(models.Model):
         data_string = json.dumps(data, sort_keys=True)
         return hashlib.sha256(data_string.encode()).hexdigest()
 
+    @classmethod
+    def bulk_append(cls, logs):
+        """
+        Insère plusieurs entrées en conservant le chaînage des hash.
+
+        Les entrées sont chaînées dans l'ordre de la liste, avec des horodatages strictement
+        croissants pour que ``get_last_hash`` retrouve la dernière. Les autres ajouts attendent
+        la fin de la transaction (voir ``lock_chain``).
+        """
+        if not logs:
+            return []
+
+        with transaction.atomic():
+            cls.lock_chain()
+            previous_hash = cls.get_last_hash()
+            logs = cls.objects.bulk_create(logs)
+
+            # ``timestamp`` est renseigné par bulk_create (auto_now_add) : on le fixe avant le hash
+            start = timezone.now()
+            for index, log in enumerate(logs):
+                log.timestamp = start + timedelta(microseconds=index)
+                log.previous_hash = previous_hash
+                log.current_hash = log.calculate_hash()
+                previous_hash = log.current_hash
+
+            cls.objects.bulk_update(logs, ["timestamp", "previous_hash", "current_hash"])
+        return logs
+
     def save(self, *args, **kwargs):
         """Override save pour calcul automatique du hash"""
-        if not self.previous_hash:
-            self.previous_hash = self.get_last_hash()
-
-        # Sauvegarder d'abord pour avoir un timestamp
-        if not self.pk:
-            super().save(*args, **kwargs)
-
-        # Calculer et mettre à jour le hash
-        if not self.current_hash:
-            self.current_hash = self.calculate_hash()
-            # Mettre à jour uniquement le hash
-            ContraventionAuditLog.objects.filter(pk=self.pk).update(current_hash=self.current_hash)
-        else:
-            super().save(*args, **kwargs)
+        with transaction.atomic():
+            if not self.previous_hash:
+                self.lock_chain()
+                self.previous_hash = self.get_last_hash()
+
+            # Sauvegarder d'abord pour avoir un timestamp
+            if self._state.adding:
+                super().save(*args, **kwargs)
+
+            # Calculer et mettre à jour le hash
+            if not self.current_hash:
+                self.current_hash = self.calculate_hash()
+                # Mettre à jour uniquement le hash
+                ContraventionAuditLog.objects.filter(pk=self.pk).update(current_hash=self.current_hash)
+            else:
+                super().save(*args, **kwargs)
+
+
+class ResumeInfractions(models.Model):
+    """
+    Infractions récentes d'un conducteur ou d'un véhicule, pour la détection des récidives.
+
+    Une ligne par contrevenant ; ``infractions`` contient les contraventions non annulées de la
+    fenêtre ``CONTRAVENTION_RECIDIVE_WINDOW_DAYS`` sous la forme
+    ``{"id", "type_infraction", "date", "statut"}``. Maintenu par les signaux de ``Contravention``.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    conducteur = models.OneToOneField(
+        Conducteur,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="resume_infractions",
+        verbose_name="Conducteur",
+    )
+    vehicule = models.OneToOneField(
+        "vehicles.Vehicule",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="resume_infractions",
+        verbose_name="Véhicule",
+    )
+    infractions = models.JSONField(default=list, blank=True, verbose_name="Infractions récentes")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Résumé des infractions"
+        verbose_name_plural = "Résumés des infractions"
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(conducteur__isnull=False, vehicule__isnull=True)
+                | models.Q(conducteur__isnull=True, vehicule__isnull=False),
+                name="resume_infractions_un_contrevenant",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.conducteur or self.vehicule} - {len(self.infractions)} infraction(s)"
+
+
+class RappelPaiement(models.Model):
+    """Rappel de paiement envoyé pour une contravention (un seul par type de rappel)"""
+
+    TYPE_RAPPEL_CHOICES = [
+        ("approaching_due", "Échéance proche"),
+        ("past_due", "Échéance dépassée"),
+        ("very_overdue", "Très en retard"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    contravention = models.ForeignKey(
+        Contravention, on_delete=models.CASCADE, related_name="rappels", verbose_name="Contravention"
+    )
+    type_rappel = models.CharField(max_length=20, choices=TYPE_RAPPEL_CHOICES, verbose_name="Type de rappel")
+    destinataire = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Destinataire"
+    )
+    email = models.EmailField(blank=True, verbose_name="Email")
+    date_envoi = models.DateTimeField(auto_now_add=True, verbose_name="Date d'envoi")
+
+    class Meta:
+        verbose_name = "Rappel de paiement"
+        verbose_name_plural = "Rappels de paiement"
+        ordering = ["-date_envoi"]
+        constraints = [
+            models.UniqueConstraint(fields=["contravention", "type_rappel"], name="unique_rappel_par_type"),
+        ]
+
+    def __str__(self):
+        return f"{self.contravention_id} - {self.type_rappel}"
 
 
 class ConfigurationSysteme(models.Model):
@@ -816,6 +954,11 @@ class ConfigurationSysteme(models.Model):
         verbose_name="Durée minimale fourrière périssable (jours)",
         help_text="Durée minimale pour véhicules transportant des denrées périssables",
     )
+    duree_maximale_fourriere_jours = models.IntegerField(
+        default=30,
+        verbose_name="Durée maximale fourrière (jours)",
+        help_text="Au-delà, le dossier expire et le véhicule peut être mis en vente",
+    )
 
     # Délais administratifs
     delai_annulation_directe_heures = models.IntegerField(
@@ -842,9 +985,8 @@ class ConfigurationSysteme(models.Model):
 
     @classmethod
     def get_config(cls):
-        """Récupère ou crée la configuration singleton"""
-        config, created = cls.objects.get_or_create(pk=1)
-        return config
+        """Récupère ou crée la configuration singleton (gardée en mémoire, voir core.utils.config_cache)"""
+        return _configuration_cache.get()
 
     def save(self, *args, **kwargs):
         """Override pour garantir qu'il n'y a qu'une seule instance (pk=1)"""
@@ -854,3 +996,6 @@ class ConfigurationSysteme(models.Model):
     def delete(self, *args, **kwargs):
         """Empêche la suppression du singleton"""
         pass
+
+
+_configuration_cache = ConfigCache(ConfigurationSysteme, lambda: ConfigurationSysteme.objects.get_or_create(pk=1)[0])
@@ -74,7 +74,9 @@ class ConducteurSerializer(serializers.ModelSerializer):
 
 
 class VehiculeSummarySerializer(serializers.ModelSerializer):
-    proprietaire_nom = serializers.CharField(source="proprietaire.nom_complet", read_only=True)
+    id = serializers.CharField(source="pk", read_only=True)
+    numero_chassis = serializers.CharField(source="vin", read_only=True)
+    proprietaire_nom = serializers.CharField(source="nom_proprietaire", read_only=True)
 
     class Meta:
         model = Vehicule
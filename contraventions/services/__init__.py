@@ -7,6 +7,10 @@ from .contravention_service import ContraventionService
 from .fourriere_service import FourriereService
 from .infraction_service import InfractionService
 from .paiement_amende_service import PaiementAmendeService
+from .penalty_service import PenaltyService
+from .rapport_service import RapportService
+from .recidive_service import RecidiveService
+from .search_service import SearchService
 
 __all__ = [
     "InfractionService",
@@ -14,4 +18,8 @@ __all__ = [
     "FourriereService",
     "PaiementAmendeService",
     "ContestationService",
+    "PenaltyService",
+    "RapportService",
+    "RecidiveService",
+    "SearchService",
 ]
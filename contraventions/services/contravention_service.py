@@ -2,7 +2,6 @@
 Service de gestion des contraventions.
 """
 
-from datetime import timedelta
 from decimal import Decimal
 
 from django.contrib.auth.models import User
@@ -221,17 +220,18 @@ class ContraventionService:
         Returns:
             bool: True si récidive détectée, False sinon
         """
-        date_limite = timezone.now() - timedelta(days=periode_mois * 30)
-
-        # Chercher des contraventions du même type dans la période
-        contraventions_precedentes = Contravention.objects.filter(
-            conducteur=conducteur,
-            type_infraction=type_infraction,
-            date_heure_infraction__gte=date_limite,
-            statut__in=["IMPAYEE", "PAYEE"],  # Exclure les annulées
-        ).exists()
-
-        return contraventions_precedentes
+        from contraventions.services.recidive_service import STATUTS_RECIDIVE, RecidiveService
+
+        # Contraventions du même type dans la période, lues dans le résumé du conducteur
+        return (
+            RecidiveService.compter(
+                conducteur=conducteur,
+                type_infraction=type_infraction,
+                jours=periode_mois * 30,
+                statuts=STATUTS_RECIDIVE,  # Exclure les annulées et contestées
+            )
+            > 0
+        )
 
     @staticmethod
     def calculer_montant_amende(type_infraction, has_accident=False, is_recidive=False, autorite=None):
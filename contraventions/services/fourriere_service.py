@@ -1,17 +1,78 @@
 """
 Service de gestion des dossiers de fourrière.
+
+Les jours de gardiennage et les frais sont aussi disponibles sous forme d'expressions SQL
+(``FourriereService.annoter_frais``) : les statistiques les agrègent en base, par fourrière,
+sans charger les dossiers. Les dossiers expirés sont marqués par lots d'``UPDATE`` et les
+avis de vente envoyés par la tâche ``send_notification_emails``.
 """
 
+import logging
+from dataclasses import dataclass
 from datetime import timedelta
 from decimal import Decimal
+from itertools import islice
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import transaction
+from django.db.models import (
+    Avg,
+    Count,
+    DateTimeField,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    Func,
+    IntegerField,
+    Q,
+    Sum,
+    TextField,
+    Value,
+)
+from django.db.models.functions import Coalesce, Concat, Greatest
 from django.utils import timezone
 
 from contraventions.models import ConfigurationSysteme, Contravention, ContraventionAuditLog, DossierFourriere
+from notifications.models import Notification
 from payments.models import PaiementTaxe, QRCode
 
+logger = logging.getLogger(__name__)
+
+MONTANT = DecimalField(max_digits=14, decimal_places=2)
+
+
+class JoursEcoules(Func):
+    """Nombre de jours entiers écoulés de ``debut`` à ``fin`` (comme ``timedelta.days``)"""
+
+    arity = 2
+    output_field = IntegerField()
+
+    def _compile(self, compiler):
+        fin, fin_params = compiler.compile(self.source_expressions[0])
+        debut, debut_params = compiler.compile(self.source_expressions[1])
+        return fin, debut, (*fin_params, *debut_params)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        fin, debut, params = self._compile(compiler)
+        return f"CAST(FLOOR(EXTRACT(EPOCH FROM ({fin} - {debut})) / 86400) AS integer)", params
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # Secondes entières depuis l'epoch ; la division entière arrondit vers zéro
+        fin, debut, params = self._compile(compiler)
+        return (
+            f"((CAST(STRFTIME('%%s', {fin}) AS integer) - CAST(STRFTIME('%%s', {debut}) AS integer)) / 86400)",
+            params,
+        )
+
+
+@dataclass
+class ExpirationRun:
+    """Résultat d'un traitement des dossiers expirés"""
+
+    dossiers: int = 0
+    notifications: int = 0
+
 
 class FourriereService:
     """Service pour gérer les dossiers de fourrière"""
@@ -134,6 +195,9 @@ class FourriereService:
         """
         Calcule les frais totaux de fourrière (transport + gardiennage).
 
+        Même calcul que ``annoter_frais``, pour un dossier déjà chargé (éventuellement pas
+        encore enregistré, comme lors de la sortie).
+
         Args:
             dossier: DossierFourriere object
 
@@ -324,20 +388,45 @@ class FourriereService:
         )
 
     @staticmethod
-    def get_statistiques_fourriere(date_debut=None, date_fin=None):
+    def annoter_frais(queryset, maintenant=None):
+        """
+        Annote les dossiers des jours de gardiennage et des frais, calculés en base.
+
+        Les jours courent jusqu'à la date de sortie, ou jusqu'à ``maintenant`` pour les
+        véhicules encore en fourrière.
+
+        Returns:
+            QuerySet: annoté de ``jours_gardiennage``, ``frais_gardiennage`` et ``frais_calcules``
+        """
+        maintenant = maintenant or timezone.now()
+        fin = Coalesce(F("date_sortie_fourriere"), Value(maintenant, output_field=DateTimeField()))
+        return queryset.annotate(
+            jours_gardiennage=Greatest(JoursEcoules(fin, F("date_mise_fourriere")), Value(0)),
+        ).annotate(
+            frais_gardiennage=ExpressionWrapper(
+                F("frais_gardiennage_journalier_ariary") * F("jours_gardiennage"), output_field=MONTANT
+            ),
+            frais_calcules=ExpressionWrapper(
+                F("frais_transport_ariary") + F("frais_gardiennage"), output_field=MONTANT
+            ),
+        )
+
+    @staticmethod
+    def get_statistiques_fourriere(date_debut=None, date_fin=None, maintenant=None):
         """
         Calcule les statistiques de la fourrière pour une période donnée.
 
+        Deux requêtes quel que soit le nombre de dossiers : un agrégat global et un agrégat
+        groupé par lieu de fourrière.
+
         Args:
             date_debut: datetime, date de début (optionnel)
             date_fin: datetime, date de fin (optionnel)
+            maintenant: datetime, fin du gardiennage des véhicules encore en fourrière
 
         Returns:
-            dict: Statistiques de la fourrière
+            dict: Statistiques de la fourrière, avec le détail ``par_fourriere``
         """
-        from django.db.models import Avg, Count, Sum
-
-        # Construire la requête de base
         queryset = DossierFourriere.objects.all()
 
         if date_debut:
@@ -346,19 +435,172 @@ class FourriereService:
         if date_fin:
             queryset = queryset.filter(date_mise_fourriere__lte=date_fin)
 
-        # Calculer les statistiques
-        stats = queryset.aggregate(
-            total_dossiers=Count("id"),
-            dossiers_actifs=Count("id", filter=queryset.filter(statut="EN_FOURRIERE").query),
-            dossiers_restitues=Count("id", filter=queryset.filter(statut="RESTITUE").query),
-            frais_totaux=Sum("frais_totaux_ariary"),
-            duree_moyenne_jours=Avg("date_sortie_fourriere__day") - Avg("date_mise_fourriere__day"),
-        )
+        queryset = FourriereService.annoter_frais(queryset, maintenant)
+        actif = Q(statut="EN_FOURRIERE")
+        restitue = Q(statut="RESTITUE")
+        agregats = {
+            "total_dossiers": Count("id"),
+            "dossiers_actifs": Count("id", filter=actif),
+            "dossiers_restitues": Count("id", filter=restitue),
+            "frais_totaux_collectes": Sum("frais_calcules", filter=restitue),
+            "frais_en_cours": Sum("frais_calcules", filter=actif),
+            "duree_moyenne_jours": Avg("jours_gardiennage"),
+        }
+
+        stats = FourriereService._statistiques(queryset.aggregate(**agregats))
+        stats["par_fourriere"] = [
+            {"lieu_fourriere": ligne["lieu_fourriere"], **FourriereService._statistiques(ligne)}
+            for ligne in queryset.order_by().values("lieu_fourriere").annotate(**agregats).order_by("lieu_fourriere")
+        ]
+        return stats
 
+    @staticmethod
+    def _statistiques(ligne):
         return {
-            "total_dossiers": stats["total_dossiers"] or 0,
-            "dossiers_actifs": stats["dossiers_actifs"] or 0,
-            "dossiers_restitues": stats["dossiers_restitues"] or 0,
-            "frais_totaux_collectes": stats["frais_totaux"] or Decimal("0"),
-            "duree_moyenne_jours": stats["duree_moyenne_jours"] or 0,
+            "total_dossiers": ligne["total_dossiers"] or 0,
+            "dossiers_actifs": ligne["dossiers_actifs"] or 0,
+            "dossiers_restitues": ligne["dossiers_restitues"] or 0,
+            "frais_totaux_collectes": ligne["frais_totaux_collectes"] or Decimal("0"),
+            "frais_en_cours": ligne["frais_en_cours"] or Decimal("0"),
+            "duree_moyenne_jours": round(float(ligne["duree_moyenne_jours"] or 0), 1),
         }
+
+    @staticmethod
+    def get_dossiers_expires(maintenant=None):
+        """
+        Dossiers en fourrière au-delà de la durée maximale, dont le propriétaire n'a pas
+        encore été avisé de la vente.
+        """
+        maintenant = maintenant or timezone.now()
+        duree_maximale = ConfigurationSysteme.get_config().duree_maximale_fourriere_jours
+        return FourriereService.annoter_frais(
+            DossierFourriere.objects.filter(
+                statut="EN_FOURRIERE",
+                date_notification_vente__isnull=True,
+                date_mise_fourriere__lte=maintenant - timedelta(days=duree_maximale),
+            ),
+            maintenant,
+        )
+
+    @staticmethod
+    def traiter_dossiers_expires(maintenant=None, dry_run=False, batch_size=500, on_batch=None):
+        """
+        Marque les dossiers expirés et avise les propriétaires de la mise en vente.
+
+        Chaque lot est marqué par un seul ``UPDATE`` (note système et
+        ``date_notification_vente``) ; les notifications sont créées en bloc et leurs emails
+        envoyés par ``send_notification_emails`` après le commit. Un dossier marqué n'est
+        plus sélectionné : un avis n'est jamais envoyé deux fois.
+
+        Args:
+            maintenant: datetime de référence (maintenant par défaut)
+            dry_run: Sélectionne les dossiers sans rien modifier
+            batch_size: Dossiers par lot
+            on_batch: Appelé avec les lignes (dict) de chaque lot
+
+        Returns:
+            ExpirationRun
+        """
+        maintenant = maintenant or timezone.now()
+        run = ExpirationRun()
+        colonnes = (
+            "id",
+            "numero_dossier",
+            "jours_gardiennage",
+            "contravention__vehicule__plaque_immatriculation",
+            "contravention__vehicule__proprietaire_id",
+            "contravention__vehicule__proprietaire__first_name",
+            "contravention__vehicule__proprietaire__last_name",
+            "contravention__vehicule__proprietaire__username",
+        )
+        dossiers = FourriereService.get_dossiers_expires(maintenant).order_by("date_mise_fourriere", "id")
+
+        if dry_run:
+            lignes = dossiers.values(*colonnes).iterator(chunk_size=batch_size)
+            while lot := list(islice(lignes, batch_size)):
+                FourriereService._compter_lot(lot, run, on_batch)
+            return run
+
+        note = Value(
+            f"\n\n[SYSTEM] Dossier expiré le {timezone.localtime(maintenant).strftime('%d/%m/%Y')}. "
+            "Notification de vente envoyée."
+        )
+        while True:
+            with transaction.atomic():
+                # Les dossiers marqués sortent de la sélection : le lot suivant reprend au début
+                lignes = list(dossiers.select_for_update(of=("self",))[:batch_size].values(*colonnes))
+                if not lignes:
+                    break
+                DossierFourriere.objects.filter(id__in=[ligne["id"] for ligne in lignes]).update(
+                    notes=Concat(F("notes"), note, output_field=TextField()),
+                    date_notification_vente=maintenant,
+                )
+                FourriereService._compter_lot(lignes, run, on_batch)
+                run.notifications += FourriereService._notifier_vente(lignes)
+
+        logger.info(f"Dossiers de fourrière expirés: dossiers={run.dossiers}, notifications={run.notifications}")
+        return run
+
+    @staticmethod
+    def _compter_lot(lignes, run, on_batch):
+        run.dossiers += len(lignes)
+        if on_batch:
+            on_batch(lignes)
+
+    @staticmethod
+    def _notifier_vente(lignes):
+        """Crée les avis de vente du lot et met leurs emails en file après le commit"""
+        contact = getattr(settings, "CONTACT_PHONE", "")
+        notifications = []
+        for ligne in lignes:
+            proprietaire_id = ligne["contravention__vehicule__proprietaire_id"]
+            if not proprietaire_id:
+                continue
+            plaque = ligne["contravention__vehicule__plaque_immatriculation"]
+            nom = " ".join(
+                filter(
+                    None,
+                    (
+                        ligne["contravention__vehicule__proprietaire__first_name"],
+                        ligne["contravention__vehicule__proprietaire__last_name"],
+                    ),
+                )
+            )
+            contenu = f"""
+Bonjour {nom or ligne["contravention__vehicule__proprietaire__username"]},
+
+Votre véhicule immatriculé {plaque} est en fourrière depuis {ligne["jours_gardiennage"]} jours.
+
+Le délai légal étant dépassé, votre véhicule sera mis en vente.
+
+Pour plus d'informations, contactez: {contact}
+
+Cordialement,
+Service de la Fourrière
+            """.strip()
+            notifications.append(
+                Notification(
+                    user_id=proprietaire_id,
+                    type_notification="system",
+                    titre=f"Notification de vente - Véhicule {plaque}",
+                    contenu=contenu,
+                    langue="fr",
+                    metadata={
+                        "event": "fourriere_notification_vente",
+                        "dossier_id": str(ligne["id"]),
+                        "numero_dossier": ligne["numero_dossier"],
+                        "jours_gardiennage": ligne["jours_gardiennage"],
+                    },
+                )
+            )
+
+        if not notifications:
+            return 0
+
+        Notification.objects.bulk_create(notifications)
+
+        from contraventions.tasks import send_notification_emails
+
+        notification_ids = [str(notification.id) for notification in notifications]
+        transaction.on_commit(lambda: send_notification_emails.delay(notification_ids), robust=True)
+        return len(notifications)
@@ -0,0 +1,237 @@
+"""
+Service d'application des pénalités de retard.
+
+Les contraventions impayées dont la date limite est dépassée sont traitées par lots de
+``CONTRAVENTION_PENALTY_CHUNK_SIZE``, un lot par transaction : les montants sont mis à jour
+avec un seul ``bulk_update``, les entrées d'audit sont ajoutées en une fois avec un chaînage
+de hash continu, et les notifications sont créées en bloc, leurs emails étant envoyés par une
+tâche Celery après le commit.
+
+Chaque contravention pénalisée reçoit ``date_derniere_penalite`` : une nouvelle exécution le
+même jour ne la pénalise pas une seconde fois.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from contraventions.models import ConfigurationSysteme, Contravention, ContraventionAuditLog
+from notifications.models import Notification
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "System - calculate_penalties command"
+
+
+@dataclass
+class AppliedPenalty:
+    """Pénalité calculée pour une contravention"""
+
+    contravention: Contravention
+    days_overdue: int
+    old_amount: Decimal
+    penalty_amount: Decimal
+
+    @property
+    def new_amount(self):
+        return self.old_amount + self.penalty_amount
+
+
+@dataclass
+class PenaltyRun:
+    """Résultat d'une exécution"""
+
+    penalties: list = field(default_factory=list)
+    notifications_sent: int = 0
+
+    @property
+    def total_penalty_amount(self):
+        return sum((penalty.penalty_amount for penalty in self.penalties), Decimal("0"))
+
+
+class PenaltyService:
+    """Service pour appliquer les pénalités de retard"""
+
+    @staticmethod
+    def get_overdue_contraventions(today=None):
+        """Contraventions en retard qui n'ont pas encore été pénalisées ce jour"""
+        today = today or timezone.now().date()
+        return Contravention.objects.filter(statut="IMPAYEE", date_limite_paiement__lt=today).filter(
+            Q(date_derniere_penalite__isnull=True) | Q(date_derniere_penalite__lt=today)
+        )
+
+    @staticmethod
+    def appliquer_penalites(dry_run=False, send_notifications=False, chunk_size=None, today=None, on_chunk=None):
+        """
+        Applique les pénalités de retard à toutes les contraventions en retard.
+
+        Args:
+            dry_run: Calcule les pénalités sans rien enregistrer
+            send_notifications: Notifie le conducteur ou le propriétaire du véhicule
+            chunk_size: Contraventions par lot (``CONTRAVENTION_PENALTY_CHUNK_SIZE`` par défaut)
+            today: Date d'exécution (aujourd'hui par défaut)
+            on_chunk: Appelé avec la liste des ``AppliedPenalty`` de chaque lot traité
+
+        Returns:
+            PenaltyRun
+        """
+        today = today or timezone.now().date()
+        chunk_size = chunk_size or getattr(settings, "CONTRAVENTION_PENALTY_CHUNK_SIZE", 500)
+        run = PenaltyRun()
+
+        # Configuration lue une seule fois pour toute l'exécution
+        config = ConfigurationSysteme.get_config()
+        percentage = config.penalite_retard_pct
+        if percentage <= 0:
+            return run
+
+        queryset = (
+            PenaltyService.get_overdue_contraventions(today)
+            .select_related("conducteur", "vehicule__proprietaire", "qr_code")
+            .order_by("id")
+        )
+
+        last_id = None
+        while True:
+            with transaction.atomic():
+                chunk = queryset if last_id is None else queryset.filter(id__gt=last_id)
+                if not dry_run:
+                    # Les lignes verrouillées par une exécution concurrente sont laissées à celle-ci
+                    chunk = chunk.select_for_update(skip_locked=True, of=("self",))
+                contraventions = list(chunk[:chunk_size])
+                if not contraventions:
+                    break
+                last_id = contraventions[-1].id
+
+                penalties = [
+                    AppliedPenalty(
+                        contravention=contravention,
+                        days_overdue=(today - contravention.date_limite_paiement).days,
+                        old_amount=contravention.montant_amende_ariary,
+                        penalty_amount=(contravention.montant_amende_ariary * percentage / 100).quantize(
+                            Decimal("0.01")
+                        ),
+                    )
+                    for contravention in contraventions
+                ]
+                penalties = [penalty for penalty in penalties if penalty.penalty_amount > 0]
+
+                if not dry_run and penalties:
+                    PenaltyService._save_chunk(penalties, percentage, today)
+                    if send_notifications:
+                        run.notifications_sent += PenaltyService._notify_chunk(penalties)
+
+            run.penalties.extend(penalties)
+            if on_chunk:
+                on_chunk(penalties)
+
+        logger.info(
+            f"Late penalties {'computed' if dry_run else 'applied'}: count={len(run.penalties)}, "
+            f"total={run.total_penalty_amount}"
+        )
+        return run
+
+    @staticmethod
+    def _save_chunk(penalties, percentage, today):
+        now = timezone.now()
+        contraventions = []
+        for penalty in penalties:
+            contravention = penalty.contravention
+            contravention.montant_amende_ariary = penalty.new_amount
+            contravention.date_derniere_penalite = today
+            contravention.updated_at = now
+            contraventions.append(contravention)
+        Contravention.objects.bulk_update(
+            contraventions, ["montant_amende_ariary", "date_derniere_penalite", "updated_at"]
+        )
+
+        ContraventionAuditLog.bulk_append(
+            [
+                ContraventionAuditLog(
+                    action_type="UPDATE",
+                    user=None,  # Action système
+                    contravention=penalty.contravention,
+                    action_data={
+                        "action": "penalty_applied",
+                        "days_overdue": penalty.days_overdue,
+                        "penalty_percentage": float(percentage),
+                        "penalty_amount": float(penalty.penalty_amount),
+                        "old_amount": float(penalty.old_amount),
+                        "new_amount": float(penalty.new_amount),
+                        "date_limite_paiement": penalty.contravention.date_limite_paiement.isoformat(),
+                        "applied_at": now.isoformat(),
+                    },
+                    ip_address=None,
+                    user_agent=USER_AGENT,
+                )
+                for penalty in penalties
+            ]
+        )
+
+    @staticmethod
+    def _get_recipient(contravention):
+        """Utilisateur à notifier : conducteur si lié à un compte, sinon propriétaire du véhicule"""
+        user = getattr(contravention.conducteur, "user", None) if contravention.conducteur else None
+        if user is None and contravention.vehicule:
+            user = contravention.vehicule.proprietaire
+        return user
+
+    @staticmethod
+    def _notify_chunk(penalties):
+        notifications = []
+        for penalty in penalties:
+            contravention = penalty.contravention
+            user = PenaltyService._get_recipient(contravention)
+            if not user:
+                continue
+
+            reference = contravention.qr_code.token if contravention.qr_code else contravention.numero_pv
+            contenu = f"""
+Bonjour,
+
+Une pénalité de retard a été appliquée à votre contravention {contravention.numero_pv}.
+
+Détails:
+- Jours de retard: {penalty.days_overdue}
+- Montant de la pénalité: {penalty.penalty_amount:,.2f} Ar
+- Nouveau montant total: {penalty.new_amount:,.2f} Ar
+
+Veuillez régulariser votre situation dans les plus brefs délais pour éviter des poursuites judiciaires.
+
+Payer maintenant: https://taxcollector.mg/contraventions/verify/{reference}/
+
+Cordialement,
+Service des Contraventions
+            """.strip()
+
+            notifications.append(
+                Notification(
+                    user=user,
+                    type_notification="system",
+                    titre=f"Pénalité de retard appliquée - {contravention.numero_pv}",
+                    contenu=contenu,
+                    langue="fr",
+                    metadata={
+                        "contravention_id": str(contravention.id),
+                        "numero_pv": contravention.numero_pv,
+                        "penalty_amount": float(penalty.penalty_amount),
+                        "days_overdue": penalty.days_overdue,
+                    },
+                )
+            )
+
+        if not notifications:
+            return 0
+
+        Notification.objects.bulk_create(notifications)
+
+        from contraventions.tasks import send_notification_emails
+
+        notification_ids = [str(notification.id) for notification in notifications]
+        transaction.on_commit(lambda: send_notification_emails.delay(notification_ids), robust=True)
+        return len(notifications)
@@ -0,0 +1,130 @@
+"""
+Service du rapport quotidien des contraventions.
+
+Chaque table est lue une seule fois : un agrégat conditionnel (``Count``/``Sum`` avec
+``filter=Q(...)``) calcule d'un coup les chiffres du jour et les cumuls des contraventions, un
+autre ceux des fourrières et des contestations ; seuls les classements par infraction et par
+agent sont des requêtes groupées à part.
+
+Le rapport d'un jour passé est enregistré dans un ``ReportSnapshot`` : le rouvrir ne coûte
+qu'une lecture. La tâche nocturne le recalcule avec ``refresh=True``.
+"""
+
+from datetime import datetime
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from contraventions.models import Contestation, Contravention, DossierFourriere
+from core.models import ReportSnapshot
+
+SNAPSHOT_KIND = "contraventions_journalier"
+
+
+class RapportService:
+    """Service pour générer le rapport quotidien des contraventions"""
+
+    @staticmethod
+    def generer_rapport_journalier(report_date, refresh=False):
+        """
+        Rapport quotidien du ``report_date`` (section du jour et cumuls)
+
+        Returns:
+            dict: ``report_date``, ``daily`` et ``cumulative``
+        """
+        data = ReportSnapshot.get_or_build(
+            SNAPSHOT_KIND, report_date, lambda: RapportService._calculer(report_date), refresh=refresh
+        )
+        return {"report_date": report_date, **data}
+
+    @staticmethod
+    def _calculer(report_date):
+        start_datetime = timezone.make_aware(datetime.combine(report_date, datetime.min.time()))
+        end_datetime = timezone.make_aware(datetime.combine(report_date, datetime.max.time()))
+        du_jour = Q(created_at__range=(start_datetime, end_datetime))
+        statuts = [statut for statut, _ in Contravention.STATUT_CHOICES]
+
+        # Contraventions : chiffres du jour et cumuls en une passe
+        aggregats = {
+            "total_created": Count("id", filter=du_jour),
+            "total_amount": Sum("montant_amende_ariary", filter=du_jour),
+            "paid_amount": Sum("montant_amende_ariary", filter=du_jour & Q(statut="PAYEE")),
+            "cumulative_total": Count("id"),
+            "cumulative_amount": Sum("montant_amende_ariary"),
+            "cumulative_paid_amount": Sum("montant_amende_ariary", filter=Q(statut="PAYEE")),
+        }
+        for statut in statuts:
+            aggregats[f"jour_{statut}"] = Count("id", filter=du_jour & Q(statut=statut))
+            aggregats[f"cumul_{statut}"] = Count("id", filter=Q(statut=statut))
+        totaux = Contravention.objects.aggregate(**aggregats)
+
+        daily_contraventions = Contravention.objects.filter(du_jour)
+        by_infraction = (
+            daily_contraventions.values("type_infraction__nom", "type_infraction__article_code")
+            .annotate(count=Count("id"), total_amount=Sum("montant_amende_ariary"))
+            .order_by("-count")[:10]
+        )
+        by_agent = (
+            daily_contraventions.values(
+                "agent_controleur__matricule", "agent_controleur__nom_complet", "agent_controleur__unite_affectation"
+            )
+            .annotate(count=Count("id"), total_amount=Sum("montant_amende_ariary"))
+            .order_by("-count")[:10]
+        )
+
+        fourriere = DossierFourriere.objects.filter(
+            Q(date_mise_fourriere__range=(start_datetime, end_datetime))
+            | Q(date_sortie_fourriere__range=(start_datetime, end_datetime))
+        ).aggregate(
+            created=Count("id", filter=Q(date_mise_fourriere__range=(start_datetime, end_datetime))),
+            released=Count(
+                "id", filter=Q(date_sortie_fourriere__range=(start_datetime, end_datetime), statut="RESTITUE")
+            ),
+        )
+        contestations = Contestation.objects.filter(
+            Q(date_soumission__range=(start_datetime, end_datetime))
+            | Q(date_examen__range=(start_datetime, end_datetime))
+        ).aggregate(
+            created=Count("id", filter=Q(date_soumission__range=(start_datetime, end_datetime))),
+            accepted=Count("id", filter=Q(date_examen__range=(start_datetime, end_datetime), statut="ACCEPTEE")),
+            rejected=Count("id", filter=Q(date_examen__range=(start_datetime, end_datetime), statut="REJETEE")),
+        )
+
+        total_created = totaux["total_created"]
+        by_status = sorted(
+            ({"statut": statut, "count": totaux[f"jour_{statut}"]} for statut in statuts if totaux[f"jour_{statut}"]),
+            key=lambda row: -row["count"],
+        )
+
+        return {
+            "daily": {
+                "total_created": total_created,
+                "total_paid": totaux["jour_PAYEE"],
+                "total_contested": totaux["jour_CONTESTEE"],
+                "total_cancelled": totaux["jour_ANNULEE"],
+                "total_unpaid": totaux["jour_IMPAYEE"],
+                "total_amount": float(totaux["total_amount"] or Decimal("0")),
+                "paid_amount": float(totaux["paid_amount"] or Decimal("0")),
+                "payment_rate": round(totaux["jour_PAYEE"] / total_created * 100, 2) if total_created else 0,
+                "by_infraction": [RapportService._classement(row) for row in by_infraction],
+                "by_agent": [RapportService._classement(row) for row in by_agent],
+                "by_status": by_status,
+                "fourriere_created": fourriere["created"],
+                "fourriere_released": fourriere["released"],
+                "contestations_created": contestations["created"],
+                "contestations_accepted": contestations["accepted"],
+                "contestations_rejected": contestations["rejected"],
+            },
+            "cumulative": {
+                "total": totaux["cumulative_total"],
+                "paid": totaux["cumul_PAYEE"],
+                "unpaid": totaux["cumul_IMPAYEE"],
+                "total_amount": float(totaux["cumulative_amount"] or Decimal("0")),
+                "paid_amount": float(totaux["cumulative_paid_amount"] or Decimal("0")),
+            },
+        }
+
+    @staticmethod
+    def _classement(row):
+        return {**row, "total_amount": float(row["total_amount"] or 0)}
@@ -0,0 +1,202 @@
+"""
+Service de détection des récidives.
+
+Chaque conducteur et chaque véhicule enregistré a un ``ResumeInfractions`` listant ses
+contraventions non annulées de la fenêtre ``CONTRAVENTION_RECIDIVE_WINDOW_DAYS``. Le résumé est
+mis à jour à chaque enregistrement ou suppression d'une contravention (voir
+``contraventions.signals``), si bien qu'une vérification de récidive au bord de la route est
+une lecture d'une ligne par contrevenant au lieu d'une recherche dans les contraventions.
+
+Pour une période plus longue que la fenêtre, la recherche se fait sur ``Contravention`` via
+les index (conducteur | véhicule, type_infraction, date_heure_infraction).
+"""
+
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from contraventions.models import Contravention, ResumeInfractions
+
+# Statuts pris en compte pour la majoration de récidive à la création d'une contravention
+STATUTS_RECIDIVE = ("IMPAYEE", "PAYEE")
+
+
+class RecidiveService:
+    """Service pour maintenir et consulter les résumés d'infractions"""
+
+    @staticmethod
+    def get_window_days():
+        return getattr(settings, "CONTRAVENTION_RECIDIVE_WINDOW_DAYS", 365)
+
+    @staticmethod
+    def _entry(contravention):
+        return {
+            "id": str(contravention.id),
+            "type_infraction": str(contravention.type_infraction_id) if contravention.type_infraction_id else None,
+            "date": contravention.date_heure_infraction.isoformat(),
+            "statut": contravention.statut,
+        }
+
+    @staticmethod
+    def _is_recent(entry, cutoff):
+        return datetime.fromisoformat(entry["date"]) >= cutoff
+
+    @staticmethod
+    def enregistrer(contravention):
+        """Ajoute ou met à jour la contravention dans les résumés de son conducteur et de son véhicule"""
+        cutoff = timezone.now() - timedelta(days=RecidiveService.get_window_days())
+        keep = (
+            contravention.statut != "ANNULEE"
+            and contravention.date_heure_infraction is not None
+            and contravention.date_heure_infraction >= cutoff
+        )
+        for lookup in RecidiveService._lookups(contravention):
+            RecidiveService._update(lookup, contravention, keep, cutoff)
+
+    @staticmethod
+    def retirer(contravention):
+        """Retire la contravention des résumés de son conducteur et de son véhicule"""
+        cutoff = timezone.now() - timedelta(days=RecidiveService.get_window_days())
+        for lookup in RecidiveService._lookups(contravention):
+            RecidiveService._update(lookup, contravention, False, cutoff)
+
+    @staticmethod
+    def _lookups(contravention):
+        lookups = []
+        if contravention.conducteur_id:
+            lookups.append({"conducteur_id": contravention.conducteur_id})
+        if contravention.vehicule_id:
+            lookups.append({"vehicule_id": contravention.vehicule_id})
+        return lookups
+
+    @staticmethod
+    def _update(lookup, contravention, keep, cutoff):
+        with transaction.atomic():
+            if keep:
+                resume, _ = ResumeInfractions.objects.select_for_update().get_or_create(**lookup)
+            else:
+                resume = ResumeInfractions.objects.select_for_update().filter(**lookup).first()
+                if resume is None:
+                    return
+
+            contravention_id = str(contravention.id)
+            infractions = [
+                entry
+                for entry in resume.infractions
+                if entry["id"] != contravention_id and RecidiveService._is_recent(entry, cutoff)
+            ]
+            if keep:
+                infractions.append(RecidiveService._entry(contravention))
+                infractions.sort(key=lambda entry: entry["date"])
+
+            if infractions != resume.infractions:
+                resume.infractions = infractions
+                resume.save(update_fields=["infractions", "updated_at"])
+
+    @staticmethod
+    def infractions_recentes(conducteur=None, vehicule=None, type_infraction=None, jours=None, statuts=None):
+        """
+        Contraventions non annulées du conducteur et/ou du véhicule sur les ``jours`` derniers jours.
+
+        Args:
+            conducteur: Conducteur ou identifiant
+            vehicule: Véhicule ou plaque d'immatriculation
+            type_infraction: TypeInfraction ou identifiant (tous types si None)
+            jours: int, période (``CONTRAVENTION_RECIDIVE_WINDOW_DAYS`` par défaut)
+            statuts: statuts retenus (tous sauf ANNULEE si None)
+
+        Returns:
+            list: ``{"id", "type_infraction", "date", "statut"}``, de la plus ancienne à la plus récente
+        """
+        window = RecidiveService.get_window_days()
+        jours = jours or window
+        cutoff = timezone.now() - timedelta(days=jours)
+        type_id = str(getattr(type_infraction, "pk", type_infraction)) if type_infraction else None
+
+        if jours > window:
+            infractions = RecidiveService._query(conducteur, vehicule, cutoff)
+        else:
+            infractions = None
+            for lookup in ({"conducteur": conducteur}, {"vehicule": vehicule}):
+                if list(lookup.values())[0] is None:
+                    continue
+                entries = ResumeInfractions.objects.filter(**lookup).values_list("infractions", flat=True).first()
+                entries = entries or []
+                if infractions is None:
+                    infractions = entries
+                else:
+                    # Conducteur et véhicule : contraventions communes aux deux
+                    ids = {entry["id"] for entry in entries}
+                    infractions = [entry for entry in infractions if entry["id"] in ids]
+            infractions = infractions or []
+
+        return [
+            entry
+            for entry in infractions
+            if RecidiveService._is_recent(entry, cutoff)
+            and (type_id is None or entry["type_infraction"] == type_id)
+            and (entry["statut"] in statuts if statuts else entry["statut"] != "ANNULEE")
+        ]
+
+    @staticmethod
+    def _query(conducteur, vehicule, cutoff):
+        queryset = Contravention.objects.filter(date_heure_infraction__gte=cutoff).exclude(statut="ANNULEE")
+        if conducteur is not None:
+            queryset = queryset.filter(conducteur=conducteur)
+        if vehicule is not None:
+            queryset = queryset.filter(vehicule=vehicule)
+        return [RecidiveService._entry(contravention) for contravention in queryset.order_by("date_heure_infraction")]
+
+    @staticmethod
+    def compter(**kwargs):
+        """Nombre de contraventions retenues par ``infractions_recentes``"""
+        return len(RecidiveService.infractions_recentes(**kwargs))
+
+    @staticmethod
+    def verifier(conducteur=None, vehicule=None, type_infraction=None):
+        """
+        Vérification de récidive pour l'agent : nombre de contraventions récentes et majoration.
+
+        La majoration est celle qui sera appliquée à la nouvelle contravention
+        (``penalite_recidive_pct`` du type d'infraction sur son montant de base).
+        """
+        count = RecidiveService.compter(conducteur=conducteur, vehicule=vehicule, type_infraction=type_infraction)
+        majoration = 0
+        if count and type_infraction is not None and type_infraction.penalite_recidive_pct:
+            majoration = type_infraction.montant_min_ariary * type_infraction.penalite_recidive_pct / 100
+        return {"recidive_count": count, "has_recidive": count > 0, "majoration": majoration}
+
+    @staticmethod
+    def reconstruire():
+        """Recalcule tous les résumés à partir des contraventions ; retourne le nombre de résumés"""
+        cutoff = timezone.now() - timedelta(days=RecidiveService.get_window_days())
+        by_conducteur, by_vehicule = {}, {}
+        contraventions = (
+            Contravention.objects.filter(date_heure_infraction__gte=cutoff)
+            .exclude(statut="ANNULEE")
+            .only("id", "conducteur_id", "vehicule_id", "type_infraction_id", "date_heure_infraction", "statut")
+            .order_by("date_heure_infraction")
+        )
+        for contravention in contraventions.iterator(chunk_size=2000):
+            entry = RecidiveService._entry(contravention)
+            if contravention.conducteur_id:
+                by_conducteur.setdefault(contravention.conducteur_id, []).append(entry)
+            if contravention.vehicule_id:
+                by_vehicule.setdefault(contravention.vehicule_id, []).append(entry)
+
+        with transaction.atomic():
+            ResumeInfractions.objects.all().delete()
+            ResumeInfractions.objects.bulk_create(
+                [
+                    ResumeInfractions(conducteur_id=conducteur_id, infractions=entries)
+                    for conducteur_id, entries in by_conducteur.items()
+                ]
+                + [
+                    ResumeInfractions(vehicule_id=vehicule_id, infractions=entries)
+                    for vehicule_id, entries in by_vehicule.items()
+                ],
+                batch_size=1000,
+            )
+        return len(by_conducteur) + len(by_vehicule)
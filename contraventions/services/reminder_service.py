@@ -0,0 +1,286 @@
+"""
+Service d'envoi des rappels de paiement des contraventions.
+
+Les contraventions impayées sont réparties en trois cohortes selon leur date limite de
+paiement : échéance proche, échéance dépassée et très en retard. Une seule requête sur
+(``statut``, ``date_limite_paiement``) sélectionne les contraventions d'une cohorte qui n'ont
+pas encore reçu le rappel correspondant (``RappelPaiement``), triées par destinataire.
+
+Les contraventions sont lues en flux et regroupées par propriétaire du véhicule : chaque
+destinataire reçoit un seul email et une seule notification pour toutes ses contraventions.
+Les destinataires sont traités par lots de ``CONTRAVENTION_REMINDER_BATCH_SIZE`` ; pour chaque
+lot, les contraventions sont verrouillées (``SKIP LOCKED``) et les rappels enregistrés avant
+l'envoi des emails sur une seule connexion SMTP. Seuls les rappels enregistrés par cette
+exécution sont envoyés : une exécution concurrente ignore les contraventions verrouillées ou
+déjà rappelées, si bien qu'un rappel n'est jamais envoyé deux fois. ``verrou`` évite en plus de
+lancer deux exécutions à la fois (tâche planifiée et commande).
+"""
+
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, CharField, Exists, OuterRef, Q, Value, When
+from django.utils import timezone
+
+from contraventions.models import Contravention, RappelPaiement
+from notifications.models import Notification
+
+logger = logging.getLogger(__name__)
+
+APPROACHING_DUE = "approaching_due"
+PAST_DUE = "past_due"
+VERY_OVERDUE = "very_overdue"
+
+LOCK_KEY = "contraventions:payment_reminders:lock"
+
+# Du plus au moins urgent : le sujet du message suit le rappel le plus urgent du destinataire
+SUBJECTS = {
+    VERY_OVERDUE: "AVERTISSEMENT: Contraventions très en retard",
+    PAST_DUE: "URGENT: Contraventions impayées",
+    APPROACHING_DUE: "Rappel: Paiement de contraventions",
+}
+
+LINES = {
+    APPROACHING_DUE: "à payer avant le {date}",
+    PAST_DUE: "date limite dépassée ({date}), des frais de retard peuvent s'appliquer",
+    VERY_OVERDUE: "très en retard depuis le {date}, des poursuites judiciaires peuvent être engagées",
+}
+
+
+@dataclass
+class ReminderRun:
+    """Résultat d'une exécution"""
+
+    recipients: int = 0
+    emails_sent: int = 0
+    reminders: dict = field(default_factory=lambda: dict.fromkeys(SUBJECTS, 0))
+
+    @property
+    def total(self):
+        return sum(self.reminders.values())
+
+
+class ReminderService:
+    """Service pour envoyer les rappels de paiement par lots"""
+
+    @staticmethod
+    @contextmanager
+    def verrou(timeout=60 * 60):
+        """Verrou partagé par les exécutions ; produit ``False`` si une autre exécution est en cours"""
+        acquired = cache.add(LOCK_KEY, True, timeout=timeout)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                cache.delete(LOCK_KEY)
+
+    @staticmethod
+    def get_due_reminders(today=None, days_before_due=None, days_after_due=None, very_overdue_days=None):
+        """
+        Contraventions impayées à rappeler, annotées de ``type_rappel`` et triées par destinataire.
+
+        Seules les contraventions dont le véhicule a un propriétaire enregistré sont retenues, et
+        chaque type de rappel n'est envoyé qu'une fois par contravention.
+        """
+        today = today or timezone.now().date()
+        if days_before_due is None:
+            days_before_due = getattr(settings, "CONTRAVENTION_REMINDER_DAYS_BEFORE_DUE", 7)
+        if days_after_due is None:
+            days_after_due = getattr(settings, "CONTRAVENTION_REMINDER_DAYS_AFTER_DUE", 3)
+        if very_overdue_days is None:
+            very_overdue_days = getattr(settings, "CONTRAVENTION_REMINDER_VERY_OVERDUE_DAYS", 30)
+
+        approaching = Q(date_limite_paiement__range=(today, today + timedelta(days=days_before_due)))
+        past_due = Q(date_limite_paiement__lte=today - timedelta(days=days_after_due))
+        very_overdue = Q(date_limite_paiement__lt=today - timedelta(days=very_overdue_days))
+
+        return (
+            Contravention.objects.filter(approaching | past_due, statut="IMPAYEE", vehicule__proprietaire__isnull=False)
+            .annotate(
+                type_rappel=Case(
+                    When(very_overdue, then=Value(VERY_OVERDUE)),
+                    When(past_due, then=Value(PAST_DUE)),
+                    default=Value(APPROACHING_DUE),
+                    output_field=CharField(),
+                )
+            )
+            .exclude(
+                Exists(RappelPaiement.objects.filter(contravention=OuterRef("pk"), type_rappel=OuterRef("type_rappel")))
+            )
+            .select_related("vehicule__proprietaire")
+            .only(
+                "id",
+                "numero_pv",
+                "montant_amende_ariary",
+                "date_limite_paiement",
+                "vehicule__plaque_immatriculation",
+                "vehicule__proprietaire__id",
+                "vehicule__proprietaire__email",
+                "vehicule__proprietaire__first_name",
+                "vehicule__proprietaire__last_name",
+                "vehicule__proprietaire__username",
+            )
+            .order_by("vehicule__proprietaire_id", "date_limite_paiement", "id")
+        )
+
+    @staticmethod
+    def envoyer_rappels(dry_run=False, batch_size=None, on_batch=None, **cohorts):
+        """
+        Envoie les rappels de paiement dus, regroupés par destinataire.
+
+        Args:
+            dry_run: Sélectionne les rappels sans rien envoyer ni enregistrer
+            batch_size: Destinataires par lot (``CONTRAVENTION_REMINDER_BATCH_SIZE`` par défaut)
+            on_batch: Appelé avec la liste des ``(destinataire, contraventions)`` de chaque lot
+            **cohorts: ``today``, ``days_before_due``, ``days_after_due``, ``very_overdue_days``
+
+        Returns:
+            ReminderRun
+        """
+        batch_size = batch_size or getattr(settings, "CONTRAVENTION_REMINDER_BATCH_SIZE", 200)
+        run = ReminderRun()
+
+        contraventions = ReminderService.get_due_reminders(**cohorts).iterator(chunk_size=2000)
+        batch = []
+        for _, group in groupby(contraventions, key=lambda contravention: contravention.vehicule.proprietaire_id):
+            group = list(group)
+            batch.append((group[0].vehicule.proprietaire, group))
+            if len(batch) >= batch_size:
+                ReminderService._process_batch(batch, run, dry_run, on_batch)
+                batch = []
+        if batch:
+            ReminderService._process_batch(batch, run, dry_run, on_batch)
+
+        logger.info(
+            f"Payment reminders {'selected' if dry_run else 'sent'}: recipients={run.recipients}, "
+            f"reminders={run.total}, emails={run.emails_sent}"
+        )
+        return run
+
+    @staticmethod
+    def _process_batch(batch, run, dry_run, on_batch):
+        if dry_run:
+            ReminderService._count(batch, run, on_batch)
+            return
+
+        # Les rappels sont enregistrés avant l'envoi : un lot interrompu n'est pas renvoyé
+        with transaction.atomic():
+            batch = ReminderService._claim(batch)
+            if not batch:
+                return
+            messages = [ReminderService.build_message(user, contraventions) for user, contraventions in batch]
+
+            RappelPaiement.objects.bulk_create(
+                [
+                    RappelPaiement(
+                        contravention=contravention,
+                        type_rappel=contravention.type_rappel,
+                        destinataire=user,
+                        email=user.email or "",
+                    )
+                    for user, contraventions in batch
+                    for contravention in contraventions
+                ]
+            )
+            Notification.objects.bulk_create(
+                [
+                    Notification(
+                        user=user,
+                        type_notification="system",
+                        titre=subject,
+                        contenu=message,
+                        langue="fr",
+                        metadata={
+                            "event": "contravention_payment_reminder",
+                            "contraventions": [str(contravention.id) for contravention in contraventions],
+                            "types": sorted({contravention.type_rappel for contravention in contraventions}),
+                        },
+                    )
+                    for (user, contraventions), (subject, message) in zip(batch, messages)
+                ]
+            )
+
+        from administration.email_utils import send_mass_email
+
+        sent, _ = send_mass_email(
+            [
+                {
+                    "subject": subject,
+                    "message": message,
+                    "recipient": user.email,
+                    "related_object_type": "User",
+                    "related_object_id": user.id,
+                }
+                for (user, _), (subject, message) in zip(batch, messages)
+                if user.email
+            ],
+            email_type="reminder",
+        )
+        ReminderService._count(batch, run, on_batch)
+        run.emails_sent += sent
+
+    @staticmethod
+    def _claim(batch):
+        """
+        Verrouille les contraventions du lot et retire celles qu'une autre exécution traite ou a
+        déjà rappelées. À appeler dans une transaction.
+        """
+        ids = [contravention.id for _, contraventions in batch for contravention in contraventions]
+        locked = set(
+            Contravention.objects.select_for_update(skip_locked=True).filter(id__in=ids).values_list("id", flat=True)
+        )
+        sent = set(
+            RappelPaiement.objects.filter(contravention_id__in=locked).values_list("contravention_id", "type_rappel")
+        )
+
+        claimed = []
+        for user, contraventions in batch:
+            contraventions = [
+                contravention
+                for contravention in contraventions
+                if contravention.id in locked and (contravention.id, contravention.type_rappel) not in sent
+            ]
+            if contraventions:
+                claimed.append((user, contraventions))
+        return claimed
+
+    @staticmethod
+    def _count(batch, run, on_batch):
+        run.recipients += len(batch)
+        for _, contraventions in batch:
+            for contravention in contraventions:
+                run.reminders[contravention.type_rappel] += 1
+        if on_batch:
+            on_batch(batch)
+
+    @staticmethod
+    def build_message(user, contraventions):
+        """Sujet et contenu du rappel regroupant les contraventions d'un destinataire"""
+        types = {contravention.type_rappel for contravention in contraventions}
+        subject = next(subject for type_rappel, subject in SUBJECTS.items() if type_rappel in types)
+
+        site_url = getattr(settings, "SITE_URL", "https://taxcollector.mg")
+        lines = []
+        for contravention in contraventions:
+            detail = LINES[contravention.type_rappel].format(
+                date=contravention.date_limite_paiement.strftime("%d/%m/%Y")
+            )
+            lines.append(
+                f"- {contravention.numero_pv} ({contravention.vehicule.plaque_immatriculation}) : "
+                f"{contravention.montant_amende_ariary:,.0f} Ar, {detail}\n"
+                f"  Payer: {site_url}/contraventions/public/{contravention.numero_pv}/pay/"
+            )
+
+        message = (
+            f"Bonjour {user.get_full_name() or user.username},\n\n"
+            f"Les contraventions suivantes sont en attente de paiement :\n\n"
+            + "\n".join(lines)
+            + "\n\nCordialement,\nService des Contraventions"
+        )
+        return subject, message
@@ -0,0 +1,129 @@
+"""
+Service de recherche des véhicules et conducteurs pour les agents.
+
+La recherche porte sur des colonnes normalisées (voir ``core.utils.search``) : plaque, numéro
+de châssis, CIN, numéro de permis et nom. Les correspondances par préfixe sont cherchées en
+premier (index ``varchar_pattern_ops``) et classées : identifiant exact, puis préfixe. Si elles
+ne remplissent pas les ``CONTRAVENTION_SEARCH_LIMIT`` résultats et que la saisie fait au moins
+trois caractères, les correspondances au milieu du texte complètent la liste (index trigrammes).
+
+Les agents interrogent la recherche à chaque frappe : les résultats sont mis en cache par agent
+et par saisie normalisée pendant ``CONTRAVENTION_SEARCH_CACHE_SECONDS``, si bien qu'un retour
+arrière ou une saisie répétée ne refait pas la requête.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from contraventions.models import Conducteur
+from core.utils.search import normalize_search_key, normalize_search_text
+from vehicles.models import Vehicule
+
+MIN_QUERY_LENGTH = 2
+# Longueur minimale pour une recherche au milieu du texte (un trigramme)
+MIN_CONTAINS_LENGTH = 3
+
+
+class SearchService:
+    """Service pour l'autocomplétion des véhicules et conducteurs"""
+
+    @staticmethod
+    def get_limit():
+        return getattr(settings, "CONTRAVENTION_SEARCH_LIMIT", 10)
+
+    @staticmethod
+    def _cache_key(kind, user, key):
+        digest = hashlib.md5(key.encode("utf-8")).hexdigest()
+        return f"contraventions:search:{kind}:{getattr(user, 'pk', None) or 'anon'}:{digest}"
+
+    @staticmethod
+    def _cached(kind, user, key, search):
+        timeout = getattr(settings, "CONTRAVENTION_SEARCH_CACHE_SECONDS", 30)
+        if not timeout:
+            return search()
+        cache_key = SearchService._cache_key(kind, user, key)
+        results = cache.get(cache_key)
+        if results is None:
+            results = search()
+            cache.set(cache_key, results, timeout)
+        return results
+
+    @staticmethod
+    def _ranked(queryset, prefix, exact, contains, order_by, limit):
+        results = list(
+            queryset.filter(prefix)
+            .annotate(rang=Case(When(exact, then=Value(0)), default=Value(1), output_field=IntegerField()))
+            .order_by("rang", *order_by)[:limit]
+        )
+        if contains is not None and len(results) < limit:
+            results += list(
+                queryset.filter(contains)
+                .exclude(pk__in=[obj.pk for obj in results])
+                .order_by(*order_by)[: limit - len(results)]
+            )
+        return results
+
+    @staticmethod
+    def rechercher_vehicules(query, user=None, limit=None):
+        """
+        Véhicules dont la plaque ou le numéro de châssis correspond à la saisie.
+
+        Returns:
+            list[Vehicule]: au plus ``limit`` véhicules, les plus pertinents en premier
+        """
+        key = normalize_search_key(query)
+        if len(key) < MIN_QUERY_LENGTH:
+            return []
+        limit = limit or SearchService.get_limit()
+
+        # Les plaques gardent leur tiret (TEMP-XXXXXXXX), les numéros de châssis sont normalisés
+        plate = Vehicule.normalize_plate(query.strip())
+
+        def search():
+            return SearchService._ranked(
+                Vehicule.objects.all(),
+                prefix=Q(plaque_immatriculation__startswith=plate) | Q(vin_normalise__startswith=key),
+                exact=Q(plaque_immatriculation=plate) | Q(vin_normalise=key),
+                contains=(
+                    Q(plaque_immatriculation__contains=plate) | Q(vin_normalise__contains=key)
+                    if len(key) >= MIN_CONTAINS_LENGTH
+                    else None
+                ),
+                order_by=["plaque_immatriculation"],
+                limit=limit,
+            )
+
+        return SearchService._cached("vehicules", user, f"{plate}:{limit}", search)
+
+    @staticmethod
+    def rechercher_conducteurs(query, user=None, limit=None):
+        """
+        Conducteurs dont le CIN, le numéro de permis ou le nom correspond à la saisie.
+
+        Returns:
+            list[Conducteur]: au plus ``limit`` conducteurs, les plus pertinents en premier
+        """
+        key = normalize_search_key(query)
+        text = normalize_search_text(query)
+        if len(key) < MIN_QUERY_LENGTH:
+            return []
+        limit = limit or SearchService.get_limit()
+
+        def search():
+            return SearchService._ranked(
+                Conducteur.objects.all(),
+                prefix=Q(cin__startswith=key) | Q(permis_normalise__startswith=key) | Q(nom_normalise__startswith=text),
+                exact=Q(cin=key) | Q(permis_normalise=key),
+                contains=(
+                    Q(nom_normalise__contains=text) | Q(permis_normalise__contains=key) | Q(cin__contains=key)
+                    if len(key) >= MIN_CONTAINS_LENGTH
+                    else None
+                ),
+                order_by=["nom_normalise", "cin"],
+                limit=limit,
+            )
+
+        return SearchService._cached("conducteurs", user, f"{text}:{limit}", search)
@@ -0,0 +1,24 @@
+"""
+Signal handlers keeping the per-offender infraction summaries up to date
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Contravention
+from .services.recidive_service import RecidiveService
+
+
+@receiver(post_save, sender=Contravention)
+def update_resume_infractions(sender, instance, raw=False, **kwargs):
+    """
+    Record the contravention in the summaries of its driver and vehicle (removed once cancelled)
+    """
+    if raw:
+        return
+    RecidiveService.enregistrer(instance)
+
+
+@receiver(post_delete, sender=Contravention)
+def remove_from_resume_infractions(sender, instance, **kwargs):
+    RecidiveService.retirer(instance)
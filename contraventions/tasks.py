@@ -7,7 +7,7 @@ from django.utils import timezone
 
 from celery import shared_task
 
-from contraventions.models import Contestation, Contravention, DossierFourriere
+from contraventions.models import Contestation, Contravention
 from notifications.models import Notification
 
 
@@ -121,57 +121,29 @@ Service des Contraventions
 
 
 @shared_task
-def process_expired_fourriere():
+def send_payment_reminders():
     """
-    Process expired fourrière cases
+    Send the payment reminders due today, one message per recipient (scheduled nightly)
     """
-    expired_fourrieres = DossierFourriere.objects.filter(
-        statut="EN_FOURRIERE", date_mise_fourriere__lte=timezone.now() - timedelta(days=30)  # 30 days max duration
-    )
-
-    processed_count = 0
-
-    for fourriere in expired_fourrieres:
-        days_elapsed = (timezone.now() - fourriere.date_mise_fourriere).days
-
-        if days_elapsed >= fourriere.duree_maximale_jours:
-            # Mark for sale notification
-            fourriere.observations += f'\n\n[SYSTEM] Dossier expiré le {timezone.now().strftime("%d/%m/%Y")}. '
-            fourriere.observations += "Notification de vente envoyée."
-            fourriere.save()
+    from contraventions.services.reminder_service import ReminderService
 
-            # Send notification to vehicle owner
-            if fourriere.contravention.vehicule and fourriere.contravention.vehicule.proprietaire:
-                owner = fourriere.contravention.vehicule.proprietaire
-                subject = f"Notification de vente - Véhicule {fourriere.contravention.vehicule.plaque_immatriculation}"
-                message = f"""
-Bonjour {owner.get_full_name()},
+    # Only one run at a time (shared with the management command)
+    with ReminderService.verrou() as acquired:
+        if not acquired:
+            return None
+        run = ReminderService.envoyer_rappels()
 
-Votre véhicule immatriculé {fourriere.contravention.vehicule.plaque_immatriculation} 
-est en fourrière depuis plus de {days_elapsed} jours.
-
-Le délai légal étant dépassé, votre véhicule sera mis en vente.
-
-Pour plus d'informations, contactez: {settings.CONTACT_PHONE}
-
-Cordialement,
-Service de la Fourrière
-"""
+    return {"recipients": run.recipients, "emails_sent": run.emails_sent, **run.reminders}
 
-                try:
-                    send_mail(
-                        subject=subject,
-                        message=message,
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        recipient_list=[owner.email],
-                        fail_silently=False,
-                    )
-                except Exception as e:
-                    print(f"Failed to send fourrière notification to {owner.email}: {str(e)}")
 
-            processed_count += 1
+@shared_task
+def process_expired_fourriere():
+    """
+    Mark the expired fourrière cases and notify the owners of the sale (scheduled daily)
+    """
+    from contraventions.services.fourriere_service import FourriereService
 
-    return processed_count
+    return FourriereService.traiter_dossiers_expires().dossiers
 
 
 @shared_task
@@ -222,34 +194,48 @@ Pour traiter: {settings.SITE_URL}/admin/contraventions/contestation/{contestatio
 @shared_task
 def generate_daily_reports():
     """
-    Generate daily reports for contraventions
+    Generate (and persist) yesterday's daily report for contraventions
     """
-    from datetime import datetime, timedelta
-
-    yesterday = timezone.now() - timedelta(days=1)
-
-    # Daily statistics
-    stats = {
-        "new_contraventions": Contravention.objects.filter(date_creation__date=yesterday.date()).count(),
-        "paid_contraventions": Contravention.objects.filter(date_paiement__date=yesterday.date()).count(),
-        "contested_contraventions": Contravention.objects.filter(
-            statut="contested", date_modification__date=yesterday.date()
-        ).count(),
-        "total_revenue": Contravention.objects.filter(date_paiement__date=yesterday.date()).aggregate(
-            total=Sum("montant_total_ariary")
-        )["total"]
-        or 0,
+    from contraventions.services.rapport_service import RapportService
+
+    yesterday = timezone.localdate() - timedelta(days=1)
+    report = RapportService.generer_rapport_journalier(yesterday, refresh=True)
+    daily = report["daily"]
+
+    return {
+        "date": yesterday.isoformat(),
+        "new_contraventions": daily["total_created"],
+        "paid_contraventions": daily["total_paid"],
+        "contested_contraventions": daily["total_contested"],
+        "total_amount": daily["total_amount"],
     }
 
-    # Create report record
-    from contraventions.models import RapportJournalier
 
-    RapportJournalier.objects.create(
-        date=yesterday.date(),
-        nombre_nouvelles_contraventions=stats["new_contraventions"],
-        nombre_contraventions_payees=stats["paid_contraventions"],
-        nombre_contestations=stats["contested_contraventions"],
-        montant_total_percu=stats["total_revenue"],
-    )
-
-    return stats
+@shared_task
+def send_notification_emails(notification_ids):
+    """
+    Send the emails of notifications created in bulk (e.g. late penalties)
+    """
+    from administration.email_utils import send_email as send_smtp_email
+
+    sent_count = 0
+    notifications = Notification.objects.select_related("user").filter(id__in=notification_ids)
+    for notification in notifications:
+        if not notification.user.email:
+            continue
+        try:
+            success, message, logs = send_smtp_email(
+                subject=notification.titre,
+                message=notification.contenu,
+                recipient_list=[notification.user.email],
+                email_type="notification",
+                related_object_type="Notification",
+                related_object_id=notification.id,
+                fail_silently=True,
+            )
+            if success:
+                sent_count += 1
+        except Exception as e:
+            print(f"Failed to send notification email {notification.id}: {str(e)}")
+
+    return sent_count
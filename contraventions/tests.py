@@ -4,10 +4,15 @@ Tests pour le service de contraventions.
 
 from datetime import timedelta
 from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
 from django.contrib.auth.models import Group, User
+from django.core import mail
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied, ValidationError
-from django.test import TestCase
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.utils import timezone
 
 from contraventions.models import (
@@ -16,11 +21,21 @@ from contraventions.models import (
     ConfigurationSysteme,
     Contravention,
     ContraventionAuditLog,
+    DossierFourriere,
+    RappelPaiement,
+    ResumeInfractions,
     TypeInfraction,
 )
 from contraventions.services.contravention_service import ContraventionService
-from core.models import UserProfile
-from vehicles.models import Vehicule
+from contraventions.services.fourriere_service import FourriereService
+from contraventions.services.penalty_service import PenaltyService
+from contraventions.services.rapport_service import RapportService
+from contraventions.services.recidive_service import RecidiveService
+from contraventions.services.reminder_service import ReminderService
+from contraventions.services.search_service import SearchService
+from core.models import ReportSnapshot, UserProfile
+from notifications.models import Notification
+from vehicles.models import VehicleType, Vehicule
 
 
 class ContraventionServiceAnnulationTest(TestCase):
@@ -289,3 +304,668 @@ class ContraventionServiceConsultationTest(TestCase):
         statuts = [c.statut for c in contraventions]
         self.assertIn("IMPAYEE", statuts)
         self.assertIn("CONTESTEE", statuts)
+
+
+class PenaltyServiceTest(TestCase):
+    """Tests pour l'application des pénalités de retard"""
+
+    def setUp(self):
+        """Configuration initiale pour les tests"""
+        self.config = ConfigurationSysteme.get_config()
+        self.today = timezone.now().date()
+
+        self.type_infraction = TypeInfraction.objects.create(
+            nom="Excès de vitesse",
+            article_code="L7.2-5",
+            categorie="CIRCULATION",
+            montant_min_ariary=Decimal("100000"),
+            montant_max_ariary=Decimal("500000"),
+        )
+        self.conducteur = Conducteur.objects.create(
+            cin="123456789012", nom_complet="Conducteur Test", telephone="0340000002"
+        )
+        self.proprietaire = User.objects.create_user(
+            username="proprietaire", password="testpass123", email="proprietaire@test.com"
+        )
+        self.vehicule = Vehicule.objects.create(
+            plaque_immatriculation="1234TAB",
+            proprietaire=self.proprietaire,
+            marque="Toyota",
+            puissance_fiscale_cv=13,
+            cylindree_cm3=1800,
+            source_energie="Essence",
+            date_premiere_circulation="2020-01-01",
+            categorie_vehicule="Personnel",
+            type_vehicule=VehicleType.objects.create(nom="Voiture"),
+        )
+
+        self.overdue = [self.create_contravention(Decimal("100000"), days_late=days_late) for days_late in (1, 5, 30)]
+        self.not_due = self.create_contravention(Decimal("100000"), days_late=-3)
+        self.paid = self.create_contravention(Decimal("100000"), days_late=10, statut="PAYEE")
+
+    def create_contravention(self, montant, days_late, statut="IMPAYEE", vehicule=None):
+        return Contravention.objects.create(
+            type_infraction=self.type_infraction,
+            conducteur=self.conducteur,
+            vehicule=vehicule,
+            date_heure_infraction=timezone.now(),
+            lieu_infraction="RN1, Antananarivo",
+            montant_amende_ariary=montant,
+            statut=statut,
+            date_limite_paiement=self.today - timedelta(days=days_late),
+        )
+
+    def test_penalites_appliquees_par_lots(self):
+        """Test: Chaque contravention en retard est majorée une fois, lot par lot"""
+        chunks = []
+        run = PenaltyService.appliquer_penalites(chunk_size=2, on_chunk=chunks.append)
+
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+        self.assertEqual(len(run.penalties), 3)
+        self.assertEqual(run.total_penalty_amount, Decimal("30000"))
+        for contravention in self.overdue:
+            contravention.refresh_from_db()
+            self.assertEqual(contravention.montant_amende_ariary, Decimal("110000"))
+            self.assertEqual(contravention.date_derniere_penalite, self.today)
+
+        for contravention in (self.not_due, self.paid):
+            contravention.refresh_from_db()
+            self.assertEqual(contravention.montant_amende_ariary, Decimal("100000"))
+            self.assertIsNone(contravention.date_derniere_penalite)
+
+    def test_penalites_idempotentes_par_jour(self):
+        """Test: Une nouvelle exécution le même jour ne pénalise pas deux fois"""
+        PenaltyService.appliquer_penalites()
+        run = PenaltyService.appliquer_penalites()
+
+        self.assertEqual(run.penalties, [])
+        self.assertEqual(ContraventionAuditLog.objects.count(), 3)
+        self.overdue[0].refresh_from_db()
+        self.assertEqual(self.overdue[0].montant_amende_ariary, Decimal("110000"))
+
+        # Le lendemain, la pénalité s'applique de nouveau
+        run = PenaltyService.appliquer_penalites(today=self.today + timedelta(days=1))
+        self.assertEqual(len(run.penalties), 3)
+        self.overdue[0].refresh_from_db()
+        self.assertEqual(self.overdue[0].montant_amende_ariary, Decimal("121000"))
+
+    def test_dry_run_ne_modifie_rien(self):
+        """Test: Le mode dry-run calcule sans enregistrer"""
+        run = PenaltyService.appliquer_penalites(dry_run=True)
+
+        self.assertEqual(len(run.penalties), 3)
+        self.assertFalse(ContraventionAuditLog.objects.exists())
+        self.assertFalse(Contravention.objects.filter(date_derniere_penalite__isnull=False).exists())
+
+    def test_journal_audit_chaine(self):
+        """Test: Les entrées d'audit insérées par lot prolongent la chaîne de hash"""
+        [existing] = ContraventionAuditLog.bulk_append(
+            [ContraventionAuditLog(action_type="CREATE", contravention=self.not_due, action_data={"action": "created"})]
+        )
+
+        PenaltyService.appliquer_penalites(chunk_size=2)
+
+        logs = list(ContraventionAuditLog.objects.order_by("timestamp"))
+        self.assertEqual(len(logs), 4)
+        self.assertEqual(logs[0].id, existing.id)
+        for previous, log in zip(logs, logs[1:]):
+            self.assertEqual(log.previous_hash, previous.current_hash)
+            self.assertEqual(log.current_hash, log.calculate_hash())
+            self.assertEqual(log.action_data["action"], "penalty_applied")
+            self.assertEqual(log.user_agent, "System - calculate_penalties command")
+        self.assertEqual(ContraventionAuditLog.get_last_hash(), logs[-1].current_hash)
+
+    def test_journal_audit_verrouille_avant_lecture_du_dernier_hash(self):
+        """Test: Les ajouts, par lot ou unitaires, verrouillent la chaîne avant de lire le dernier hash"""
+        with mock.patch.object(
+            ContraventionAuditLog, "lock_chain", wraps=ContraventionAuditLog.lock_chain
+        ) as lock_chain:
+            [first] = ContraventionAuditLog.bulk_append([ContraventionAuditLog(action_type="CREATE")])
+            second = ContraventionAuditLog.objects.create(action_type="UPDATE", contravention=self.not_due)
+
+        self.assertEqual(lock_chain.call_count, 2)
+        second.refresh_from_db()
+        self.assertEqual(second.previous_hash, first.current_hash)
+        self.assertEqual(second.current_hash, second.calculate_hash())
+        self.assertEqual(ContraventionAuditLog.get_last_hash(), second.current_hash)
+
+    def test_notifications_creees_en_bloc(self):
+        """Test: Les notifications sont créées par lot et les emails envoyés après le commit"""
+        avec_vehicule = self.create_contravention(Decimal("50000"), days_late=2, vehicule=self.vehicule)
+
+        with mock.patch("contraventions.tasks.send_notification_emails.delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                run = PenaltyService.appliquer_penalites(send_notifications=True)
+
+        self.assertEqual(len(run.penalties), 4)
+        self.assertEqual(run.notifications_sent, 1)
+        notification = Notification.objects.get(user=self.proprietaire, metadata__has_key="penalty_amount")
+        self.assertEqual(notification.metadata["numero_pv"], avec_vehicule.numero_pv)
+        self.assertIn("55,000.00 Ar", notification.contenu)
+        delay.assert_called_once_with([str(notification.id)])
+
+
+class ReminderServiceTest(TestCase):
+    """Tests pour l'envoi groupé des rappels de paiement"""
+
+    def setUp(self):
+        """Configuration initiale pour les tests"""
+        from administration.models import SMTPConfiguration
+
+        self.today = timezone.now().date()
+        SMTPConfiguration.objects.create(
+            name="Test",
+            host="localhost",
+            port=25,
+            username="test",
+            password="test",
+            from_email="pv@test.mg",
+            is_active=True,
+        )
+        vehicle_type = VehicleType.objects.create(nom="Voiture")
+        self.type_infraction = TypeInfraction.objects.create(
+            nom="Excès de vitesse",
+            article_code="L7.2-5",
+            categorie="CIRCULATION",
+            montant_min_ariary=Decimal("100000"),
+            montant_max_ariary=Decimal("500000"),
+        )
+
+        self.owners = []
+        self.vehicules = []
+        for index in range(2):
+            owner = User.objects.create_user(
+                username=f"proprietaire{index}", password="testpass123", email=f"proprietaire{index}@test.com"
+            )
+            self.owners.append(owner)
+            self.vehicules.append(
+                Vehicule.objects.create(
+                    plaque_immatriculation=f"123{index}TAB",
+                    proprietaire=owner,
+                    marque="Toyota",
+                    puissance_fiscale_cv=13,
+                    cylindree_cm3=1800,
+                    source_energie="Essence",
+                    date_premiere_circulation="2020-01-01",
+                    categorie_vehicule="Personnel",
+                    type_vehicule=vehicle_type,
+                )
+            )
+
+        self.approaching = self.create_contravention(self.vehicules[0], due_in=3)
+        self.past_due = self.create_contravention(self.vehicules[0], due_in=-5)
+        self.very_overdue = self.create_contravention(self.vehicules[0], due_in=-40)
+        self.create_contravention(self.vehicules[0], due_in=20)
+        self.create_contravention(self.vehicules[0], due_in=-5, statut="PAYEE")
+        self.create_contravention(None, due_in=-5)
+        self.other_past_due = self.create_contravention(self.vehicules[1], due_in=-10)
+
+    def create_contravention(self, vehicule, due_in, statut="IMPAYEE"):
+        return Contravention.objects.create(
+            type_infraction=self.type_infraction,
+            vehicule=vehicule,
+            date_heure_infraction=timezone.now(),
+            lieu_infraction="RN1, Antananarivo",
+            montant_amende_ariary=Decimal("100000"),
+            statut=statut,
+            date_limite_paiement=self.today + timedelta(days=due_in),
+        )
+
+    def send(self, **kwargs):
+        with mock.patch("administration.email_utils.get_connection", side_effect=lambda **_: mail.get_connection()):
+            return ReminderService.envoyer_rappels(**kwargs)
+
+    def test_rappels_groupes_par_destinataire(self):
+        """Test: Un email et une notification par destinataire pour toutes ses contraventions"""
+        run = self.send()
+
+        self.assertEqual(run.recipients, 2)
+        self.assertEqual(run.reminders, {"very_overdue": 1, "past_due": 2, "approaching_due": 1})
+        self.assertEqual(run.emails_sent, 2)
+        self.assertEqual(len(mail.outbox), 2)
+
+        email = next(email for email in mail.outbox if email.to == ["proprietaire0@test.com"])
+        self.assertIn("AVERTISSEMENT", email.subject)
+        for contravention in (self.approaching, self.past_due, self.very_overdue):
+            self.assertIn(contravention.numero_pv, email.body)
+
+        self.assertEqual(
+            set(RappelPaiement.objects.values_list("contravention_id", "type_rappel")),
+            {
+                (self.approaching.id, "approaching_due"),
+                (self.past_due.id, "past_due"),
+                (self.very_overdue.id, "very_overdue"),
+                (self.other_past_due.id, "past_due"),
+            },
+        )
+        notifications = Notification.objects.filter(metadata__event="contravention_payment_reminder")
+        self.assertEqual(notifications.count(), 2)
+
+    def test_rappel_envoye_une_seule_fois_par_type(self):
+        """Test: Une nouvelle exécution n'envoie que les rappels pas encore envoyés"""
+        self.send()
+        mail.outbox.clear()
+
+        run = self.send()
+        self.assertEqual(run.total, 0)
+        self.assertEqual(mail.outbox, [])
+
+        # L'échéance est maintenant dépassée : le rappel suivant est dû
+        Contravention.objects.filter(id=self.approaching.id).update(date_limite_paiement=self.today - timedelta(days=4))
+        run = self.send()
+        self.assertEqual(run.reminders["past_due"], 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_rappel_enregistre_par_une_execution_concurrente_non_renvoye(self):
+        """Test: Les rappels enregistrés par une autre exécution après la sélection ne sont pas envoyés"""
+        get_due_reminders = ReminderService.get_due_reminders
+
+        def overlapping_run(**cohorts):
+            selected = list(get_due_reminders(**cohorts))
+            RappelPaiement.objects.create(contravention=self.past_due, type_rappel="past_due")
+            return mock.Mock(iterator=lambda chunk_size: iter(selected))
+
+        with mock.patch.object(ReminderService, "get_due_reminders", side_effect=overlapping_run):
+            run = self.send()
+
+        self.assertEqual(run.reminders, {"very_overdue": 1, "past_due": 1, "approaching_due": 1})
+        email = next(email for email in mail.outbox if email.to == ["proprietaire0@test.com"])
+        self.assertNotIn(self.past_due.numero_pv, email.body)
+        self.assertIn(self.very_overdue.numero_pv, email.body)
+
+    def test_commande_attend_la_fin_de_l_execution_en_cours(self):
+        """Test: La commande partage le verrou de la tâche planifiée"""
+        from contraventions.management.commands.send_payment_reminders import Command
+
+        out = StringIO()
+        with ReminderService.verrou() as acquired:
+            self.assertTrue(acquired)
+            call_command(Command(), stdout=out)
+
+        self.assertIn("déjà en cours", out.getvalue())
+        self.assertFalse(RappelPaiement.objects.exists())
+        self.assertEqual(mail.outbox, [])
+
+    def test_envoi_par_lots_sur_une_connexion(self):
+        """Test: Chaque lot de destinataires est envoyé sur une seule connexion SMTP"""
+        with mock.patch("administration.email_utils.get_connection", return_value=mail.get_connection()) as conn:
+            run = ReminderService.envoyer_rappels(batch_size=1)
+
+        self.assertEqual(run.recipients, 2)
+        self.assertEqual(conn.call_count, 2)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_limite_journaliere_smtp(self):
+        """Test: Les emails au-delà de la limite journalière sont journalisés en échec"""
+        from administration.models import EmailLog, SMTPConfiguration
+
+        SMTPConfiguration.objects.update(daily_limit=1)
+        run = self.send()
+
+        self.assertEqual(run.emails_sent, 1)
+        self.assertEqual(EmailLog.objects.filter(status="sent").count(), 1)
+        self.assertEqual(EmailLog.objects.filter(status="failed").count(), 1)
+        self.assertEqual(SMTPConfiguration.objects.get().emails_sent_today, 1)
+
+    def test_dry_run_n_enregistre_rien(self):
+        """Test: Le mode dry-run sélectionne les rappels sans rien envoyer"""
+        run = self.send(dry_run=True)
+
+        self.assertEqual(run.total, 4)
+        self.assertFalse(RappelPaiement.objects.exists())
+        self.assertEqual(mail.outbox, [])
+
+
+class RecidiveServiceTest(TestCase):
+    """Tests pour les résumés d'infractions et la détection des récidives"""
+
+    def setUp(self):
+        """Configuration initiale pour les tests"""
+        self.type_vitesse = TypeInfraction.objects.create(
+            nom="Excès de vitesse",
+            article_code="L7.2-5",
+            categorie="CIRCULATION",
+            montant_min_ariary=Decimal("100000"),
+            montant_max_ariary=Decimal("500000"),
+            penalite_recidive_pct=Decimal("50.00"),
+        )
+        self.type_stationnement = TypeInfraction.objects.create(
+            nom="Stationnement interdit",
+            article_code="L7.2-7",
+            categorie="CIRCULATION",
+            montant_min_ariary=Decimal("12000"),
+            montant_max_ariary=Decimal("600000"),
+        )
+        self.conducteur = Conducteur.objects.create(cin="123456789012", nom_complet="Conducteur Test")
+        owner = User.objects.create_user(username="proprietaire", password="testpass123")
+        self.vehicule = Vehicule.objects.create(
+            plaque_immatriculation="1234TAB",
+            proprietaire=owner,
+            marque="Toyota",
+            puissance_fiscale_cv=13,
+            cylindree_cm3=1800,
+            source_energie="Essence",
+            date_premiere_circulation="2020-01-01",
+            categorie_vehicule="Personnel",
+            type_vehicule=VehicleType.objects.create(nom="Voiture"),
+        )
+
+    def create_contravention(self, type_infraction, days_ago=1, conducteur=None, vehicule=None, statut="IMPAYEE"):
+        return Contravention.objects.create(
+            type_infraction=type_infraction,
+            conducteur=conducteur,
+            vehicule=vehicule,
+            date_heure_infraction=timezone.now() - timedelta(days=days_ago),
+            lieu_infraction="RN1, Antananarivo",
+            montant_amende_ariary=Decimal("100000"),
+            statut=statut,
+        )
+
+    def test_resume_maintenu_a_la_creation_et_annulation(self):
+        """Test: Le résumé suit la création et l'annulation des contraventions"""
+        contravention = self.create_contravention(self.type_vitesse, conducteur=self.conducteur, vehicule=self.vehicule)
+
+        for lookup in ({"conducteur": self.conducteur}, {"vehicule": self.vehicule}):
+            resume = ResumeInfractions.objects.get(**lookup)
+            self.assertEqual([entry["id"] for entry in resume.infractions], [str(contravention.id)])
+
+        self.assertTrue(ContraventionService.detecter_recidive(self.conducteur, self.type_vitesse))
+        self.assertFalse(ContraventionService.detecter_recidive(self.conducteur, self.type_stationnement))
+
+        contravention.statut = "ANNULEE"
+        contravention.save()
+
+        self.assertEqual(ResumeInfractions.objects.get(conducteur=self.conducteur).infractions, [])
+        self.assertFalse(ContraventionService.detecter_recidive(self.conducteur, self.type_vitesse))
+
+    def test_detection_en_une_requete(self):
+        """Test: La détection de récidive lit une seule ligne"""
+        for _ in range(3):
+            self.create_contravention(self.type_vitesse, conducteur=self.conducteur)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(ContraventionService.detecter_recidive(self.conducteur, self.type_vitesse))
+
+    def test_fenetre_et_statuts(self):
+        """Test: Les contraventions anciennes ou contestées ne comptent pas pour la majoration"""
+        self.create_contravention(self.type_vitesse, days_ago=400, conducteur=self.conducteur)
+        self.create_contravention(self.type_vitesse, conducteur=self.conducteur, statut="CONTESTEE")
+
+        self.assertFalse(ContraventionService.detecter_recidive(self.conducteur, self.type_vitesse))
+        self.assertEqual(RecidiveService.compter(conducteur=self.conducteur), 1)
+        # Au-delà de la fenêtre du résumé, la recherche se fait sur les contraventions
+        self.assertEqual(RecidiveService.compter(conducteur=self.conducteur, jours=500), 2)
+
+    def test_verification_par_vehicule(self):
+        """Test: Récidive d'un véhicule, avec la majoration du type d'infraction"""
+        self.create_contravention(self.type_vitesse, vehicule=self.vehicule)
+        self.create_contravention(self.type_vitesse, conducteur=self.conducteur, vehicule=self.vehicule)
+
+        result = RecidiveService.verifier(vehicule=self.vehicule.pk, type_infraction=self.type_vitesse)
+        self.assertEqual(result["recidive_count"], 2)
+        self.assertEqual(result["majoration"], Decimal("50000"))
+
+        # Conducteur et véhicule : seules les contraventions communes comptent
+        result = RecidiveService.verifier(
+            conducteur=self.conducteur.pk, vehicule=self.vehicule.pk, type_infraction=self.type_vitesse
+        )
+        self.assertEqual(result["recidive_count"], 1)
+
+    def test_reconstruction(self):
+        """Test: Les résumés peuvent être recalculés depuis les contraventions"""
+        self.create_contravention(self.type_vitesse, conducteur=self.conducteur, vehicule=self.vehicule)
+        self.create_contravention(self.type_stationnement, conducteur=self.conducteur)
+        expected = {
+            resume.conducteur_id or resume.vehicule_id: resume.infractions for resume in ResumeInfractions.objects.all()
+        }
+        ResumeInfractions.objects.all().delete()
+
+        self.assertEqual(RecidiveService.reconstruire(), 2)
+        rebuilt = {
+            resume.conducteur_id or resume.vehicule_id: resume.infractions for resume in ResumeInfractions.objects.all()
+        }
+        self.assertEqual(rebuilt, expected)
+
+
+@override_settings(CONTRAVENTION_SEARCH_LIMIT=3)
+class SearchServiceTest(TestCase):
+    """Tests pour la recherche des véhicules et conducteurs"""
+
+    def setUp(self):
+        """Configuration initiale pour les tests"""
+        cache.clear()
+        self.agent = User.objects.create_user(username="agent_recherche", password="testpass123")
+        type_vehicule = VehicleType.objects.create(nom="Voiture")
+        for plate, vin in (("1234TAB", "jt-123 456"), ("1234TAC", ""), ("5123TAB", "XX1234YY"), ("99TBA", "")):
+            Vehicule.objects.create(
+                plaque_immatriculation=plate,
+                proprietaire=self.agent,
+                nom_proprietaire="Rakoto",
+                marque="Toyota",
+                vin=vin,
+                puissance_fiscale_cv=13,
+                cylindree_cm3=1800,
+                source_energie="Essence",
+                date_premiere_circulation="2020-01-01",
+                categorie_vehicule="Personnel",
+                type_vehicule=type_vehicule,
+            )
+        Conducteur.objects.create(cin="101010101010", nom_complet="Rakoto Noël", numero_permis="AB-1234")
+        Conducteur.objects.create(cin="201010101010", nom_complet="Rabe Jean", numero_permis="1234")
+        Conducteur.objects.create(cin="301234101010", nom_complet="Randria Zo")
+
+    def test_cles_normalisees(self):
+        """Test: Les colonnes de recherche sont normalisées à l'enregistrement"""
+        self.assertEqual(Vehicule.objects.get(pk="1234TAB").vin_normalise, "JT123456")
+        conducteur = Conducteur.objects.get(cin="101010101010")
+        self.assertEqual((conducteur.nom_normalise, conducteur.permis_normalise), ("RAKOTO NOEL", "AB1234"))
+
+        conducteur.nom_complet = "Rakoto Hery"
+        conducteur.save(update_fields=["nom_complet"])
+        conducteur.refresh_from_db()
+        self.assertEqual(conducteur.nom_normalise, "RAKOTO HERY")
+
+    def test_recherche_vehicules_classee(self):
+        """Test: Plaque exacte, puis préfixes, puis correspondances au milieu"""
+        plates = [v.pk for v in SearchService.rechercher_vehicules("1234 tab")]
+        self.assertEqual(plates, ["1234TAB"])
+
+        plates = [v.pk for v in SearchService.rechercher_vehicules("123")]
+        self.assertEqual(plates, ["1234TAB", "1234TAC", "5123TAB"])
+
+        # Numéro de châssis saisi avec séparateurs
+        self.assertEqual([v.pk for v in SearchService.rechercher_vehicules("JT 1234")], ["1234TAB"])
+        # Deux caractères : préfixes seulement
+        self.assertEqual([v.pk for v in SearchService.rechercher_vehicules("99")], ["99TBA"])
+        self.assertEqual(SearchService.rechercher_vehicules("9"), [])
+
+    def test_recherche_conducteurs_classee(self):
+        """Test: CIN ou permis exact en premier, puis préfixes de nom, puis correspondances au milieu"""
+        results = SearchService.rechercher_conducteurs("1234")
+        self.assertEqual([c.nom_complet for c in results], ["Rabe Jean", "Rakoto Noël", "Randria Zo"])
+
+        self.assertEqual([c.cin for c in SearchService.rechercher_conducteurs("noel")], ["101010101010"])
+        self.assertEqual([c.cin for c in SearchService.rechercher_conducteurs("ra")][:1], ["201010101010"])
+
+    def test_cache_par_agent(self):
+        """Test: Une saisie répétée par le même agent ne refait pas la requête"""
+        other = User.objects.create_user(username="autre_agent", password="testpass123")
+        SearchService.rechercher_vehicules("1234", user=self.agent)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(len(SearchService.rechercher_vehicules("1234", user=self.agent)), 3)
+        # Préfixes, puis correspondances au milieu
+        with self.assertNumQueries(2):
+            SearchService.rechercher_vehicules("1234", user=other)
+
+
+class RapportServiceTest(TestCase):
+    """Tests pour le rapport quotidien des contraventions"""
+
+    def setUp(self):
+        """Configuration initiale pour les tests"""
+        self.type_infraction = TypeInfraction.objects.create(
+            nom="Excès de vitesse",
+            article_code="L7.2-5",
+            categorie="CIRCULATION",
+            montant_min_ariary=Decimal("100000"),
+            montant_max_ariary=Decimal("500000"),
+        )
+        self.hier = timezone.localdate() - timedelta(days=1)
+
+    def create_contravention(self, statut="IMPAYEE", montant="100000", jours=1):
+        contravention = Contravention.objects.create(
+            type_infraction=self.type_infraction,
+            date_heure_infraction=timezone.now() - timedelta(days=jours),
+            lieu_infraction="RN1, Antananarivo",
+            montant_amende_ariary=Decimal(montant),
+            statut=statut,
+        )
+        Contravention.objects.filter(pk=contravention.pk).update(created_at=timezone.now() - timedelta(days=jours))
+        return contravention
+
+    def test_chiffres_du_jour_et_cumuls(self):
+        """Test: Les chiffres du jour et les cumuls viennent d'un même agrégat"""
+        self.create_contravention()
+        self.create_contravention(statut="PAYEE", montant="200000")
+        self.create_contravention(statut="PAYEE", jours=10)
+
+        rapport = RapportService.generer_rapport_journalier(self.hier)
+
+        self.assertEqual(rapport["report_date"], self.hier)
+        daily = rapport["daily"]
+        self.assertEqual((daily["total_created"], daily["total_paid"], daily["total_unpaid"]), (2, 1, 1))
+        self.assertEqual(daily["total_amount"], 300000.0)
+        self.assertEqual(daily["paid_amount"], 200000.0)
+        self.assertEqual(daily["payment_rate"], 50.0)
+        self.assertEqual(daily["by_infraction"][0]["count"], 2)
+        self.assertEqual([row["count"] for row in daily["by_status"]], [1, 1])
+        self.assertEqual(rapport["cumulative"]["total"], 3)
+        self.assertEqual(rapport["cumulative"]["paid"], 2)
+
+    def test_rapport_passe_relu_depuis_instantane(self):
+        """Test: Rouvrir le rapport d'un jour passé relit l'instantané enregistré"""
+        self.create_contravention()
+        RapportService.generer_rapport_journalier(self.hier)
+        self.create_contravention()
+
+        with self.assertNumQueries(1):
+            rapport = RapportService.generer_rapport_journalier(self.hier)
+        self.assertEqual(rapport["daily"]["total_created"], 1)
+
+        rapport = RapportService.generer_rapport_journalier(self.hier, refresh=True)
+        self.assertEqual(rapport["daily"]["total_created"], 2)
+        self.assertEqual(ReportSnapshot.objects.get(report_date=self.hier).data["daily"]["total_created"], 2)
+
+    def test_rapport_du_jour_non_enregistre(self):
+        """Test: Le rapport du jour en cours est recalculé à chaque fois"""
+        self.create_contravention(jours=0)
+
+        self.assertEqual(RapportService.generer_rapport_journalier(timezone.localdate())["daily"]["total_created"], 1)
+        self.assertFalse(ReportSnapshot.objects.exists())
+
+
+class FourriereServiceTest(TestCase):
+    """Tests pour les frais, statistiques et expirations de fourrière calculés en base"""
+
+    def setUp(self):
+        """Configuration initiale pour les tests"""
+        self.maintenant = timezone.now()
+        self.type_infraction = TypeInfraction.objects.create(
+            nom="Stationnement gênant",
+            article_code="L7.3-1",
+            categorie="STATIONNEMENT",
+            montant_min_ariary=Decimal("50000"),
+            montant_max_ariary=Decimal("100000"),
+        )
+        self.proprietaire = User.objects.create_user(
+            username="proprietaire", password="testpass123", email="proprietaire@test.com", first_name="Jean"
+        )
+        self.vehicule = Vehicule.objects.create(
+            plaque_immatriculation="5678TAB",
+            proprietaire=self.proprietaire,
+            marque="Toyota",
+            puissance_fiscale_cv=13,
+            cylindree_cm3=1800,
+            source_energie="Essence",
+            date_premiere_circulation="2020-01-01",
+            categorie_vehicule="Personnel",
+            type_vehicule=VehicleType.objects.create(nom="Voiture"),
+        )
+
+    def create_dossier(self, jours, lieu="Fourrière Municipale", statut="EN_FOURRIERE", sortie_apres=None):
+        contravention = Contravention.objects.create(
+            type_infraction=self.type_infraction,
+            vehicule=self.vehicule,
+            date_heure_infraction=self.maintenant - timedelta(days=jours),
+            lieu_infraction="Avenue de l'Indépendance",
+            montant_amende_ariary=Decimal("50000"),
+        )
+        date_mise_fourriere = self.maintenant - timedelta(days=jours, hours=1)
+        return DossierFourriere.objects.create(
+            contravention=contravention,
+            date_mise_fourriere=date_mise_fourriere,
+            lieu_fourriere=lieu,
+            adresse_fourriere="Antananarivo",
+            type_vehicule="VOITURE",
+            frais_transport_ariary=Decimal("20000"),
+            frais_gardiennage_journalier_ariary=Decimal("10000"),
+            statut=statut,
+            date_sortie_fourriere=date_mise_fourriere + timedelta(days=sortie_apres) if sortie_apres else None,
+        )
+
+    def test_frais_calcules_en_base(self):
+        """Test: Les frais annotés en base sont ceux calculés pour un dossier chargé"""
+        dossiers = [self.create_dossier(3), self.create_dossier(12, statut="RESTITUE", sortie_apres=5)]
+
+        annotes = FourriereService.annoter_frais(DossierFourriere.objects.all(), self.maintenant).in_bulk()
+
+        for dossier in dossiers:
+            with mock.patch("contraventions.services.fourriere_service.timezone.now", return_value=self.maintenant):
+                frais = FourriereService.calculer_frais_fourriere(dossier)
+            self.assertEqual(annotes[dossier.pk].jours_gardiennage, frais["jours_gardiennage"])
+            self.assertEqual(annotes[dossier.pk].frais_calcules, frais["frais_totaux"])
+        self.assertEqual(annotes[dossiers[1].pk].jours_gardiennage, 5)
+
+    def test_statistiques_par_fourriere(self):
+        """Test: Les statistiques sont agrégées en base, au total et par fourrière"""
+        self.create_dossier(3)
+        self.create_dossier(12, statut="RESTITUE", sortie_apres=5)
+        self.create_dossier(7, lieu="Fourrière de Toamasina")
+
+        with self.assertNumQueries(2):
+            stats = FourriereService.get_statistiques_fourriere(maintenant=self.maintenant)
+
+        self.assertEqual((stats["total_dossiers"], stats["dossiers_actifs"], stats["dossiers_restitues"]), (3, 2, 1))
+        self.assertEqual(stats["frais_totaux_collectes"], Decimal("70000"))
+        self.assertEqual(stats["frais_en_cours"], Decimal("140000"))
+        self.assertEqual(stats["duree_moyenne_jours"], 5.0)
+        self.assertEqual(
+            [(ligne["lieu_fourriere"], ligne["total_dossiers"]) for ligne in stats["par_fourriere"]],
+            [("Fourrière Municipale", 2), ("Fourrière de Toamasina", 1)],
+        )
+
+    def test_dossiers_expires_marques_une_fois(self):
+        """Test: Les dossiers expirés sont marqués en bloc et le propriétaire avisé une seule fois"""
+        expires = [self.create_dossier(31), self.create_dossier(45)]
+        recent = self.create_dossier(10)
+
+        with mock.patch("contraventions.tasks.send_notification_emails.delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                run = FourriereService.traiter_dossiers_expires(batch_size=1)
+
+        self.assertEqual((run.dossiers, run.notifications), (2, 2))
+        self.assertEqual(delay.call_count, 2)
+        for dossier in expires:
+            dossier.refresh_from_db()
+            self.assertIsNotNone(dossier.date_notification_vente)
+            self.assertIn("Notification de vente envoyée.", dossier.notes)
+        recent.refresh_from_db()
+        self.assertIsNone(recent.date_notification_vente)
+        notification = Notification.objects.get(metadata__numero_dossier=expires[1].numero_dossier)
+        self.assertEqual(notification.user, self.proprietaire)
+        self.assertIn("depuis 45 jours", notification.contenu)
+
+        run = FourriereService.traiter_dossiers_expires()
+        self.assertEqual(run.dossiers, 0)
+        self.assertEqual(Notification.objects.filter(metadata__event="fourriere_notification_vente").count(), 2)
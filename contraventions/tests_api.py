@@ -113,3 +113,15 @@ class ContraventionsAPITests(APITestCase):
         self.assertTrue(data["success"])
         # Either detects recidive or returns default no recidive; accept both to be robust
         self.assertIn("has_recidive", data)
+
+    def test_search_conducteurs(self):
+        resp = self.client.get("/api/contraventions/search/conducteurs/", {"q": "3333"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([c["cin"] for c in resp.data["conducteurs"]], [self.conducteur.cin])
+
+        resp = self.client.get(reverse("contraventions:ajax_search_conducteur"), {"q": "driver a"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([c["nom"] for c in resp.json()["conducteurs"]], ["Driver API"])
+
+        resp = self.client.get("/api/contraventions/search/conducteurs/", {"q": "3"})
+        self.assertEqual(resp.status_code, 400)
@@ -1,10 +1,10 @@
 import json
-from datetime import timedelta
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db.models import Count, Q, Sum
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Sum
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
@@ -27,7 +27,13 @@ from contraventions.models import (
     DossierFourriere,
     TypeInfraction,
 )
-from contraventions.services import ContestationService, ContraventionService, FourriereService
+from contraventions.services import (
+    ContestationService,
+    ContraventionService,
+    FourriereService,
+    RecidiveService,
+    SearchService,
+)
 from payments.models import PaiementTaxe
 
 
@@ -452,7 +458,8 @@ class ConfigurationView(AdminRequiredMixin, UpdateView):
     success_url = reverse_lazy("contraventions:admin_configuration")
 
     def get_object(self, queryset=None):
-        return ConfigurationSysteme.get_config()
+        # Ligne fraîche : un formulaire invalide ne doit pas modifier la copie partagée de get_config()
+        return ConfigurationSysteme.objects.get_or_create(pk=1)[0]
 
     def form_valid(self, form):
         messages.success(self.request, "Configuration mise à jour avec succès.")
@@ -517,6 +524,17 @@ def infraction_desactivate(request, pk):
 
 
 # Vues AJAX pour les recherches
+def _vehicle_data(vehicule):
+    return {
+        "id": vehicule.pk,
+        "numero_plaque": vehicule.plaque_immatriculation,
+        "marque": vehicule.marque,
+        "modele": vehicule.modele,
+        "numero_chassis": vehicule.vin,
+        "proprietaire_nom": vehicule.nom_proprietaire,
+    }
+
+
 @login_required
 def search_vehicle(request):
     if request.method == "GET":
@@ -524,42 +542,28 @@ def search_vehicle(request):
 
         vid = request.GET.get("id")
         if vid:
-            vehicule = Vehicule.objects.filter(id=vid).first()
+            vehicule = Vehicule.objects.filter(pk=vid).first()
             if vehicule:
-                data = {
-                    "success": True,
-                    "vehicle": {
-                        "id": vehicule.id,
-                        "numero_plaque": vehicule.plaque_immatriculation,
-                        "marque": vehicule.marque,
-                        "modele": vehicule.modele,
-                        "numero_chassis": getattr(vehicule, "numero_chassis", ""),
-                        "proprietaire_nom": (
-                            vehicule.proprietaire.nom_complet if getattr(vehicule, "proprietaire", None) else ""
-                        ),
-                    },
-                }
+                data = {"success": True, "vehicle": _vehicle_data(vehicule)}
             else:
                 data = {"success": False, "message": "Véhicule non trouvé"}
             return JsonResponse(data)
-        q = request.GET.get("q", "").upper().replace(" ", "")
-        results = []
-        if q:
-            qs = Vehicule.objects.filter(plaque_immatriculation__icontains=q)[:10]
-            for v in qs:
-                results.append(
-                    {
-                        "id": v.id,
-                        "numero_plaque": v.plaque_immatriculation,
-                        "marque": v.marque,
-                        "modele": v.modele,
-                        "numero_chassis": getattr(v, "numero_chassis", ""),
-                        "proprietaire_nom": v.proprietaire.nom_complet if getattr(v, "proprietaire", None) else "",
-                    }
-                )
+        q = request.GET.get("q", "")
+        results = [_vehicle_data(v) for v in SearchService.rechercher_vehicules(q, user=request.user)]
         return JsonResponse({"success": True, "vehicles": results})
 
 
+def _conducteur_data(conducteur):
+    return {
+        "id": conducteur.id,
+        "nom": conducteur.nom_complet,
+        "prenom": "",
+        "numero_permis": conducteur.numero_permis or "",
+        "telephone": conducteur.telephone or "",
+        "adresse": conducteur.adresse or "",
+    }
+
+
 @login_required
 def search_conducteur(request):
     if request.method == "GET":
@@ -567,37 +571,10 @@ def search_conducteur(request):
         if cid:
             c = Conducteur.objects.filter(id=cid).first()
             if c:
-                return JsonResponse(
-                    {
-                        "success": True,
-                        "conducteur": {
-                            "id": c.id,
-                            "nom": c.nom_complet,
-                            "prenom": "",
-                            "numero_permis": c.numero_permis or "",
-                            "telephone": c.telephone or "",
-                            "adresse": c.adresse or "",
-                        },
-                    }
-                )
+                return JsonResponse({"success": True, "conducteur": _conducteur_data(c)})
             return JsonResponse({"success": False, "message": "Conducteur non trouvé"})
         q = request.GET.get("q", "")
-        conducteurs = []
-        if q:
-            qs = Conducteur.objects.filter(
-                Q(cin__icontains=q) | Q(nom_complet__icontains=q) | Q(numero_permis__icontains=q)
-            )[:10]
-            for c in qs:
-                conducteurs.append(
-                    {
-                        "id": c.id,
-                        "nom": c.nom_complet,
-                        "prenom": "",
-                        "numero_permis": c.numero_permis or "",
-                        "telephone": c.telephone or "",
-                        "adresse": c.adresse or "",
-                    }
-                )
+        conducteurs = [_conducteur_data(c) for c in SearchService.rechercher_conducteurs(q, user=request.user)]
         return JsonResponse({"success": True, "conducteurs": conducteurs})
 
 
@@ -626,28 +603,23 @@ def get_infraction_details(request):
 def check_recidive(request):
     if request.method == "GET":
         conducteur_id = request.GET.get("conducteur_id")
+        vehicule_id = request.GET.get("vehicule_id")
         type_infraction_id = request.GET.get("type_infraction_id")
         data = {"success": True, "has_recidive": False}
-        if conducteur_id and type_infraction_id:
+        if (conducteur_id or vehicule_id) and type_infraction_id:
             try:
-                conducteur = Conducteur.objects.get(id=conducteur_id)
                 type_infraction = TypeInfraction.objects.get(id=type_infraction_id)
-                est_recidive = ContraventionService.detecter_recidive(
-                    conducteur=conducteur, type_infraction=type_infraction, periode_mois=12
+                result = RecidiveService.verifier(
+                    conducteur=conducteur_id or None, vehicule=vehicule_id or None, type_infraction=type_infraction
                 )
-                if est_recidive:
-                    recidives = Contravention.objects.filter(
-                        conducteur=conducteur,
-                        type_infraction=type_infraction,
-                        date_heure_infraction__gte=timezone.now() - timedelta(days=365),
-                    ).order_by("-date_heure_infraction")[:5]
+                if result["has_recidive"]:
                     data = {
                         "success": True,
                         "has_recidive": True,
                         "message": "Récidive détectée",
-                        "recidive_count": len(recidives),
-                        "majoration": 0,
+                        "recidive_count": result["recidive_count"],
+                        "majoration": float(result["majoration"]),
                     }
-            except (Conducteur.DoesNotExist, TypeInfraction.DoesNotExist):
+            except (TypeInfraction.DoesNotExist, ValidationError):
                 data = {"success": False, "message": "Conducteur ou infraction non trouvée"}
         return JsonResponse(data)
@@ -6,4 +6,7 @@ class CoreConfig(AppConfig):
     name = "core"
 
     def ready(self):
-        from . import social_signals  # noqa: F401
+        from . import role_signals, social_signals  # noqa: F401
+        from .utils.query_budget import connect_celery_signals
+
+        connect_celery_signals()
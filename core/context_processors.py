@@ -2,14 +2,60 @@
 Context processors for the core app
 """
 
+import time
+
 from core.utils import is_agent_government, is_agent_partenaire
 from django.conf import settings
+from django.core.cache import cache
 from allauth.socialaccount.models import SocialApp
 
+ROLE_SESSION_KEY = "_user_role_context"
+
+
+def _role_version_key(user_id):
+    return f"user_role:version:{user_id}"
+
+
+def invalidate_user_role_context(user_id):
+    """Make every session of the user resolve its role and permissions again"""
+    cache.set(_role_version_key(user_id), time.time_ns(), timeout=None)
+
 
 def user_role_context(request):
     """
     Add comprehensive user role information to template context
+
+    The resolved role is kept in the session for ``USER_ROLE_CONTEXT_TTL`` seconds, or until
+    the user, their profile, agent profiles, groups or permissions change.
+    """
+    user = request.user
+    session = getattr(request, "session", None)
+    if not user.is_authenticated or session is None:
+        return build_user_role_context(user)
+
+    version = cache.get(_role_version_key(user.pk))
+    cached = session.get(ROLE_SESSION_KEY)
+    if (
+        cached
+        and cached.get("user_id") == user.pk
+        and cached.get("version") == version
+        and cached.get("expires", 0) > time.time()
+    ):
+        return cached["context"]
+
+    context = build_user_role_context(user)
+    session[ROLE_SESSION_KEY] = {
+        "user_id": user.pk,
+        "version": version,
+        "expires": time.time() + getattr(settings, "USER_ROLE_CONTEXT_TTL", 300),
+        "context": context,
+    }
+    return context
+
+
+def build_user_role_context(user):
+    """
+    Resolve the role and admin permissions of ``user``
     """
     context = {
         "is_admin_user": False,
@@ -30,9 +76,7 @@ def user_role_context(request):
         },
     }
 
-    if request.user.is_authenticated:
-        user = request.user
-
+    if user.is_authenticated:
         # Basic admin checks
         context["is_superuser"] = user.is_superuser
         context["is_admin_user"] = user.is_staff or user.is_superuser
@@ -0,0 +1,114 @@
+"""
+Read-replica database routing
+
+Reads are sent to the ``replica`` database alias only inside an explicit replica scope:
+either a request to one of the read-heavy views listed in ``REPLICA_READ_VIEWS`` (set up by
+``ReplicaRoutingMiddleware``) or a ``read_from_replica()`` block in report commands.
+Everything else, and every write, uses ``default``.
+
+To preserve read-your-writes, a scope is pinned to the primary as soon as it writes, and a
+client that just sent a POST/PUT/PATCH/DELETE is served from the primary for
+``REPLICA_STICKY_SECONDS`` through a short-lived cookie, covering replication lag.
+"""
+
+import contextvars
+from contextlib import contextmanager
+from fnmatch import fnmatchcase
+
+from django.conf import settings
+
+REPLICA_ALIAS = "replica"
+PRIMARY_ALIAS = "default"
+STICKY_COOKIE = "db_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# None: no replica scope; False: replica scope pinned to the primary after a write
+_replica_scope = contextvars.ContextVar("replica_scope", default=None)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def read_from_replica():
+    """Route the reads of the block to the replica (until the block writes)"""
+    token = _replica_scope.set(True)
+    try:
+        yield
+    finally:
+        _replica_scope.reset(token)
+
+
+def is_replica_view(view_name):
+    patterns = getattr(settings, "REPLICA_READ_VIEWS", [])
+    return bool(view_name) and any(fnmatchcase(view_name, pattern) for pattern in patterns)
+
+
+class ReplicaReadCommandMixin:
+    """Management command mixin running the whole command in a replica scope"""
+
+    def execute(self, *args, **options):
+        with read_from_replica():
+            return super().execute(*args, **options)
+
+
+class ReplicaRouter:
+    """Database router sending reads in a replica scope to the ``replica`` alias"""
+
+    def db_for_read(self, model, **hints):
+        if _replica_scope.get() and replica_configured():
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        if _replica_scope.get():
+            # Read-your-writes: the rest of the scope reads from the primary
+            _replica_scope.set(False)
+        return PRIMARY_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {PRIMARY_ALIAS, REPLICA_ALIAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary and is never migrated directly
+        return db != REPLICA_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Serve safe requests to ``REPLICA_READ_VIEWS`` from the replica, and keep clients on the
+    primary for ``REPLICA_STICKY_SECONDS`` after they write.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _replica_scope.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica_scope.reset(token)
+
+        if request.method not in SAFE_METHODS and replica_configured():
+            response.set_cookie(
+                STICKY_COOKIE,
+                "1",
+                max_age=getattr(settings, "REPLICA_STICKY_SECONDS", 15),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            request.method in SAFE_METHODS
+            and not request.COOKIES.get(STICKY_COOKIE)
+            and is_replica_view(getattr(request.resolver_match, "view_name", None))
+        ):
+            _replica_scope.set(True)
+        return None
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-19 03:20
+
+from django.db import migrations, models
+
+# Kinds of core.utils.identifiers.PREFIXES at the time of this migration, and its BLOCK_SIZE
+KINDS = ["pv", "cash_session", "cash_transaction", "cash_receipt"]
+BLOCK_SIZE = 20
+
+
+def create_sequences(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for kind in KINDS:
+        schema_editor.execute(f"CREATE SEQUENCE IF NOT EXISTS identifier_{kind}_seq INCREMENT BY {BLOCK_SIZE}")
+
+
+def drop_sequences(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for kind in KINDS:
+        schema_editor.execute(f"DROP SEQUENCE IF EXISTS identifier_{kind}_seq")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_add_google_socialapp"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IdentifierSequence",
+            fields=[
+                ("name", models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ("next_value", models.BigIntegerField(default=1)),
+            ],
+            options={
+                "verbose_name": "Séquence d'identifiants",
+                "verbose_name_plural": "Séquences d'identifiants",
+            },
+        ),
+        migrations.RunPython(create_sequences, drop_sequences),
+    ]
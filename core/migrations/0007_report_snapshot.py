@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 03:30
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_identifier_sequences"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReportSnapshot",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("kind", models.CharField(max_length=50, verbose_name="Type de rapport")),
+                ("report_date", models.DateField(verbose_name="Date du rapport")),
+                (
+                    "data",
+                    models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name="Données"),
+                ),
+                ("generated_at", models.DateTimeField(auto_now=True, verbose_name="Généré le")),
+            ],
+            options={
+                "verbose_name": "Instantané de rapport",
+                "verbose_name_plural": "Instantanés de rapports",
+                "constraints": [models.UniqueConstraint(fields=("kind", "report_date"), name="unique_report_snapshot")],
+            },
+        ),
+    ]
@@ -1,8 +1,10 @@
 import uuid
 
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import RegexValidator
 from django.db import models
+from django.utils import timezone
 
 
 class UserProfile(models.Model):
@@ -444,3 +446,53 @@ class AuditLog(models.Model):
 
     def __str__(self):
         return f"{self.action} - {self.table_concernee} - {self.date_action}"
+
+
+class IdentifierSequence(models.Model):
+    """Counter of an identifier kind (see core.utils.identifiers), used when the database has no sequences"""
+
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField(default=1)
+
+    class Meta:
+        verbose_name = "Séquence d'identifiants"
+        verbose_name_plural = "Séquences d'identifiants"
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+
+class ReportSnapshot(models.Model):
+    """Persisted result of a daily report, so that re-opening a past day does not recompute it"""
+
+    kind = models.CharField(max_length=50, verbose_name="Type de rapport")
+    report_date = models.DateField(verbose_name="Date du rapport")
+    data = models.JSONField(encoder=DjangoJSONEncoder, verbose_name="Données")
+    generated_at = models.DateTimeField(auto_now=True, verbose_name="Généré le")
+
+    class Meta:
+        verbose_name = "Instantané de rapport"
+        verbose_name_plural = "Instantanés de rapports"
+        constraints = [models.UniqueConstraint(fields=["kind", "report_date"], name="unique_report_snapshot")]
+
+    def __str__(self):
+        return f"{self.kind} {self.report_date}"
+
+    @classmethod
+    def get_or_build(cls, kind, report_date, build, refresh=False):
+        """
+        Data of the ``kind`` report for ``report_date``, built by ``build()`` on first use
+
+        Only past days are persisted: the report of the current day is rebuilt on every call.
+        ``build()`` should return JSON types, so that built and stored data look the same.
+        ``refresh`` rebuilds and replaces an existing snapshot (nightly run).
+        """
+        if report_date >= timezone.localdate():
+            return build()
+        if not refresh:
+            data = cls.objects.filter(kind=kind, report_date=report_date).values_list("data", flat=True).first()
+            if data is not None:
+                return data
+        data = build()
+        cls.objects.update_or_create(kind=kind, report_date=report_date, defaults={"data": data})
+        return data
@@ -0,0 +1,45 @@
+"""
+Signal handlers invalidating the role context cached in user sessions
+"""
+
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from administration.models import AgentVerification
+from payments.models import AgentPartenaireProfile
+
+from .context_processors import invalidate_user_role_context
+from .models import UserProfile
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_role_on_user_change(sender, instance, **kwargs):
+    invalidate_user_role_context(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+@receiver([post_save, post_delete], sender=AgentPartenaireProfile)
+@receiver([post_save, post_delete], sender=AgentVerification)
+def invalidate_role_on_profile_change(sender, instance, **kwargs):
+    invalidate_user_role_context(instance.user_id)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_role_on_permission_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Group and permission membership; changes to a group's own permissions expire with the TTL"""
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            invalidate_user_role_context(instance.pk)
+        return
+
+    # ``instance`` is a group or permission
+    if action in ("post_add", "post_remove"):
+        user_ids = pk_set
+    elif action == "pre_clear":
+        user_ids = instance.user_set.values_list("pk", flat=True)
+    else:
+        return
+    for user_id in user_ids:
+        invalidate_user_role_context(user_id)
@@ -0,0 +1,38 @@
+"""
+Test helpers shared across apps
+"""
+
+from contextlib import contextmanager
+
+from core.utils.query_budget import QueryInspector
+
+
+class QueryBudgetTestMixin:
+    """
+    ``TestCase`` mixin to lock in the number of queries a view or service executes.
+
+    Unlike ``assertNumQueries`` it also fails when a single query shape repeats more than
+    ``max_repeats`` times, which catches N+1 patterns even while the total stays under budget::
+
+        with self.assertQueryBudget(8, max_repeats=2):
+            self.client.get(url)
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, max_queries, max_repeats=None, using="default"):
+        inspector = QueryInspector(aliases=[using])
+        with inspector.track():
+            yield inspector
+
+        shapes = "\n".join(f"  {n}x {shape}" for shape, n in inspector.shapes.most_common())
+        self.assertLessEqual(
+            inspector.count,
+            max_queries,
+            f"{inspector.count} queries executed, budget is {max_queries}:\n{shapes}",
+        )
+        if max_repeats is not None:
+            repeated = [(shape, n) for shape, n in inspector.shapes.most_common() if n > max_repeats]
+            self.assertFalse(
+                repeated,
+                f"Query shapes repeated more than {max_repeats} times:\n{shapes}",
+            )
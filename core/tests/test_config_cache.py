@@ -0,0 +1,86 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from administration.models import SMTPConfiguration, _smtp_config_cache
+from contraventions.models import ConfigurationSysteme, _configuration_cache
+from core.utils.conditional import bump_resource_version
+from payments.models import CashSystemConfig, StripeConfig, _cash_config_cache, _stripe_config_cache
+
+CACHES = [_cash_config_cache, _stripe_config_cache, _smtp_config_cache, _configuration_cache]
+
+
+@override_settings(CONFIG_CACHE=True, CONFIG_CACHE_LOCAL_TTL=60)
+class ConfigCacheTests(TestCase):
+    def setUp(self):
+        for config_cache in CACHES:
+            config_cache.clear()
+
+    def tearDown(self):
+        for config_cache in CACHES:
+            config_cache.clear()
+
+    def test_steady_state_costs_no_queries(self):
+        CashSystemConfig.get_config()
+        StripeConfig.get_active()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(CashSystemConfig.get_config().pk, 1)
+            # A missing configuration is remembered too
+            self.assertIsNone(StripeConfig.get_active())
+
+    def test_save_invalidates_every_process(self):
+        config = CashSystemConfig.get_config()
+        version = _cash_config_cache._state[0]
+
+        fresh = CashSystemConfig.objects.get(pk=config.pk)
+        fresh.dual_verification_threshold = Decimal("123456.00")
+        with self.captureOnCommitCallbacks(execute=True):
+            fresh.save()
+
+        self.assertEqual(CashSystemConfig.get_config().dual_verification_threshold, Decimal("123456.00"))
+        self.assertNotEqual(_cash_config_cache._state[0], version)
+
+    def test_other_process_change_is_seen_after_local_ttl(self):
+        CashSystemConfig.get_config()
+        # Another process saved the configuration
+        CashSystemConfig.objects.filter(pk=1).update(dual_verification_threshold=Decimal("42.00"))
+        bump_resource_version(_cash_config_cache.resource)
+
+        with self.assertNumQueries(0):
+            self.assertNotEqual(CashSystemConfig.get_config().dual_verification_threshold, Decimal("42.00"))
+        with override_settings(CONFIG_CACHE_LOCAL_TTL=0), self.assertNumQueries(1):
+            self.assertEqual(CashSystemConfig.get_config().dual_verification_threshold, Decimal("42.00"))
+
+    def test_counter_updates_keep_the_copy(self):
+        SMTPConfiguration.objects.create(
+            name="SMTP", host="smtp.example.com", port=587, username="user", password="secret", is_active=True
+        )
+        smtp_config = SMTPConfiguration.get_active_config()
+
+        smtp_config.increment_counter()
+
+        with self.assertNumQueries(0):
+            self.assertIs(SMTPConfiguration.get_active_config(), smtp_config)
+
+    def test_disabled_cache_reads_every_time(self):
+        ConfigurationSysteme.objects.create()
+
+        with override_settings(CONFIG_CACHE=False), self.assertNumQueries(2):
+            ConfigurationSysteme.get_config()
+            ConfigurationSysteme.get_config()
+
+    def test_invalid_configuration_form_leaves_cached_copy_untouched(self):
+        config = ConfigurationSysteme.get_config()
+        self.client.force_login(User.objects.create_user(username="admin", password="pw", is_staff=True))
+
+        response = self.client.post(
+            reverse("contraventions:admin_configuration"),
+            {"delai_paiement_standard_jours": "45", "penalite_retard_pct": "invalide"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIs(ConfigurationSysteme.get_config(), config)
+        self.assertEqual(config.delai_paiement_standard_jours, 15)
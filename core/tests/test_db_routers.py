@@ -0,0 +1,89 @@
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import resolve
+
+from core.db_routers import (
+    STICKY_COOKIE,
+    ReplicaRouter,
+    ReplicaRoutingMiddleware,
+    read_from_replica,
+)
+
+TWO_DATABASES = {
+    "default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"},
+    "replica": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:", "TEST": {"MIRROR": "default"}},
+}
+
+
+@override_settings(DATABASES=TWO_DATABASES, REPLICA_READ_VIEWS=["administration:analytics"])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def route_request(self, method, path, cookies=None):
+        """Run a request through the middleware and return the alias a read would use in the view"""
+        seen = {}
+
+        def view(request):
+            seen["db"] = self.router.db_for_read(User)
+            return HttpResponse()
+
+        def get_response(request):
+            request.resolver_match = resolve(request.path_info)
+            middleware.process_view(request, view, (), {})
+            return view(request)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        request = getattr(RequestFactory(), method)(path)
+        request.COOKIES.update(cookies or {})
+        response = middleware(request)
+        return seen["db"], response
+
+    def test_reads_use_primary_outside_replica_scope(self):
+        self.assertIsNone(self.router.db_for_read(User))
+
+    def test_replica_scope_reads_from_replica_until_it_writes(self):
+        with read_from_replica():
+            self.assertEqual(self.router.db_for_read(User), "replica")
+            self.assertEqual(self.router.db_for_write(User), "default")
+            self.assertIsNone(self.router.db_for_read(User))
+        self.assertIsNone(self.router.db_for_read(User))
+
+    @override_settings(DATABASES={"default": TWO_DATABASES["default"]})
+    def test_no_replica_configured(self):
+        with read_from_replica():
+            self.assertIsNone(self.router.db_for_read(User))
+
+    def test_listed_views_are_served_from_replica(self):
+        db, _ = self.route_request("get", "/administration/analytics/")
+        self.assertEqual(db, "replica")
+
+        db, _ = self.route_request("get", "/administration/")
+        self.assertIsNone(db)
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        _, response = self.route_request("post", "/administration/analytics/")
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        db, _ = self.route_request("get", "/administration/analytics/", cookies={STICKY_COOKIE: "1"})
+        self.assertIsNone(db)
+
+    def test_replica_is_never_migrated(self):
+        self.assertFalse(self.router.allow_migrate("replica", "vehicles"))
+        self.assertTrue(self.router.allow_migrate("default", "vehicles"))
+
+
+@skipUnless("replica" in settings.DATABASES, "Run with --ds=taxcollector_project.settings_test_replica")
+class ReplicaDatabaseTests(TestCase):
+    databases = {"default", "replica"}
+
+    def test_queries_in_replica_scope_use_the_replica_alias(self):
+        with read_from_replica():
+            users = User.objects.filter(username="replicated")
+            self.assertEqual(users.db, "replica")
+            self.assertFalse(users.exists())
+        self.assertEqual(User.objects.all().db, "default")
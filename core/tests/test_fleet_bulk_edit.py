@@ -0,0 +1,80 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import UserProfile
+from vehicles.models import BulkEditChange, BulkEditOperation, VehicleType, Vehicule
+
+
+class FleetBulkEditTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="bulkedit", password="testpass")
+        UserProfile.objects.update_or_create(user=self.user, defaults={"user_type": "company"})
+        self.type_car = VehicleType.objects.create(nom="Voiture")
+        self.type_truck = VehicleType.objects.create(nom="Camion")
+        self.client.login(username="bulkedit", password="testpass")
+
+    def create_vehicles(self, count, start=1000, **overrides):
+        plates = []
+        for i in range(count):
+            values = {
+                "plaque_immatriculation": f"{start + i}TAA",
+                "proprietaire": self.user,
+                "marque": "Toyota",
+                "puissance_fiscale_cv": 13,
+                "cylindree_cm3": 1500,
+                "source_energie": "Diesel" if i % 2 else "Essence",
+                "date_premiere_circulation": date(2020, 1, 1),
+                "type_vehicule": self.type_car,
+            }
+            values.update(overrides)
+            plates.append(Vehicule.objects.create(**values).pk)
+        return plates
+
+    def post_edit(self, plates, **data):
+        return self.client.post(reverse("core:fleet_bulk_edit"), {"ids": plates, **data})
+
+    def test_bulk_edit_updates_vehicles_and_records_changes(self):
+        plates = self.create_vehicles(4)
+
+        response = self.post_edit(plates, source_energie="Hybride", type_vehicule=self.type_truck.pk, est_actif="false")
+
+        self.assertRedirects(response, reverse("core:fleet_bulk_edit_history"))
+        op = BulkEditOperation.objects.get()
+        self.assertEqual(op.statut, "APPLIED")
+        self.assertEqual(
+            set(Vehicule.objects.values_list("source_energie", "type_vehicule_id", "est_actif")),
+            {("Hybride", self.type_truck.pk, False)},
+        )
+        change = BulkEditChange.objects.get(operation=op, vehicule_id=plates[1])
+        self.assertEqual(change.avant["source_energie"], "Diesel")
+        self.assertEqual(change.apres["source_energie"], "Hybride")
+
+    def test_rollback_restores_prior_values(self):
+        plates = self.create_vehicles(4)
+        self.post_edit(plates, source_energie="Electrique", categorie_vehicule="Commercial")
+        op = BulkEditOperation.objects.get()
+
+        self.client.post(reverse("core:fleet_bulk_edit_rollback", args=[op.id]))
+
+        op.refresh_from_db()
+        self.assertEqual(op.statut, "ROLLED_BACK")
+        restored = dict(Vehicule.objects.values_list("pk", "source_energie"))
+        self.assertEqual(restored[plates[0]], "Essence")
+        self.assertEqual(restored[plates[1]], "Diesel")
+        self.assertEqual(set(Vehicule.objects.values_list("categorie_vehicule", flat=True)), {"Personnel"})
+
+    def test_query_count_does_not_grow_with_selection(self):
+        small = self.create_vehicles(3)
+        large = self.create_vehicles(40, start=2000)
+
+        with CaptureQueriesContext(connection) as small_ctx:
+            self.post_edit(small, source_energie="Hybride")
+        with CaptureQueriesContext(connection) as large_ctx:
+            self.post_edit(large, source_energie="Hybride")
+
+        self.assertEqual(len(small_ctx.captured_queries), len(large_ctx.captured_queries))
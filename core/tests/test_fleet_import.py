@@ -0,0 +1,153 @@
+import json
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import UserProfile
+from vehicles.fleet_import import FleetImportEngine
+from vehicles.import_utils import iter_rows
+from vehicles.models import FleetAuditLog, FleetImportBatch, FleetImportRow, VehicleType, Vehicule
+
+MAPPING = {
+    "plaque_immatriculation": "plaque",
+    "marque": "marque",
+    "source_energie": "energie",
+    "puissance_fiscale_cv": "cv",
+    "cylindree_cm3": "cylindree",
+    "date_premiere_circulation": "date",
+    "type_vehicule": "type",
+}
+
+
+def build_csv(rows):
+    lines = ["plaque,marque,energie,cv,cylindree,date,type"]
+    lines.extend(",".join(str(v) for v in row) for row in rows)
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def valid_rows(count, start=1000):
+    return [(f"{start + i}TAA", "Toyota", "Essence", 13, 1500, "2020-01-01", "Voiture") for i in range(count)]
+
+
+class FleetImportTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = User.objects.create_user(username="fleetimport", password="testpass")
+        UserProfile.objects.update_or_create(user=self.user, defaults={"user_type": "company"})
+        self.type_car = VehicleType.objects.create(nom="Voiture")
+        self.client.login(username="fleetimport", password="testpass")
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def post_import(self, content):
+        return self.client.post(
+            reverse("core:fleet_import_process"),
+            {
+                "mapping_json": json.dumps(MAPPING),
+                "type_fichier": "csv",
+                "fichier": SimpleUploadedFile("fleet.csv", content, content_type="text/csv"),
+            },
+        )
+
+    def make_batch(self, content):
+        return FleetImportBatch.objects.create(
+            utilisateur=self.user,
+            nom_fichier="fleet.csv",
+            type_fichier="csv",
+            fichier=SimpleUploadedFile("fleet.csv", content, content_type="text/csv"),
+            mapping_colonnes=MAPPING,
+        )
+
+    def test_import_creates_vehicles_and_reports_row_errors(self):
+        rows = valid_rows(3) + [
+            ("1000TAA", "Toyota", "Essence", 13, 1500, "2020-01-01", "Voiture"),
+            ("BAD", "Toyota", "Essence", 13, 1500, "2020-01-01", "Voiture"),
+            ("2000TAA", "Toyota", "Charbon", 13, 1500, "2020-01-01", "Voiture"),
+            ("2001TAA", "Toyota", "Essence", 13, 1500, "2020-01-01", "Inconnu"),
+        ]
+        response = self.post_import(build_csv(rows))
+
+        batch = FleetImportBatch.objects.get()
+        self.assertRedirects(response, reverse("core:fleet_import_detail", args=[batch.id]))
+        self.assertEqual(batch.statut, "FAILED")
+        self.assertEqual((batch.total_lignes, batch.lignes_traitees), (7, 7))
+        self.assertEqual((batch.reussites, batch.echecs), (3, 4))
+        self.assertEqual(Vehicule.objects.filter(proprietaire=self.user).count(), 3)
+        self.assertEqual(Vehicule.objects.get(pk="1000TAA").type_vehicule, self.type_car)
+        self.assertEqual(FleetImportRow.objects.filter(lot=batch, statut="ERROR").count(), 4)
+        self.assertEqual(FleetAuditLog.objects.filter(lot_import=batch, action_type="IMPORT_ROW_SUCCESS").count(), 3)
+
+    def test_audit_hash_chain_is_continuous(self):
+        self.post_import(build_csv(valid_rows(5)))
+
+        logs = list(FleetAuditLog.objects.order_by("cree_le", "id"))
+        for previous, current in zip(logs, logs[1:]):
+            self.assertEqual(current.previous_hash, previous.current_hash)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        small = self.make_batch(build_csv(valid_rows(5)))
+        with CaptureQueriesContext(connection) as small_ctx:
+            FleetImportEngine(small, chunk_size=100).run()
+
+        large = self.make_batch(build_csv(valid_rows(80, start=3000)))
+        with CaptureQueriesContext(connection) as large_ctx:
+            FleetImportEngine(large, chunk_size=100).run()
+
+        # Only the bulk INSERT batching (bounded by the backend's parameter limit) may add queries
+        self.assertLessEqual(len(large_ctx.captured_queries), len(small_ctx.captured_queries) + 6)
+
+    def test_interrupted_import_resumes_after_committed_rows(self):
+        batch = self.make_batch(build_csv(valid_rows(10)))
+        engine = FleetImportEngine(batch, chunk_size=4)
+        with batch.fichier.open("rb") as handle:
+            rows = list(enumerate(iter_rows(handle, "csv"), start=1))
+        engine.process_chunk(rows[:4])
+        batch.refresh_from_db()
+        self.assertEqual(batch.lignes_traitees, 4)
+
+        batch = FleetImportEngine(batch, chunk_size=4).run()
+
+        self.assertEqual(batch.statut, "COMPLETED")
+        self.assertEqual(batch.reussites, 10)
+        self.assertEqual(FleetImportRow.objects.filter(lot=batch).count(), 10)
+
+    def test_rollback_deletes_imported_vehicles(self):
+        Vehicule.objects.create(
+            plaque_immatriculation="9999TAA",
+            proprietaire=self.user,
+            marque="Toyota",
+            puissance_fiscale_cv=13,
+            cylindree_cm3=1500,
+            source_energie="Essence",
+            date_premiere_circulation="2020-01-01",
+            type_vehicule=self.type_car,
+        )
+        self.post_import(build_csv(valid_rows(4)))
+        batch = FleetImportBatch.objects.get()
+
+        self.client.post(reverse("core:fleet_import_rollback", args=[batch.id]))
+
+        batch.refresh_from_db()
+        self.assertEqual(batch.statut, "ROLLED_BACK")
+        self.assertEqual(list(Vehicule.objects.values_list("pk", flat=True)), ["9999TAA"])
+        rollback = FleetAuditLog.objects.get(action_type="IMPORT_ROLLBACK")
+        self.assertEqual(rollback.donnees_action, {"deleted": 4})
+
+    def test_progress_endpoint(self):
+        self.post_import(build_csv(valid_rows(2)))
+        batch = FleetImportBatch.objects.get()
+
+        data = self.client.get(reverse("core:fleet_import_progress", args=[batch.id])).json()
+
+        self.assertEqual(data["statut"], "COMPLETED")
+        self.assertEqual(data["progression"], 100)
@@ -0,0 +1,88 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from core.models import IdentifierSequence
+from core.utils import identifiers
+from core.utils.identifiers import IdentifierAllocator, is_valid_identifier, next_identifier
+
+
+class IdentifierTests(TestCase):
+    def test_format_and_check_symbol(self):
+        identifier = next_identifier("pv")
+
+        self.assertRegex(identifier, r"^PV-\d{8}-[0-9A-HJKMNP-TV-Z]{7}$")
+        self.assertTrue(is_valid_identifier(identifier))
+        self.assertTrue(is_valid_identifier(identifier.lower()))
+
+    def test_typos_are_detected(self):
+        identifier = next_identifier("cash_receipt")
+        prefix, suffix = identifier.rsplit("-", 1)
+
+        # A changed character or two swapped adjacent characters
+        changed = ("1" if suffix[0] != "1" else "2") + suffix[1:]
+        self.assertFalse(is_valid_identifier(f"{prefix}-{changed}"))
+        if suffix[0] != suffix[1]:
+            self.assertFalse(is_valid_identifier(f"{prefix}-{suffix[1]}{suffix[0]}{suffix[2:]}"))
+        self.assertFalse(is_valid_identifier("REC-20251102-A1B2C3"))
+
+    def test_check_detects_every_single_change_and_adjacent_swap(self):
+        for value in (0, 1, 12345, identifiers._permute("pv", 7), (1 << identifiers.SUFFIX_BITS) - 1):
+            suffix = identifiers.encode_base32(value) + identifiers.check_symbol(value)
+            self.assertTrue(is_valid_identifier(f"PV-20261019-{suffix}"))
+            for position in range(len(suffix)):
+                for char in identifiers.CROCKFORD_ALPHABET.replace(suffix[position], ""):
+                    changed = suffix[:position] + char + suffix[position + 1 :]
+                    self.assertFalse(is_valid_identifier(f"PV-20261019-{changed}"), changed)
+            for position in range(len(suffix) - 1):
+                if suffix[position] != suffix[position + 1]:
+                    swapped = suffix[:position] + suffix[position + 1] + suffix[position] + suffix[position + 2 :]
+                    self.assertFalse(is_valid_identifier(f"PV-20261019-{swapped}"), swapped)
+
+    def test_numbers_are_unique_and_unordered(self):
+        numbers = [next_identifier("cash_transaction") for _ in range(500)]
+
+        self.assertEqual(len(set(numbers)), 500)
+        self.assertNotEqual(numbers, sorted(numbers))
+        self.assertEqual(IdentifierSequence.objects.get(name="cash_transaction").next_value, 501)
+
+    def test_kinds_have_independent_counters(self):
+        next_identifier("cash_session")
+        self.assertTrue(next_identifier("cash_session").startswith("SESS-"))
+        self.assertEqual(IdentifierSequence.objects.get(name="cash_session").next_value, 3)
+        self.assertFalse(IdentifierSequence.objects.filter(name="pv").exists())
+
+    def test_permutation_depends_on_key(self):
+        with override_settings(IDENTIFIER_PERMUTATION_KEY="one-key"):
+            first = [identifiers._permute("pv", value) for value in range(1, 4)]
+        with override_settings(IDENTIFIER_PERMUTATION_KEY="another-key"):
+            second = [identifiers._permute("pv", value) for value in range(1, 4)]
+        self.assertNotEqual(first, second)
+
+    def test_sequence_blocks_are_drawn_once_per_block(self):
+        allocator = IdentifierAllocator()
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value.fetchone.side_effect = [(1,), (21,)]
+
+        with (
+            mock.patch.object(identifiers.connection, "vendor", "postgresql"),
+            mock.patch.object(identifiers.connection, "cursor", return_value=cursor),
+        ):
+            values = [allocator.next_value("pv") for _ in range(identifiers.BLOCK_SIZE + 1)]
+
+        self.assertEqual(values, list(range(1, identifiers.BLOCK_SIZE + 2)))
+        self.assertEqual(cursor.__enter__.return_value.execute.call_count, 2)
+        cursor.__enter__.return_value.execute.assert_called_with("SELECT nextval(%s)", ["identifier_pv_seq"])
+
+    def test_forked_process_draws_its_own_block(self):
+        allocator = IdentifierAllocator()
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value.fetchone.side_effect = [(1,), (21,)]
+
+        with (
+            mock.patch.object(identifiers.connection, "vendor", "postgresql"),
+            mock.patch.object(identifiers.connection, "cursor", return_value=cursor),
+        ):
+            self.assertEqual(allocator.next_value("pv"), 1)
+            with mock.patch.object(identifiers.os, "getpid", return_value=-1):
+                self.assertEqual(allocator.next_value("pv"), 21)
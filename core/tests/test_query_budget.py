@@ -0,0 +1,94 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from core.testing import QueryBudgetTestMixin
+from core.utils.query_budget import QueryInspector, query_budget, query_shape
+from payments.models import PaiementTaxe, QRCode
+from vehicles.models import VehicleType, Vehicule
+from vehicles.views import DeclarationHistoryView
+
+
+class QueryInspectorTests(TestCase):
+    def test_query_shape_collapses_parameters_and_in_lists(self):
+        self.assertEqual(
+            query_shape('SELECT * FROM "t" WHERE "id" IN (%s, %s, %s) AND "n" = 42'),
+            query_shape('SELECT * FROM "t" WHERE "id" IN (%s) AND "n" = 7'),
+        )
+
+    def test_repeated_shapes_are_reported(self):
+        with self.assertLogs("query_budget", level="WARNING") as logs:
+            with query_budget("task", "tests.repeated", budget=100) as inspector:
+                for username in ["a", "b", "c"]:
+                    User.objects.filter(username=username).exists()
+                with override_settings(QUERY_DUPLICATE_THRESHOLD=3):
+                    reasons = inspector.report("task", "tests.repeated", budget=100)
+
+        self.assertEqual(inspector.count, 3)
+        self.assertEqual(reasons, ["duplicates"])
+        self.assertIn("3x SELECT", logs.output[0])
+
+    def test_budget_overrun_is_reported(self):
+        inspector = QueryInspector()
+        with inspector.track():
+            User.objects.count()
+            VehicleType.objects.count()
+        with self.assertLogs("query_budget", level="WARNING"):
+            self.assertEqual(inspector.report("request", "GET /tests/", budget=1), ["budget"])
+
+    @override_settings(QUERY_COUNT_HEADER=True)
+    def test_query_count_header(self):
+        response = self.client.get("/api/v1/health/")
+        self.assertIn("X-Query-Count", response)
+        self.assertEqual(response["X-Query-Duplicates"], "0")
+
+
+class DeclarationHistoryQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="history", password="testpass")
+        self.vehicle_type = VehicleType.objects.create(nom="Voiture")
+
+    def create_vehicles(self, count, start):
+        year = timezone.now().year
+        for i in range(count):
+            vehicule = Vehicule.objects.create(
+                plaque_immatriculation=f"{start + i}TAA",
+                proprietaire=self.user,
+                marque="Toyota",
+                puissance_fiscale_cv=13,
+                cylindree_cm3=1500,
+                source_energie="Essence",
+                date_premiere_circulation=date(2020, 1, 1),
+                type_vehicule=self.vehicle_type,
+            )
+            PaiementTaxe.objects.create(
+                vehicule_plaque=vehicule,
+                annee_fiscale=year,
+                montant_du_ariary=Decimal("50000"),
+                montant_paye_ariary=Decimal("50000"),
+                statut="PAYE",
+                date_paiement=timezone.now(),
+            )
+            QRCode.objects.create(
+                vehicule_plaque=vehicule, annee_fiscale=year, date_expiration=timezone.now() + timedelta(days=365)
+            )
+
+    def get_context(self):
+        request = RequestFactory().get("/vehicles/history/")
+        request.user = self.user
+        return DeclarationHistoryView.as_view()(request).context_data
+
+    def test_query_count_does_not_grow_with_vehicles(self):
+        self.create_vehicles(10, start=1000)
+
+        with self.assertQueryBudget(6, max_repeats=1):
+            context = self.get_context()
+
+        rows = [row for categories in context["grouped_vehicles"].values() for r in categories.values() for row in r]
+        self.assertEqual(len(rows), 10)
+        self.assertTrue(all(row["has_qr_code"] and row["has_receipt"] for row in rows))
+        self.assertEqual(rows[0]["payment_status"]["status"], "valid")
+        self.assertEqual(rows[0]["tax_amount"], Decimal("50000"))
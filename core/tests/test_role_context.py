@@ -0,0 +1,36 @@
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+
+from core.context_processors import user_role_context
+
+
+class UserRoleContextCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="role-client", password="x")
+        self.request = RequestFactory().get("/")
+        self.request.user = User.objects.get(pk=self.user.pk)
+        self.request.session = SessionStore()
+
+    def test_role_is_resolved_once_per_session(self):
+        self.assertEqual(user_role_context(self.request)["user_role"], "client")
+
+        self.request.user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(user_role_context(self.request)["user_role"], "client")
+
+    def test_profile_change_invalidates_the_session_role(self):
+        user_role_context(self.request)
+
+        self.user.profile.user_type = "company"
+        self.user.profile.save()
+        self.request.user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(user_role_context(self.request)["user_role"], "company")
+
+    def test_role_is_not_shared_between_users(self):
+        user_role_context(self.request)
+
+        self.request.user = User.objects.create_user(username="role-staff", password="x", is_staff=True)
+        self.assertEqual(user_role_context(self.request)["user_role"], "admin")
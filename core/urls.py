@@ -54,6 +54,9 @@ urlpatterns = [
     path("fleet/import/process/", views.FleetImportProcessView.as_view(), name="fleet_import_process"),
     path("fleet/import/history/", views.FleetImportHistoryView.as_view(), name="fleet_import_history"),
     path("fleet/import/<int:batch_id>/", views.FleetImportDetailView.as_view(), name="fleet_import_detail"),
+    path(
+        "fleet/import/<int:batch_id>/progress/", views.FleetImportProgressView.as_view(), name="fleet_import_progress"
+    ),
     path(
         "fleet/import/<int:batch_id>/rollback/", views.FleetImportRollbackView.as_view(), name="fleet_import_rollback"
     ),
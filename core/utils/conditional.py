@@ -0,0 +1,99 @@
+"""
+Conditional responses for reference data
+
+Reference data (vehicle types, price grids, API changelog...) changes a few times a year but
+is fetched on every app start. Each such resource has a version stored in the cache, replaced
+by a new timestamp whenever one of its models is saved or deleted (see ``api.signals``).
+``ConditionalResponseMixin`` derives a strong ETag from that version and the request, answers
+``If-None-Match``/``If-Modified-Since`` with 304 before the view runs (no queries, no
+serialization) and marks successful responses cacheable by shared caches for
+``API_REFERENCE_MAX_AGE`` seconds.
+
+Only use it on public views whose response does not depend on the user.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+SAFE_METHODS = ("GET", "HEAD")
+VARY_HEADERS = ("Accept", "Accept-Language")
+
+
+def _version_key(resource):
+    return f"resource_version:{resource}"
+
+
+def get_resource_version(resource):
+    """Current version (a nanosecond timestamp) of a reference resource"""
+    key = _version_key(resource)
+    cache.add(key, time.time_ns(), timeout=None)
+    return cache.get(key)
+
+
+def bump_resource_version(*resources):
+    """Invalidate the ETags of the given resources"""
+    version = time.time_ns()
+    cache.set_many({_version_key(resource): version for resource in resources}, timeout=None)
+
+
+class ConditionalResponseMixin:
+    """
+    View mixin (Django or DRF) serving 304 Not Modified for unchanged reference data.
+
+    Set ``conditional_resource`` to the resource name bumped by ``bump_resource_version``, or
+    override ``get_resource_version`` for data defined in code.
+    """
+
+    conditional_resource = None
+
+    def get_resource_version(self):
+        return get_resource_version(self.conditional_resource)
+
+    def get_conditional_etag(self, request, version):
+        parts = [
+            self.conditional_resource or self.__class__.__name__,
+            str(version),
+            request.get_full_path(),
+            *(request.headers.get(header, "") for header in VARY_HEADERS),
+        ]
+        return '"%s"' % hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:32]
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+
+        version = self.get_resource_version()
+        if version is None:
+            # Cache unavailable: serve normally, without validators
+            return super().dispatch(request, *args, **kwargs)
+
+        etag = self.get_conditional_etag(request, version)
+        # Versions bumped from signals are nanosecond timestamps
+        last_modified = int(version) // 10**9 if isinstance(version, int) else None
+
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match:
+            not_modified = etag in parse_etags(if_none_match) or if_none_match.strip() == "*"
+        else:
+            since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+            not_modified = since is not None and last_modified is not None and last_modified <= since
+
+        if not_modified:
+            response = HttpResponseNotModified()
+        else:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        patch_cache_control(response, public=True, max_age=getattr(settings, "API_REFERENCE_MAX_AGE", 300))
+        patch_vary_headers(response, VARY_HEADERS)
+        return response
@@ -0,0 +1,79 @@
+"""
+Cached configuration objects
+
+Configuration singletons (contravention and cash system settings, the active MVola, Stripe and
+SMTP configurations) are read on hot paths: every penalty calculation, every cash payment,
+every email, every payment client. ``ConfigCache`` keeps the loaded object in process memory
+together with the version of its resource (see ``core.utils.conditional``). Saving or deleting
+the model bumps that version once the transaction commits, so the other processes reload the
+object the next time they re-read the version, at most ``CONFIG_CACHE_LOCAL_TTL`` seconds
+later. The process that saved it drops its copy immediately.
+
+The cached object is shared by the whole process: modify a configuration through a fresh
+instance or save it, never leave a cached one modified. ``CONFIG_CACHE`` = False loads the
+object on every call (tests: process memory outlives the per-test rollback).
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from core.utils.conditional import bump_resource_version, get_resource_version
+
+_MISSING = object()
+
+
+class ConfigCache:
+    """
+    Process-local copy of the object returned by ``load()``, reloaded when ``model`` changes
+
+    Saves that only touch ``ignored_fields`` (e.g. usage counters) do not invalidate the copy.
+    """
+
+    def __init__(self, model, load, ignored_fields=()):
+        self.resource = f"config:{model._meta.label_lower}"
+        self._load = load
+        self._ignored_fields = frozenset(ignored_fields)
+        self._lock = threading.Lock()
+        self._state = (None, 0.0, _MISSING)
+        post_save.connect(self._changed, sender=model, weak=False, dispatch_uid=f"{self.resource}:save")
+        post_delete.connect(self._changed, sender=model, weak=False, dispatch_uid=f"{self.resource}:delete")
+
+    def get(self):
+        if not getattr(settings, "CONFIG_CACHE", True):
+            return self._load()
+
+        now = time.monotonic()
+        version, checked, value = self._state
+        if value is not _MISSING and now - checked < getattr(settings, "CONFIG_CACHE_LOCAL_TTL", 5):
+            return value
+
+        # Read the version before loading: a change committed in between bumps it again
+        current = get_resource_version(self.resource)
+        if current is None:
+            # Shared cache unavailable
+            return self._load()
+        if current != version or value is _MISSING:
+            value = self._load()
+        with self._lock:
+            self._state = (current, now, value)
+        return value
+
+    def clear(self):
+        """Drop the copy of this process"""
+        with self._lock:
+            self._state = (None, 0.0, _MISSING)
+
+    def invalidate(self):
+        """Drop the copy of every process"""
+        self.clear()
+        bump_resource_version(self.resource)
+
+    def _changed(self, sender, update_fields=None, **kwargs):
+        if update_fields and set(update_fields) <= self._ignored_fields:
+            return
+        self.clear()
+        transaction.on_commit(self.invalidate, robust=True)
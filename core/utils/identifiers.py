@@ -0,0 +1,157 @@
+"""
+Identifier numbers (PV, cash session, cash transaction and receipt numbers)
+
+Numbers look like ``PV-20261019-7K3QX2C``: a prefix, the issue date, six Crockford base32
+characters and a check character, so a mistyped number is rejected by ``is_valid_identifier``
+before any lookup. The check character is a weighted sum of the six digits in GF(32) (weights
+x^6 ... x^1), which detects any single changed character and any swap of adjacent characters
+while staying in the base32 alphabet: numbers are safe in URLs, file and storage paths, and
+contain no symbols to type from a paper ticket.
+
+The six characters encode a counter, unique per kind, passed through a keyed permutation of
+the 30-bit space: numbers never collide, so inserts need no existence probe and cannot fail on
+the unique constraint, yet they do not reveal their order (PV numbers are used in public
+URLs). On PostgreSQL the counters are sequences incremented by ``BLOCK_SIZE``: each process
+draws a block of numbers with one ``nextval`` and issues them from memory. ``nextval`` is not
+transactional, so a rolled back insert only leaves a gap. Other databases use an
+``IdentifierSequence`` row updated in the caller's transaction, one number at a time.
+
+``IDENTIFIER_PERMUTATION_KEY`` must never change once numbers have been issued.
+"""
+
+import hashlib
+import hmac
+import os
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import IdentifierSequence
+
+CROCKFORD_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+# x^5 + x^2 + 1, a primitive polynomial: the powers of x are 31 distinct non-zero weights
+GF32_MODULUS = 0b100101
+
+# Identifier kinds and their prefixes
+PREFIXES = {
+    "pv": "PV",
+    "cash_session": "SESS",
+    "cash_transaction": "CASH",
+    "cash_receipt": "REC",
+}
+
+SUFFIX_LENGTH = 6
+SUFFIX_BITS = 5 * SUFFIX_LENGTH
+FEISTEL_ROUNDS = 4
+# Numbers drawn per nextval (the INCREMENT BY of the sequences, see core migration 0006)
+BLOCK_SIZE = 20
+
+
+def sequence_name(kind):
+    return f"identifier_{kind}_seq"
+
+
+def encode_base32(value, length=SUFFIX_LENGTH):
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(CROCKFORD_ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+def decode_base32(text):
+    """Decode Crockford base32, accepting lower case and the I/L/O aliases"""
+    value = 0
+    for char in text.upper().replace("I", "1").replace("L", "1").replace("O", "0"):
+        value = value * 32 + CROCKFORD_ALPHABET.index(char)
+    return value
+
+
+def _times_x(element):
+    element <<= 1
+    return element ^ GF32_MODULUS if element & 32 else element
+
+
+def check_value(value):
+    """Check digit of a ``SUFFIX_LENGTH``-digit base32 value (Horner's rule in GF(32))"""
+    check = 0
+    for shift in range(SUFFIX_BITS - 5, -1, -5):
+        check = _times_x(check ^ ((value >> shift) & 31))
+    return check
+
+
+def check_symbol(value):
+    return CROCKFORD_ALPHABET[check_value(value)]
+
+
+def is_valid_identifier(identifier):
+    """True if the last segment of ``identifier`` has a correct check symbol"""
+    suffix = str(identifier).rsplit("-", 1)[-1]
+    if len(suffix) != SUFFIX_LENGTH + 1:
+        return False
+    try:
+        value, check = decode_base32(suffix[:-1]), decode_base32(suffix[-1])
+    except ValueError:
+        return False
+    return check_value(value) == check
+
+
+def _permute(kind, value):
+    """Keyed Feistel permutation of the ``SUFFIX_BITS``-bit space (a bijection, so no collisions)"""
+    half = SUFFIX_BITS // 2
+    mask = (1 << half) - 1
+    key = getattr(settings, "IDENTIFIER_PERMUTATION_KEY", settings.SECRET_KEY).encode("utf-8")
+    left, right = value >> half, value & mask
+    for round_number in range(FEISTEL_ROUNDS):
+        digest = hmac.new(key, f"{kind}:{round_number}:{right}".encode(), hashlib.sha256).digest()
+        left, right = right, left ^ (int.from_bytes(digest[:4], "big") & mask)
+    return (left << half) | right
+
+
+class IdentifierAllocator:
+    """Counter values per kind: blocks drawn from PostgreSQL sequences, or one database row per kind"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._blocks = {}
+
+    def next_value(self, kind):
+        if connection.vendor != "postgresql":
+            return self._next_row_value(kind)
+
+        with self._lock:
+            # Forked workers must not reuse the block of their parent
+            if self._pid != os.getpid():
+                self._pid, self._blocks = os.getpid(), {}
+            value, end = self._blocks.get(kind, (0, 0))
+            if value >= end:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT nextval(%s)", [sequence_name(kind)])
+                    value = cursor.fetchone()[0]
+                end = value + BLOCK_SIZE
+            self._blocks[kind] = (value + 1, end)
+            return value
+
+    @staticmethod
+    def _next_row_value(kind):
+        with transaction.atomic():
+            sequence, _ = IdentifierSequence.objects.select_for_update().get_or_create(name=kind)
+            IdentifierSequence.objects.filter(pk=kind).update(next_value=F("next_value") + 1)
+            return sequence.next_value
+
+
+allocator = IdentifierAllocator()
+
+
+def next_identifier(kind):
+    """Next number of ``kind`` (a key of ``PREFIXES``), e.g. ``PV-20261019-7K3QX2C``"""
+    value = allocator.next_value(kind)
+    if value >= 1 << SUFFIX_BITS:
+        raise OverflowError(f"Identifier space exhausted for {kind}")
+    suffix = _permute(kind, value)
+    date_str = timezone.now().strftime("%Y%m%d")
+    return f"{PREFIXES[kind]}-{date_str}-{encode_base32(suffix)}{check_symbol(suffix)}"
@@ -282,6 +282,61 @@ class ImageOptimizer:
 
         return thumbnail_file
 
+    @staticmethod
+    def generate_variants(image_file, specs, prefix="variant"):
+        """
+        Build several resized WebP variants from a single decode of the source image.
+
+        JPEG sources are decoded with ``Image.draft`` so the decoder downscales by a power of
+        two while reading, as long as the result still covers the largest requested variant.
+        Variants are produced from largest to smallest, each one resized from the previous.
+
+        Args:
+            image_file: Django File object or file path
+            specs: Dict of ``name -> {"size": (w, h), "quality": int, "method": int}``
+            prefix: Filename prefix for the generated files
+
+        Returns:
+            Dict of ``name -> (InMemoryUploadedFile, width, height)``
+        """
+        try:
+            img = Image.open(image_file)
+        except Exception as e:
+            raise ValueError(f"Invalid image file: {str(e)}")
+
+        largest = max((spec["size"] for spec in specs.values()), key=lambda size: size[0] * size[1])
+        if img.format == "JPEG":
+            img.draft("RGB", largest)
+
+        # Convert RGBA to RGB if necessary
+        if img.mode in ("RGBA", "LA", "P"):
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            if img.mode == "P":
+                img = img.convert("RGBA")
+            background.paste(img, mask=img.split()[-1] if img.mode == "RGBA" else None)
+            img = background
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+
+        variants = {}
+        ordered = sorted(specs.items(), key=lambda item: item[1]["size"][0] * item[1]["size"][1], reverse=True)
+        for name, spec in ordered:
+            # In-place and never upscales; the previous variant is already encoded
+            img.thumbnail(spec["size"], Image.Resampling.LANCZOS)
+
+            output = BytesIO()
+            img.save(output, format="WEBP", quality=spec["quality"], optimize=True, method=spec.get("method", 4))
+            output.seek(0)
+
+            filename = ImageOptimizer.generate_unique_filename(f"{name}.jpg", prefix=f"{prefix}_{name}")
+            variants[name] = (
+                InMemoryUploadedFile(output, "ImageField", filename, "image/webp", output.getbuffer().nbytes, None),
+                img.width,
+                img.height,
+            )
+
+        return variants
+
     @staticmethod
     def get_image_info(image_file):
         """
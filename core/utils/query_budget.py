@@ -0,0 +1,165 @@
+"""
+Query budget instrumentation
+
+Counts the SQL statements executed by a unit of work (HTTP request, Celery task or
+management command) through ``connection.execute_wrapper`` and groups them by shape, i.e.
+the SQL with its parameters and ``IN`` lists collapsed. A shape executed many times in one
+unit of work is the signature of an N+1 pattern. Units that exceed their query budget or
+repeat a shape more than ``QUERY_DUPLICATE_THRESHOLD`` times are logged on the
+``query_budget`` logger and counted in ``query_budget_exceeded_total``.
+
+Budgets are configured with ``QUERY_BUDGET_REQUEST``, ``QUERY_BUDGET_TASK`` and
+``QUERY_BUDGET_COMMAND``; a budget of 0 disables the check for that kind of unit.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+from prometheus_client import Counter as PrometheusCounter
+
+logger = logging.getLogger("query_budget")
+
+QUERY_BUDGET_EXCEEDED = PrometheusCounter(
+    "query_budget_exceeded_total",
+    "Units of work that exceeded their query budget or repeated a query shape",
+    ["kind", "name", "reason"],
+)
+
+DEFAULT_BUDGETS = {"request": 50, "task": 200, "command": 2000}
+
+_IN_LIST_RE = re.compile(r"\((?:%s|\?)(?:\s*,\s*(?:%s|\?))*\)")
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def query_shape(sql):
+    """SQL with literals and ``IN (%s, %s, ...)`` lists collapsed, so repeated lookups compare equal"""
+    return _IN_LIST_RE.sub("(...)", _LITERAL_RE.sub("?", sql))
+
+
+def get_budget(kind):
+    return getattr(settings, f"QUERY_BUDGET_{kind.upper()}", DEFAULT_BUDGETS[kind])
+
+
+def get_duplicate_threshold():
+    return getattr(settings, "QUERY_DUPLICATE_THRESHOLD", 10)
+
+
+class QueryInspector:
+    """Database execute wrapper counting queries, database time and query shapes"""
+
+    def __init__(self, aliases=None):
+        self.aliases = aliases
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+            self.shapes[query_shape(sql)] += 1
+
+    def track(self):
+        """Context manager installing the wrapper on the tracked database connections"""
+        stack = ExitStack()
+        for alias in self.aliases or connections:
+            stack.enter_context(connections[alias].execute_wrapper(self))
+        return stack
+
+    def duplicates(self, threshold=None):
+        """Query shapes executed at least ``threshold`` times, most repeated first"""
+        threshold = threshold or get_duplicate_threshold()
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+    def report(self, kind, name, budget=None):
+        """
+        Log and count the unit of work if it went over budget or repeated a query shape.
+
+        Returns the list of reasons (``"budget"``, ``"duplicates"``), empty when within budget.
+        """
+        budget = get_budget(kind) if budget is None else budget
+        reasons = []
+        if budget and self.count > budget:
+            reasons.append("budget")
+        duplicates = self.duplicates()
+        if duplicates:
+            reasons.append("duplicates")
+        if not reasons:
+            return reasons
+
+        for reason in reasons:
+            QUERY_BUDGET_EXCEEDED.labels(kind=kind, name=name, reason=reason).inc()
+        logger.warning(
+            "%s %s executed %d queries in %.1f ms (budget %s); most repeated: %s",
+            kind,
+            name,
+            self.count,
+            self.duration * 1000,
+            budget or "none",
+            "; ".join(f"{n}x {shape[:200]}" for shape, n in duplicates[:3]) or "none",
+        )
+        return reasons
+
+
+@contextmanager
+def query_budget(kind, name, budget=None):
+    """
+    Track the queries executed inside the block and report them against the budget of ``kind``.
+
+    Usage::
+
+        with query_budget("command", "calculate_penalties"):
+            ...
+    """
+    inspector = QueryInspector()
+    with inspector.track():
+        yield inspector
+    inspector.report(kind, name, budget)
+
+
+class QueryBudgetCommandMixin:
+    """Management command mixin reporting the queries of the whole command run"""
+
+    def execute(self, *args, **options):
+        name = self.__class__.__module__.rsplit(".", 1)[-1]
+        with query_budget("command", name):
+            return super().execute(*args, **options)
+
+
+_task_inspectors = {}
+
+
+def _task_prerun(task_id=None, task=None, **kwargs):
+    inspector = QueryInspector()
+    stack = inspector.track()
+    stack.__enter__()
+    _task_inspectors[task_id] = (inspector, stack)
+
+
+def _task_postrun(task_id=None, task=None, **kwargs):
+    entry = _task_inspectors.pop(task_id, None)
+    if entry is None:
+        return
+    inspector, stack = entry
+    stack.__exit__(None, None, None)
+    try:
+        inspector.report("task", getattr(task, "name", "unknown"))
+    except Exception:
+        logger.debug("Could not report task queries", exc_info=True)
+
+
+def connect_celery_signals():
+    """Track the queries of every Celery task run in this process"""
+    from celery.signals import task_postrun, task_prerun
+
+    task_prerun.connect(_task_prerun, weak=False, dispatch_uid="query_budget_task_prerun")
+    task_postrun.connect(_task_postrun, weak=False, dispatch_uid="query_budget_task_postrun")
@@ -0,0 +1,57 @@
+"""
+Normalized search keys
+
+Identifiers typed by agents (plates, chassis, CIN and permit numbers, names) are compared on
+normalized copies stored next to the original columns: upper case, without accents, and
+without separators for identifiers. Lookups on those copies are plain ``startswith`` /
+``contains`` (``LIKE 'X%'`` / ``LIKE '%X%'``), which PostgreSQL serves from
+``varchar_pattern_ops`` and ``gin_trgm_ops`` indexes instead of scanning the table as
+``icontains`` (``UPPER(col) LIKE UPPER(...)``) does.
+"""
+
+import re
+import unicodedata
+
+from django.db import migrations
+
+_NON_ALNUM = re.compile(r"[^A-Z0-9]+")
+
+
+def _fold(value):
+    value = unicodedata.normalize("NFKD", str(value or ""))
+    return "".join(char for char in value if not unicodedata.combining(char)).upper()
+
+
+def normalize_search_key(value):
+    """Identifier key: ``"ab-12 3c"`` -> ``"AB123C"``"""
+    return _NON_ALNUM.sub("", _fold(value))
+
+
+def normalize_search_text(value):
+    """Text key: ``" Rakoto  Jean-Noël"`` -> ``"RAKOTO JEAN NOEL"``"""
+    return _NON_ALNUM.sub(" ", _fold(value)).strip()
+
+
+def trigram_indexes(table, columns):
+    """
+    Migration operations adding ``gin_trgm_ops`` indexes on ``columns`` of ``table``.
+
+    PostgreSQL only: other databases (SQLite in tests) fall back to scanning.
+    """
+
+    def forwards(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for column in columns:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS "{table}_{column}_trgm" ON "{table}" USING gin ("{column}" gin_trgm_ops)'
+            )
+
+    def backwards(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for column in columns:
+            schema_editor.execute(f'DROP INDEX IF EXISTS "{table}_{column}_trgm"')
+
+    return migrations.RunPython(forwards, backwards)
@@ -2,6 +2,7 @@ import csv
 import io
 import json
 from datetime import timedelta
+from itertools import islice
 
 from django.contrib import messages
 from django.contrib.auth import authenticate, login
@@ -10,7 +11,9 @@ from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.models import User
 from django.contrib.auth.views import LoginView
+from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
+from django.db import transaction
 from django.db.models import Count, Q, Sum
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
@@ -28,16 +31,16 @@ from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, Tabl
 
 from payments.models import PaiementTaxe, QRCode
 from vehicles.audit import log_action
+from vehicles.fleet_bulk_edit import apply_bulk_edit, get_changes, rollback_bulk_edit
 from vehicles.forms import FleetBulkEditForm, FleetImportMappingForm, FleetImportUploadForm
-from vehicles.import_utils import map_row, normalize_vehicle_payload, read_rows, validate_vehicle_payload
+from vehicles.import_utils import iter_rows
 from vehicles.models import (
-    BulkEditChange,
     BulkEditOperation,
     FleetImportBatch,
-    FleetImportRow,
     GrilleTarifaire,
     Vehicule,
 )
+from vehicles.tasks import process_fleet_import
 
 from .forms import CustomUserCreationForm
 from .models import EntrepriseProfile
@@ -1257,14 +1260,14 @@ class FleetImportView(FleetManagerMixin, TemplateView):
             return render(request, self.template_name, {"upload_form": form, "page_title": _("Import Flotte")})
         file = request.FILES["fichier"]
         file_type = form.cleaned_data["type_fichier"]
-        rows = read_rows(file, file_type)
+        rows = list(islice(iter_rows(file, file_type), 20))
         headers = list(rows[0].keys()) if rows else []
         return render(
             request,
             "fleet/import_preview.html",
             {
                 "headers": headers,
-                "rows": rows[:20],
+                "rows": rows,
                 "mapping_form": FleetImportMappingForm(),
                 "file_type": file_type,
                 "page_title": _("Prévisualisation Import"),
@@ -1283,67 +1286,39 @@ class FleetImportProcessView(FleetManagerMixin, View):
         except Exception:
             return JsonResponse({"ok": False, "error": "invalid_json"}, status=400)
         file = request.FILES.get("fichier")
-        file_type = request.POST.get("type_fichier")
-        rows = read_rows(file, file_type) if file else []
+        if not file:
+            return JsonResponse({"ok": False, "error": "missing_file"}, status=400)
+        # The upload is stored with the batch and processed by a background worker
         batch = FleetImportBatch.objects.create(
             utilisateur=request.user,
             nom_fichier=getattr(file, "name", ""),
-            type_fichier=file_type or "",
+            type_fichier=request.POST.get("type_fichier") or "",
+            fichier=file,
             mapping_colonnes=mapping,
             options=options,
-            total_lignes=len(rows),
-            statut="PROCESSING",
+            statut="PENDING",
         )
-        log_action(request.user, "IMPORT_START", lot_import=batch, donnees_action={"total": len(rows)})
-        success = 0
-        failed = 0
-        for i, row in enumerate(rows, start=1):
-            data = map_row(mapping, row)
-            data = normalize_vehicle_payload(data)
-            valid, errs = validate_vehicle_payload(data)
-            if not valid:
-                FleetImportRow.objects.create(lot=batch, numero_ligne=i, donnees=data, erreurs=errs, statut="ERROR")
-                log_action(request.user, "IMPORT_ROW_FAIL", lot_import=batch, donnees_action={"row": i, "errors": errs})
-                failed += 1
-                continue
-            try:
-                v = Vehicule(
-                    proprietaire=request.user,
-                    nom_proprietaire=data.get("nom_proprietaire") or "",
-                    plaque_immatriculation=data.get("plaque_immatriculation"),
-                    marque=data.get("marque") or "",
-                    modele=data.get("modele") or "",
-                    vin=data.get("vin") or "",
-                    couleur=data.get("couleur") or "",
-                    puissance_fiscale_cv=data.get("puissance_fiscale_cv") or 1,
-                    cylindree_cm3=data.get("cylindree_cm3") or 1000,
-                    source_energie=data.get("source_energie"),
-                    date_premiere_circulation=data.get("date_premiere_circulation"),
-                    categorie_vehicule=data.get("categorie_vehicule") or "Personnel",
-                    type_vehicule_id=data.get("type_vehicule") if isinstance(data.get("type_vehicule"), int) else None,
-                    est_actif=True,
-                )
-                v.full_clean()
-                v.save()
-                FleetImportRow.objects.create(
-                    lot=batch, numero_ligne=i, donnees=data, erreurs=[], statut="SUCCESS", vehicule=v
-                )
-                log_action(request.user, "IMPORT_ROW_SUCCESS", vehicule=v, lot_import=batch, donnees_action={"row": i})
-                success += 1
-            except Exception as e:
-                FleetImportRow.objects.create(lot=batch, numero_ligne=i, donnees=data, erreurs=[str(e)], statut="ERROR")
-                log_action(
-                    request.user, "IMPORT_ROW_FAIL", lot_import=batch, donnees_action={"row": i, "errors": [str(e)]}
-                )
-                failed += 1
-        batch.reussites = success
-        batch.echecs = failed
-        batch.statut = "COMPLETED" if failed == 0 else "FAILED"
-        batch.save()
-        log_action(request.user, "IMPORT_END", lot_import=batch, donnees_action={"success": success, "failed": failed})
+        log_action(request.user, "IMPORT_START", lot_import=batch, donnees_action={"fichier": batch.nom_fichier})
+        result = process_fleet_import.delay(batch.id)
+        FleetImportBatch.objects.filter(id=batch.id).update(task_id=result.id or "")
         return redirect("core:fleet_import_detail", batch_id=batch.id)
 
 
+class FleetImportProgressView(FleetManagerMixin, View):
+    def get(self, request, *args, **kwargs):
+        batch = get_object_or_404(FleetImportBatch, id=kwargs.get("batch_id"), utilisateur=request.user)
+        return JsonResponse(
+            {
+                "statut": batch.statut,
+                "total": batch.total_lignes,
+                "traitees": batch.lignes_traitees,
+                "reussites": batch.reussites,
+                "echecs": batch.echecs,
+                "progression": batch.get_progress_percent(),
+            }
+        )
+
+
 class FleetImportHistoryView(FleetManagerMixin, TemplateView):
     template_name = "fleet/import_history.html"
 
@@ -1370,16 +1345,14 @@ class FleetImportRollbackView(FleetManagerMixin, View):
     def post(self, request, *args, **kwargs):
         batch_id = kwargs.get("batch_id")
         batch = get_object_or_404(FleetImportBatch, id=batch_id, utilisateur=request.user)
-        deleted = 0
-        for row in batch.lignes.filter(statut="SUCCESS"):
-            if row.vehicule:
-                try:
-                    row.vehicule.delete()
-                    deleted += 1
-                except Exception:
-                    pass
-        batch.statut = "ROLLED_BACK"
-        batch.save()
+        imported = Vehicule.objects.filter(
+            proprietaire=request.user, fleetimportrow__lot=batch, fleetimportrow__statut="SUCCESS"
+        )
+        with transaction.atomic():
+            _total, per_model = imported.delete()
+            batch.statut = "ROLLED_BACK"
+            batch.save(update_fields=["statut"])
+        deleted = per_model.get(Vehicule._meta.label, 0)
         log_action(request.user, "IMPORT_ROLLBACK", lot_import=batch, donnees_action={"deleted": deleted})
         return redirect("core:fleet_import_detail", batch_id=batch.id)
 
@@ -1396,7 +1369,7 @@ class FleetBulkEditView(FleetManagerMixin, TemplateView):
 
     def post(self, request, *args, **kwargs):
         ids = request.POST.getlist("ids")
-        vehicles = list(Vehicule.objects.filter(proprietaire=request.user, plaque_immatriculation__in=ids))
+        vehicles = Vehicule.objects.filter(proprietaire=request.user, plaque_immatriculation__in=ids)
         form = FleetBulkEditForm(request.POST)
         if not form.is_valid():
             return render(
@@ -1404,38 +1377,15 @@ class FleetBulkEditView(FleetManagerMixin, TemplateView):
                 self.template_name,
                 {"vehicles": vehicles, "form": form, "page_title": _("Modification en lot")},
             )
-        op = BulkEditOperation.objects.create(
-            utilisateur=request.user, champs_modifies=form.cleaned_data, selection=ids, statut="PENDING"
-        )
-        changed = 0
-        for v in vehicles:
-            before = {
-                "est_actif": v.est_actif,
-                "source_energie": v.source_energie,
-                "categorie_vehicule": v.categorie_vehicule,
-                "type_vehicule_id": v.type_vehicule_id,
-            }
-            if form.cleaned_data.get("est_actif") in ["true", "false"]:
-                v.est_actif = True if form.cleaned_data["est_actif"] == "true" else False
-            if form.cleaned_data.get("source_energie"):
-                v.source_energie = form.cleaned_data["source_energie"]
-            if form.cleaned_data.get("categorie_vehicule"):
-                v.categorie_vehicule = form.cleaned_data["categorie_vehicule"]
-            if form.cleaned_data.get("type_vehicule"):
-                v.type_vehicule = form.cleaned_data["type_vehicule"]
-            v.full_clean()
-            v.save()
-            after = {
-                "est_actif": v.est_actif,
-                "source_energie": v.source_energie,
-                "categorie_vehicule": v.categorie_vehicule,
-                "type_vehicule_id": v.type_vehicule_id,
-            }
-            BulkEditChange.objects.create(operation=op, vehicule=v, avant=before, apres=after)
-            changed += 1
-        op.statut = "APPLIED"
-        op.applique_le = timezone.now()
-        op.save()
+        try:
+            op, changed = apply_bulk_edit(request.user, vehicles, get_changes(form.cleaned_data), ids)
+        except ValidationError as e:
+            form.add_error(None, e)
+            return render(
+                request,
+                self.template_name,
+                {"vehicles": vehicles, "form": form, "page_title": _("Modification en lot")},
+            )
         log_action(request.user, "BULK_EDIT_APPLY", operation_modification=op, donnees_action={"changed": changed})
         return redirect("core:fleet_bulk_edit_history")
 
@@ -1454,17 +1404,7 @@ class FleetBulkEditRollbackView(FleetManagerMixin, View):
     def post(self, request, *args, **kwargs):
         op_id = kwargs.get("op_id")
         op = get_object_or_404(BulkEditOperation, id=op_id, utilisateur=request.user)
-        for ch in op.changements.all():
-            v = ch.vehicule
-            v.est_actif = ch.avant.get("est_actif", v.est_actif)
-            v.source_energie = ch.avant.get("source_energie", v.source_energie)
-            v.categorie_vehicule = ch.avant.get("categorie_vehicule", v.categorie_vehicule)
-            if ch.avant.get("type_vehicule_id"):
-                v.type_vehicule_id = ch.avant["type_vehicule_id"]
-            v.full_clean()
-            v.save()
-        op.statut = "ROLLED_BACK"
-        op.save()
+        rollback_bulk_edit(op)
         log_action(request.user, "BULK_EDIT_ROLLBACK", operation_modification=op)
         return redirect("core:fleet_bulk_edit_history")
 
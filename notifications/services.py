@@ -327,10 +327,10 @@ class NotificationService:
         """Create notification for payment confirmation"""
         if langue == "mg":
             titre = "Fandoavam-bola vita soa aman-tsara"
-            contenu = f"Ny fandoavam-bola ho an'ny fiara {payment.vehicule.numero_plaque} dia vita soa aman-tsara. Vola naloa: {payment.montant_paye_ariary:,.0f} Ar"
+            contenu = f"Ny fandoavam-bola ho an'ny fiara {payment.vehicule_plaque.plaque_immatriculation} dia vita soa aman-tsara. Vola naloa: {payment.montant_paye_ariary:,.0f} Ar"
         else:
             titre = "Paiement confirmé"
-            contenu = f"Votre paiement pour le véhicule {payment.vehicule.numero_plaque} a été confirmé. Montant payé: {payment.montant_paye_ariary:,.0f} Ar"
+            contenu = f"Votre paiement pour le véhicule {payment.vehicule_plaque.plaque_immatriculation} a été confirmé. Montant payé: {payment.montant_paye_ariary:,.0f} Ar"
 
         return NotificationService.create_notification(
             user=user,
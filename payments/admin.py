@@ -1,6 +1,7 @@
 from django.contrib import admin, messages
 from django.shortcuts import redirect, render
 from django.urls import path
+from django.utils import timezone
 from django.utils.html import format_html
 
 from .models import (
@@ -13,6 +14,7 @@ from .models import (
     CommissionRecord,
     MvolaConfiguration,
     PaiementTaxe,
+    PaymentOutboxEvent,
     QRCode,
     StripeConfig,
     StripeWebhookEvent,
@@ -638,3 +640,31 @@ class CashAuditLogAdmin(admin.ModelAdmin):
     def has_change_permission(self, request, obj=None):
         # Prevent modification of audit logs
         return False
+
+
+@admin.register(PaymentOutboxEvent)
+class PaymentOutboxEventAdmin(admin.ModelAdmin):
+    list_display = ("event_type", "payment", "status", "attempts", "next_attempt_at", "created_at", "processed_at")
+    list_filter = ("event_type", "status", "created_at")
+    search_fields = ("payment__id", "payment__vehicule_plaque__plaque_immatriculation", "last_error")
+    readonly_fields = (
+        "payment",
+        "event_type",
+        "payload",
+        "completed_effects",
+        "attempts",
+        "last_error",
+        "created_at",
+        "processed_at",
+    )
+    ordering = ("-created_at",)
+    actions = ["retry_events"]
+
+    def has_add_permission(self, request):
+        # Events are only recorded by payment handlers
+        return False
+
+    @admin.action(description="Relancer les événements sélectionnés")
+    def retry_events(self, request, queryset):
+        updated = queryset.exclude(status="DONE").update(status="PENDING", attempts=0, next_attempt_at=timezone.now())
+        self.message_user(request, f"{updated} événement(s) relancé(s).", messages.SUCCESS)
@@ -571,7 +571,7 @@ class DailyReconciliationView(LoginRequiredMixin, AdminStaffMixin, TemplateView)
         reconciliation_notes = form.cleaned_data.get("reconciliation_notes", "")
 
         # Perform reconciliation
-        success, error = ReconciliationService.reconcile_day(
+        success, error, _reconciliation = ReconciliationService.reconcile_day(
             date=reconciliation_date,
             admin_user=request.user,
             physical_count=physical_cash_count,
@@ -1226,8 +1226,9 @@ class CashSystemConfigView(LoginRequiredMixin, AdminStaffMixin, UpdateView):
     success_url = reverse_lazy("payments:admin_system_config")
 
     def get_object(self, queryset=None):
-        # Get or create singleton config
-        return CashSystemConfig.get_config()
+        # Get or create singleton config; a fresh row, not the process-wide copy of get_config(),
+        # which an invalid form would leave modified
+        return CashSystemConfig.objects.get_or_create(pk=1)[0]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
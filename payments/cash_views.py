@@ -11,7 +11,7 @@ from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.db import transaction
 from django.db.models import Count, Q, Sum
-from django.http import Http404, HttpResponse, JsonResponse
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
@@ -37,6 +37,7 @@ from .models import (
     CommissionRecord,
     PaiementTaxe,
 )
+from .services.artifact_service import PaymentArtifactService
 from .services.cash_payment_service import CashPaymentService
 from .services.cash_receipt_service import CashReceiptService
 from .services.cash_session_service import CashSessionService
@@ -622,15 +623,9 @@ class ReceiptDownloadView(LoginRequiredMixin, AgentPartenaireMixin, View):
         # Get receipt
         receipt = get_object_or_404(CashReceipt, pk=pk, transaction__collector=agent)
 
-        # Generate PDF
-        pdf_buffer = CashReceiptService.generate_cash_receipt_pdf(receipt)
-
-        # Return as download
-        response = HttpResponse(pdf_buffer.getvalue(), content_type="application/pdf")
-        filename = f"recu_{receipt.receipt_number}.pdf"
-        response["Content-Disposition"] = f'attachment; filename="{filename}"'
-
-        return response
+        # Rendered once, then served from storage
+        artifact = PaymentArtifactService.cash_receipt(receipt)
+        return PaymentArtifactService.response(request, artifact, filename=f"recu_{receipt.receipt_number}.pdf")
 
 
 # ============================================================================
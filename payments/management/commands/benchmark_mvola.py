@@ -0,0 +1,177 @@
+"""
+Management command to benchmark the MVola API client
+
+Starts a local stand-in for the MVola API (token, merchant pay and status endpoints, with a
+configurable latency) and runs payment initiations followed by status checks through
+MvolaAPIClient, first with bare ``requests`` calls (a new connection per call) and then with
+the shared keep-alive session.
+"""
+
+import json
+import logging
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+import requests
+
+from payments.services.mvola import api_client
+from payments.services.mvola.constants import HTTP_CREATED, HTTP_OK, TOKEN_ENDPOINT
+
+
+class StandInMvolaServer(ThreadingHTTPServer):
+    """Minimal MVola API answering every call successfully after ``latency`` seconds"""
+
+    daemon_threads = True
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.counts = {"connections": 0, "token": 0, "initiate": 0, "status": 0}
+        super().__init__(("127.0.0.1", 0), StandInMvolaHandler)
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def process_request(self, request, client_address):
+        self.count("connections")
+        super().process_request(request, client_address)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StandInMvolaHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real API; headers and body are separate writes, so disable Nagle's
+    # algorithm to avoid delayed-ACK stalls on reused connections
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self, status, data):
+        time.sleep(self.server.latency)
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path == TOKEN_ENDPOINT:
+            self.server.count("token")
+            self._respond(HTTP_OK, {"access_token": "stand-in-token", "token_type": "Bearer", "expires_in": 3600})
+        else:
+            self.server.count("initiate")
+            self._respond(HTTP_CREATED, {"status": "pending", "serverCorrelationId": str(uuid.uuid4())})
+
+    def do_GET(self):
+        self.server.count("status")
+        self._respond(HTTP_OK, {"status": "completed", "transactionReference": str(uuid.uuid4())})
+
+
+class Command(BaseCommand):
+    help = "Benchmark MVola payment initiation and status check throughput against a local stand-in API"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--payments", type=int, default=200, help="Payments to initiate (default: 200)")
+        parser.add_argument("--concurrency", type=int, default=8, help="Concurrent callers (default: 8)")
+        parser.add_argument(
+            "--latency", type=float, default=20, help="Stand-in response latency in milliseconds (default: 20)"
+        )
+
+    def handle(self, *args, **options):
+        server = StandInMvolaServer(options["latency"] / 1000)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        mvola_logger = logging.getLogger("payments.mvola")
+        previous_level = mvola_logger.level
+        mvola_logger.setLevel(logging.WARNING)
+
+        settings = {
+            "MVOLA_BASE_URL": server.url,
+            "MVOLA_CONSUMER_KEY": f"benchmark-{uuid.uuid4()}",
+            "MVOLA_CONSUMER_SECRET": "benchmark",
+            "MVOLA_PARTNER_MSISDN": "0343500003",
+            "MVOLA_PARTNER_NAME": "Benchmark",
+            "MVOLA_CALLBACK_URL": "http://127.0.0.1/callback/",
+        }
+        self.stdout.write(
+            f"{options['payments']} payments (initiate + status), {options['concurrency']} concurrent callers, "
+            f"{options['latency']:.0f} ms stand-in latency"
+        )
+        try:
+            with override_settings(**settings):
+                client = api_client.MvolaAPIClient()
+                # The ``requests`` module has the same post/get API as the shared session
+                for name, transport in (("bare requests", requests), ("keep-alive session", api_client.http)):
+                    self.reset(server, client)
+                    self.report(name, self.run(client, transport, options), server.counts)
+        finally:
+            mvola_logger.setLevel(previous_level)
+            server.shutdown()
+            server.server_close()
+
+    def reset(self, server, client):
+        cache.delete_many(
+            [client._get_token_cache_key(), client._get_token_refresh_key(), client._get_token_lock_key()]
+        )
+        server.counts = dict.fromkeys(server.counts, 0)
+
+    def run(self, client, transport, options):
+        latencies = {"initiate": [], "status": []}
+
+        def payment(index):
+            start = time.perf_counter()
+            result = client.initiate_payment(
+                amount=Decimal("103000"),
+                customer_msisdn="0343500003",
+                description="Benchmark",
+                vehicle_plate=f"{index:04d}TBA",
+                tax_year=2025,
+            )
+            latencies["initiate"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            client.get_transaction_status(result["server_correlation_id"])
+            latencies["status"].append(time.perf_counter() - start)
+
+        original = api_client.http
+        api_client.http = transport
+        try:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+                list(executor.map(payment, range(options["payments"])))
+            elapsed = time.perf_counter() - start
+        finally:
+            api_client.http = original
+        return latencies, elapsed
+
+    def report(self, name, measurements, counts):
+        latencies, elapsed = measurements
+        self.stdout.write(self.style.SUCCESS(f"{name}:"))
+        for operation, values in latencies.items():
+            values = sorted(values)
+            p95 = values[max(int(len(values) * 0.95) - 1, 0)]
+            self.stdout.write(
+                f"  {operation:>8}: mean {statistics.mean(values) * 1000:.1f} ms, "
+                f"p50 {statistics.median(values) * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms"
+            )
+        self.stdout.write(
+            f"  throughput {len(latencies['initiate']) / elapsed:.1f} payments/s, "
+            f"{counts['connections']} connections opened, {counts['token']} token request(s)"
+        )
@@ -64,8 +64,8 @@ class Command(BaseCommand):
 
         for session in expired_sessions:
             try:
-                # Get transaction count
-                transaction_count = session.transactions.count()
+                # Get transaction count (running total on the session row)
+                transaction_count = session.transaction_count
 
                 if dry_run:
                     self.stdout.write(
@@ -91,7 +91,16 @@ class Command(BaseCommand):
                 session.discrepancy_notes = (
                     f"Session auto-closed after {timeout_hours} hours timeout. " f"Please verify physical cash count."
                 )
-                session.save()
+                session.save(
+                    update_fields=[
+                        "status",
+                        "closing_time",
+                        "expected_balance",
+                        "closing_balance",
+                        "discrepancy_amount",
+                        "discrepancy_notes",
+                    ]
+                )
 
                 self.stdout.write(
                     self.style.SUCCESS(
@@ -12,12 +12,13 @@ from django.db.models import Count, Q, Sum
 from django.utils import timezone
 
 from administration.email_utils import send_email
+from core.db_routers import ReplicaReadCommandMixin
 from payments.models import AgentPartenaireProfile, CommissionRecord
 
 logger = logging.getLogger(__name__)
 
 
-class Command(BaseCommand):
+class Command(ReplicaReadCommandMixin, BaseCommand):
     help = "Generate monthly commission reports and email them to admin"
 
     def add_arguments(self, parser):
@@ -0,0 +1,77 @@
+"""
+Management command to pre-render payment receipts and QR codes
+
+Run before the start-of-year peak so downloads are served from storage instead of rendering
+under load. Artifacts that already exist are read back, not rendered again.
+"""
+
+import logging
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from core.utils.query_budget import QueryBudgetCommandMixin
+from payments.models import CashReceipt, PaiementTaxe, QRCode
+from payments.services.artifact_service import PaymentArtifactService
+
+logger = logging.getLogger(__name__)
+
+
+class Command(QueryBudgetCommandMixin, BaseCommand):
+    help = "Pre-render receipt PDFs and QR code images for paid payments"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, help="Only payments of this fiscal year")
+        parser.add_argument(
+            "--base-url",
+            help="Absolute site URL encoded in the QR codes (default: SITE_URL); QR codes are skipped without one",
+        )
+        parser.add_argument("--batch-size", type=int, default=500, help="Payments loaded per query (default: 500)")
+        parser.add_argument("--skip-cash-receipts", action="store_true", help="Do not pre-render cash receipts")
+
+    def handle(self, *args, **options):
+        payments = PaiementTaxe.objects.filter(statut="PAYE").select_related(
+            "vehicule_plaque", "vehicule_plaque__type_vehicule"
+        )
+        receipts = CashReceipt.objects.all()
+        if options["year"]:
+            payments = payments.filter(annee_fiscale=options["year"])
+            receipts = receipts.filter(tax_year=options["year"])
+
+        batch_size = options["batch_size"]
+        rendered = failed = 0
+
+        payment_iter = payments.order_by("pk").iterator(chunk_size=batch_size)
+        while batch := list(islice(payment_iter, batch_size)):
+            # One QR code query per batch instead of one per payment
+            qr_codes = {
+                (qr.vehicule_plaque_id, qr.annee_fiscale): qr
+                for qr in QRCode.objects.filter(
+                    vehicule_plaque_id__in={p.vehicule_plaque_id for p in batch},
+                    annee_fiscale__in={p.annee_fiscale for p in batch},
+                )
+            }
+            for payment in batch:
+                try:
+                    rendered += len(
+                        PaymentArtifactService.prerender_payment(
+                            payment,
+                            base_url=options["base_url"],
+                            qr_code=qr_codes.get((payment.vehicule_plaque_id, payment.annee_fiscale)),
+                        )
+                    )
+                except Exception:
+                    failed += 1
+                    logger.exception("Could not pre-render artifacts of payment %s", payment.id)
+            self.stdout.write(f"  {rendered} artifacts ready...")
+
+        if not options["skip_cash_receipts"]:
+            for receipt in receipts.iterator(chunk_size=batch_size):
+                try:
+                    PaymentArtifactService.cash_receipt(receipt)
+                    rendered += 1
+                except Exception:
+                    failed += 1
+                    logger.exception("Could not pre-render cash receipt %s", receipt.receipt_number)
+
+        self.stdout.write(self.style.SUCCESS(f"{rendered} artifacts ready, {failed} failures"))
@@ -0,0 +1,116 @@
+"""
+Management command to verify (and repair) the running totals of cash sessions
+
+The totals stored on each CashSession row (transaction count, tax, cash received, change given,
+commission and pending approvals) are compared with the totals recomputed from its non-voided
+transactions. With --repair, mismatching sessions are locked, recomputed and corrected.
+"""
+
+import logging
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from payments.models import CashSession
+from payments.services.cash_session_service import SESSION_TOTAL_FIELDS, CashSessionService
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Verify the running totals of cash sessions against their transactions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repair",
+            action="store_true",
+            help="Correct the sessions whose stored totals do not match their transactions",
+        )
+        parser.add_argument(
+            "--session",
+            type=str,
+            help="Only verify the session with this session number",
+        )
+        parser.add_argument(
+            "--since",
+            type=str,
+            help="Only verify sessions opened on or after this date (YYYY-MM-DD)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Sessions verified per query (default: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        sessions = CashSession.objects.all()
+        if options["session"]:
+            sessions = sessions.filter(session_number=options["session"])
+        if options["since"]:
+            try:
+                since = datetime.strptime(options["since"], "%Y-%m-%d").replace(tzinfo=timezone.get_current_timezone())
+            except ValueError:
+                self.stdout.write(self.style.ERROR("Invalid date format. Use YYYY-MM-DD"))
+                return
+            sessions = sessions.filter(opening_time__gte=since)
+
+        checked = 0
+        mismatched = []
+        batch_size = options["batch_size"]
+        session_ids = list(sessions.order_by("pk").values_list("pk", flat=True))
+        for offset in range(0, len(session_ids), batch_size):
+            batch = CashSession.objects.filter(pk__in=session_ids[offset : offset + batch_size])
+            mismatched += self.find_mismatches(batch)
+            checked += len(session_ids[offset : offset + batch_size])
+
+        for session, expected in mismatched:
+            differences = ", ".join(
+                f"{field}: {getattr(session, field)} -> {expected[field]}"
+                for field in SESSION_TOTAL_FIELDS
+                if getattr(session, field) != expected[field]
+            )
+            self.stdout.write(self.style.WARNING(f"  {session.session_number}: {differences}"))
+
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS(f"Verified {checked} session(s): all totals match"))
+            return
+
+        self.stdout.write(self.style.WARNING(f"Verified {checked} session(s): {len(mismatched)} mismatch(es)"))
+        if not options["repair"]:
+            self.stdout.write("Run with --repair to correct them")
+            return
+
+        repaired = self.repair([session.pk for session, _ in mismatched])
+        logger.warning(f"Repaired running totals of {repaired} cash session(s)")
+        self.stdout.write(self.style.SUCCESS(f"Repaired {repaired} session(s)"))
+
+    @staticmethod
+    def find_mismatches(sessions):
+        """(session, expected totals) for each session whose stored totals differ"""
+        expected_totals = CashSessionService.recompute_session_totals(sessions)
+        mismatches = []
+        for session in sessions.only("pk", "session_number", *SESSION_TOTAL_FIELDS):
+            expected = Command.expected(expected_totals.get(session.pk))
+            if any(getattr(session, field) != expected[field] for field in SESSION_TOTAL_FIELDS):
+                mismatches.append((session, expected))
+        return mismatches
+
+    @staticmethod
+    def expected(totals):
+        totals = totals or {}
+        return {field: totals.get(field) or 0 for field in SESSION_TOTAL_FIELDS}
+
+    @staticmethod
+    @transaction.atomic
+    def repair(session_ids):
+        """Recompute the totals under a row lock, so no transaction is recorded in between"""
+        sessions = list(CashSession.objects.select_for_update().filter(pk__in=session_ids))
+        expected_totals = CashSessionService.recompute_session_totals(CashSession.objects.filter(pk__in=session_ids))
+        for session in sessions:
+            for field, value in Command.expected(expected_totals.get(session.pk)).items():
+                setattr(session, field, value)
+        CashSession.objects.bulk_update(sessions, SESSION_TOTAL_FIELDS, batch_size=1000)
+        return len(sessions)
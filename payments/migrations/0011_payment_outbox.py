@@ -0,0 +1,71 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:43
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0010_rename_payments_qr_code_idx_payments_qr_code_c30dce_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PaymentOutboxEvent",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "event_type",
+                    models.CharField(
+                        choices=[("payment.completed", "Paiement confirmé"), ("payment.failed", "Paiement échoué")],
+                        max_length=50,
+                        verbose_name="Type d'événement",
+                    ),
+                ),
+                ("payload", models.JSONField(blank=True, default=dict, verbose_name="Données")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "En attente"),
+                            ("PROCESSING", "En cours"),
+                            ("DONE", "Traité"),
+                            ("FAILED", "Échec"),
+                        ],
+                        default="PENDING",
+                        max_length=20,
+                        verbose_name="Statut",
+                    ),
+                ),
+                ("completed_effects", models.JSONField(blank=True, default=list, verbose_name="Effets traités")),
+                ("attempts", models.PositiveIntegerField(default=0, verbose_name="Tentatives")),
+                (
+                    "next_attempt_at",
+                    models.DateTimeField(default=django.utils.timezone.now, verbose_name="Prochaine tentative"),
+                ),
+                ("last_error", models.TextField(blank=True, verbose_name="Dernière erreur")),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="Date de création")),
+                ("processed_at", models.DateTimeField(blank=True, null=True, verbose_name="Date de traitement")),
+                (
+                    "payment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="outbox_events",
+                        to="payments.paiementtaxe",
+                        verbose_name="Paiement",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Événement de paiement à traiter",
+                "verbose_name_plural": "Événements de paiement à traiter",
+                "ordering": ["id"],
+                "indexes": [models.Index(fields=["status", "next_attempt_at"], name="payments_outbox_due_idx")],
+                "constraints": [
+                    models.UniqueConstraint(fields=("payment", "event_type"), name="payments_outbox_unique_event")
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.7 on 2026-10-19 03:25
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_session_totals(apps, schema_editor):
+    CashSession = apps.get_model("payments", "CashSession")
+    CashTransaction = apps.get_model("payments", "CashTransaction")
+    totals = (
+        CashTransaction.objects.filter(is_voided=False)
+        .values("session_id")
+        .annotate(
+            transaction_count=Count("id"),
+            total_tax_collected=Sum("tax_amount"),
+            total_cash_received=Sum("amount_tendered"),
+            total_change_given=Sum("change_given"),
+            total_commission=Sum("commission_amount"),
+            pending_approvals=Count("id", filter=Q(requires_approval=True, approved_by__isnull=True)),
+        )
+    )
+    fields = [
+        "transaction_count",
+        "total_tax_collected",
+        "total_cash_received",
+        "total_change_given",
+        "total_commission",
+        "pending_approvals",
+    ]
+    sessions = [
+        CashSession(id=row["session_id"], **{field: row[field] or 0 for field in fields})
+        for row in totals.iterator()
+    ]
+    CashSession.objects.bulk_update(sessions, fields, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0011_payment_outbox"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cashsession",
+            name="pending_approvals",
+            field=models.PositiveIntegerField(default=0, verbose_name="Approbations en attente"),
+        ),
+        migrations.AddField(
+            model_name="cashsession",
+            name="total_cash_received",
+            field=models.DecimalField(
+                decimal_places=2, default=Decimal("0.00"), max_digits=14, verbose_name="Espèces reçues (Ariary)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="cashsession",
+            name="total_change_given",
+            field=models.DecimalField(
+                decimal_places=2, default=Decimal("0.00"), max_digits=14, verbose_name="Monnaie rendue (Ariary)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="cashsession",
+            name="total_tax_collected",
+            field=models.DecimalField(
+                decimal_places=2, default=Decimal("0.00"), max_digits=14, verbose_name="Taxe collectée (Ariary)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="cashsession",
+            name="transaction_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="Nombre de transactions"),
+        ),
+        migrations.RunPython(backfill_session_totals, migrations.RunPython.noop),
+    ]
@@ -11,6 +11,9 @@ from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.utils import timezone
 
+from core.utils.config_cache import ConfigCache
+from core.utils.identifiers import next_identifier
+
 
 class PaiementTaxe(models.Model):
     """Payment records for vehicle taxes and contraventions"""
@@ -281,8 +284,8 @@ class StripeConfig(models.Model):
 
     @classmethod
     def get_active(cls):
-        """Return the active Stripe configuration, if any."""
-        return cls.objects.filter(is_active=True).first()
+        """Return the active Stripe configuration, if any (kept in memory, see core.utils.config_cache)."""
+        return _stripe_config_cache.get()
 
     def activate(self):
         """Activate this configuration and deactivate others."""
@@ -291,6 +294,9 @@ class StripeConfig(models.Model):
         self.save(update_fields=["is_active", "updated_at"])
 
 
+_stripe_config_cache = ConfigCache(StripeConfig, lambda: StripeConfig.objects.filter(is_active=True).first())
+
+
 class MvolaConfiguration(models.Model):
     """MVola Payment Gateway Configuration"""
 
@@ -485,7 +491,11 @@ class MvolaConfiguration(models.Model):
 
     @classmethod
     def get_active_config(cls):
-        """Get the active MVola configuration"""
+        """Get the active MVola configuration (kept in memory, see core.utils.config_cache)"""
+        return _mvola_config_cache.get()
+
+    @classmethod
+    def _load_active_config(cls):
         try:
             return cls.objects.get(is_active=True, is_enabled=True)
         except cls.DoesNotExist:
@@ -597,6 +607,9 @@ class MvolaConfiguration(models.Model):
         return round((self.successful_transactions / self.total_transactions) * 100, 2)
 
 
+_mvola_config_cache = ConfigCache(MvolaConfiguration, MvolaConfiguration._load_active_config)
+
+
 class StripeWebhookEvent(models.Model):
     """Store Stripe webhook events for audit and retry"""
 
@@ -697,13 +710,9 @@ class QRCode(models.Model):
     def generate_token(self):
         """Generate unique verification token"""
         alphabet = string.ascii_letters + string.digits
-        token = "".join(secrets.choice(alphabet) for _ in range(32))
-
-        # Ensure uniqueness
-        while QRCode.objects.filter(token=token).exists():
-            token = "".join(secrets.choice(alphabet) for _ in range(32))
-
-        return token
+        # 32 characters out of 62 (190 bits): a collision is not a practical concern, and the unique
+        # constraint still guards against one, so no existence probe
+        return "".join(secrets.choice(alphabet) for _ in range(32))
 
     def __str__(self):
         if self.type_code == "CONTRAVENTION":
@@ -803,9 +812,8 @@ class CashSystemConfig(models.Model):
 
     @classmethod
     def get_config(cls):
-        """Get or create singleton configuration"""
-        config, created = cls.objects.get_or_create(pk=1)
-        return config
+        """Get or create singleton configuration (kept in memory, see core.utils.config_cache)"""
+        return _cash_config_cache.get()
 
     def save(self, *args, **kwargs):
         # Ensure only one instance exists
@@ -817,6 +825,9 @@ class CashSystemConfig(models.Model):
         pass
 
 
+_cash_config_cache = ConfigCache(CashSystemConfig, lambda: CashSystemConfig.objects.get_or_create(pk=1)[0])
+
+
 class AgentPartenaireProfile(models.Model):
     """Profile for agent partenaires authorized to accept cash payments"""
 
@@ -906,9 +917,22 @@ class CashSession(models.Model):
         max_digits=12, decimal_places=2, default=Decimal("0.00"), verbose_name="Montant de l'écart (Ariary)"
     )
     discrepancy_notes = models.TextField(blank=True, verbose_name="Notes sur l'écart")
+    # Running totals of the non-voided transactions, updated with F() expressions by CashPaymentService
+    # (see CashSessionService.record_transaction and the verify_session_totals command)
+    transaction_count = models.PositiveIntegerField(default=0, verbose_name="Nombre de transactions")
+    total_tax_collected = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal("0.00"), verbose_name="Taxe collectée (Ariary)"
+    )
+    total_cash_received = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal("0.00"), verbose_name="Espèces reçues (Ariary)"
+    )
+    total_change_given = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal("0.00"), verbose_name="Monnaie rendue (Ariary)"
+    )
     total_commission = models.DecimalField(
         max_digits=12, decimal_places=2, default=Decimal("0.00"), verbose_name="Commission totale (Ariary)"
     )
+    pending_approvals = models.PositiveIntegerField(default=0, verbose_name="Approbations en attente")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="open", verbose_name="Statut")
     approved_by = models.ForeignKey(
         User,
@@ -936,12 +960,8 @@ class CashSession(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.session_number:
-            # Generate session number: SESS-YYYYMMDD-XXXXXX
-            from django.utils import timezone
-
-            date_str = timezone.now().strftime("%Y%m%d")
-            random_str = "".join(secrets.choice(string.digits) for _ in range(6))
-            self.session_number = f"SESS-{date_str}-{random_str}"
+            # Generate session number: SESS-YYYYMMDD-XXXXXXC
+            self.session_number = next_identifier("cash_session")
         super().save(*args, **kwargs)
 
 
@@ -1027,12 +1047,8 @@ class CashTransaction(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.transaction_number:
-            # Generate transaction number: CASH-YYYYMMDD-XXXXXX
-            from django.utils import timezone
-
-            date_str = timezone.now().strftime("%Y%m%d")
-            random_str = "".join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(6))
-            self.transaction_number = f"CASH-{date_str}-{random_str}"
+            # Generate transaction number: CASH-YYYYMMDD-XXXXXXC
+            self.transaction_number = next_identifier("cash_transaction")
         super().save(*args, **kwargs)
 
 
@@ -1095,12 +1111,8 @@ class CashReceipt(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.receipt_number:
-            # Generate receipt number: REC-YYYYMMDD-XXXXXX
-            from django.utils import timezone
-
-            date_str = timezone.now().strftime("%Y%m%d")
-            random_str = "".join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(6))
-            self.receipt_number = f"REC-{date_str}-{random_str}"
+            # Generate receipt number: REC-YYYYMMDD-XXXXXXC
+            self.receipt_number = next_identifier("cash_receipt")
         super().save(*args, **kwargs)
 
 
@@ -1228,3 +1240,54 @@ class CashAuditLog(models.Model):
         """Get the hash of the most recent log entry"""
         last_log = cls.objects.order_by("-timestamp").first()
         return last_log.current_hash if last_log else ""
+
+
+class PaymentOutboxEvent(models.Model):
+    """
+    Side effects of a payment state change (QR code, notifications, receipts, webhooks).
+
+    Written in the same transaction as the payment update and processed by the outbox relay
+    (``payments.services.outbox_service``), so callbacks return immediately and no side
+    effect is lost when a process dies. One event per payment and event type makes
+    repeated callbacks idempotent; ``completed_effects`` keeps retries from repeating the
+    side effects that already succeeded.
+    """
+
+    EVENT_TYPE_CHOICES = [
+        ("payment.completed", "Paiement confirmé"),
+        ("payment.failed", "Paiement échoué"),
+    ]
+
+    STATUS_CHOICES = [
+        ("PENDING", "En attente"),
+        ("PROCESSING", "En cours"),
+        ("DONE", "Traité"),
+        ("FAILED", "Échec"),
+    ]
+
+    payment = models.ForeignKey(
+        PaiementTaxe, on_delete=models.CASCADE, related_name="outbox_events", verbose_name="Paiement"
+    )
+    event_type = models.CharField(max_length=50, choices=EVENT_TYPE_CHOICES, verbose_name="Type d'événement")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="Données")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="PENDING", verbose_name="Statut")
+    completed_effects = models.JSONField(default=list, blank=True, verbose_name="Effets traités")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Tentatives")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="Prochaine tentative")
+    last_error = models.TextField(blank=True, verbose_name="Dernière erreur")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name="Date de traitement")
+
+    class Meta:
+        verbose_name = "Événement de paiement à traiter"
+        verbose_name_plural = "Événements de paiement à traiter"
+        ordering = ["id"]
+        constraints = [
+            models.UniqueConstraint(fields=["payment", "event_type"], name="payments_outbox_unique_event"),
+        ]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="payments_outbox_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} - {self.payment_id} ({self.status})"
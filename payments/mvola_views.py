@@ -8,7 +8,6 @@ This module contains API views for MVola mobile money payment operations:
 """
 
 import logging
-from datetime import timedelta
 from decimal import Decimal
 
 from django.db import transaction
@@ -25,11 +24,12 @@ from notifications.services import NotificationService
 from vehicles.models import Vehicule
 from vehicles.services import TaxCalculationService
 
-from .models import PaiementTaxe, QRCode
+from .models import PaiementTaxe
 from .services.mvola.api_client import MvolaAPIClient
 from .services.mvola.exceptions import MvolaAPIError, MvolaAuthenticationError, MvolaCallbackError, MvolaValidationError
 from .services.mvola.fee_calculator import MvolaFeeCalculator
 from .services.mvola.validators import validate_msisdn
+from .services.outbox_service import PAYMENT_COMPLETED, PAYMENT_FAILED, PaymentOutbox
 
 # Configure logger
 logger = logging.getLogger("payments.mvola")
@@ -422,9 +422,9 @@ class MvolaCallbackView(APIView):
     5. Extracts and stores gateway fees using MvolaFeeCalculator.extract_gateway_fees()
     6. Updates mvola_status, mvola_transaction_reference, and mvola_gateway_fees fields
     7. Sets statut to 'PAYE' and date_paiement when status is 'completed'
-    8. Creates notification for user
-    9. Generates QR code if payment completed
-    10. Returns HTTP 200 with acknowledgment JSON
+    8. Records a payment outbox event in the same transaction; the relay then creates the
+       notification for the user and generates the QR code if payment completed
+    9. Returns HTTP 200 with acknowledgment JSON
 
     Request Body (from MVola):
     {
@@ -551,169 +551,18 @@ class MvolaCallbackView(APIView):
                 # Save payment
                 payment.save()
 
-            # Get user and vehicle info for notifications
-            user = payment.vehicule_plaque.proprietaire
-            vehicle_plate = payment.vehicule_plaque.plaque_immatriculation
-
-            # Determine user language preference (default to French)
-            user_language = "fr"
-            if hasattr(user, "userprofile") and hasattr(user.userprofile, "langue_preferee"):
-                user_language = user.userprofile.langue_preferee or "fr"
-
-            # Create notification based on payment status
-            if payment.mvola_status == "completed":
-                # Create payment confirmation notification
-                try:
-                    if user_language == "mg":
-                        titre = "Fandoavam-bola MVola vita soa aman-tsara"
-                        contenu = (
-                            f"Ny fandoavam-bola MVola ho an'ny fiara {vehicle_plate} "
-                            f"dia vita soa aman-tsara. "
-                            f"Vola naloa: {payment.montant_paye_ariary:,.0f} Ar. "
-                            f"Référence: {transaction_reference or server_correlation_id}"
-                        )
-                    else:
-                        titre = "Paiement MVola confirmé"
-                        contenu = (
-                            f"Votre paiement MVola pour le véhicule {vehicle_plate} "
-                            f"a été confirmé avec succès. "
-                            f"Montant payé: {payment.montant_paye_ariary:,.0f} Ar. "
-                            f"Référence: {transaction_reference or server_correlation_id}"
-                        )
-
-                    NotificationService.create_notification(
-                        user=user,
-                        type_notification="system",
-                        titre=titre,
-                        contenu=contenu,
-                        langue=user_language,
-                        metadata={
-                            "event": "mvola_payment_completed",
-                            "payment_id": str(payment.id),
-                            "amount": str(payment.montant_paye_ariary),
-                            "server_correlation_id": server_correlation_id,
-                            "transaction_reference": transaction_reference,
-                            "gateway_fees": str(gateway_fees),
-                        },
-                        send_email=True,
-                    )
-
-                    logger.info(
-                        f"Payment confirmation notification created: "
-                        f"payment_id={payment.id}, "
-                        f"user={user.username}"
-                    )
-
-                except Exception as e:
-                    logger.error(
-                        f"Failed to create payment confirmation notification: "
-                        f"payment_id={payment.id}, "
-                        f"error={str(e)}"
-                    )
-
-                # Generate QR code for completed payment
-                try:
-                    # Check if QR code already exists for this vehicle and year
-                    qr_code, created = QRCode.objects.get_or_create(
-                        vehicule_plaque=payment.vehicule_plaque,
-                        annee_fiscale=payment.annee_fiscale,
-                        defaults={"date_expiration": timezone.now() + timedelta(days=365), "est_actif": True},
-                    )
-
-                    if created:
-                        logger.info(
-                            f"QR code generated: "
-                            f"payment_id={payment.id}, "
-                            f"qr_code_id={qr_code.id}, "
-                            f"vehicle_plate={vehicle_plate}, "
-                            f"tax_year={payment.annee_fiscale}"
-                        )
-
-                        # Create QR code generation notification
-                        try:
-                            if user_language == "mg":
-                                titre_qr = "QR code noforonina"
-                                contenu_qr = (
-                                    f"Ny QR code ho an'ny fiara {vehicle_plate} "
-                                    f"({payment.annee_fiscale}) dia noforonina soa aman-tsara."
-                                )
-                            else:
-                                titre_qr = "QR code généré"
-                                contenu_qr = (
-                                    f"Le QR code pour le véhicule {vehicle_plate} "
-                                    f"({payment.annee_fiscale}) a été généré avec succès."
-                                )
-
-                            NotificationService.create_notification(
-                                user=user,
-                                type_notification="system",
-                                titre=titre_qr,
-                                contenu=contenu_qr,
-                                langue=user_language,
-                                metadata={
-                                    "event": "qr_generated",
-                                    "qr_code_id": str(qr_code.id),
-                                    "vehicle_plaque": vehicle_plate,
-                                    "tax_year": payment.annee_fiscale,
-                                    "payment_id": str(payment.id),
-                                },
-                            )
-
-                            logger.info(f"QR code notification created: " f"qr_code_id={qr_code.id}")
-
-                        except Exception as e:
-                            logger.error(
-                                f"Failed to create QR code notification: "
-                                f"qr_code_id={qr_code.id}, "
-                                f"error={str(e)}"
-                            )
-                    else:
-                        logger.info(f"QR code already exists: " f"payment_id={payment.id}, " f"qr_code_id={qr_code.id}")
-
-                except Exception as e:
-                    logger.error(f"Failed to generate QR code: " f"payment_id={payment.id}, " f"error={str(e)}")
-
-            elif payment.mvola_status == "failed":
-                # Create payment failed notification
-                try:
-                    if user_language == "mg":
-                        titre = "Tsy nahomby ny fandoavam-bola MVola"
-                        contenu = (
-                            f"Tsy nahomby ny fandoavam-bola MVola ho an'ny fiara {vehicle_plate}. "
-                            f"Andramo indray azafady. "
-                            f"Référence: {transaction_reference or server_correlation_id}"
-                        )
-                    else:
-                        titre = "Échec du paiement MVola"
-                        contenu = (
-                            f"Le paiement MVola pour le véhicule {vehicle_plate} a échoué. "
-                            f"Veuillez réessayer. "
-                            f"Référence: {transaction_reference or server_correlation_id}"
-                        )
-
-                    NotificationService.create_notification(
-                        user=user,
-                        type_notification="system",
-                        titre=titre,
-                        contenu=contenu,
-                        langue=user_language,
-                        metadata={
-                            "event": "mvola_payment_failed",
-                            "payment_id": str(payment.id),
-                            "server_correlation_id": server_correlation_id,
-                            "transaction_reference": transaction_reference,
-                            "transaction_status": transaction_status,
-                        },
-                        send_email=True,
-                    )
-
-                    logger.info(
-                        f"Payment failed notification created: " f"payment_id={payment.id}, " f"user={user.username}"
-                    )
-
-                except Exception as e:
-                    logger.error(
-                        f"Failed to create payment failed notification: " f"payment_id={payment.id}, " f"error={str(e)}"
+                # Notifications, QR code, receipts and webhooks are run by the outbox relay
+                # once this transaction commits, so MVola gets its acknowledgment right away
+                event_type = {"completed": PAYMENT_COMPLETED, "failed": PAYMENT_FAILED}.get(payment.mvola_status)
+                if event_type:
+                    PaymentOutbox.enqueue(
+                        payment,
+                        event_type,
+                        notification="mvola",
+                        server_correlation_id=server_correlation_id,
+                        transaction_reference=transaction_reference,
+                        transaction_status=transaction_status,
+                        gateway_fees=str(gateway_fees),
                     )
 
             # Return success acknowledgment to MVola
@@ -869,62 +718,16 @@ class MvolaStatusCheckView(APIView):
                             f"server_correlation_id={server_correlation_id}"
                         )
 
-                        # Create notification for user
-                        user = payment.vehicule_plaque.proprietaire
-                        vehicle_plate = payment.vehicule_plaque.plaque_immatriculation
-
-                        # Determine user language preference
-                        user_language = "fr"
-                        if hasattr(user, "userprofile") and hasattr(user.userprofile, "langue_preferee"):
-                            user_language = user.userprofile.langue_preferee or "fr"
-
-                        try:
-                            if user_language == "mg":
-                                titre = "Fandoavam-bola MVola vita soa aman-tsara"
-                                contenu = (
-                                    f"Ny fandoavam-bola MVola ho an'ny fiara {vehicle_plate} "
-                                    f"dia vita soa aman-tsara. "
-                                    f"Vola naloa: {payment.montant_paye_ariary:,.0f} Ar. "
-                                    f"Référence: {transaction_reference or server_correlation_id}"
-                                )
-                            else:
-                                titre = "Paiement MVola confirmé"
-                                contenu = (
-                                    f"Votre paiement MVola pour le véhicule {vehicle_plate} "
-                                    f"a été confirmé avec succès. "
-                                    f"Montant payé: {payment.montant_paye_ariary:,.0f} Ar. "
-                                    f"Référence: {transaction_reference or server_correlation_id}"
-                                )
-
-                            NotificationService.create_notification(
-                                user=user,
-                                type_notification="system",
-                                titre=titre,
-                                contenu=contenu,
-                                langue=user_language,
-                                metadata={
-                                    "event": "mvola_payment_completed",
-                                    "payment_id": str(payment.id),
-                                    "amount": str(payment.montant_paye_ariary),
-                                    "server_correlation_id": server_correlation_id,
-                                    "transaction_reference": transaction_reference,
-                                },
-                                send_email=True,
-                            )
-
-                            logger.info(f"Payment confirmation notification created: " f"payment_id={payment.id}")
-
-                        except Exception as e:
-                            logger.error(
-                                f"Failed to create notification: " f"payment_id={payment.id}, " f"error={str(e)}"
-                            )
-
-                        # Use unified payment success service (same workflow as cash and Stripe)
+                        # Use unified payment success service (same workflow as cash and Stripe);
+                        # the MVola confirmation is sent by the outbox relay after commit
                         try:
                             from payments.services.payment_success_service import PaymentSuccessService
 
                             qr_code, error = PaymentSuccessService.handle_payment_success(
-                                payment=payment, send_notification=False  # Notification already sent above
+                                payment=payment,
+                                notification="mvola",
+                                server_correlation_id=server_correlation_id,
+                                transaction_reference=transaction_reference,
                             )
 
                             if error:
@@ -2,6 +2,7 @@
 Payment services package
 """
 
+from .artifact_service import PaymentArtifactService
 from .cash_audit_service import CashAuditService
 
 # Cash payment services
@@ -18,6 +19,7 @@ from .mobile_money_service import (
     OrangeMoneyService,
     PaymentServiceFactory,
 )
+from .outbox_service import PaymentOutbox
 from .reconciliation_service import ReconciliationService
 
 __all__ = [
@@ -28,6 +30,8 @@ __all__ = [
     "CommissionService",
     "ReconciliationService",
     "CashAuditService",
+    "PaymentArtifactService",
+    "PaymentOutbox",
     # Mobile money services
     "MobileMoneyService",
     "MVolaService",
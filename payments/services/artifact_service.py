@@ -0,0 +1,360 @@
+"""
+Payment Artifact Service
+Renders QR code images and PDF receipts once and serves them from storage
+
+A paid payment's QR code and receipt never change, so each artifact is rendered a single
+time and stored under a key derived from the exact data it shows (plus a renderer version).
+Downloads then only compute that key from the database row, read the stored file and return
+it with a strong ETag. The download URLs are stable while the data behind them may change
+(a receipt shows the payment status), so clients revalidate them with ``If-None-Match``;
+only content-addressed URLs may be served as immutable.
+"""
+
+import hashlib
+import io
+import json
+import logging
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import HttpResponse, HttpResponseNotModified
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import parse_etags
+
+import qrcode
+from PIL import Image, ImageDraw, ImageFont
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+logger = logging.getLogger(__name__)
+
+# Bump when a renderer's layout changes so stored artifacts are regenerated
+RENDER_VERSION = 1
+
+STORAGE_PREFIX = "payment_artifacts"
+
+Artifact = namedtuple("Artifact", ["etag", "content", "content_type"])
+
+
+@lru_cache(maxsize=None)
+def get_font(size):
+    """TrueType font for the QR card, loaded once per process and size"""
+    try:
+        return ImageFont.truetype("arial.ttf", size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=1)
+def get_receipt_styles():
+    """ReportLab paragraph and table styles shared by every payment receipt"""
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        "CustomTitle",
+        parent=styles["Heading1"],
+        fontSize=24,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        textColor=colors.darkblue,
+    )
+    table_style = TableStyle(
+        [
+            ("BACKGROUND", (0, 0), (0, -1), colors.lightgrey),
+            ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
+            ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+            ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
+            ("FONTSIZE", (0, 0), (-1, -1), 12),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 12),
+            ("BACKGROUND", (1, 0), (1, -1), colors.beige),
+            ("GRID", (0, 0), (-1, -1), 1, colors.black),
+        ]
+    )
+    return styles, title_style, table_style
+
+
+def format_amount(value):
+    """Format an Ariary amount without decimals and with spaces as thousands separator"""
+    try:
+        return f"{int(float(value or 0)):,}".replace(",", " ")
+    except (ValueError, TypeError):
+        return str(value or 0)
+
+
+def make_qr_image(data):
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.make_image(fill_color="black", back_color="white")
+
+
+def render_qr_image(data):
+    """Plain QR code PNG"""
+    img_io = io.BytesIO()
+    make_qr_image(data).save(img_io, format="PNG")
+    return img_io.getvalue()
+
+
+def render_qr_card(title, lines, qr_url, instructions):
+    """Printable PNG card: title, payment details, the QR code and verification instructions"""
+    img_width, img_height = 800, 1000
+    img = Image.new("RGB", (img_width, img_height), "white")
+    draw = ImageDraw.Draw(img)
+    title_font, info_font, small_font = get_font(32), get_font(24), get_font(18)
+
+    def centered(text, y, font, fill):
+        bbox = draw.textbbox((0, 0), text, font=font)
+        draw.text(((img_width - (bbox[2] - bbox[0])) // 2, y), text, fill=fill, font=font)
+
+    centered(title, 50, title_font, "black")
+    y_pos = 120
+    for line in lines:
+        centered(line, y_pos, info_font, "black")
+        y_pos += 40
+
+    qr_size = 400
+    qr_x = (img_width - qr_size) // 2
+    qr_y = y_pos + 20
+    img.paste(make_qr_image(qr_url).resize((qr_size, qr_size)), (qr_x, qr_y))
+
+    y_pos = qr_y + qr_size + 30
+    for instruction in instructions:
+        centered(instruction, y_pos, small_font, "gray")
+        y_pos += 25
+
+    img_io = io.BytesIO()
+    img.save(img_io, format="PNG", quality=95)
+    return img_io.getvalue()
+
+
+def render_receipt_pdf(payment_rows, vehicle_rows):
+    """Payment receipt PDF with the payment and vehicle information tables"""
+    styles, title_style, table_style = get_receipt_styles()
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    story = [Paragraph("REÇU DE PAIEMENT TAXE VÉHICULE", title_style), Spacer(1, 20)]
+
+    table = Table(payment_rows, colWidths=[150, 200])
+    table.setStyle(table_style)
+    story += [table, Spacer(1, 30)]
+
+    story += [Paragraph("INFORMATIONS DU VÉHICULE", styles["Heading2"]), Spacer(1, 10)]
+    vehicle_table = Table(vehicle_rows, colWidths=[150, 200])
+    vehicle_table.setStyle(table_style)
+    story += [vehicle_table, Spacer(1, 30)]
+
+    footer_text = f"Document généré le {timezone.localtime().strftime('%d/%m/%Y à %H:%M')}"
+    story.append(Paragraph(footer_text, styles["Normal"]))
+
+    doc.build(story)
+    return buffer.getvalue()
+
+
+class PaymentArtifactService:
+    """Render-once storage for payment QR codes and receipts"""
+
+    @staticmethod
+    def fingerprint(kind, data):
+        """Key of an artifact: a hash of its kind, the renderer version and the data it shows"""
+        payload = json.dumps([kind, RENDER_VERSION, data], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def storage_path(kind, etag, extension):
+        return f"{STORAGE_PREFIX}/{kind}/{etag[:2]}/{etag}.{extension}"
+
+    @staticmethod
+    def get_or_render(kind, data, render, content_type, extension):
+        """
+        Return the stored artifact for ``data``, rendering and storing it on first use.
+
+        ``render`` is only called on a miss and receives ``data``.
+        """
+        etag = PaymentArtifactService.fingerprint(kind, data)
+        path = PaymentArtifactService.storage_path(kind, etag, extension)
+        try:
+            with default_storage.open(path, "rb") as stored:
+                return Artifact(etag, stored.read(), content_type)
+        except OSError:
+            pass
+
+        content = render(data)
+        try:
+            saved = default_storage.save(path, ContentFile(content))
+            if saved != path:
+                # Another worker stored the same artifact first
+                default_storage.delete(saved)
+        except Exception:
+            logger.exception("Could not store payment artifact %s", path)
+        return Artifact(etag, content, content_type)
+
+    @staticmethod
+    def site_url(request=None):
+        """
+        Base of the absolute URLs encoded in QR artifacts: ``SITE_URL``, else the request host.
+
+        Downloads and pre-rendering must use the same base, or pre-rendered artifacts are never hit.
+        """
+        base_url = getattr(settings, "SITE_URL", "")
+        if not base_url and request is not None:
+            base_url = request.build_absolute_uri("/")
+        return base_url.rstrip("/")
+
+    @staticmethod
+    def qr_card_url(qr_code, base_url):
+        from .payment_success_service import PaymentSuccessService
+
+        return base_url + PaymentSuccessService.get_qr_verification_url(qr_code)
+
+    @staticmethod
+    def qr_image_url(token, base_url):
+        return base_url + reverse("payments:qr_verify", kwargs={"code": token})
+
+    @staticmethod
+    def qr_card(payment, qr_code, qr_url):
+        """QR code card offered for download once a payment is paid"""
+        data = {
+            "title": "TAXE VÉHICULE PAYÉE",
+            "lines": [
+                f"Plaque: {payment.vehicule_plaque_id}",
+                f"Année fiscale: {payment.annee_fiscale}",
+                f"Montant payé: {format_amount(payment.montant_paye_ariary)} Ar",
+                "Date de paiement: " + (payment.date_paiement.strftime("%d/%m/%Y") if payment.date_paiement else "N/A"),
+            ],
+            "qr_url": qr_url,
+            "instructions": [
+                "Scannez ce QR code pour vérifier",
+                "le paiement de la taxe véhicule",
+                f"Valide jusqu'au: {qr_code.date_expiration.strftime('%d/%m/%Y')}",
+            ],
+        }
+        return PaymentArtifactService.get_or_render("qr_card", data, lambda d: render_qr_card(**d), "image/png", "png")
+
+    @staticmethod
+    def qr_image(url):
+        """Plain QR code image encoding ``url``"""
+        return PaymentArtifactService.get_or_render("qr_image", url, render_qr_image, "image/png", "png")
+
+    @staticmethod
+    def payment_receipt(payment):
+        """PDF receipt of a paid vehicle tax payment"""
+        vehicule = payment.vehicule_plaque
+        data = {
+            "payment_rows": [
+                ["Plaque d'immatriculation:", vehicule.plaque_immatriculation],
+                ["Année fiscale:", str(payment.annee_fiscale)],
+                ["Montant payé:", f"{format_amount(payment.montant_paye_ariary)} Ar"],
+                [
+                    "Date de paiement:",
+                    payment.date_paiement.strftime("%d/%m/%Y %H:%M") if payment.date_paiement else "N/A",
+                ],
+                ["Méthode de paiement:", payment.get_methode_paiement_display() or "N/A"],
+                ["Référence transaction:", payment.transaction_id or "N/A"],
+                ["Statut:", payment.get_statut_display()],
+            ],
+            "vehicle_rows": [
+                ["Puissance fiscale:", f"{vehicule.puissance_fiscale_cv} CV"],
+                ["Cylindrée:", f"{vehicule.cylindree_cm3} cm³" if vehicule.cylindree_cm3 else "N/A"],
+                ["Source d'énergie:", vehicule.get_source_energie_display()],
+                ["Catégorie:", vehicule.get_categorie_vehicule_display()],
+                ["Type:", vehicule.type_vehicule.nom if vehicule.type_vehicule else "N/A"],
+                ["Date de circulation:", vehicule.date_premiere_circulation.strftime("%d/%m/%Y")],
+            ],
+        }
+        return PaymentArtifactService.get_or_render(
+            "receipt", data, lambda d: render_receipt_pdf(**d), "application/pdf", "pdf"
+        )
+
+    @staticmethod
+    def cash_receipt(receipt):
+        """PDF of a cash receipt"""
+        from payments.models import CashSystemConfig
+
+        from .cash_receipt_service import CashReceiptService
+
+        fields = [
+            "receipt_number",
+            "is_duplicate",
+            "payment_date",
+            "vehicle_registration",
+            "vehicle_owner",
+            "tax_year",
+            "tax_amount",
+            "amount_paid",
+            "change_given",
+            "collector_name",
+            "collector_id",
+            "qr_code_data",
+        ]
+        data = {field: getattr(receipt, field) for field in fields}
+        data["footer"] = CashSystemConfig.get_config().receipt_footer_text
+        return PaymentArtifactService.get_or_render(
+            "cash_receipt",
+            data,
+            lambda d: CashReceiptService.generate_cash_receipt_pdf(receipt).getvalue(),
+            "application/pdf",
+            "pdf",
+        )
+
+    @staticmethod
+    def prerender_payment(payment, base_url=None, qr_code=None):
+        """
+        Render the receipt and QR artifacts of a paid payment ahead of the first download.
+
+        The QR artifacts encode absolute URLs, so they are only pre-rendered when a base URL
+        (``SITE_URL`` by default) is known; otherwise they are rendered on first download.
+        ``qr_code`` is looked up when not given.
+        """
+        from payments.models import QRCode
+
+        rendered = [PaymentArtifactService.payment_receipt(payment)]
+        base_url = (base_url or PaymentArtifactService.site_url()).rstrip("/")
+        if base_url and qr_code is None:
+            qr_code = QRCode.objects.filter(
+                vehicule_plaque_id=payment.vehicule_plaque_id, annee_fiscale=payment.annee_fiscale
+            ).first()
+        if base_url and qr_code:
+            qr_url = PaymentArtifactService.qr_card_url(qr_code, base_url)
+            rendered.append(PaymentArtifactService.qr_card(payment, qr_code, qr_url))
+            verify_url = PaymentArtifactService.qr_image_url(qr_code.token, base_url)
+            rendered.append(PaymentArtifactService.qr_image(verify_url))
+        return rendered
+
+    @staticmethod
+    def response(request, artifact, filename=None, public=False, immutable=False):
+        """
+        Serve an artifact with a strong ETag, answering conditional requests with 304.
+
+        Responses must be revalidated (``no-cache``) unless ``immutable`` is set, which is only
+        correct for URLs that embed the artifact's hash: clients may then keep them for
+        ``PAYMENT_ARTIFACT_MAX_AGE`` seconds without revalidating.
+        """
+        etag = f'"{artifact.etag}"'
+        cache_control = "public" if public else "private"
+        if immutable:
+            max_age = getattr(settings, "PAYMENT_ARTIFACT_MAX_AGE", 60 * 60 * 24 * 365)
+            cache_control += f", max-age={max_age}, immutable"
+        else:
+            cache_control += ", no-cache"
+
+        if_none_match = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+        if etag in if_none_match or "*" in if_none_match:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(artifact.content, content_type=artifact.content_type)
+            if filename:
+                response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        response["ETag"] = etag
+        response["Cache-Control"] = cache_control
+        return response
@@ -22,6 +22,7 @@ from vehicles.models import Vehicule
 from vehicles.services import TaxCalculationService
 
 from .cash_audit_service import CashAuditService
+from .cash_session_service import CashSessionService
 from .commission_service import CommissionService
 
 
@@ -193,8 +194,7 @@ class CashPaymentService:
             )
 
             # 9. Update session totals
-            active_session.total_commission += commission_amount
-            active_session.save(update_fields=["total_commission"])
+            CashSessionService.record_transaction(active_session, cash_transaction)
 
             # 10. If payment is automatically approved (no approval required), handle payment success
             if not requires_approval:
@@ -220,7 +220,7 @@ class CashPaymentService:
                 action_type="transaction_create",
                 user=collector.user,
                 session=active_session,
-                transaction=cash_transaction,
+                transaction_obj=cash_transaction,
                 data={
                     "vehicle_plate": cash_transaction.vehicle_plate,
                     "tax_amount": str(tax_amount),
@@ -313,6 +313,8 @@ class CashPaymentService:
             if notes:
                 transaction.notes = notes
             transaction.save(update_fields=["approved_by", "approval_time", "notes"])
+            if not transaction.is_voided:
+                CashSessionService.record_approval(transaction.session)
 
             # Update payment status
             payment = transaction.payment
@@ -344,7 +346,7 @@ class CashPaymentService:
                 action_type="transaction_approve",
                 user=admin_user,
                 session=transaction.session,
-                transaction=transaction,
+                transaction_obj=transaction,
                 data={
                     "transaction_number": transaction.transaction_number,
                     "tax_amount": str(transaction.tax_amount),
@@ -402,9 +404,7 @@ class CashPaymentService:
             payment.save(update_fields=["statut"])
 
             # Reverse session balance (subtract amounts)
-            session = transaction.session
-            session.total_commission -= transaction.commission_amount
-            session.save(update_fields=["total_commission"])
+            CashSessionService.record_transaction(transaction.session, transaction, reverse=True)
 
             # Cancel commission
             if hasattr(transaction, "commission"):
@@ -418,7 +418,7 @@ class CashPaymentService:
                 action_type="transaction_void",
                 user=admin_user,
                 session=transaction.session,
-                transaction=transaction,
+                transaction_obj=transaction,
                 data={
                     "transaction_number": transaction.transaction_number,
                     "tax_amount": str(transaction.tax_amount),
@@ -89,6 +89,12 @@ class CashReceiptService:
                 qr_code_data=qr_data,
             )
 
+            # Render the receipt PDF ahead of the first download
+            from payments.tasks import prerender_cash_receipt
+
+            receipt_id = str(receipt.id)
+            transaction.on_commit(lambda: prerender_cash_receipt.delay(receipt_id), robust=True)
+
             # Mark receipt as printed
             cash_transaction.receipt_printed = True
             cash_transaction.receipt_print_time = timezone.now()
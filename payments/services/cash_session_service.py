@@ -8,7 +8,7 @@ from typing import Any, Dict, Optional, Tuple
 
 from django.contrib.auth.models import User
 from django.db import transaction
-from django.db.models import Count, Q, Sum
+from django.db.models import Count, F, Q, Sum
 from django.utils import timezone
 
 from payments.models import (
@@ -20,6 +20,16 @@ from payments.models import (
 
 from .cash_audit_service import CashAuditService
 
+# Running totals kept on the CashSession row
+SESSION_TOTAL_FIELDS = [
+    "transaction_count",
+    "total_tax_collected",
+    "total_cash_received",
+    "total_change_given",
+    "total_commission",
+    "pending_approvals",
+]
+
 
 class CashSessionService:
     """Service for managing cash sessions"""
@@ -92,7 +102,8 @@ class CashSessionService:
             if session.status != "open":
                 return None, None
 
-            # 1. Calculate expected balance
+            # 1. Calculate expected balance (from the totals as committed, not the loaded instance)
+            session.refresh_from_db(fields=SESSION_TOTAL_FIELDS)
             totals = CashSessionService.calculate_session_totals(session)
             expected_balance = totals["expected_balance"]
 
@@ -116,7 +127,18 @@ class CashSessionService:
             else:
                 session.approved_by = counted_by
 
-            session.save()
+            # Only the closing fields: the running totals may be updated concurrently (F() updates)
+            session.save(
+                update_fields=[
+                    "closing_balance",
+                    "expected_balance",
+                    "closing_time",
+                    "discrepancy_amount",
+                    "discrepancy_notes",
+                    "status",
+                    "approved_by",
+                ]
+            )
 
             # 5. Create audit log
             audit_service = CashAuditService()
@@ -155,49 +177,86 @@ class CashSessionService:
         return CashSession.objects.filter(collector=collector, status="open").first()
 
     @staticmethod
-    def calculate_session_totals(session: CashSession) -> Dict[str, Any]:
+    def record_transaction(session: CashSession, cash_transaction: CashTransaction, reverse: bool = False) -> None:
         """
-        Calculate session totals (transactions, commission, etc.)
+        Add a transaction to the running totals of its session (or remove it when voided)
+
+        The totals are updated with F() expressions in a single UPDATE, so concurrent
+        transactions of the same session cannot overwrite each other's amounts.
 
         Args:
-            session: The cash session
+            session: The cash session of the transaction
+            cash_transaction: The transaction being recorded or voided
+            reverse: True to subtract the transaction (voiding)
+        """
+        sign = -1 if reverse else 1
+        updates = {
+            "transaction_count": F("transaction_count") + sign,
+            "total_tax_collected": F("total_tax_collected") + sign * cash_transaction.tax_amount,
+            "total_cash_received": F("total_cash_received") + sign * cash_transaction.amount_tendered,
+            "total_change_given": F("total_change_given") + sign * cash_transaction.change_given,
+            "total_commission": F("total_commission") + sign * cash_transaction.commission_amount,
+        }
+        if cash_transaction.requires_approval and not cash_transaction.approved_by_id:
+            updates["pending_approvals"] = F("pending_approvals") + sign
+        CashSession.objects.filter(pk=session.pk).update(**updates)
+
+    @staticmethod
+    def record_approval(session: CashSession) -> None:
+        """Remove an approved transaction from the pending approvals of its session"""
+        CashSession.objects.filter(pk=session.pk, pending_approvals__gt=0).update(
+            pending_approvals=F("pending_approvals") - 1
+        )
+
+    @staticmethod
+    def recompute_session_totals(sessions) -> Dict[int, Dict[str, Any]]:
+        """
+        Recompute the running totals from the transactions, in one grouped query
+
+        Args:
+            sessions: QuerySet of cash sessions
 
         Returns:
-            Dictionary with session totals
+            Dictionary of session id -> totals (sessions without transactions are omitted)
         """
-        # Get all non-voided transactions
-        transactions = session.transactions.filter(is_voided=False)
-
-        # Calculate totals
-        totals = transactions.aggregate(
-            total_transactions=Count("id"),
-            total_tax_collected=Sum("tax_amount"),
-            total_cash_received=Sum("amount_tendered"),
-            total_change_given=Sum("change_given"),
-            total_commission=Sum("commission_amount"),
+        rows = (
+            CashTransaction.objects.filter(session__in=sessions, is_voided=False)
+            .values("session_id")
+            .annotate(
+                transaction_count=Count("id"),
+                total_tax_collected=Sum("tax_amount"),
+                total_cash_received=Sum("amount_tendered"),
+                total_change_given=Sum("change_given"),
+                total_commission=Sum("commission_amount"),
+                pending_approvals=Count("id", filter=Q(requires_approval=True, approved_by__isnull=True)),
+            )
         )
+        return {row.pop("session_id"): row for row in rows}
 
-        # Calculate net cash (cash received - change given)
-        net_cash = (totals["total_cash_received"] or Decimal("0.00")) - (
-            totals["total_change_given"] or Decimal("0.00")
-        )
+    @staticmethod
+    def calculate_session_totals(session: CashSession) -> Dict[str, Any]:
+        """
+        Session totals (transactions, commission, etc.) from the running totals of the session row
 
-        # Calculate expected balance
-        expected_balance = session.opening_balance + net_cash
+        Args:
+            session: The cash session
 
-        # Count pending approvals
-        pending_approvals = transactions.filter(requires_approval=True, approved_by__isnull=True).count()
+        Returns:
+            Dictionary with session totals
+        """
+        # Calculate net cash (cash received - change given)
+        net_cash = session.total_cash_received - session.total_change_given
 
         return {
-            "transaction_count": totals["total_transactions"] or 0,
-            "total_tax_collected": totals["total_tax_collected"] or Decimal("0.00"),
-            "total_cash_received": totals["total_cash_received"] or Decimal("0.00"),
-            "total_change_given": totals["total_change_given"] or Decimal("0.00"),
+            "transaction_count": session.transaction_count,
+            "total_tax_collected": session.total_tax_collected,
+            "total_cash_received": session.total_cash_received,
+            "total_change_given": session.total_change_given,
             "net_cash": net_cash,
-            "total_commission": totals["total_commission"] or Decimal("0.00"),
-            "expected_balance": expected_balance,
+            "total_commission": session.total_commission,
+            "expected_balance": session.opening_balance + net_cash,
             "opening_balance": session.opening_balance,
-            "pending_approvals": pending_approvals,
+            "pending_approvals": session.pending_approvals,
         }
 
     @staticmethod
@@ -278,7 +337,7 @@ class CashSessionService:
                     else f"Approbation: {notes}"
                 )
             session.status = "reconciled"
-            session.save()
+            session.save(update_fields=["approved_by", "discrepancy_notes", "status"])
 
             # Create audit log
             audit_service = CashAuditService()
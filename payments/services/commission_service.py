@@ -9,6 +9,7 @@ from typing import Any, Dict, Optional, Tuple
 from django.contrib.auth.models import User
 from django.db import transaction
 from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
 from django.utils import timezone
 
 from payments.models import (
@@ -265,62 +266,40 @@ class CommissionService:
         )
 
         if group_by == "collector":
-            summary = (
-                commissions.values("collector__agent_id", "collector__full_name")
-                .annotate(
-                    total_commission=Sum("commission_amount"),
-                    total_tax=Sum("tax_amount"),
-                    transaction_count=Count("id"),
-                    pending_amount=Sum("commission_amount", filter=Q(payment_status="pending")),
-                    paid_amount=Sum("commission_amount", filter=Q(payment_status="paid")),
-                )
-                .order_by("-total_commission")
-            )
-
+            groups, order_by = commissions.values("collector__agent_id", "collector__full_name"), "-total_commission"
         elif group_by == "session":
-            summary = (
-                commissions.values("session__session_number", "session__collector__full_name", "session__opening_time")
-                .annotate(
-                    total_commission=Sum("commission_amount"),
-                    total_tax=Sum("tax_amount"),
-                    transaction_count=Count("id"),
-                )
-                .order_by("-session__opening_time")
+            groups = commissions.values(
+                "session__session_number", "session__collector__full_name", "session__opening_time"
             )
-
+            order_by = "-session__opening_time"
         else:  # group by date
-            summary = (
-                commissions.extra(select={"date": "DATE(created_at)"})
-                .values("date")
-                .annotate(
-                    total_commission=Sum("commission_amount"),
-                    total_tax=Sum("tax_amount"),
-                    transaction_count=Count("id"),
-                )
-                .order_by("-date")
-            )
-
-        # Calculate overall totals
-        overall_totals = commissions.aggregate(
-            total_commission=Sum("commission_amount"),
-            total_tax=Sum("tax_amount"),
-            transaction_count=Count("id"),
-            pending_amount=Sum("commission_amount", filter=Q(payment_status="pending")),
-            paid_amount=Sum("commission_amount", filter=Q(payment_status="paid")),
+            groups, order_by = commissions.annotate(date=TruncDate("created_at")).values("date"), "-date"
+
+        # One grouped query: the overall totals are the sum of the groups
+        summary = list(
+            groups.annotate(
+                total_commission=Sum("commission_amount"),
+                total_tax=Sum("tax_amount"),
+                transaction_count=Count("id"),
+                pending_amount=Sum("commission_amount", filter=Q(payment_status="pending")),
+                paid_amount=Sum("commission_amount", filter=Q(payment_status="paid")),
+            ).order_by(order_by)
         )
 
+        overall_totals = {
+            field: sum((row[field] or 0 for row in summary), Decimal("0.00"))
+            for field in ("total_commission", "total_tax", "pending_amount", "paid_amount")
+        }
+
         return {
             "period": {
                 "start_date": start_date,
                 "end_date": end_date,
             },
             "group_by": group_by,
-            "summary": list(summary),
+            "summary": summary,
             "totals": {
-                "total_commission": overall_totals["total_commission"] or Decimal("0.00"),
-                "total_tax": overall_totals["total_tax"] or Decimal("0.00"),
-                "transaction_count": overall_totals["transaction_count"] or 0,
-                "pending_amount": overall_totals["pending_amount"] or Decimal("0.00"),
-                "paid_amount": overall_totals["paid_amount"] or Decimal("0.00"),
+                **overall_totals,
+                "transaction_count": sum(row["transaction_count"] for row in summary),
             },
         }
@@ -10,6 +10,7 @@ Handles all interactions with MVola Merchant Pay API v1.0 including:
 
 import base64
 import logging
+import time
 import uuid
 from datetime import datetime
 from decimal import Decimal
@@ -19,6 +20,8 @@ from django.conf import settings
 from django.core.cache import cache
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from .constants import (
     API_VERSION,
@@ -43,6 +46,10 @@ from .constants import (
     HTTP_CREATED,
     HTTP_NOT_FOUND,
     HTTP_OK,
+    HTTP_POOL_MAXSIZE,
+    HTTP_RETRY_BACKOFF_FACTOR,
+    HTTP_RETRY_STATUS_FORCELIST,
+    HTTP_RETRY_TOTAL,
     HTTP_UNAUTHORIZED,
     MAX_DESCRIPTION_LENGTH,
     MERCHANT_PAY_ENDPOINT,
@@ -56,6 +63,9 @@ from .constants import (
     TOKEN_CACHE_KEY_PREFIX,
     TOKEN_CACHE_TTL,
     TOKEN_ENDPOINT,
+    TOKEN_LOCK_TIMEOUT,
+    TOKEN_REFRESH_MARGIN,
+    TOKEN_WAIT_INTERVAL,
     TRANSACTION_DETAILS_ENDPOINT,
     TRANSACTION_STATUS_ENDPOINT,
     USER_LANGUAGE_FR,
@@ -66,6 +76,33 @@ from .exceptions import MvolaAPIError, MvolaAuthenticationError
 logger = logging.getLogger("payments.mvola")
 
 
+def build_http_session() -> requests.Session:
+    """
+    Create the keep-alive HTTP session used for MVola API calls.
+
+    Connection errors are retried for every request (nothing was sent). Read errors and
+    502/503/504 responses are only retried for GET requests, so a payment is never initiated
+    twice.
+    """
+    retry = Retry(
+        total=HTTP_RETRY_TOTAL,
+        backoff_factor=HTTP_RETRY_BACKOFF_FACTOR,
+        status_forcelist=HTTP_RETRY_STATUS_FORCELIST,
+        allowed_methods=frozenset({"GET"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# Shared by all clients of the process; connections are opened lazily, so the session is
+# safe to create before worker processes fork
+http = build_http_session()
+
+
 class MvolaAPIClient:
     """
     MVola API client for handling all MVola Merchant Pay operations.
@@ -208,6 +245,12 @@ class MvolaAPIClient:
         """
         return f"{TOKEN_CACHE_KEY_PREFIX}_{self.consumer_key}"
 
+    def _get_token_refresh_key(self) -> str:
+        return f"{self._get_token_cache_key()}_refresh_at"
+
+    def _get_token_lock_key(self) -> str:
+        return f"{self._get_token_cache_key()}_lock"
+
     def get_access_token(self) -> str:
         """
         Get or refresh OAuth2 access token.
@@ -217,8 +260,10 @@ class MvolaAPIClient:
 
         Flow:
         1. Check if valid token exists in cache
-        2. If cache hit, return cached token
-        3. If cache miss, request new token from MVola
+        2. If cache hit, return cached token, queueing a background refresh when it
+           expires within TOKEN_REFRESH_MARGIN seconds
+        3. If cache miss, take the single-flight lock and request a new token from MVola;
+           workers that do not get the lock wait for the token of the lock holder
         4. Cache new token for 55 minutes
         5. Return new token
 
@@ -230,128 +275,97 @@ class MvolaAPIClient:
         """
         # Generate cache key
         cache_key = self._get_token_cache_key()
+        refresh_key = self._get_token_refresh_key()
 
         # Try to get token from cache
-        cached_token = cache.get(cache_key)
+        cached = cache.get_many([cache_key, refresh_key])
+        cached_token = cached.get(cache_key)
 
         if cached_token:
             logger.info(f"Access token retrieved from cache (key={cache_key})")
+            refresh_at = cached.get(refresh_key)
+            if refresh_at and time.time() >= refresh_at:
+                self._schedule_token_refresh()
             return cached_token
 
-        # Cache miss - request new token
-        logger.info("Access token not in cache, requesting new token from MVola")
-
-        try:
-            # Generate Basic Auth header
-            basic_auth = self._generate_basic_auth_header()
-
-            # Prepare token request
-            token_url = f"{self.base_url}{TOKEN_ENDPOINT}"
-            headers = {
-                HEADER_AUTHORIZATION: basic_auth,
-                HEADER_CONTENT_TYPE: "application/x-www-form-urlencoded",
-                HEADER_CACHE_CONTROL: CACHE_CONTROL_NO_CACHE,
-            }
-
-            payload = {
-                "grant_type": OAUTH_GRANT_TYPE,
-                "scope": OAUTH_SCOPE,
-            }
-
-            # Log token request attempt (with environment info)
-            env_type = "PRODUCTION" if "api.mvola.mg" in token_url else "SANDBOX"
-            logger.info(
-                f"Requesting OAuth2 token from {token_url} "
-                f"(environment={env_type}, grant_type={OAUTH_GRANT_TYPE}, scope={OAUTH_SCOPE})"
-            )
-
-            # Make token request
-            response = requests.post(token_url, headers=headers, data=payload, timeout=TIMEOUT_TOKEN_REQUEST)
+        # Cache miss - only one worker requests a new token, the others wait for it
+        lock_key = self._get_token_lock_key()
+        deadline = time.monotonic() + TOKEN_LOCK_TIMEOUT
+        while True:
+            if cache.add(lock_key, 1, TOKEN_LOCK_TIMEOUT):
+                try:
+                    return self._request_access_token()
+                finally:
+                    cache.delete(lock_key)
 
-            # Log response status
-            logger.info(f"Token request response: status_code={response.status_code}")
+            if time.monotonic() >= deadline:
+                error_msg = f"{ERROR_AUTH_FAILED} Token request timeout"
+                logger.error(f"Token generation failed: {error_msg} (waiting for another worker)")
+                raise MvolaAuthenticationError(error_msg)
 
-            # Check for authentication errors
-            if response.status_code == HTTP_UNAUTHORIZED:
-                # Try to extract error details from response
-                api_error_detail = None
-                try:
-                    error_response = response.json()
-                    api_error_detail = (
-                        error_response.get("error_description")
-                        or error_response.get("error")
-                        or error_response.get("message")
-                    )
-                except (ValueError, AttributeError):
-                    # If response is not JSON, try to get text
-                    api_error_detail = response.text.strip() if response.text else None
+            time.sleep(TOKEN_WAIT_INTERVAL)
+            cached_token = cache.get(cache_key)
+            if cached_token:
+                logger.info(f"Access token refreshed by another worker (key={cache_key})")
+                return cached_token
 
-                # Determine environment for better error message
-                is_sandbox = "devapi" in self.base_url or "sandbox" in self.base_url.lower()
-                is_production = "api.mvola.mg" in self.base_url and not is_sandbox
+    def _schedule_token_refresh(self):
+        """
+        Queue a background token refresh, unless another worker is already refreshing.
+        """
+        lock_key = self._get_token_lock_key()
+        if not cache.add(lock_key, 1, TOKEN_LOCK_TIMEOUT):
+            return
 
-                # Check if credentials are present (but don't log them)
-                has_credentials = bool(self.consumer_key and self.consumer_secret)
+        try:
+            from payments.tasks import refresh_mvola_access_token
 
-                # Build detailed error message
-                if not has_credentials:
-                    error_msg = (
-                        f"{ERROR_AUTH_FAILED} " f"Les identifiants (Consumer Key/Secret) sont manquants ou vides."
-                    )
-                else:
-                    env_info = ""
-                    if is_sandbox:
-                        env_info = " (Mode SANDBOX - utilisez les identifiants de test)"
-                    elif is_production:
-                        env_info = " (Mode PRODUCTION - utilisez les identifiants de production)"
-
-                    base_msg = (
-                        f"{ERROR_AUTH_FAILED} "
-                        f"Identifiants MVola invalides ou expirés{env_info}. "
-                        f"Vérifiez que: (1) Consumer Key et Consumer Secret sont corrects, "
-                        f"(2) Les identifiants correspondent à l'environnement configuré, "
-                        f"(3) Les identifiants n'ont pas expiré."
-                    )
+            refresh_mvola_access_token.delay()
+            logger.info("Access token expires soon, background refresh queued")
+        except Exception as e:
+            # The token is still valid; the next call will try again
+            cache.delete(lock_key)
+            logger.warning(f"Could not queue access token refresh: {str(e)}")
 
-                    # Append API error detail if available
-                    if api_error_detail:
-                        error_msg = f"{base_msg} Détail API: {api_error_detail}"
-                    else:
-                        error_msg = base_msg
+    def refresh_access_token(self) -> str:
+        """
+        Request a new token and release the lock taken by ``_schedule_token_refresh``.
 
-                logger.error(
-                    f"Token generation failed: {error_msg} "
-                    f"(base_url={self.base_url}, "
-                    f"consumer_key_present={bool(self.consumer_key)}, "
-                    f"consumer_secret_present={bool(self.consumer_secret)}, "
-                    f"api_error_detail={api_error_detail})"
-                )
-                raise MvolaAuthenticationError(error_msg)
+        Returns:
+            str: New bearer access token
+        """
+        try:
+            return self._request_access_token()
+        finally:
+            cache.delete(self._get_token_lock_key())
 
-            # Check for other errors
-            if response.status_code not in [HTTP_OK, HTTP_CREATED]:
-                error_msg = f"{ERROR_AUTH_FAILED} " f"HTTP {response.status_code}: {response.text}"
-                logger.error(f"Token generation failed: {error_msg}")
-                raise MvolaAuthenticationError(error_msg)
+    def _request_access_token(self) -> str:
+        """
+        Request a new OAuth2 access token from MVola and cache it.
 
-            # Parse response
-            try:
-                response_data = response.json()
-            except ValueError as e:
-                error_msg = f"{ERROR_AUTH_FAILED} Invalid JSON response from token endpoint"
-                logger.error(f"Token response parsing failed: {error_msg}, error={str(e)}")
-                raise MvolaAuthenticationError(error_msg)
+        Returns:
+            str: Bearer access token for API requests
 
-            # Extract access token
-            access_token = response_data.get("access_token")
+        Raises:
+            MvolaAuthenticationError: If token generation fails
+        """
+        cache_key = self._get_token_cache_key()
 
-            if not access_token:
-                error_msg = f"{ERROR_AUTH_FAILED} No access_token in response"
-                logger.error(f"Token extraction failed: {error_msg}")
-                raise MvolaAuthenticationError(error_msg)
+        logger.info("Requesting new access token from MVola")
 
-            # Cache the token for 55 minutes
-            cache.set(cache_key, access_token, TOKEN_CACHE_TTL)
+        try:
+            response = self._post_token_request()
+            self._check_token_response(response)
+            access_token = self._extract_access_token(response)
+
+            # Cache the token for 55 minutes, refreshing it in the background shortly before
+            cache.set_many(
+                {
+                    cache_key: access_token,
+                    self._get_token_refresh_key(): time.time() + TOKEN_CACHE_TTL - TOKEN_REFRESH_MARGIN,
+                },
+                TOKEN_CACHE_TTL,
+            )
 
             logger.info(f"Access token generated successfully and cached " f"(key={cache_key}, ttl={TOKEN_CACHE_TTL}s)")
 
@@ -376,6 +390,127 @@ class MvolaAPIClient:
             logger.error(f"Token generation failed: {error_msg}")
             raise MvolaAuthenticationError(error_msg)
 
+    def _post_token_request(self):
+        """
+        Send the client credentials request to the token endpoint.
+
+        Returns:
+            requests.Response: Raw token endpoint response (transient failures are retried by ``http``)
+        """
+        # Generate Basic Auth header
+        basic_auth = self._generate_basic_auth_header()
+
+        # Prepare token request
+        token_url = f"{self.base_url}{TOKEN_ENDPOINT}"
+        headers = {
+            HEADER_AUTHORIZATION: basic_auth,
+            HEADER_CONTENT_TYPE: "application/x-www-form-urlencoded",
+            HEADER_CACHE_CONTROL: CACHE_CONTROL_NO_CACHE,
+        }
+
+        payload = {
+            "grant_type": OAUTH_GRANT_TYPE,
+            "scope": OAUTH_SCOPE,
+        }
+
+        # Log token request attempt (with environment info)
+        env_type = "PRODUCTION" if "api.mvola.mg" in token_url else "SANDBOX"
+        logger.info(
+            f"Requesting OAuth2 token from {token_url} "
+            f"(environment={env_type}, grant_type={OAUTH_GRANT_TYPE}, scope={OAUTH_SCOPE})"
+        )
+
+        # Make token request
+        response = http.post(token_url, headers=headers, data=payload, timeout=TIMEOUT_TOKEN_REQUEST)
+
+        # Log response status
+        logger.info(f"Token request response: status_code={response.status_code}")
+        return response
+
+    def _check_token_response(self, response):
+        """
+        Raise ``MvolaAuthenticationError`` if the token endpoint rejected the request.
+        """
+        # Check for authentication errors
+        if response.status_code == HTTP_UNAUTHORIZED:
+            api_error_detail = self._token_error_detail(response)
+            error_msg = self._unauthorized_message(api_error_detail)
+            logger.error(
+                f"Token generation failed: {error_msg} "
+                f"(base_url={self.base_url}, "
+                f"consumer_key_present={bool(self.consumer_key)}, "
+                f"consumer_secret_present={bool(self.consumer_secret)}, "
+                f"api_error_detail={api_error_detail})"
+            )
+            raise MvolaAuthenticationError(error_msg)
+
+        # Check for other errors
+        if response.status_code not in [HTTP_OK, HTTP_CREATED]:
+            error_msg = f"{ERROR_AUTH_FAILED} " f"HTTP {response.status_code}: {response.text}"
+            logger.error(f"Token generation failed: {error_msg}")
+            raise MvolaAuthenticationError(error_msg)
+
+    @staticmethod
+    def _token_error_detail(response):
+        """Error detail returned by the token endpoint, if any"""
+        try:
+            error_response = response.json()
+            return (
+                error_response.get("error_description") or error_response.get("error") or error_response.get("message")
+            )
+        except (ValueError, AttributeError):
+            # If response is not JSON, try to get text
+            return response.text.strip() if response.text else None
+
+    def _unauthorized_message(self, api_error_detail):
+        """User-facing message for rejected credentials, with the configured environment"""
+        # Check if credentials are present (but don't log them)
+        if not (self.consumer_key and self.consumer_secret):
+            return f"{ERROR_AUTH_FAILED} " f"Les identifiants (Consumer Key/Secret) sont manquants ou vides."
+
+        # Determine environment for better error message
+        is_sandbox = "devapi" in self.base_url or "sandbox" in self.base_url.lower()
+        is_production = "api.mvola.mg" in self.base_url and not is_sandbox
+
+        env_info = ""
+        if is_sandbox:
+            env_info = " (Mode SANDBOX - utilisez les identifiants de test)"
+        elif is_production:
+            env_info = " (Mode PRODUCTION - utilisez les identifiants de production)"
+
+        base_msg = (
+            f"{ERROR_AUTH_FAILED} "
+            f"Identifiants MVola invalides ou expirés{env_info}. "
+            f"Vérifiez que: (1) Consumer Key et Consumer Secret sont corrects, "
+            f"(2) Les identifiants correspondent à l'environnement configuré, "
+            f"(3) Les identifiants n'ont pas expiré."
+        )
+
+        # Append API error detail if available
+        if api_error_detail:
+            return f"{base_msg} Détail API: {api_error_detail}"
+        return base_msg
+
+    @staticmethod
+    def _extract_access_token(response):
+        """Access token of a successful token endpoint response"""
+        # Parse response
+        try:
+            response_data = response.json()
+        except ValueError as e:
+            error_msg = f"{ERROR_AUTH_FAILED} Invalid JSON response from token endpoint"
+            logger.error(f"Token response parsing failed: {error_msg}, error={str(e)}")
+            raise MvolaAuthenticationError(error_msg)
+
+        # Extract access token
+        access_token = response_data.get("access_token")
+
+        if not access_token:
+            error_msg = f"{ERROR_AUTH_FAILED} No access_token in response"
+            logger.error(f"Token extraction failed: {error_msg}")
+            raise MvolaAuthenticationError(error_msg)
+        return access_token
+
     def initiate_payment(
         self, amount: Decimal, customer_msisdn: str, description: str, vehicle_plate: str, tax_year: int
     ) -> Dict[str, Any]:
@@ -467,7 +602,7 @@ class MvolaAPIClient:
             )
 
             # Make POST request to MVola merchant pay endpoint
-            response = requests.post(payment_url, headers=headers, json=payload, timeout=TIMEOUT_PAYMENT_REQUEST)
+            response = http.post(payment_url, headers=headers, json=payload, timeout=TIMEOUT_PAYMENT_REQUEST)
 
             # Log response status
             logger.info(
@@ -618,7 +753,7 @@ class MvolaAPIClient:
             )
 
             # Make GET request to transaction status endpoint
-            response = requests.get(status_url, headers=headers, timeout=TIMEOUT_STATUS_REQUEST)
+            response = http.get(status_url, headers=headers, timeout=TIMEOUT_STATUS_REQUEST)
 
             # Log response status
             logger.info(
@@ -781,7 +916,7 @@ class MvolaAPIClient:
             )
 
             # Make GET request to transaction details endpoint
-            response = requests.get(details_url, headers=headers, timeout=TIMEOUT_DETAILS_REQUEST)
+            response = http.get(details_url, headers=headers, timeout=TIMEOUT_DETAILS_REQUEST)
 
             # Log response status
             logger.info(
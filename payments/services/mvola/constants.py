@@ -38,12 +38,21 @@ OAUTH_SCOPE = "EXT_INT_MVOLA_SCOPE"
 TOKEN_CACHE_KEY_PREFIX = "mvola_access_token"
 TOKEN_CACHE_TTL = 3300  # 55 minutes (token expires in 60 minutes)
 TOKEN_EXPIRY_SECONDS = 3600  # 1 hour
+TOKEN_REFRESH_MARGIN = 300  # Refresh in the background 5 minutes before the cached token expires
+TOKEN_WAIT_INTERVAL = 0.1  # Poll interval while another worker fetches the token
 
 # Request Timeouts (in seconds)
 TIMEOUT_TOKEN_REQUEST = 10
 TIMEOUT_PAYMENT_REQUEST = 30
 TIMEOUT_STATUS_REQUEST = 15
 TIMEOUT_DETAILS_REQUEST = 15
+TOKEN_LOCK_TIMEOUT = TIMEOUT_TOKEN_REQUEST + 5  # Single-flight token lock lifetime
+
+# HTTP transport (shared keep-alive session)
+HTTP_POOL_MAXSIZE = 10  # Kept-alive connections per host
+HTTP_RETRY_TOTAL = 2  # Connection errors, plus read errors and 502/503/504 for GET requests
+HTTP_RETRY_BACKOFF_FACTOR = 0.5
+HTTP_RETRY_STATUS_FORCELIST = (502, 503, 504)
 
 # Retry Configuration
 MAX_RETRY_ATTEMPTS = 3
@@ -0,0 +1,130 @@
+"""
+User notifications for MVola payment status changes
+"""
+
+import logging
+
+from notifications.services import NotificationService
+
+logger = logging.getLogger(__name__)
+
+
+def get_user_language(user):
+    """Preferred language of the user (French by default)"""
+    profile = getattr(user, "profile", None)
+    return getattr(profile, "langue_preferee", None) or "fr"
+
+
+def notify_payment_completed(payment, transaction_reference=None, server_correlation_id=None, gateway_fees=None):
+    """Payment confirmation notification, with email"""
+    user = payment.vehicule_plaque.proprietaire
+    vehicle_plate = payment.vehicule_plaque.plaque_immatriculation
+    user_language = get_user_language(user)
+    reference = transaction_reference or server_correlation_id
+
+    if user_language == "mg":
+        titre = "Fandoavam-bola MVola vita soa aman-tsara"
+        contenu = (
+            f"Ny fandoavam-bola MVola ho an'ny fiara {vehicle_plate} "
+            f"dia vita soa aman-tsara. "
+            f"Vola naloa: {payment.montant_paye_ariary:,.0f} Ar. "
+            f"Référence: {reference}"
+        )
+    else:
+        titre = "Paiement MVola confirmé"
+        contenu = (
+            f"Votre paiement MVola pour le véhicule {vehicle_plate} "
+            f"a été confirmé avec succès. "
+            f"Montant payé: {payment.montant_paye_ariary:,.0f} Ar. "
+            f"Référence: {reference}"
+        )
+
+    NotificationService.create_notification(
+        user=user,
+        type_notification="system",
+        titre=titre,
+        contenu=contenu,
+        langue=user_language,
+        metadata={
+            "event": "mvola_payment_completed",
+            "payment_id": str(payment.id),
+            "amount": str(payment.montant_paye_ariary),
+            "server_correlation_id": server_correlation_id,
+            "transaction_reference": transaction_reference,
+            "gateway_fees": str(gateway_fees),
+        },
+        send_email=True,
+    )
+    logger.info(f"Payment confirmation notification created: payment_id={payment.id}, user={user.username}")
+
+
+def notify_payment_failed(payment, transaction_reference=None, server_correlation_id=None, transaction_status=None):
+    """Payment failure notification, with email"""
+    user = payment.vehicule_plaque.proprietaire
+    vehicle_plate = payment.vehicule_plaque.plaque_immatriculation
+    user_language = get_user_language(user)
+    reference = transaction_reference or server_correlation_id
+
+    if user_language == "mg":
+        titre = "Tsy nahomby ny fandoavam-bola MVola"
+        contenu = (
+            f"Tsy nahomby ny fandoavam-bola MVola ho an'ny fiara {vehicle_plate}. "
+            f"Andramo indray azafady. "
+            f"Référence: {reference}"
+        )
+    else:
+        titre = "Échec du paiement MVola"
+        contenu = (
+            f"Le paiement MVola pour le véhicule {vehicle_plate} a échoué. "
+            f"Veuillez réessayer. "
+            f"Référence: {reference}"
+        )
+
+    NotificationService.create_notification(
+        user=user,
+        type_notification="system",
+        titre=titre,
+        contenu=contenu,
+        langue=user_language,
+        metadata={
+            "event": "mvola_payment_failed",
+            "payment_id": str(payment.id),
+            "server_correlation_id": server_correlation_id,
+            "transaction_reference": transaction_reference,
+            "transaction_status": transaction_status,
+        },
+        send_email=True,
+    )
+    logger.info(f"Payment failed notification created: payment_id={payment.id}, user={user.username}")
+
+
+def notify_qr_generated(payment, qr_code):
+    """Notification that the QR code of a paid vehicle tax was generated"""
+    user = payment.vehicule_plaque.proprietaire
+    vehicle_plate = payment.vehicule_plaque.plaque_immatriculation
+    user_language = get_user_language(user)
+
+    if user_language == "mg":
+        titre_qr = "QR code noforonina"
+        contenu_qr = (
+            f"Ny QR code ho an'ny fiara {vehicle_plate} ({payment.annee_fiscale}) dia noforonina soa aman-tsara."
+        )
+    else:
+        titre_qr = "QR code généré"
+        contenu_qr = f"Le QR code pour le véhicule {vehicle_plate} ({payment.annee_fiscale}) a été généré avec succès."
+
+    NotificationService.create_notification(
+        user=user,
+        type_notification="system",
+        titre=titre_qr,
+        contenu=contenu_qr,
+        langue=user_language,
+        metadata={
+            "event": "qr_generated",
+            "qr_code_id": str(qr_code.id),
+            "vehicle_plaque": vehicle_plate,
+            "tax_year": payment.annee_fiscale,
+            "payment_id": str(payment.id),
+        },
+    )
+    logger.info(f"QR code notification created: qr_code_id={qr_code.id}")
@@ -0,0 +1,218 @@
+"""
+Transactional outbox for payment side effects
+
+Payment handlers (cash, MVola callback, Stripe webhook) only update the payment and record a
+``PaymentOutboxEvent`` in the same transaction, then return. The relay
+(``payments.tasks.relay_payment_outbox``) runs the side effects of the event afterwards:
+QR code, user notification, receipt pre-rendering and webhook fan-out. It is triggered when
+the transaction commits and swept every minute by Celery beat, so events left behind by a
+dead worker or an unavailable broker are picked up again.
+
+Each effect is recorded in ``completed_effects`` once it succeeded, so a retry only runs the
+effects that failed. Failed events are retried with exponential backoff up to
+``PAYMENT_OUTBOX_MAX_ATTEMPTS`` times.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from payments.models import PaymentOutboxEvent
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_COMPLETED = "payment.completed"
+PAYMENT_FAILED = "payment.failed"
+
+
+def _qr_code_effect(event):
+    from payments.services.payment_success_service import PaymentSuccessService
+
+    qr_code, created = PaymentSuccessService.ensure_qr_code(event.payment)
+    if created and event.payload.get("notification") == "mvola":
+        from payments.services.mvola.notifications import notify_qr_generated
+
+        notify_qr_generated(event.payment, qr_code)
+
+
+def _notification_effect(event):
+    kind = event.payload.get("notification")
+    if not kind:
+        return
+
+    if kind == "mvola":
+        from payments.services.mvola import notifications
+
+        if event.event_type == PAYMENT_COMPLETED:
+            notifications.notify_payment_completed(
+                event.payment,
+                transaction_reference=event.payload.get("transaction_reference"),
+                server_correlation_id=event.payload.get("server_correlation_id"),
+                gateway_fees=event.payload.get("gateway_fees"),
+            )
+        else:
+            notifications.notify_payment_failed(
+                event.payment,
+                transaction_reference=event.payload.get("transaction_reference"),
+                server_correlation_id=event.payload.get("server_correlation_id"),
+                transaction_status=event.payload.get("transaction_status"),
+            )
+    elif event.event_type == PAYMENT_COMPLETED:
+        from payments.services.payment_success_service import PaymentSuccessService
+
+        PaymentSuccessService.send_payment_notification(event.payment)
+
+
+def _artifacts_effect(event):
+    from payments.services.artifact_service import PaymentArtifactService
+
+    if event.payment.statut == "PAYE":
+        PaymentArtifactService.prerender_payment(event.payment)
+
+
+def _webhook_effect(event):
+    from api.utils.webhooks import dispatch_webhook_event
+
+    payment = event.payment
+    dispatch_webhook_event(
+        event.event_type,
+        {
+            "event": event.event_type,
+            "payment_id": str(payment.id),
+            "vehicle": payment.vehicule_plaque.plaque_immatriculation,
+            "tax_year": payment.annee_fiscale,
+            "status": payment.statut,
+            "amount": str(payment.montant_paye_ariary or payment.montant_du_ariary),
+            "payment_method": payment.methode_paiement,
+            "paid_at": payment.date_paiement.isoformat() if payment.date_paiement else None,
+        },
+    )
+
+
+# Side effects of each event type, in the order they run
+EFFECTS = {
+    PAYMENT_COMPLETED: [
+        ("qr_code", _qr_code_effect),
+        ("notification", _notification_effect),
+        ("artifacts", _artifacts_effect),
+        ("webhook", _webhook_effect),
+    ],
+    PAYMENT_FAILED: [
+        ("notification", _notification_effect),
+        ("webhook", _webhook_effect),
+    ],
+}
+
+
+class PaymentOutbox:
+    """
+    Record payment events and run their side effects
+    """
+
+    @staticmethod
+    def enqueue(payment, event_type, **payload):
+        """
+        Record ``event_type`` for ``payment`` in the current transaction.
+
+        Only one event per payment and type is kept: repeated callbacks for the same payment
+        return the existing event. The relay is triggered once the transaction commits.
+        """
+        event, created = PaymentOutboxEvent.objects.get_or_create(
+            payment=payment, event_type=event_type, defaults={"payload": payload}
+        )
+        if created:
+            from payments.tasks import relay_payment_outbox
+
+            transaction.on_commit(lambda: relay_payment_outbox.delay(), robust=True)
+        else:
+            logger.info(f"Outbox event already recorded: payment_id={payment.id}, event_type={event_type}")
+        return event
+
+    @staticmethod
+    def claim(batch_size=None):
+        """
+        Lock a batch of due events for this worker.
+
+        Claimed events are leased for ``PAYMENT_OUTBOX_LEASE_SECONDS``: if the worker dies
+        before finishing them, they become due again when the lease expires.
+        """
+        batch_size = batch_size or getattr(settings, "PAYMENT_OUTBOX_BATCH_SIZE", 50)
+        now = timezone.now()
+        lease = timedelta(seconds=getattr(settings, "PAYMENT_OUTBOX_LEASE_SECONDS", 300))
+
+        with transaction.atomic():
+            ids = list(
+                PaymentOutboxEvent.objects.select_for_update(skip_locked=True)
+                .filter(Q(status="PENDING") | Q(status="PROCESSING"), next_attempt_at__lte=now)
+                .order_by("next_attempt_at", "id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if ids:
+                PaymentOutboxEvent.objects.filter(id__in=ids).update(
+                    status="PROCESSING", attempts=F("attempts") + 1, next_attempt_at=now + lease
+                )
+
+        return list(
+            PaymentOutboxEvent.objects.select_related(
+                "payment",
+                "payment__vehicule_plaque",
+                "payment__vehicule_plaque__proprietaire",
+                "payment__vehicule_plaque__type_vehicule",
+                "payment__collected_by",
+            ).filter(id__in=ids)
+        )
+
+    @staticmethod
+    def relay(batch_size=None):
+        """
+        Process one batch of due events; returns the number of events completed
+        """
+        done = 0
+        for event in PaymentOutbox.claim(batch_size):
+            if PaymentOutbox.process(event):
+                done += 1
+        return done
+
+    @staticmethod
+    def process(event):
+        """
+        Run the side effects of a claimed event that have not succeeded yet.
+
+        Returns True once every effect succeeded.
+        """
+        completed = list(event.completed_effects)
+        for name, effect in EFFECTS.get(event.event_type, []):
+            if name in completed:
+                continue
+            try:
+                effect(event)
+            except Exception as e:
+                logger.exception(f"Payment outbox effect failed: event_id={event.id}, effect={name}, error={str(e)}")
+                PaymentOutbox._schedule_retry(event, completed, f"{name}: {e}")
+                return False
+            completed.append(name)
+            # Persist progress after each effect so a crash does not repeat it
+            PaymentOutboxEvent.objects.filter(id=event.id).update(completed_effects=completed)
+
+        event.completed_effects = completed
+        event.status = "DONE"
+        event.processed_at = timezone.now()
+        event.last_error = ""
+        event.save(update_fields=["completed_effects", "status", "processed_at", "last_error"])
+        return True
+
+    @staticmethod
+    def _schedule_retry(event, completed, error):
+        event.completed_effects = completed
+        event.last_error = error[:2000]
+        if event.attempts >= getattr(settings, "PAYMENT_OUTBOX_MAX_ATTEMPTS", 8):
+            event.status = "FAILED"
+            logger.error(f"Payment outbox event failed permanently: event_id={event.id}, attempts={event.attempts}")
+        else:
+            event.status = "PENDING"
+            event.next_attempt_at = timezone.now() + timedelta(seconds=min(30 * 2 ** (event.attempts - 1), 3600))
+        event.save(update_fields=["completed_effects", "last_error", "status", "next_attempt_at"])
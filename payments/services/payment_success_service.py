@@ -8,6 +8,7 @@ import logging
 from datetime import timedelta
 from typing import Optional, Tuple
 
+from django.db import transaction
 from django.utils import timezone
 
 from payments.models import PaiementTaxe, QRCode
@@ -23,58 +24,42 @@ class PaymentSuccessService:
 
     @staticmethod
     def handle_payment_success(
-        payment: PaiementTaxe, send_notification: bool = True
+        payment: PaiementTaxe, send_notification: bool = True, **event_payload
     ) -> Tuple[Optional[QRCode], Optional[str]]:
         """
-        Handle payment success - generate QR code and send notifications
+        Handle payment success - generate QR code and queue the other side effects
         This is called by all payment methods (cash, MVola, Stripe) after payment is confirmed
 
+        The payment update and its ``payment.completed`` outbox event are written in one
+        transaction; notifications, receipts and webhooks are run by the outbox relay.
+
         Args:
             payment: The PaiementTaxe instance that was successfully paid
             send_notification: Whether to send notification to user (default: True)
+            event_payload: Extra data stored on the outbox event (e.g. MVola references)
 
         Returns:
             Tuple of (QRCode instance, error_message)
         """
         try:
-            # Ensure payment is marked as paid
-            if payment.statut != "PAYE" and payment.statut != "EXONERE":
-                payment.statut = "PAYE"
-                if not payment.date_paiement:
-                    payment.date_paiement = timezone.now()
-                if not payment.montant_paye_ariary:
-                    payment.montant_paye_ariary = payment.montant_du_ariary
-                payment.save(update_fields=["statut", "date_paiement", "montant_paye_ariary"])
-
-            # Generate QR code using get_or_create to avoid duplicates
-            # This ensures the same QR code is used for the same vehicle and tax year
-            # regardless of payment method (cash, MVola, Stripe)
-            qr_code, created = QRCode.objects.get_or_create(
-                vehicule_plaque=payment.vehicule_plaque,
-                annee_fiscale=payment.annee_fiscale,
-                defaults={"date_expiration": timezone.now() + timedelta(days=365), "est_actif": True},
-            )
+            with transaction.atomic():
+                # Ensure payment is marked as paid
+                if payment.statut != "PAYE" and payment.statut != "EXONERE":
+                    payment.statut = "PAYE"
+                    if not payment.date_paiement:
+                        payment.date_paiement = timezone.now()
+                    if not payment.montant_paye_ariary:
+                        payment.montant_paye_ariary = payment.montant_du_ariary
+                    payment.save(update_fields=["statut", "date_paiement", "montant_paye_ariary"])
+
+                # Callers hand the QR code to the user right away, so it is created inline
+                qr_code, created = PaymentSuccessService.ensure_qr_code(payment)
 
-            # If QR code already existed but was expired, reactivate it
-            if not created:
-                if not qr_code.est_actif or (qr_code.date_expiration and qr_code.date_expiration < timezone.now()):
-                    qr_code.est_actif = True
-                    qr_code.date_expiration = timezone.now() + timedelta(days=365)
-                    qr_code.save(update_fields=["est_actif", "date_expiration"])
-                    logger.info(f"Reactivated expired QR code for payment: {payment.id}")
-
-            if created:
-                logger.info(
-                    f"QR code generated for payment: payment_id={payment.id}, qr_code_id={qr_code.id}, token={qr_code.token}"
-                )
-            else:
-                logger.info(
-                    f"QR code already exists for payment: payment_id={payment.id}, qr_code_id={qr_code.id}, token={qr_code.token}"
-                )
-
-            # Send notification if requested
-            if send_notification:
-                PaymentSuccessService._send_payment_notification(payment, qr_code)
+                # Notification, receipt pre-rendering and webhooks run from the outbox once committed
+                from .outbox_service import PAYMENT_COMPLETED, PaymentOutbox
+
+                payload = {"notification": "default" if send_notification else None, **event_payload}
+                PaymentOutbox.enqueue(payment, PAYMENT_COMPLETED, **payload)
 
             return qr_code, None
 
@@ -84,36 +69,68 @@ class PaymentSuccessService:
             return None, error_msg
 
     @staticmethod
-    def _send_payment_notification(payment: PaiementTaxe, qr_code: QRCode):
+    def ensure_qr_code(payment: PaiementTaxe) -> Tuple[QRCode, bool]:
+        """
+        Get or create the active QR code of the payment's vehicle and tax year
+
+        Returns:
+            Tuple of (QRCode instance, created)
+        """
+        # Generate QR code using get_or_create to avoid duplicates
+        # This ensures the same QR code is used for the same vehicle and tax year
+        # regardless of payment method (cash, MVola, Stripe)
+        qr_code, created = QRCode.objects.get_or_create(
+            vehicule_plaque=payment.vehicule_plaque,
+            annee_fiscale=payment.annee_fiscale,
+            defaults={"date_expiration": timezone.now() + timedelta(days=365), "est_actif": True},
+        )
+
+        # If QR code already existed but was expired, reactivate it
+        if not created:
+            if not qr_code.est_actif or (qr_code.date_expiration and qr_code.date_expiration < timezone.now()):
+                qr_code.est_actif = True
+                qr_code.date_expiration = timezone.now() + timedelta(days=365)
+                qr_code.save(update_fields=["est_actif", "date_expiration"])
+                logger.info(f"Reactivated expired QR code for payment: {payment.id}")
+
+        if created:
+            logger.info(
+                f"QR code generated for payment: payment_id={payment.id}, qr_code_id={qr_code.id}, token={qr_code.token}"
+            )
+        else:
+            logger.info(
+                f"QR code already exists for payment: payment_id={payment.id}, qr_code_id={qr_code.id}, token={qr_code.token}"
+            )
+        return qr_code, created
+
+    @staticmethod
+    def send_payment_notification(payment: PaiementTaxe):
         """
         Send notification to user about successful payment
+
+        Errors are raised so the outbox relay retries the notification.
         """
-        try:
-            from notifications.services import NotificationService
-
-            owner = payment.vehicule_plaque.proprietaire
-            langue = "fr"
-            if hasattr(owner, "profile"):
-                langue = owner.profile.langue_preferee
-
-            # Use appropriate notification based on payment method
-            if payment.methode_paiement == "cash":
-                NotificationService.create_cash_payment_notification(
-                    user=owner, payment=payment, collector=payment.collected_by, langue=langue
-                )
-            elif payment.methode_paiement == "mvola":
-                NotificationService.create_payment_confirmation_notification(user=owner, payment=payment, langue=langue)
-            elif payment.methode_paiement == "carte_bancaire":
-                NotificationService.create_payment_confirmation_notification(user=owner, payment=payment, langue=langue)
-            else:
-                # Generic payment confirmation
-                NotificationService.create_payment_confirmation_notification(user=owner, payment=payment, langue=langue)
-
-            logger.info(f"Payment notification sent: payment_id={payment.id}")
+        from notifications.services import NotificationService
 
-        except Exception as e:
-            # Log error but don't fail the payment success handling
-            logger.error(f"Error sending payment notification: {str(e)} - payment_id={payment.id}")
+        owner = payment.vehicule_plaque.proprietaire
+        langue = "fr"
+        if hasattr(owner, "profile"):
+            langue = owner.profile.langue_preferee
+
+        # Use appropriate notification based on payment method
+        if payment.methode_paiement == "cash":
+            NotificationService.create_cash_payment_notification(
+                user=owner, payment=payment, collector=payment.collected_by, langue=langue
+            )
+        elif payment.methode_paiement == "mvola":
+            NotificationService.create_payment_confirmation_notification(user=owner, payment=payment, langue=langue)
+        elif payment.methode_paiement == "carte_bancaire":
+            NotificationService.create_payment_confirmation_notification(user=owner, payment=payment, langue=langue)
+        else:
+            # Generic payment confirmation
+            NotificationService.create_payment_confirmation_notification(user=owner, payment=payment, langue=langue)
+
+        logger.info(f"Payment notification sent: payment_id={payment.id}")
 
     @staticmethod
     def get_qr_verification_url(qr_code: QRCode, request=None) -> str:
@@ -10,8 +10,10 @@ from typing import Any, Dict, List, Optional, Tuple
 from django.contrib.auth.models import User
 from django.db import transaction
 from django.db.models import Avg, Count, Q, Sum
+from django.db.models.functions import TruncDate
 from django.utils import timezone
 
+from core.models import ReportSnapshot
 from payments.models import (
     AgentPartenaireProfile,
     CashSession,
@@ -22,10 +24,126 @@ from payments.models import (
 from .cash_audit_service import CashAuditService
 from .cash_session_service import CashSessionService
 
+SNAPSHOT_KIND = "cash_reconciliation_day"
+# Amounts of a day summary (stored as strings in snapshots)
+DECIMAL_TOTALS = (
+    "total_opening_balance",
+    "total_expected_balance",
+    "total_closing_balance",
+    "total_discrepancy",
+    "total_tax_collected",
+    "total_commission",
+)
+
 
 class ReconciliationService:
     """Service for cash reconciliation"""
 
+    @staticmethod
+    def _summarize_days(start_date: datetime.date, end_date: datetime.date) -> Dict[datetime.date, Dict[str, Any]]:
+        """
+        Totals and status counts of each day with sessions, in one grouped query over the range
+
+        Session amounts are the running totals of the session rows, so no transaction is read.
+        """
+        start_datetime = timezone.make_aware(datetime.combine(start_date, datetime.min.time()))
+        end_datetime = timezone.make_aware(datetime.combine(end_date, datetime.max.time()))
+        counted = Q(status__in=["closed", "reconciled"])
+
+        rows = (
+            CashSession.objects.filter(opening_time__gte=start_datetime, opening_time__lte=end_datetime)
+            .annotate(day=TruncDate("opening_time"))
+            .values("day")
+            .annotate(
+                session_count=Count("id"),
+                total_opening_balance=Sum("opening_balance"),
+                total_cash_received=Sum("total_cash_received"),
+                total_change_given=Sum("total_change_given"),
+                total_closing_balance=Sum("closing_balance", filter=counted),
+                total_discrepancy=Sum("discrepancy_amount", filter=counted),
+                total_tax_collected=Sum("total_tax_collected"),
+                total_commission=Sum("total_commission"),
+                total_transactions=Sum("transaction_count"),
+                open_sessions=Count("id", filter=Q(status="open")),
+                closed_sessions=Count("id", filter=Q(status="closed")),
+                reconciled_sessions=Count("id", filter=Q(status="reconciled")),
+            )
+        )
+
+        summaries = {}
+        for row in rows:
+            opening = row["total_opening_balance"] or Decimal("0.00")
+            net_cash = (row["total_cash_received"] or Decimal("0.00")) - (row["total_change_given"] or Decimal("0.00"))
+            summaries[row["day"]] = {
+                "totals": {
+                    "session_count": row["session_count"],
+                    "total_opening_balance": opening,
+                    "total_expected_balance": opening + net_cash,
+                    "total_closing_balance": row["total_closing_balance"] or Decimal("0.00"),
+                    "total_discrepancy": row["total_discrepancy"] or Decimal("0.00"),
+                    "total_tax_collected": row["total_tax_collected"] or Decimal("0.00"),
+                    "total_commission": row["total_commission"] or Decimal("0.00"),
+                    "total_transactions": row["total_transactions"] or 0,
+                },
+                "status": {
+                    "open_sessions": row["open_sessions"],
+                    "closed_sessions": row["closed_sessions"],
+                    "reconciled_sessions": row["reconciled_sessions"],
+                },
+            }
+        return summaries
+
+    @staticmethod
+    def _empty_day() -> Dict[str, Any]:
+        return {
+            "totals": {
+                "session_count": 0,
+                **{field: Decimal("0.00") for field in DECIMAL_TOTALS},
+                "total_transactions": 0,
+            },
+            "status": {"open_sessions": 0, "closed_sessions": 0, "reconciled_sessions": 0},
+        }
+
+    @staticmethod
+    def _is_reconciled(summary: Dict[str, Any]) -> bool:
+        return (
+            summary["status"]["open_sessions"] == 0
+            and summary["status"]["closed_sessions"] == 0
+            and summary["totals"]["session_count"] > 0
+        )
+
+    @staticmethod
+    def _day_summaries(start_date: datetime.date, end_date: datetime.date) -> Dict[datetime.date, Dict[str, Any]]:
+        """
+        Totals and status counts of every day of the range
+
+        Fully reconciled past days can no longer change: their summary is persisted as a
+        ReportSnapshot and read back from it. The other days are computed with one grouped query.
+        """
+        today = timezone.localdate()
+        summaries = {}
+        if start_date < today:
+            for snapshot in ReportSnapshot.objects.filter(
+                kind=SNAPSHOT_KIND, report_date__gte=start_date, report_date__lte=end_date
+            ):
+                totals = snapshot.data["totals"]
+                totals.update({field: Decimal(totals[field]) for field in DECIMAL_TOTALS})
+                summaries[snapshot.report_date] = snapshot.data
+
+        days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+        missing = [day for day in days if day not in summaries]
+        if not missing:
+            return summaries
+
+        computed = ReconciliationService._summarize_days(missing[0], missing[-1])
+        snapshots = []
+        for day in missing:
+            summaries[day] = computed.get(day) or ReconciliationService._empty_day()
+            if day < today and ReconciliationService._is_reconciled(summaries[day]):
+                snapshots.append(ReportSnapshot(kind=SNAPSHOT_KIND, report_date=day, data=summaries[day]))
+        ReportSnapshot.objects.bulk_create(snapshots, ignore_conflicts=True)
+        return summaries
+
     @staticmethod
     def generate_daily_report(date: datetime.date) -> Dict[str, Any]:
         """
@@ -41,26 +159,17 @@ class ReconciliationService:
         start_datetime = timezone.make_aware(datetime.combine(date, datetime.min.time()))
         end_datetime = timezone.make_aware(datetime.combine(date, datetime.max.time()))
 
-        sessions = CashSession.objects.filter(opening_time__gte=start_datetime, opening_time__lte=end_datetime)
+        sessions = CashSession.objects.filter(
+            opening_time__gte=start_datetime, opening_time__lte=end_datetime
+        ).select_related("collector")
 
-        # Calculate totals across all sessions
         session_data = []
-        total_opening_balance = Decimal("0.00")
-        total_expected_balance = Decimal("0.00")
-        total_closing_balance = Decimal("0.00")
-        total_discrepancy = Decimal("0.00")
-        total_tax_collected = Decimal("0.00")
-        total_commission = Decimal("0.00")
-        total_transactions = 0
-
         for session in sessions:
-            session_totals = CashSessionService.calculate_session_totals(session)
-
             session_info = {
                 "session": session,
                 "collector": session.collector,
                 "status": session.get_status_display(),
-                **session_totals,
+                **CashSessionService.calculate_session_totals(session),
             }
 
             if session.status in ["closed", "reconciled"]:
@@ -70,35 +179,13 @@ class ReconciliationService:
                         "discrepancy_amount": session.discrepancy_amount,
                     }
                 )
-                total_closing_balance += session.closing_balance or Decimal("0.00")
-                total_discrepancy += session.discrepancy_amount or Decimal("0.00")
 
             session_data.append(session_info)
 
-            total_opening_balance += session.opening_balance
-            total_expected_balance += session_totals["expected_balance"]
-            total_tax_collected += session_totals["total_tax_collected"]
-            total_commission += session_totals["total_commission"]
-            total_transactions += session_totals["transaction_count"]
-
         return {
             "date": date,
             "sessions": session_data,
-            "totals": {
-                "session_count": sessions.count(),
-                "total_opening_balance": total_opening_balance,
-                "total_expected_balance": total_expected_balance,
-                "total_closing_balance": total_closing_balance,
-                "total_discrepancy": total_discrepancy,
-                "total_tax_collected": total_tax_collected,
-                "total_commission": total_commission,
-                "total_transactions": total_transactions,
-            },
-            "status": {
-                "open_sessions": sessions.filter(status="open").count(),
-                "closed_sessions": sessions.filter(status="closed").count(),
-                "reconciled_sessions": sessions.filter(status="reconciled").count(),
-            },
+            **ReconciliationService._day_summaries(date, date)[date],
         }
 
     @staticmethod
@@ -153,14 +240,9 @@ class ReconciliationService:
             start_datetime = timezone.make_aware(datetime.combine(date, datetime.min.time()))
             end_datetime = timezone.make_aware(datetime.combine(date, datetime.max.time()))
 
-            sessions_to_reconcile = CashSession.objects.filter(
+            sessions_reconciled = CashSession.objects.filter(
                 opening_time__gte=start_datetime, opening_time__lte=end_datetime, status="closed"
-            )
-
-            for session in sessions_to_reconcile:
-                session.status = "reconciled"
-                session.approved_by = admin_user
-                session.save(update_fields=["status", "approved_by"])
+            ).update(status="reconciled", approved_by=admin_user)
 
             # Create audit log
             audit_service = CashAuditService()
@@ -174,7 +256,7 @@ class ReconciliationService:
                     "discrepancy": str(discrepancy),
                     "requires_approval": requires_approval,
                     "notes": notes,
-                    "sessions_reconciled": sessions_to_reconcile.count(),
+                    "sessions_reconciled": sessions_reconciled,
                 },
                 request=request,
             )
@@ -186,7 +268,7 @@ class ReconciliationService:
                 "discrepancy": discrepancy,
                 "requires_approval": requires_approval,
                 "notes": notes,
-                "sessions_reconciled": sessions_to_reconcile.count(),
+                "sessions_reconciled": sessions_reconciled,
                 "daily_report": daily_report,
             }
 
@@ -299,22 +381,11 @@ class ReconciliationService:
             List of daily reconciliation summaries
         """
         history = []
-        current_date = start_date
-
-        while current_date <= end_date:
-            daily_report = ReconciliationService.generate_daily_report(current_date)
-
-            # Check if day is fully reconciled
-            is_reconciled = (
-                daily_report["status"]["open_sessions"] == 0
-                and daily_report["status"]["closed_sessions"] == 0
-                and daily_report["totals"]["session_count"] > 0
-            )
-
+        for current_date, daily_report in sorted(ReconciliationService._day_summaries(start_date, end_date).items()):
             history.append(
                 {
                     "date": current_date,
-                    "is_reconciled": is_reconciled,
+                    "is_reconciled": ReconciliationService._is_reconciled(daily_report),
                     "session_count": daily_report["totals"]["session_count"],
                     "total_tax_collected": daily_report["totals"]["total_tax_collected"],
                     "total_commission": daily_report["totals"]["total_commission"],
@@ -324,8 +395,6 @@ class ReconciliationService:
                 }
             )
 
-            current_date += timedelta(days=1)
-
         return history
 
     @staticmethod
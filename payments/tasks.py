@@ -0,0 +1,55 @@
+import logging
+
+from celery import shared_task
+
+from payments.models import CashReceipt, PaiementTaxe
+from payments.services.artifact_service import PaymentArtifactService
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def prerender_payment_artifacts(payment_id):
+    """
+    Render the receipt and QR code artifacts of a paid payment ahead of the first download
+    """
+    payment = (
+        PaiementTaxe.objects.select_related("vehicule_plaque", "vehicule_plaque__type_vehicule")
+        .filter(id=payment_id, statut="PAYE")
+        .first()
+    )
+    if payment is None:
+        return 0
+    return len(PaymentArtifactService.prerender_payment(payment))
+
+
+@shared_task
+def prerender_cash_receipt(receipt_id):
+    """
+    Render the PDF of a cash receipt ahead of the first download
+    """
+    receipt = CashReceipt.objects.filter(id=receipt_id).first()
+    if receipt is None:
+        return 0
+    PaymentArtifactService.cash_receipt(receipt)
+    return 1
+
+
+@shared_task
+def relay_payment_outbox(batch_size=None):
+    """
+    Run the side effects of due payment outbox events
+    """
+    from payments.services.outbox_service import PaymentOutbox
+
+    return PaymentOutbox.relay(batch_size)
+
+
+@shared_task
+def refresh_mvola_access_token():
+    """
+    Refresh the cached MVola access token before it expires (queued by the API client)
+    """
+    from payments.services.mvola.api_client import MvolaAPIClient
+
+    MvolaAPIClient().refresh_access_token()
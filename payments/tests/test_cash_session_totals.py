@@ -0,0 +1,198 @@
+"""
+Tests for the running totals of cash sessions
+"""
+
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import ReportSnapshot
+from payments.models import AgentPartenaireProfile, CashSession, CashSystemConfig
+from payments.services.cash_payment_service import CashPaymentService
+from payments.services.cash_session_service import CashSessionService
+from payments.services.commission_service import CommissionService
+from payments.services.reconciliation_service import ReconciliationService
+from vehicles.models import VehicleType, Vehicule
+
+
+@mock.patch("payments.services.cash_payment_service.TaxCalculationService.calculate_tax")
+class CashSessionTotalsTestCase(TestCase):
+    """Test that session totals follow payments, approvals and voids"""
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.override = override_settings(MEDIA_ROOT=self.media.name, SITE_URL="http://testserver")
+        self.override.enable()
+
+        self.admin = User.objects.create_user(username="admin", password="testpass123", is_staff=True)
+        self.agent = AgentPartenaireProfile.objects.create(
+            user=User.objects.create_user(username="agent1", password="testpass123"),
+            agent_id="AG001",
+            full_name="Test Agent",
+            phone_number="0340000000",
+            collection_location="Test Location",
+            is_active=True,
+            created_by=self.admin,
+        )
+        config = CashSystemConfig.get_config()
+        config.dual_verification_threshold = Decimal("100000.00")
+        config.save()
+
+        self.vehicle_type = VehicleType.objects.create(nom="Voiture")
+        self.session, _ = CashSessionService.open_session(self.agent, Decimal("10000.00"))
+
+    def tearDown(self):
+        self.override.disable()
+        self.media.cleanup()
+
+    def pay(self, calculate_tax, plate, tax_amount, tendered):
+        calculate_tax.return_value = {"amount": tax_amount}
+        vehicle = Vehicule.objects.create(
+            plaque_immatriculation=plate,
+            proprietaire=self.admin,
+            marque="Toyota",
+            puissance_fiscale_cv=13,
+            cylindree_cm3=1800,
+            source_energie="Essence",
+            date_premiere_circulation=date(2020, 1, 1),
+            type_vehicule=self.vehicle_type,
+        )
+        cash_transaction, error = CashPaymentService.create_cash_payment(
+            collector=self.agent, vehicle=vehicle, customer_data={}, amount_tendered=tendered
+        )
+        self.assertIsNone(error)
+        return cash_transaction
+
+    def test_payments_approvals_and_voids_update_totals(self, calculate_tax):
+        first = self.pay(calculate_tax, "1111TAA", Decimal("50000.00"), Decimal("60000.00"))
+        second = self.pay(calculate_tax, "2222TAA", Decimal("150000.00"), Decimal("150000.00"))
+
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.transaction_count, 2)
+        self.assertEqual(self.session.total_tax_collected, Decimal("200000.00"))
+        self.assertEqual(self.session.total_cash_received, Decimal("210000.00"))
+        self.assertEqual(self.session.total_change_given, Decimal("10000.00"))
+        self.assertEqual(self.session.total_commission, first.commission_amount + second.commission_amount)
+        self.assertEqual(self.session.pending_approvals, 1)
+
+        success, error = CashPaymentService.approve_transaction(second, self.admin)
+        self.assertTrue(success, error)
+        success, error = CashPaymentService.void_transaction(first, self.admin, "Erreur de saisie")
+        self.assertTrue(success, error)
+
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.transaction_count, 1)
+        self.assertEqual(self.session.total_tax_collected, Decimal("150000.00"))
+        self.assertEqual(self.session.total_change_given, Decimal("0.00"))
+        self.assertEqual(self.session.total_commission, second.commission_amount)
+        self.assertEqual(self.session.pending_approvals, 0)
+
+        totals = CashSessionService.calculate_session_totals(self.session)
+        self.assertEqual(totals["expected_balance"], Decimal("160000.00"))
+        recomputed = CashSessionService.recompute_session_totals([self.session])[self.session.pk]
+        for field, value in recomputed.items():
+            self.assertEqual(totals[field], value, field)
+
+    def test_close_session_reads_committed_totals(self, calculate_tax):
+        stale = CashSession.objects.get(pk=self.session.pk)
+        self.pay(calculate_tax, "1111TAA", Decimal("50000.00"), Decimal("50000.00"))
+
+        session, discrepancy = CashSessionService.close_session(stale, Decimal("60000.00"), self.admin)
+
+        self.assertEqual(session.expected_balance, Decimal("60000.00"))
+        self.assertEqual(discrepancy, Decimal("0.00"))
+
+    def test_closing_and_approval_keep_concurrent_total_updates(self, calculate_tax):
+        calculate_session_totals = CashSessionService.calculate_session_totals
+
+        def concurrent_payment(session):
+            totals = calculate_session_totals(session)
+            CashSession.objects.filter(pk=session.pk).update(transaction_count=F("transaction_count") + 1)
+            return totals
+
+        with mock.patch.object(CashSessionService, "calculate_session_totals", side_effect=concurrent_payment):
+            session, _ = CashSessionService.close_session(self.session, Decimal("0.00"), self.admin)
+        self.assertIsNone(session.approved_by)
+
+        CashSession.objects.filter(pk=session.pk).update(pending_approvals=F("pending_approvals") + 1)
+        success, error = CashSessionService.approve_session_closure(session, self.admin, "Compté deux fois")
+        self.assertTrue(success, error)
+
+        session.refresh_from_db()
+        self.assertEqual(session.status, "reconciled")
+        self.assertEqual(session.transaction_count, 1)
+        self.assertEqual(session.pending_approvals, 1)
+
+    def test_daily_report_uses_session_rows(self, calculate_tax):
+        self.pay(calculate_tax, "1111TAA", Decimal("50000.00"), Decimal("50000.00"))
+
+        # The session list, then one aggregate for the day totals
+        with self.assertNumQueries(2):
+            report = ReconciliationService.generate_daily_report(timezone.localdate())
+
+        self.assertEqual(report["totals"]["session_count"], 1)
+        self.assertEqual(report["totals"]["total_tax_collected"], Decimal("50000.00"))
+        self.assertEqual(report["totals"]["total_transactions"], 1)
+        self.assertEqual(report["status"]["open_sessions"], 1)
+        self.assertEqual(report["totals"]["total_expected_balance"], Decimal("60000.00"))
+
+    def test_reconciliation_history_snapshots_reconciled_days(self, calculate_tax):
+        self.pay(calculate_tax, "1111TAA", Decimal("50000.00"), Decimal("60000.00"))
+        yesterday = timezone.localdate() - timedelta(days=1)
+        CashSession.objects.filter(pk=self.session.pk).update(
+            opening_time=timezone.now() - timedelta(days=1), status="reconciled"
+        )
+
+        with self.assertNumQueries(3):
+            history = ReconciliationService.get_reconciliation_history(yesterday - timedelta(days=1), yesterday)
+
+        self.assertEqual([day["date"] for day in history], [yesterday - timedelta(days=1), yesterday])
+        self.assertFalse(history[0]["is_reconciled"])
+        self.assertTrue(history[1]["is_reconciled"])
+        self.assertEqual(history[1]["total_tax_collected"], Decimal("50000.00"))
+        self.assertEqual(ReportSnapshot.objects.get().report_date, yesterday)
+
+        # Re-opening the reconciled day reads its snapshot
+        with self.assertNumQueries(1):
+            history = ReconciliationService.get_reconciliation_history(yesterday, yesterday)
+        self.assertEqual(history[0]["total_tax_collected"], Decimal("50000.00"))
+        self.assertEqual(history[0]["session_count"], 1)
+
+    def test_commission_summary_is_one_grouped_query(self, calculate_tax):
+        first = self.pay(calculate_tax, "1111TAA", Decimal("50000.00"), Decimal("50000.00"))
+        second = self.pay(calculate_tax, "2222TAA", Decimal("60000.00"), Decimal("60000.00"))
+        start, end = timezone.now() - timedelta(hours=1), timezone.now() + timedelta(hours=1)
+
+        for group_by in ("collector", "session", "date"):
+            with self.assertNumQueries(1):
+                summary = CommissionService.get_commission_summary_by_period(start, end, group_by=group_by)
+            self.assertEqual(len(summary["summary"]), 1)
+            self.assertEqual(summary["totals"]["transaction_count"], 2)
+            self.assertEqual(summary["totals"]["total_tax"], Decimal("110000.00"))
+            self.assertEqual(summary["totals"]["pending_amount"], first.commission_amount + second.commission_amount)
+
+    def test_verify_session_totals_repairs_drift(self, calculate_tax):
+        self.pay(calculate_tax, "1111TAA", Decimal("50000.00"), Decimal("50000.00"))
+        CashSession.objects.filter(pk=self.session.pk).update(transaction_count=5, total_tax_collected=0)
+
+        out = StringIO()
+        call_command("verify_session_totals", stdout=out)
+        self.assertIn("1 mismatch(es)", out.getvalue())
+        self.assertEqual(CashSession.objects.get(pk=self.session.pk).transaction_count, 5)
+
+        call_command("verify_session_totals", "--repair", stdout=out)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.transaction_count, 1)
+        self.assertEqual(self.session.total_tax_collected, Decimal("50000.00"))
+
+        out = StringIO()
+        call_command("verify_session_totals", stdout=out)
+        self.assertIn("all totals match", out.getvalue())
@@ -5,17 +5,21 @@ Tests cover:
 - Token generation with valid credentials
 - Token caching mechanism
 - Token refresh on cache miss
+- Single-flight and background token refresh
 - Error handling for authentication failures
 - Configuration validation
 """
 
 import base64
+import time
 from decimal import Decimal
 from unittest.mock import MagicMock, Mock, patch
 
 from django.core.cache import cache
 from django.test import TestCase, override_settings
 
+import requests
+
 from payments.services.mvola import MvolaAPIClient, MvolaAuthenticationError
 from payments.services.mvola.constants import (
     HTTP_OK,
@@ -93,7 +97,7 @@ class MvolaAPIClientTokenTests(TestCase):
         expected_key = f"{TOKEN_CACHE_KEY_PREFIX}_test_consumer_key"
         self.assertEqual(cache_key, expected_key)
 
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_get_access_token_success(self, mock_post):
         """Test successful token generation"""
         # Mock successful token response
@@ -120,7 +124,7 @@ class MvolaAPIClientTokenTests(TestCase):
         cached_token = cache.get(cache_key)
         self.assertEqual(cached_token, "test_access_token_12345")
 
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_get_access_token_from_cache(self, mock_post):
         """Test token retrieval from cache (no API call)"""
         # Pre-populate cache
@@ -136,7 +140,7 @@ class MvolaAPIClientTokenTests(TestCase):
         # Verify no API call was made
         self.assertFalse(mock_post.called)
 
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_get_access_token_cache_miss_then_hit(self, mock_post):
         """Test token caching: first call generates, second call uses cache"""
         # Mock successful token response
@@ -159,7 +163,7 @@ class MvolaAPIClientTokenTests(TestCase):
         self.assertEqual(token2, "new_token_12345")
         self.assertEqual(mock_post.call_count, 1)  # No additional call
 
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_get_access_token_unauthorized(self, mock_post):
         """Test token generation fails with invalid credentials"""
         # Mock unauthorized response
@@ -174,7 +178,7 @@ class MvolaAPIClientTokenTests(TestCase):
 
         self.assertIn("Invalid consumer credentials", str(context.exception))
 
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_get_access_token_invalid_json_response(self, mock_post):
         """Test token generation fails with invalid JSON response"""
         # Mock response with invalid JSON
@@ -189,7 +193,7 @@ class MvolaAPIClientTokenTests(TestCase):
 
         self.assertIn("Invalid JSON response", str(context.exception))
 
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_get_access_token_missing_access_token_in_response(self, mock_post):
         """Test token generation fails when access_token is missing"""
         # Mock response without access_token
@@ -204,7 +208,7 @@ class MvolaAPIClientTokenTests(TestCase):
 
         self.assertIn("No access_token in response", str(context.exception))
 
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_get_access_token_timeout(self, mock_post):
         """Test token generation handles timeout"""
         # Mock timeout
@@ -216,7 +220,7 @@ class MvolaAPIClientTokenTests(TestCase):
 
         self.assertIn("Unexpected error", str(context.exception))
 
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_token_caching_ttl(self, mock_post):
         """Test token is cached with correct TTL"""
         # Mock successful token response
@@ -237,6 +241,76 @@ class MvolaAPIClientTokenTests(TestCase):
         # but we verify the token is cached
 
 
+@override_settings(
+    MVOLA_BASE_URL="https://devapi.mvola.mg",
+    MVOLA_CONSUMER_KEY="test_consumer_key",
+    MVOLA_CONSUMER_SECRET="test_consumer_secret",
+    MVOLA_PARTNER_MSISDN="0340000000",
+    MVOLA_PARTNER_NAME="TestPartner",
+    MVOLA_CALLBACK_URL="http://localhost:8000/api/payments/mvola/callback/",
+)
+class MvolaAPIClientTokenRefreshTests(TestCase):
+    """Test single-flight token refresh and the shared HTTP session"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = MvolaAPIClient()
+        self.cache_key = self.client._get_token_cache_key()
+
+    def tearDown(self):
+        cache.clear()
+
+    def _token_response(self, token):
+        response = Mock()
+        response.status_code = HTTP_OK
+        response.json.return_value = {"access_token": token, "token_type": "Bearer", "expires_in": 3600}
+        return response
+
+    @patch("payments.services.mvola.api_client.http.post")
+    def test_token_expiring_soon_is_refreshed_in_background(self, mock_post):
+        """The cached token is returned while a single refresh is queued"""
+        mock_post.return_value = self._token_response("new_token")
+        cache.set(self.cache_key, "old_token", TOKEN_CACHE_TTL)
+        cache.set(self.client._get_token_refresh_key(), time.time() - 1, TOKEN_CACHE_TTL)
+
+        with patch("payments.tasks.refresh_mvola_access_token.delay") as mock_delay:
+            self.assertEqual(self.client.get_access_token(), "old_token")
+            self.assertEqual(self.client.get_access_token(), "old_token")
+        self.assertEqual(mock_delay.call_count, 1)
+        self.assertFalse(mock_post.called)
+
+        # The queued task replaces the token and releases the lock
+        self.client.refresh_access_token()
+        self.assertEqual(cache.get(self.cache_key), "new_token")
+        self.assertIsNone(cache.get(self.client._get_token_lock_key()))
+        self.assertGreater(cache.get(self.client._get_token_refresh_key()), time.time())
+
+    @patch("payments.services.mvola.api_client.time.sleep")
+    @patch("payments.services.mvola.api_client.http.post")
+    def test_cache_miss_waits_for_lock_holder(self, mock_post, mock_sleep):
+        """Only the lock holder calls the token endpoint"""
+        cache.add(self.client._get_token_lock_key(), 1, 60)
+        mock_sleep.side_effect = lambda seconds: cache.set(self.cache_key, "holder_token", TOKEN_CACHE_TTL)
+
+        self.assertEqual(self.client.get_access_token(), "holder_token")
+        self.assertFalse(mock_post.called)
+
+    @patch("payments.services.mvola.api_client.http.post")
+    def test_lock_released_after_failed_request(self, mock_post):
+        mock_post.side_effect = requests.exceptions.ConnectionError("refused")
+
+        with self.assertRaises(MvolaAuthenticationError):
+            self.client.get_access_token()
+        self.assertIsNone(cache.get(self.client._get_token_lock_key()))
+
+    def test_shared_session_never_retries_payment_requests(self):
+        """Read errors and 5xx responses are only retried for GET requests"""
+        from payments.services.mvola import api_client
+
+        adapter = api_client.http.get_adapter(self.client.base_url)
+        self.assertEqual(adapter.max_retries.allowed_methods, frozenset({"GET"}))
+
+
 @override_settings(
     MVOLA_BASE_URL="https://devapi.mvola.mg",
     MVOLA_CONSUMER_KEY="test_consumer_key",
@@ -267,7 +341,7 @@ class MvolaAPIClientPaymentInitiationTests(TestCase):
         """Clean up after each test"""
         cache.clear()
 
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_initiate_payment_success(self, mock_post):
         """Test successful payment initiation"""
         # Mock token response
@@ -335,7 +409,7 @@ class MvolaAPIClientPaymentInitiationTests(TestCase):
         self.assertEqual(metadata["vehicle_plate"], "1234AB01")
         self.assertEqual(metadata["tax_year"], "2024")
 
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_initiate_payment_generates_unique_correlation_id(self, mock_post):
         """Test that each payment generates a unique X-CorrelationID"""
         # Mock responses
@@ -360,7 +434,7 @@ class MvolaAPIClientPaymentInitiationTests(TestCase):
         # Verify different correlation IDs
         self.assertNotEqual(result1["x_correlation_id"], result2["x_correlation_id"])
 
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_initiate_payment_api_error(self, mock_post):
         """Test payment initiation handles API errors"""
         # Mock token response
@@ -387,7 +461,7 @@ class MvolaAPIClientPaymentInitiationTests(TestCase):
         self.assertIn("x_correlation_id", result)
         self.assertEqual(result["error_code"], "INSUFFICIENT_BALANCE")
 
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_initiate_payment_missing_server_correlation_id(self, mock_post):
         """Test payment initiation handles missing serverCorrelationId"""
         # Mock token response
@@ -414,7 +488,7 @@ class MvolaAPIClientPaymentInitiationTests(TestCase):
         self.assertFalse(result["success"])
         self.assertIn("Réponse invalide de MVola", result["error"])
 
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_initiate_payment_invalid_json_response(self, mock_post):
         """Test payment initiation handles invalid JSON response"""
         # Mock token response
@@ -439,7 +513,7 @@ class MvolaAPIClientPaymentInitiationTests(TestCase):
         self.assertFalse(result["success"])
         self.assertIn("Réponse invalide de MVola", result["error"])
 
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_initiate_payment_timeout(self, mock_post):
         """Test payment initiation handles timeout"""
         # Mock token response
@@ -461,7 +535,7 @@ class MvolaAPIClientPaymentInitiationTests(TestCase):
         self.assertFalse(result["success"])
         self.assertIn("Délai d'attente dépassé", result["error"])
 
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_initiate_payment_network_error(self, mock_post):
         """Test payment initiation handles network errors"""
         # Mock token response
@@ -483,7 +557,7 @@ class MvolaAPIClientPaymentInitiationTests(TestCase):
         self.assertFalse(result["success"])
         self.assertIn("error", result)
 
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_initiate_payment_truncates_long_description(self, mock_post):
         """Test payment initiation truncates description to 50 chars"""
         # Mock responses
@@ -510,7 +584,7 @@ class MvolaAPIClientPaymentInitiationTests(TestCase):
         payment_payload = payment_call[1]["json"]
         self.assertEqual(len(payment_payload["descriptionText"]), 50)
 
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_initiate_payment_masks_msisdn_in_logs(self, mock_post):
         """Test that MSISDN is masked in log messages"""
         # Mock responses
@@ -562,8 +636,8 @@ class MvolaAPIClientStatusCheckTests(TestCase):
         """Clean up after each test"""
         cache.clear()
 
-    @patch("payments.services.mvola.api_client.requests.get")
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.get")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_get_transaction_status_success(self, mock_post, mock_get):
         """Test successful transaction status check"""
         # Mock token response
@@ -610,8 +684,8 @@ class MvolaAPIClientStatusCheckTests(TestCase):
         self.assertEqual(status_headers["Version"], "1.0")
         self.assertEqual(status_headers["UserLanguage"], "FR")
 
-    @patch("payments.services.mvola.api_client.requests.get")
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.get")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_get_transaction_status_pending(self, mock_post, mock_get):
         """Test status check for pending transaction"""
         # Mock token response
@@ -634,8 +708,8 @@ class MvolaAPIClientStatusCheckTests(TestCase):
         self.assertEqual(result["status"], "pending")
         self.assertIsNone(result["transaction_reference"])
 
-    @patch("payments.services.mvola.api_client.requests.get")
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.get")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_get_transaction_status_not_found(self, mock_post, mock_get):
         """Test status check for non-existent transaction"""
         # Mock token response
@@ -658,8 +732,8 @@ class MvolaAPIClientStatusCheckTests(TestCase):
         self.assertIn("Transaction introuvable", result["error"])
         self.assertEqual(result["status_code"], 404)
 
-    @patch("payments.services.mvola.api_client.requests.get")
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.get")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_get_transaction_status_api_error(self, mock_post, mock_get):
         """Test status check handles API errors"""
         # Mock token response
@@ -683,8 +757,8 @@ class MvolaAPIClientStatusCheckTests(TestCase):
         self.assertIn("error", result)
         self.assertEqual(result["error_code"], "INTERNAL_ERROR")
 
-    @patch("payments.services.mvola.api_client.requests.get")
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.get")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_get_transaction_status_invalid_json(self, mock_post, mock_get):
         """Test status check handles invalid JSON response"""
         # Mock token response
@@ -707,8 +781,8 @@ class MvolaAPIClientStatusCheckTests(TestCase):
         self.assertFalse(result["success"])
         self.assertIn("Réponse invalide de MVola", result["error"])
 
-    @patch("payments.services.mvola.api_client.requests.get")
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.get")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_get_transaction_status_timeout(self, mock_post, mock_get):
         """Test status check handles timeout"""
         # Mock token response
@@ -729,8 +803,8 @@ class MvolaAPIClientStatusCheckTests(TestCase):
         self.assertFalse(result["success"])
         self.assertIn("Délai d'attente dépassé", result["error"])
 
-    @patch("payments.services.mvola.api_client.requests.get")
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.get")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_get_transaction_status_network_error(self, mock_post, mock_get):
         """Test status check handles network errors"""
         # Mock token response
@@ -778,8 +852,8 @@ class MvolaAPIClientTransactionDetailsTests(TestCase):
         """Clean up after each test"""
         cache.clear()
 
-    @patch("payments.services.mvola.api_client.requests.get")
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.get")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_get_transaction_details_success(self, mock_post, mock_get):
         """Test successful transaction details retrieval"""
         # Mock token response
@@ -830,8 +904,8 @@ class MvolaAPIClientTransactionDetailsTests(TestCase):
         self.assertIn("X-CorrelationID", details_headers)
         self.assertEqual(details_headers["Version"], "1.0")
 
-    @patch("payments.services.mvola.api_client.requests.get")
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.get")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_get_transaction_details_not_found(self, mock_post, mock_get):
         """Test details retrieval for non-existent transaction"""
         # Mock token response
@@ -854,8 +928,8 @@ class MvolaAPIClientTransactionDetailsTests(TestCase):
         self.assertIn("Transaction introuvable", result["error"])
         self.assertEqual(result["status_code"], 404)
 
-    @patch("payments.services.mvola.api_client.requests.get")
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.get")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_get_transaction_details_api_error(self, mock_post, mock_get):
         """Test details retrieval handles API errors"""
         # Mock token response
@@ -879,8 +953,8 @@ class MvolaAPIClientTransactionDetailsTests(TestCase):
         self.assertIn("error", result)
         self.assertEqual(result["error_code"], "INTERNAL_ERROR")
 
-    @patch("payments.services.mvola.api_client.requests.get")
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.get")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_get_transaction_details_invalid_json(self, mock_post, mock_get):
         """Test details retrieval handles invalid JSON response"""
         # Mock token response
@@ -903,8 +977,8 @@ class MvolaAPIClientTransactionDetailsTests(TestCase):
         self.assertFalse(result["success"])
         self.assertIn("Réponse invalide de MVola", result["error"])
 
-    @patch("payments.services.mvola.api_client.requests.get")
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.get")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_get_transaction_details_timeout(self, mock_post, mock_get):
         """Test details retrieval handles timeout"""
         # Mock token response
@@ -925,8 +999,8 @@ class MvolaAPIClientTransactionDetailsTests(TestCase):
         self.assertFalse(result["success"])
         self.assertIn("Délai d'attente dépassé", result["error"])
 
-    @patch("payments.services.mvola.api_client.requests.get")
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.get")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_get_transaction_details_network_error(self, mock_post, mock_get):
         """Test details retrieval handles network errors"""
         # Mock token response
@@ -947,8 +1021,8 @@ class MvolaAPIClientTransactionDetailsTests(TestCase):
         self.assertFalse(result["success"])
         self.assertIn("error", result)
 
-    @patch("payments.services.mvola.api_client.requests.get")
-    @patch("payments.services.mvola.api_client.requests.post")
+    @patch("payments.services.mvola.api_client.http.get")
+    @patch("payments.services.mvola.api_client.http.post")
     def test_get_transaction_details_with_fees(self, mock_post, mock_get):
         """Test details retrieval includes fee information"""
         # Mock token response
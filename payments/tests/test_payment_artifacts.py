@@ -0,0 +1,127 @@
+"""
+Tests for render-once payment artifacts (QR codes and receipts)
+"""
+
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from payments.models import PaiementTaxe, QRCode
+from payments.services import artifact_service
+from vehicles.models import VehicleType, Vehicule
+
+
+class PaymentArtifactTestCase(TestCase):
+    """Test artifact caching of payment downloads"""
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.override = override_settings(MEDIA_ROOT=self.media.name, SITE_URL="http://testserver")
+        self.override.enable()
+
+        self.user = User.objects.create_user(username="owner", password="testpass123")
+        self.vehicle = Vehicule.objects.create(
+            plaque_immatriculation="5678TAB",
+            proprietaire=self.user,
+            marque="Toyota",
+            puissance_fiscale_cv=13,
+            cylindree_cm3=1500,
+            source_energie="Essence",
+            date_premiere_circulation=date(2020, 1, 1),
+            type_vehicule=VehicleType.objects.create(nom="Voiture"),
+        )
+        self.payment = PaiementTaxe.objects.create(
+            vehicule_plaque=self.vehicle,
+            annee_fiscale=timezone.now().year,
+            montant_du_ariary=Decimal("50000.00"),
+            montant_paye_ariary=Decimal("50000.00"),
+            statut="PAYE",
+            date_paiement=timezone.now(),
+        )
+        self.qr_code = QRCode.objects.create(
+            vehicule_plaque=self.vehicle,
+            annee_fiscale=self.payment.annee_fiscale,
+            date_expiration=timezone.now() + timedelta(days=365),
+        )
+        self.client.login(username="owner", password="testpass123")
+
+    def tearDown(self):
+        self.override.disable()
+        self.media.cleanup()
+
+    def test_receipt_is_rendered_once(self):
+        url = reverse("payments:download_receipt", args=[self.payment.pk])
+        with mock.patch.object(
+            artifact_service, "render_receipt_pdf", wraps=artifact_service.render_receipt_pdf
+        ) as render:
+            first = self.client.get(url)
+            second = self.client.get(url)
+
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first["Content-Type"], "application/pdf")
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first["ETag"], second["ETag"])
+        # Stable URL: the browser must revalidate, the ETag makes that a 304
+        self.assertEqual(first["Cache-Control"], "private, no-cache")
+
+    def test_conditional_request_returns_not_modified(self):
+        url = reverse("payments:download_qr", args=[self.payment.pk])
+        etag = self.client.get(url)["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_changed_data_yields_a_new_artifact(self):
+        url = reverse("payments:download_receipt", args=[self.payment.pk])
+        etag = self.client.get(url)["ETag"]
+
+        PaiementTaxe.objects.filter(pk=self.payment.pk).update(transaction_id="TX-42")
+
+        self.assertNotEqual(self.client.get(url)["ETag"], etag)
+
+    def test_prerender_command_fills_the_cache(self):
+        call_command("prerender_payment_artifacts", stdout=StringIO())
+
+        with (
+            mock.patch.object(artifact_service, "render_qr_card") as card,
+            mock.patch.object(artifact_service, "render_qr_image") as image,
+            mock.patch.object(artifact_service, "render_receipt_pdf") as receipt,
+        ):
+            self.client.get(reverse("payments:download_receipt", args=[self.payment.pk]))
+            self.client.get(reverse("payments:download_qr", args=[self.payment.pk]))
+            self.client.get(reverse("payments:qr_image", args=[self.qr_code.token]))
+
+        card.assert_not_called()
+        image.assert_not_called()
+        receipt.assert_not_called()
+
+    @override_settings(SITE_URL="https://taxcollector.mg/")
+    def test_prerendered_qr_codes_are_hit_from_another_host(self):
+        artifact_service.PaymentArtifactService.prerender_payment(self.payment)
+
+        with (
+            mock.patch.object(artifact_service, "render_qr_card") as card,
+            mock.patch.object(artifact_service, "render_qr_image") as image,
+        ):
+            # Requests reach the app through another host than SITE_URL (e.g. behind a proxy)
+            download = self.client.get(reverse("payments:download_qr", args=[self.payment.pk]), HTTP_HOST="localhost")
+            image_response = self.client.get(
+                reverse("payments:qr_image", args=[self.qr_code.token]), HTTP_HOST="localhost"
+            )
+
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(image_response.status_code, 200)
+
+        card.assert_not_called()
+        image.assert_not_called()
@@ -0,0 +1,189 @@
+"""
+Tests for the payment side effects outbox
+"""
+
+import tempfile
+import uuid
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from notifications.models import Notification
+from payments.models import PaiementTaxe, PaymentOutboxEvent, QRCode
+from payments.services import outbox_service
+from payments.services.outbox_service import PAYMENT_COMPLETED, PaymentOutbox
+from payments.services.payment_success_service import PaymentSuccessService
+from payments.views import _handle_payment_intent_succeeded
+from vehicles.models import VehicleType, Vehicule
+
+
+class PaymentOutboxTestCase(TestCase):
+    """Test outbox recording and relay of payment side effects"""
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.override = override_settings(MEDIA_ROOT=self.media.name, SITE_URL="http://testserver")
+        self.override.enable()
+
+        self.user = User.objects.create_user(username="owner", password="testpass123")
+        self.vehicle = Vehicule.objects.create(
+            plaque_immatriculation="9012TAB",
+            proprietaire=self.user,
+            marque="Toyota",
+            puissance_fiscale_cv=13,
+            cylindree_cm3=1500,
+            source_energie="Essence",
+            date_premiere_circulation=date(2020, 1, 1),
+            type_vehicule=VehicleType.objects.create(nom="Voiture"),
+        )
+        self.payment = PaiementTaxe.objects.create(
+            vehicule_plaque=self.vehicle,
+            annee_fiscale=timezone.now().year,
+            montant_du_ariary=Decimal("50000.00"),
+            montant_paye_ariary=Decimal("0.00"),
+            statut="EN_ATTENTE",
+            methode_paiement="mvola",
+            mvola_server_correlation_id=str(uuid.uuid4()),
+            mvola_status="pending",
+        )
+
+    def tearDown(self):
+        self.override.disable()
+        self.media.cleanup()
+
+    def payment_notifications(self):
+        return Notification.objects.filter(user=self.user, metadata__payment_id=str(self.payment.id))
+
+    def test_handle_payment_success_records_one_event(self):
+        """Side effects are queued once per payment, even if success is reported twice"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            qr_code, error = PaymentSuccessService.handle_payment_success(self.payment)
+            PaymentSuccessService.handle_payment_success(self.payment)
+
+        self.assertIsNone(error)
+        self.assertIsNotNone(qr_code)
+        self.assertEqual(len(callbacks), 1)
+        event = PaymentOutboxEvent.objects.get(payment=self.payment)
+        self.assertEqual(event.event_type, PAYMENT_COMPLETED)
+        self.assertEqual(event.status, "PENDING")
+        self.assertFalse(self.payment_notifications().exists())
+
+    def test_relay_runs_effects_once(self):
+        PaymentSuccessService.handle_payment_success(self.payment)
+
+        with (
+            mock.patch("payments.services.artifact_service.PaymentArtifactService.prerender_payment") as prerender,
+            mock.patch("api.utils.webhooks.dispatch_webhook_event") as dispatch,
+        ):
+            self.assertEqual(PaymentOutbox.relay(), 1)
+            self.assertEqual(PaymentOutbox.relay(), 0)
+
+        event = PaymentOutboxEvent.objects.get(payment=self.payment)
+        self.assertEqual(event.status, "DONE")
+        self.assertEqual(event.completed_effects, ["qr_code", "notification", "artifacts", "webhook"])
+        self.assertEqual(self.payment_notifications().count(), 1)
+        prerender.assert_called_once()
+        dispatch.assert_called_once()
+        self.assertEqual(dispatch.call_args[0][0], PAYMENT_COMPLETED)
+
+    def test_failed_effect_is_retried_without_repeating_others(self):
+        PaymentSuccessService.handle_payment_success(self.payment)
+        webhook = mock.Mock(side_effect=[RuntimeError("endpoint down"), None])
+        effects = {
+            PAYMENT_COMPLETED: [
+                (name, webhook if name == "webhook" else effect)
+                for name, effect in outbox_service.EFFECTS[PAYMENT_COMPLETED]
+            ]
+        }
+
+        with (
+            mock.patch.dict(outbox_service.EFFECTS, effects),
+            mock.patch("payments.services.artifact_service.PaymentArtifactService.prerender_payment") as prerender,
+        ):
+            self.assertEqual(PaymentOutbox.relay(), 0)
+            event = PaymentOutboxEvent.objects.get(payment=self.payment)
+            self.assertEqual(event.status, "PENDING")
+            self.assertEqual(event.attempts, 1)
+            self.assertIn("endpoint down", event.last_error)
+            self.assertGreater(event.next_attempt_at, timezone.now())
+
+            # Not due yet
+            self.assertEqual(PaymentOutbox.relay(), 0)
+            PaymentOutboxEvent.objects.filter(id=event.id).update(next_attempt_at=timezone.now())
+            self.assertEqual(PaymentOutbox.relay(), 1)
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, "DONE")
+        self.assertEqual(event.attempts, 2)
+        self.assertEqual(webhook.call_count, 2)
+        prerender.assert_called_once()
+        self.assertEqual(self.payment_notifications().count(), 1)
+
+    @override_settings(PAYMENT_OUTBOX_MAX_ATTEMPTS=1)
+    def test_event_fails_after_max_attempts(self):
+        PaymentSuccessService.handle_payment_success(self.payment, send_notification=False)
+
+        with mock.patch(
+            "payments.services.artifact_service.PaymentArtifactService.prerender_payment",
+            side_effect=RuntimeError("disk full"),
+        ):
+            PaymentOutbox.relay()
+
+        event = PaymentOutboxEvent.objects.get(payment=self.payment)
+        self.assertEqual(event.status, "FAILED")
+        self.assertEqual(event.completed_effects, ["qr_code", "notification"])
+
+    def test_expired_lease_is_reclaimed(self):
+        """Events claimed by a worker that died become due again"""
+        PaymentSuccessService.handle_payment_success(self.payment, send_notification=False)
+        PaymentOutboxEvent.objects.update(status="PROCESSING", attempts=1, next_attempt_at=timezone.now())
+
+        with mock.patch("payments.services.artifact_service.PaymentArtifactService.prerender_payment"):
+            self.assertEqual(PaymentOutbox.relay(), 1)
+
+    def test_mvola_callback_defers_side_effects(self):
+        client = APIClient()
+        data = {
+            "serverCorrelationId": self.payment.mvola_server_correlation_id,
+            "transactionStatus": "completed",
+            "transactionReference": "REF-1",
+            "fees": [{"feeAmount": "500"}],
+        }
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = client.put(reverse("payments:mvola-callback"), data, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(QRCode.objects.filter(vehicule_plaque=self.vehicle).exists())
+        event = PaymentOutboxEvent.objects.get(payment=self.payment)
+        self.assertEqual(event.payload["notification"], "mvola")
+        self.assertEqual(event.payload["transaction_reference"], "REF-1")
+
+        with mock.patch("payments.services.artifact_service.PaymentArtifactService.prerender_payment"):
+            PaymentOutbox.relay()
+
+        self.assertTrue(QRCode.objects.filter(vehicule_plaque=self.vehicle).exists())
+        events = set(self.payment_notifications().values_list("metadata__event", flat=True))
+        self.assertEqual(events, {"mvola_payment_completed", "qr_generated"})
+
+    def test_stripe_payment_rolls_back_without_its_event(self):
+        """A Stripe payment is not marked paid when its outbox event cannot be recorded"""
+        PaiementTaxe.objects.filter(id=self.payment.id).update(
+            methode_paiement="carte_bancaire", stripe_payment_intent_id="pi_test"
+        )
+
+        with mock.patch.object(PaymentOutbox, "enqueue", side_effect=RuntimeError("database busy")):
+            _handle_payment_intent_succeeded({"id": "pi_test", "charges": {"data": [{"id": "ch_test"}]}})
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.statut, "EN_ATTENTE")
+        self.assertIsNone(self.payment.stripe_charge_id)
+        self.assertFalse(PaymentOutboxEvent.objects.filter(payment=self.payment).exists())
@@ -1,5 +1,4 @@
 import base64
-import io
 import logging
 from datetime import datetime, timedelta
 
@@ -10,30 +9,21 @@ from django.db import transaction
 from django.db.models import Count
 from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.urls import reverse, reverse_lazy
+from django.urls import reverse_lazy
 from django.utils import timezone
 from django.utils.translation import gettext as _
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import CreateView, DetailView, ListView, TemplateView
 
-import qrcode
 import stripe
-from PIL import Image, ImageDraw, ImageFont
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER
-from reportlab.lib.pagesizes import A4, letter
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
-from reportlab.lib.units import inch
-from reportlab.pdfgen import canvas
-from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
 
 from vehicles.models import Vehicule
 from vehicles.services import TaxCalculationService
 
 from .forms import PaiementTaxeForm
 from .models import PaiementTaxe, QRCode, StripeConfig
-from .services import PaymentServiceFactory
+from .services import PaymentArtifactService, PaymentServiceFactory
 
 logger = logging.getLogger(__name__)
 
@@ -354,98 +344,15 @@ class DownloadQRCodeView(LoginRequiredMixin, View):
         # Generate QR code image with verification URL
         # The QR code contains a URL to /app/qr-verification/?code={token}
         # This is the same verification endpoint used by all payment methods
-        from .services.payment_success_service import PaymentSuccessService
-
-        qr_url = PaymentSuccessService.get_qr_verification_url(qr_code, request=request)
-
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(qr_url)
-        qr.make(fit=True)
+        qr_url = PaymentArtifactService.qr_card_url(qr_code, PaymentArtifactService.site_url(request))
 
-        # Create QR code image
-        qr_img = qr.make_image(fill_color="black", back_color="white")
-
-        # Create a larger image with vehicle info
-        img_width, img_height = 800, 1000
-        img = Image.new("RGB", (img_width, img_height), "white")
-        draw = ImageDraw.Draw(img)
-
-        # Try to load a font
-        try:
-            title_font = ImageFont.truetype("arial.ttf", 32)
-            info_font = ImageFont.truetype("arial.ttf", 24)
-            small_font = ImageFont.truetype("arial.ttf", 18)
-        except:
-            title_font = ImageFont.load_default()
-            info_font = ImageFont.load_default()
-            small_font = ImageFont.load_default()
-
-        # Add title
-        title = "TAXE VÉHICULE PAYÉE"
-        title_bbox = draw.textbbox((0, 0), title, font=title_font)
-        title_width = title_bbox[2] - title_bbox[0]
-        draw.text(((img_width - title_width) // 2, 50), title, fill="black", font=title_font)
-
-        # Add vehicle info
-        y_pos = 120
-        payment_date = payment.date_paiement.strftime("%d/%m/%Y") if payment.date_paiement else "N/A"
-        # Format amount: remove decimals, add space as thousands separator
-        try:
-            amount = int(float(payment.montant_paye_ariary or 0))
-            amount_formatted = f"{amount:,}".replace(",", " ")
-        except (ValueError, TypeError):
-            amount_formatted = str(payment.montant_paye_ariary or 0)
-        vehicle_info = [
-            f"Plaque: {payment.vehicule_plaque.plaque_immatriculation}",
-            f"Année fiscale: {payment.annee_fiscale}",
-            f"Montant payé: {amount_formatted} Ar",
-            f"Date de paiement: {payment_date}",
-        ]
-
-        for info in vehicle_info:
-            info_bbox = draw.textbbox((0, 0), info, font=info_font)
-            info_width = info_bbox[2] - info_bbox[0]
-            draw.text(((img_width - info_width) // 2, y_pos), info, fill="black", font=info_font)
-            y_pos += 40
-
-        # Add QR code
-        qr_size = 400
-        qr_img_resized = qr_img.resize((qr_size, qr_size))
-        qr_x = (img_width - qr_size) // 2
-        qr_y = y_pos + 20
-        img.paste(qr_img_resized, (qr_x, qr_y))
-
-        # Add instructions
-        instructions = [
-            "Scannez ce QR code pour vérifier",
-            "le paiement de la taxe véhicule",
-            f"Valide jusqu'au: {qr_code.date_expiration.strftime('%d/%m/%Y')}",
-        ]
-
-        y_pos = qr_y + qr_size + 30
-        for instruction in instructions:
-            inst_bbox = draw.textbbox((0, 0), instruction, font=small_font)
-            inst_width = inst_bbox[2] - inst_bbox[0]
-            draw.text(((img_width - inst_width) // 2, y_pos), instruction, fill="gray", font=small_font)
-            y_pos += 25
-
-        # Save to BytesIO
-        img_io = io.BytesIO()
-        img.save(img_io, format="PNG", quality=95)
-        img_io.seek(0)
-
-        response = HttpResponse(img_io.getvalue(), content_type="image/png")
-        response["Content-Disposition"] = (
-            f'attachment; filename="qr_code_{payment.vehicule_plaque.plaque_immatriculation}_{payment.annee_fiscale}.png"'
+        artifact = PaymentArtifactService.qr_card(payment, qr_code, qr_url)
+        return PaymentArtifactService.response(
+            request,
+            artifact,
+            filename=f"qr_code_{payment.vehicule_plaque.plaque_immatriculation}_{payment.annee_fiscale}.png",
         )
 
-        return response
-
 
 class QRCodeGenerateView(LoginRequiredMixin, DetailView):
     """Generate QR code for a payment"""
@@ -562,118 +469,13 @@ class DownloadReceiptView(LoginRequiredMixin, View):
             messages.error(request, _("Le paiement doit être effectué avant de télécharger le reçu."))
             return redirect("payments:detail", pk=pk)
 
-        # Create PDF
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        styles = getSampleStyleSheet()
-        story = []
-
-        # Title
-        title_style = ParagraphStyle(
-            "CustomTitle",
-            parent=styles["Heading1"],
-            fontSize=24,
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            textColor=colors.darkblue,
-        )
-        story.append(Paragraph("REÇU DE PAIEMENT TAXE VÉHICULE", title_style))
-        story.append(Spacer(1, 20))
-
-        # Format amount: remove decimals, add space as thousands separator
-        try:
-            amount = int(float(payment.montant_paye_ariary or 0))
-            amount_formatted = f"{amount:,}".replace(",", " ")
-        except (ValueError, TypeError):
-            amount_formatted = str(payment.montant_paye_ariary or 0)
-
-        # Format payment date
-        payment_date_str = payment.date_paiement.strftime("%d/%m/%Y %H:%M") if payment.date_paiement else "N/A"
-
-        # Payment info table
-        data = [
-            ["Plaque d'immatriculation:", payment.vehicule_plaque.plaque_immatriculation],
-            ["Année fiscale:", str(payment.annee_fiscale)],
-            ["Montant payé:", f"{amount_formatted} Ar"],
-            ["Date de paiement:", payment_date_str],
-            ["Méthode de paiement:", payment.get_methode_paiement_display() or "N/A"],
-            ["Référence transaction:", payment.transaction_id or "N/A"],
-            ["Statut:", payment.get_statut_display()],
-        ]
-
-        table = Table(data, colWidths=[150, 200])
-        table.setStyle(
-            TableStyle(
-                [
-                    ("BACKGROUND", (0, 0), (0, -1), colors.lightgrey),
-                    ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
-                    ("ALIGN", (0, 0), (-1, -1), "LEFT"),
-                    ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
-                    ("FONTSIZE", (0, 0), (-1, -1), 12),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 12),
-                    ("BACKGROUND", (1, 0), (1, -1), colors.beige),
-                    ("GRID", (0, 0), (-1, -1), 1, colors.black),
-                ]
-            )
-        )
-
-        story.append(table)
-        story.append(Spacer(1, 30))
-
-        # Vehicle info
-        story.append(Paragraph("INFORMATIONS DU VÉHICULE", styles["Heading2"]))
-        story.append(Spacer(1, 10))
-
-        # Get vehicle type name (ForeignKey, not choices field)
-        type_vehicule_name = (
-            payment.vehicule_plaque.type_vehicule.nom if payment.vehicule_plaque.type_vehicule else "N/A"
-        )
-
-        vehicle_data = [
-            ["Puissance fiscale:", f"{payment.vehicule_plaque.puissance_fiscale_cv} CV"],
-            [
-                "Cylindrée:",
-                f"{payment.vehicule_plaque.cylindree_cm3} cm³" if payment.vehicule_plaque.cylindree_cm3 else "N/A",
-            ],
-            ["Source d'énergie:", payment.vehicule_plaque.get_source_energie_display()],
-            ["Catégorie:", payment.vehicule_plaque.get_categorie_vehicule_display()],
-            ["Type:", type_vehicule_name],
-            ["Date de circulation:", payment.vehicule_plaque.date_premiere_circulation.strftime("%d/%m/%Y")],
-        ]
-
-        vehicle_table = Table(vehicle_data, colWidths=[150, 200])
-        vehicle_table.setStyle(
-            TableStyle(
-                [
-                    ("BACKGROUND", (0, 0), (0, -1), colors.lightgrey),
-                    ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
-                    ("ALIGN", (0, 0), (-1, -1), "LEFT"),
-                    ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
-                    ("FONTSIZE", (0, 0), (-1, -1), 12),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 12),
-                    ("BACKGROUND", (1, 0), (1, -1), colors.beige),
-                    ("GRID", (0, 0), (-1, -1), 1, colors.black),
-                ]
-            )
-        )
-
-        story.append(vehicle_table)
-        story.append(Spacer(1, 30))
-
-        # Footer
-        footer_text = f"Document généré le {timezone.now().strftime('%d/%m/%Y à %H:%M')}"
-        story.append(Paragraph(footer_text, styles["Normal"]))
-
-        doc.build(story)
-        buffer.seek(0)
-
-        response = HttpResponse(buffer.getvalue(), content_type="application/pdf")
-        response["Content-Disposition"] = (
-            f'attachment; filename="recu_{payment.vehicule_plaque.plaque_immatriculation}_{payment.annee_fiscale}.pdf"'
+        artifact = PaymentArtifactService.payment_receipt(payment)
+        return PaymentArtifactService.response(
+            request,
+            artifact,
+            filename=f"recu_{payment.vehicule_plaque.plaque_immatriculation}_{payment.annee_fiscale}.pdf",
         )
 
-        return response
-
 
 # --- Stripe Integration Views ---
 
@@ -854,22 +656,28 @@ def _handle_payment_intent_succeeded(payment_intent):
     This ensures the same workflow as cash and MVola payments
     """
     try:
-        paiement = PaiementTaxe.objects.get(stripe_payment_intent_id=payment_intent["id"])
-        paiement.stripe_status = "succeeded"
-        paiement.statut = "PAYE"
-        paiement.date_paiement = timezone.now()
-        paiement.montant_paye_ariary = paiement.montant_du_ariary
-        charges = payment_intent.get("charges", {}).get("data", [])
-        if charges:
-            charge = charges[0]
-            paiement.stripe_charge_id = charge.get("id")
-            paiement.stripe_receipt_url = charge.get("receipt_url")
-        paiement.save()
-
         # Use unified payment success service (same workflow as cash and MVola)
         from .services.payment_success_service import PaymentSuccessService
 
-        qr_code, error = PaymentSuccessService.handle_payment_success(payment=paiement, send_notification=True)
+        # The payment update and its outbox event are committed together; notifications
+        # and webhooks are sent by the outbox relay so Stripe gets its response right away
+        with transaction.atomic():
+            paiement = PaiementTaxe.objects.get(stripe_payment_intent_id=payment_intent["id"])
+            paiement.stripe_status = "succeeded"
+            paiement.statut = "PAYE"
+            paiement.date_paiement = timezone.now()
+            paiement.montant_paye_ariary = paiement.montant_du_ariary
+            charges = payment_intent.get("charges", {}).get("data", [])
+            if charges:
+                charge = charges[0]
+                paiement.stripe_charge_id = charge.get("id")
+                paiement.stripe_receipt_url = charge.get("receipt_url")
+            paiement.save()
+
+            qr_code, error = PaymentSuccessService.handle_payment_success(payment=paiement, send_notification=True)
+            if error:
+                # The QR code or outbox event was not recorded: keep the payment unpaid as well
+                transaction.set_rollback(True)
 
         if error:
             logger.error(f"Error in payment success handler: {error}")
@@ -969,27 +777,10 @@ class QRCodeImageView(View):
             qr_code_obj = QRCode.objects.get(token=code)
 
             # Generate verification URL
-            verify_url = request.build_absolute_uri(reverse("payments:qr_verify", kwargs={"code": code}))
-
-            # Create QR code
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(verify_url)
-            qr.make(fit=True)
-
-            # Create image
-            img = qr.make_image(fill_color="black", back_color="white")
-
-            # Save to BytesIO
-            img_io = io.BytesIO()
-            img.save(img_io, format="PNG")
-            img_io.seek(0)
+            verify_url = PaymentArtifactService.qr_image_url(code, PaymentArtifactService.site_url(request))
 
-            return HttpResponse(img_io.getvalue(), content_type="image/png")
+            artifact = PaymentArtifactService.qr_image(verify_url)
+            return PaymentArtifactService.response(request, artifact, public=True)
 
         except QRCode.DoesNotExist:
             return HttpResponse("QR Code not found", status=404)
@@ -82,6 +82,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django_prometheus.middleware.PrometheusBeforeMiddleware",
+    "api.middleware.metrics.QueryMetricsMiddleware",
+    "core.db_routers.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -139,12 +141,51 @@ DATABASES = {
         "PASSWORD": "",
         "HOST": "localhost",
         "PORT": "5432",
+        # Check pooled/persistent connections before reuse so a restarted server is not an error
+        "CONN_HEALTH_CHECKS": True,
         "OPTIONS": {
             "client_encoding": "UTF8",
         },
     }
 }
 
+# Connection pooling (psycopg 3 pool, one per process). Without it, keep connections open instead.
+if os.getenv("DB_POOL_ENABLED", "True").lower() == "true":
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+        "timeout": int(os.getenv("DB_POOL_TIMEOUT", "10")),
+        "max_idle": int(os.getenv("DB_POOL_MAX_IDLE", "300")),
+    }
+else:
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE", "60"))
+
+# Optional read replica for read-heavy views and report commands (see core.db_routers)
+if os.getenv("DB_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.getenv("DB_REPLICA_HOST"),
+        "PORT": os.getenv("DB_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "OPTIONS": {**DATABASES["default"]["OPTIONS"]},
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["core.db_routers.ReplicaRouter"]
+
+# Views served from the replica on GET (fnmatch patterns on the resolved view name)
+REPLICA_READ_VIEWS = [
+    "administration:dashboard",
+    "administration:analytics",
+    "administration:api_stats",
+    "administration:*statistics*",
+    "administration:*_export",
+    "core:fleet_export*",
+    "vehicles:declaration_history_export",
+    "admin-metrics*",
+]
+# Clients are kept on the primary this long after a write, to cover replication lag
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "15"))
+
 # Switch to SQLite for tests if requested
 if (
     os.getenv("USE_SQLITE_FOR_TESTS", "False").lower() == "true"
@@ -233,10 +274,9 @@ CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
 
 CELERY_BEAT_SCHEDULE = {
-    "contraventions-send-payment-reminder": {
-        "task": "contraventions.tasks.send_payment_reminder",
+    "contraventions-send-payment-reminders": {
+        "task": "contraventions.tasks.send_payment_reminders",
         "schedule": 60 * 60 * 24,
-        "args": (),
     },
     "contraventions-process-expired-fourriere": {
         "task": "contraventions.tasks.process_expired_fourriere",
@@ -262,11 +302,108 @@ CELERY_BEAT_SCHEDULE = {
         "task": "api.tasks_gdpr.process_deletion_requests",
         "schedule": 60 * 60 * 24,  # Run daily
     },
+    "api-retry-webhook-deliveries": {
+        "task": "api.tasks.retry_webhook_deliveries",
+        "schedule": 30,
+    },
+    "payments-relay-payment-outbox": {
+        "task": "payments.tasks.relay_payment_outbox",
+        "schedule": 60,  # Picks up events whose commit-time relay was lost
+    },
 }
 
 # Audit log retention policy (years)
 AUDIT_LOG_RETENTION_YEARS = int(os.getenv("AUDIT_LOG_RETENTION_YEARS", "3"))
 
+# Carte grise OCR engine pool (per process)
+OCR_LANGUAGE = os.getenv("OCR_LANGUAGE", "fra")
+OCR_POOL_SIZE = int(os.getenv("OCR_POOL_SIZE", "2"))
+OCR_QUEUE_SIZE = int(os.getenv("OCR_QUEUE_SIZE", "8"))
+OCR_TIMEOUT_SECONDS = int(os.getenv("OCR_TIMEOUT_SECONDS", "30"))
+
+# API keys are reported in metrics as one of this many hashed buckets
+API_METRICS_KEY_BUCKETS = int(os.getenv("API_METRICS_KEY_BUCKETS", "32"))
+
+# Query budgets per unit of work (0 disables the check) and N+1 detection threshold
+QUERY_BUDGET_REQUEST = int(os.getenv("QUERY_BUDGET_REQUEST", "50"))
+QUERY_BUDGET_TASK = int(os.getenv("QUERY_BUDGET_TASK", "200"))
+QUERY_BUDGET_COMMAND = int(os.getenv("QUERY_BUDGET_COMMAND", "2000"))
+QUERY_DUPLICATE_THRESHOLD = int(os.getenv("QUERY_DUPLICATE_THRESHOLD", "10"))
+QUERY_COUNT_HEADER = os.getenv("QUERY_COUNT_HEADER", str(DEBUG)).lower() == "true"
+
+# Browser cache lifetime (seconds) of payment artifacts served from content-addressed (immutable) URLs
+PAYMENT_ARTIFACT_MAX_AGE = int(os.getenv("PAYMENT_ARTIFACT_MAX_AGE", str(60 * 60 * 24 * 365)))
+
+# Payment outbox relay: events per batch, retries before giving up, and how long a claimed
+# event stays locked to a worker before another worker may pick it up (seconds)
+PAYMENT_OUTBOX_BATCH_SIZE = int(os.getenv("PAYMENT_OUTBOX_BATCH_SIZE", "50"))
+PAYMENT_OUTBOX_MAX_ATTEMPTS = int(os.getenv("PAYMENT_OUTBOX_MAX_ATTEMPTS", "8"))
+PAYMENT_OUTBOX_LEASE_SECONDS = int(os.getenv("PAYMENT_OUTBOX_LEASE_SECONDS", "300"))
+
+# Webhook delivery: HTTP timeout and attempts per delivery, deliveries in flight per subscriber
+# (also the keep-alive pool size per host), consecutive failures that open a subscriber's
+# circuit and how long it stays open (seconds), and the retry sweep batch size and lease
+WEBHOOK_TIMEOUT_SECONDS = int(os.getenv("WEBHOOK_TIMEOUT_SECONDS", "10"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "3"))
+WEBHOOK_MAX_CONCURRENCY_PER_SUBSCRIBER = int(os.getenv("WEBHOOK_MAX_CONCURRENCY_PER_SUBSCRIBER", "4"))
+WEBHOOK_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("WEBHOOK_CIRCUIT_FAILURE_THRESHOLD", "5"))
+WEBHOOK_CIRCUIT_RESET_SECONDS = int(os.getenv("WEBHOOK_CIRCUIT_RESET_SECONDS", "300"))
+WEBHOOK_DELIVERY_BATCH_SIZE = int(os.getenv("WEBHOOK_DELIVERY_BATCH_SIZE", "100"))
+WEBHOOK_DELIVERY_LEASE_SECONDS = int(os.getenv("WEBHOOK_DELIVERY_LEASE_SECONDS", "120"))
+
+# CMS settings and menus shown on every page are cached (seconds, 0 disables); processes
+# re-check the shared cache version this often, so changes show up after at most that delay
+CMS_CONTEXT_CACHE_TIMEOUT = int(os.getenv("CMS_CONTEXT_CACHE_TIMEOUT", "3600"))
+CMS_CONTEXT_LOCAL_TTL = int(os.getenv("CMS_CONTEXT_LOCAL_TTL", "5"))
+# Resolved user role and admin permissions are kept in the session this long (seconds)
+USER_ROLE_CONTEXT_TTL = int(os.getenv("USER_ROLE_CONTEXT_TTL", "300"))
+
+# Consents checked by ConsentVerificationMiddleware are cached per user (seconds)
+CONSENT_CACHE_TIMEOUT = int(os.getenv("CONSENT_CACHE_TIMEOUT", "300"))
+# Personal data access logs are written in batches of this size, or once the oldest is this old
+CONSENT_ACCESS_LOG_BATCH_SIZE = int(os.getenv("CONSENT_ACCESS_LOG_BATCH_SIZE", "50"))
+CONSENT_ACCESS_LOG_FLUSH_SECONDS = int(os.getenv("CONSENT_ACCESS_LOG_FLUSH_SECONDS", "2"))
+
+# Reference data endpoints (vehicle types, price grids, changelog) may be cached this long by
+# browsers and shared caches; clients revalidate with their ETag afterwards (seconds)
+API_REFERENCE_MAX_AGE = int(os.getenv("API_REFERENCE_MAX_AGE", "300"))
+
+# Late penalties are applied to overdue contraventions in chunks of this size, one
+# transaction per chunk
+CONTRAVENTION_PENALTY_CHUNK_SIZE = int(os.getenv("CONTRAVENTION_PENALTY_CHUNK_SIZE", "500"))
+
+# Contraventions kept in each driver's and vehicle's infraction summary for recidivism checks (days)
+CONTRAVENTION_RECIDIVE_WINDOW_DAYS = int(os.getenv("CONTRAVENTION_RECIDIVE_WINDOW_DAYS", "365"))
+
+# Agent vehicle/driver autocomplete: results per search and per-agent result cache (seconds, 0 disables)
+CONTRAVENTION_SEARCH_LIMIT = int(os.getenv("CONTRAVENTION_SEARCH_LIMIT", "10"))
+CONTRAVENTION_SEARCH_CACHE_SECONDS = int(os.getenv("CONTRAVENTION_SEARCH_CACHE_SECONDS", "30"))
+
+# Contravention payment reminders: days before the due date for the first reminder, days after it
+# for the overdue reminder and for the final warning, and recipients per mail batch
+CONTRAVENTION_REMINDER_DAYS_BEFORE_DUE = int(os.getenv("CONTRAVENTION_REMINDER_DAYS_BEFORE_DUE", "7"))
+CONTRAVENTION_REMINDER_DAYS_AFTER_DUE = int(os.getenv("CONTRAVENTION_REMINDER_DAYS_AFTER_DUE", "3"))
+CONTRAVENTION_REMINDER_VERY_OVERDUE_DAYS = int(os.getenv("CONTRAVENTION_REMINDER_VERY_OVERDUE_DAYS", "30"))
+CONTRAVENTION_REMINDER_BATCH_SIZE = int(os.getenv("CONTRAVENTION_REMINDER_BATCH_SIZE", "200"))
+
+# Key of the permutation hiding the order of PV, cash session, transaction and receipt numbers
+# (see core.utils.identifiers). Never change it once numbers have been issued.
+IDENTIFIER_PERMUTATION_KEY = os.getenv("IDENTIFIER_PERMUTATION_KEY", SECRET_KEY)
+
+# Configuration singletons (contravention and cash settings, active MVola, Stripe and SMTP
+# configurations) are kept in process memory; processes re-check the shared cache version this
+# often (seconds), so changes saved in another process show up after at most that delay
+CONFIG_CACHE_LOCAL_TTL = int(os.getenv("CONFIG_CACHE_LOCAL_TTL", "5"))
+
+# Open data exports (see api.utils.anonymization): groups of fewer than OPEN_DATA_K_ANONYMITY
+# records are suppressed, and each dataset may spend at most OPEN_DATA_EPSILON_BUDGET of
+# differential privacy budget over all its releases
+OPEN_DATA_K_ANONYMITY = int(os.getenv("OPEN_DATA_K_ANONYMITY", "5"))
+OPEN_DATA_EPSILON_BUDGET = float(os.getenv("OPEN_DATA_EPSILON_BUDGET", "10.0"))
+
+# OpenAPI schema generated at deploy time by `manage.py generate_openapi_schema`
+OPENAPI_SCHEMA_PATH = os.getenv("OPENAPI_SCHEMA_PATH", str(BASE_DIR / "openapi" / "schema.json"))
+
 # Security Settings
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
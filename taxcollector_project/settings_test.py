@@ -55,6 +55,15 @@ CELERY_TASK_EAGER_PROPAGATES = True
 # Test-specific settings
 TESTING = True
 
+# The cache outlives the per-test database rollback; tests of the CMS cache enable it explicitly
+CMS_CONTEXT_CACHE_TIMEOUT = 0
+# Write data access logs immediately so they never outlive the test that produced them
+CONSENT_ACCESS_LOG_BATCH_SIZE = 1
+# Same for the in-process index of webhook subscriptions
+WEBHOOK_SUBSCRIPTION_CACHE = False
+# And for the in-process copies of configuration singletons (see core.utils.config_cache)
+CONFIG_CACHE = False
+
 # Disable migrations for faster tests (optional)
 # Uncomment if you want to speed up tests
 # class DisableMigrations:
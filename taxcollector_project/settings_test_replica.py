@@ -0,0 +1,19 @@
+"""
+Django settings for testing read-replica routing locally
+
+Adds a ``replica`` alias next to the SQLite test database. The replica mirrors ``default``
+during tests (Django's ``TEST["MIRROR"]``), so the same data is visible through both aliases
+and tests can check which alias a query was routed to without a real replica:
+
+    pytest --ds=taxcollector_project.settings_test_replica core/tests/test_db_routers.py
+"""
+
+from .settings_test import *  # noqa
+
+DATABASES = {
+    "default": DATABASES["default"],  # noqa
+    "replica": {
+        **DATABASES["default"],  # noqa
+        "TEST": {"MIRROR": "default"},
+    },
+}
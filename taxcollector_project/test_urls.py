@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.urls import path
 
-from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+from drf_spectacular.views import SpectacularRedocView, SpectacularSwaggerView
+
+from api.openapi_schema import CachedSpectacularAPIView
 from api.test_views import TestHealthView, TestVehicleCreateView, TestVehicleDetailView, TestThrottledView
 
 urlpatterns = [
@@ -10,7 +12,7 @@ urlpatterns = [
     path("api/v1/vehicles/", TestVehicleCreateView.as_view()),
     path("api/v1/vehicles/<str:plaque>/", TestVehicleDetailView.as_view()),
     path("api/v1/throttled/", TestThrottledView.as_view()),
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
+    path("api/schema/", CachedSpectacularAPIView.as_view(), name="schema"),
     path("api/schema/swagger-ui/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
     path("api/schema/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
 ]
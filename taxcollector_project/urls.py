@@ -20,9 +20,10 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
-from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+from drf_spectacular.views import SpectacularRedocView, SpectacularSwaggerView
 from django_prometheus.exports import ExportToDjangoView
 from api.changelog_views import APIChangelogView
+from api.openapi_schema import CachedSpectacularAPIView
 from api.admin_metrics_views import (
     metrics_dashboard_view,
     metrics_usage_data,
@@ -56,7 +57,7 @@ urlpatterns = [
     # Prometheus metrics endpoint
     path("api/metrics/", ExportToDjangoView, name="prometheus-metrics"),
     # OpenAPI/Swagger documentation
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
+    path("api/schema/", CachedSpectacularAPIView.as_view(), name="schema"),
     path("api/schema/swagger-ui/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
     path("api/schema/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
     # API changelog
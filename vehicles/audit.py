@@ -5,6 +5,16 @@ from django.utils import timezone
 from .models import FleetAuditLog
 
 
+def _compute_hash(user, action_type, vehicule, lot_import, operation_modification, donnees_action):
+    data_str = f"{action_type}|{user.id}|{getattr(vehicule, 'plaque_immatriculation', '')}|{getattr(lot_import, 'id', '')}|{getattr(operation_modification, 'id', '')}|{timezone.now().isoformat()}|{donnees_action or {}}"
+    return hashlib.sha256(data_str.encode("utf-8")).hexdigest()
+
+
+def _last_hash():
+    previous = FleetAuditLog.objects.order_by("-cree_le", "-id").only("current_hash").first()
+    return previous.current_hash if previous else ""
+
+
 def log_action(
     user,
     action_type,
@@ -15,10 +25,8 @@ def log_action(
     adresse_ip=None,
     agent_utilisateur=None,
 ):
-    data_str = f"{action_type}|{user.id}|{getattr(vehicule, 'plaque_immatriculation', '')}|{getattr(lot_import, 'id', '')}|{getattr(operation_modification, 'id', '')}|{timezone.now().isoformat()}|{donnees_action or {}}"
-    current_hash = hashlib.sha256(data_str.encode("utf-8")).hexdigest()
-    previous = FleetAuditLog.objects.order_by("-cree_le").first()
-    previous_hash = previous.current_hash if previous else ""
+    current_hash = _compute_hash(user, action_type, vehicule, lot_import, operation_modification, donnees_action)
+    previous_hash = _last_hash()
     return FleetAuditLog.objects.create(
         action_type=action_type,
         utilisateur=user,
@@ -31,3 +39,34 @@ def log_action(
         previous_hash=previous_hash,
         current_hash=current_hash,
     )
+
+
+def bulk_log_actions(user, entries, lot_import=None, operation_modification=None):
+    """
+    Append several audit entries with a single INSERT.
+
+    ``entries`` is an iterable of dicts with ``action_type`` and optional ``vehicule`` /
+    ``donnees_action`` keys. The hash chain is continued in memory from the last stored entry.
+    """
+    previous_hash = _last_hash()
+    logs = []
+    for entry in entries:
+        vehicule = entry.get("vehicule")
+        donnees_action = entry.get("donnees_action") or {}
+        current_hash = _compute_hash(
+            user, entry["action_type"], vehicule, lot_import, operation_modification, donnees_action
+        )
+        logs.append(
+            FleetAuditLog(
+                action_type=entry["action_type"],
+                utilisateur=user,
+                vehicule=vehicule,
+                lot_import=lot_import,
+                operation_modification=operation_modification,
+                donnees_action=donnees_action,
+                previous_hash=previous_hash,
+                current_hash=current_hash,
+            )
+        )
+        previous_hash = current_hash
+    return FleetAuditLog.objects.bulk_create(logs)
@@ -0,0 +1,94 @@
+"""
+Set-based bulk edit and rollback for fleet vehicles
+
+The editable fields do not interact with the per-vehicle validation in ``Vehicule.clean``
+(cylindrée/CV coherence), so the new values are validated once per distinct resulting
+combination and applied with a single UPDATE instead of ``full_clean()`` + ``save()`` per row.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import BulkEditChange, BulkEditOperation, Vehicule
+
+EDITABLE_FIELDS = ["est_actif", "source_energie", "categorie_vehicule", "type_vehicule_id"]
+
+
+def get_changes(cleaned_data):
+    """Translate ``FleetBulkEditForm.cleaned_data`` into column updates"""
+    changes = {}
+    est_actif = cleaned_data.get("est_actif")
+    if est_actif in ["true", "false"]:
+        est_actif = est_actif == "true"
+    if isinstance(est_actif, bool):
+        changes["est_actif"] = est_actif
+    if cleaned_data.get("source_energie"):
+        changes["source_energie"] = cleaned_data["source_energie"]
+    if cleaned_data.get("categorie_vehicule"):
+        changes["categorie_vehicule"] = cleaned_data["categorie_vehicule"]
+    if cleaned_data.get("type_vehicule"):
+        changes["type_vehicule_id"] = cleaned_data["type_vehicule"].pk
+    return changes
+
+
+def validate_combinations(combinations):
+    """Run field validation once for each distinct ``{field: value}`` combination"""
+    for combination in {tuple(sorted(c.items())) for c in combinations}:
+        values = dict(combination)
+        exclude = [f.name for f in Vehicule._meta.fields if f.attname not in values]
+        Vehicule(**values).clean_fields(exclude=exclude)
+
+
+def apply_bulk_edit(user, vehicles, changes, selection):
+    """
+    Apply ``changes`` to the ``vehicles`` queryset and record one ``BulkEditChange`` per vehicle.
+
+    Returns the ``BulkEditOperation`` and the number of changed vehicles.
+    """
+    with transaction.atomic():
+        before_rows = list(vehicles.select_for_update().values("pk", *EDITABLE_FIELDS))
+        after_rows = [{**{f: row[f] for f in EDITABLE_FIELDS}, **changes} for row in before_rows]
+        validate_combinations(after_rows)
+
+        op = BulkEditOperation.objects.create(
+            utilisateur=user, champs_modifies=changes, selection=selection, statut="PENDING"
+        )
+        pks = [row["pk"] for row in before_rows]
+        if changes and pks:
+            Vehicule.objects.filter(pk__in=pks).update(**changes, updated_at=timezone.now())
+        BulkEditChange.objects.bulk_create(
+            BulkEditChange(
+                operation=op,
+                vehicule_id=before["pk"],
+                avant={f: before[f] for f in EDITABLE_FIELDS},
+                apres=after,
+            )
+            for before, after in zip(before_rows, after_rows)
+        )
+        op.statut = "APPLIED"
+        op.applique_le = timezone.now()
+        op.save(update_fields=["statut", "applique_le"])
+    return op, len(before_rows)
+
+
+def rollback_bulk_edit(op):
+    """Restore the prior values, issuing one UPDATE per distinct prior value combination"""
+    groups = defaultdict(list)
+    for vehicule_id, avant in op.changements.values_list("vehicule_id", "avant"):
+        restore = {f: avant[f] for f in EDITABLE_FIELDS if f in avant}
+        # A missing type cannot be restored on a non-nullable foreign key
+        if not restore.get("type_vehicule_id"):
+            restore.pop("type_vehicule_id", None)
+        groups[tuple(sorted(restore.items()))].append(vehicule_id)
+
+    with transaction.atomic():
+        validate_combinations(dict(key) for key in groups)
+        now = timezone.now()
+        for key, vehicule_ids in groups.items():
+            if key:
+                Vehicule.objects.filter(pk__in=vehicule_ids).update(**dict(key), updated_at=now)
+        op.statut = "ROLLED_BACK"
+        op.save(update_fields=["statut"])
+    return op
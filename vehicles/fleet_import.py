@@ -0,0 +1,174 @@
+"""
+Staged fleet import engine
+
+Rows are streamed from the stored upload, validated in memory against reference data
+loaded once per import (vehicle types, tariff grids) and per chunk (existing plates),
+then written with ``bulk_create`` one chunk per transaction. The batch records how many
+source rows have been committed so an interrupted job resumes where it stopped.
+"""
+
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .audit import bulk_log_actions, log_action
+from .import_utils import count_rows, iter_rows, map_row, normalize_vehicle_payload, validate_vehicle_payload
+from .models import FleetImportBatch, FleetImportRow, GrilleTarifaire, VehicleType, Vehicule
+
+DEFAULT_CHUNK_SIZE = 500
+
+# Fields checked by ``clean_fields`` during pre-validation. Foreign keys and the primary key
+# uniqueness are checked against the preloaded sets instead, which avoids one query per row.
+PREVALIDATION_EXCLUDE = ["proprietaire", "type_vehicule"]
+
+
+class FleetImportEngine:
+    """Process a ``FleetImportBatch`` in chunks"""
+
+    def __init__(self, batch, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.batch = batch
+        self.user = batch.utilisateur
+        self.chunk_size = chunk_size
+        self.mapping = batch.mapping_colonnes or {}
+        self.seen_plates = set()
+        self._load_reference_data()
+
+    def _load_reference_data(self):
+        types = list(VehicleType.objects.filter(est_actif=True).values_list("id", "nom"))
+        self.type_ids = {type_id for type_id, _ in types}
+        self.type_ids_by_name = {nom.strip().lower(): type_id for type_id, nom in types}
+        # Energy sources covered by an active progressive grid; empty means no grid configured yet
+        self.tariff_energies = set(
+            GrilleTarifaire.objects.filter(
+                annee_fiscale=timezone.now().year, est_active=True, grid_type="PROGRESSIVE"
+            ).values_list("source_energie", flat=True)
+        )
+
+    def run(self):
+        """Process every remaining row of the batch and finalize it"""
+        batch = self.batch
+        if batch.statut in ("COMPLETED", "FAILED", "ROLLED_BACK"):
+            return batch
+
+        with batch.fichier.open("rb") as handle:
+            if not batch.total_lignes:
+                batch.total_lignes = count_rows(handle, batch.type_fichier)
+            batch.statut = "PROCESSING"
+            batch.save(update_fields=["total_lignes", "statut"])
+
+            # Rows committed before an interruption are skipped; their plates are in the
+            # database by now, so the per-chunk plate lookup would reject them anyway.
+            rows = enumerate(iter_rows(handle, batch.type_fichier), start=1)
+            rows = islice(rows, batch.lignes_traitees, None)
+            while True:
+                chunk = list(islice(rows, self.chunk_size))
+                if not chunk:
+                    break
+                self.process_chunk(chunk)
+
+        return self.finalize()
+
+    def process_chunk(self, chunk):
+        """Validate and write one chunk of ``(line_number, raw_row)`` pairs atomically"""
+        prepared = [(i, normalize_vehicle_payload(map_row(self.mapping, row))) for i, row in chunk]
+        plates = [data.get("plaque_immatriculation") for _, data in prepared if data.get("plaque_immatriculation")]
+        existing = set(Vehicule.objects.filter(plaque_immatriculation__in=plates).values_list("pk", flat=True))
+
+        vehicles = []
+        import_rows = []
+        audit_entries = []
+        for i, data in prepared:
+            vehicule, errors = self.build_vehicle(data, existing)
+            if errors:
+                import_rows.append(
+                    FleetImportRow(lot=self.batch, numero_ligne=i, donnees=data, erreurs=errors, statut="ERROR")
+                )
+                audit_entries.append({"action_type": "IMPORT_ROW_FAIL", "donnees_action": {"row": i, "errors": errors}})
+                continue
+            self.seen_plates.add(vehicule.plaque_immatriculation)
+            vehicles.append(vehicule)
+            import_rows.append(
+                FleetImportRow(
+                    lot=self.batch, numero_ligne=i, donnees=data, erreurs=[], statut="SUCCESS", vehicule=vehicule
+                )
+            )
+            audit_entries.append(
+                {"action_type": "IMPORT_ROW_SUCCESS", "vehicule": vehicule, "donnees_action": {"row": i}}
+            )
+
+        success = len(vehicles)
+        with transaction.atomic():
+            Vehicule.objects.bulk_create(vehicles)
+            FleetImportRow.objects.bulk_create(import_rows)
+            bulk_log_actions(self.user, audit_entries, lot_import=self.batch)
+            FleetImportBatch.objects.filter(pk=self.batch.pk).update(
+                reussites=F("reussites") + success,
+                echecs=F("echecs") + len(prepared) - success,
+                lignes_traitees=chunk[-1][0],
+            )
+        self.batch.refresh_from_db(fields=["reussites", "echecs", "lignes_traitees"])
+
+    def build_vehicle(self, data, existing_plates):
+        """Return ``(vehicule, errors)`` for a mapped row without touching the database"""
+        valid, errors = validate_vehicle_payload(data)
+        if not valid:
+            return None, errors
+
+        plate = data.get("plaque_immatriculation")
+        if plate in existing_plates or plate in self.seen_plates:
+            return None, [f"plaque_immatriculation {plate} existe déjà"]
+
+        type_id = self.resolve_type(data.get("type_vehicule"))
+        if type_id is None:
+            return None, ["type_vehicule manquant ou invalide"]
+
+        if self.tariff_energies and data.get("source_energie") not in self.tariff_energies:
+            return None, ["aucune grille tarifaire active pour cette source d'énergie"]
+
+        vehicule = Vehicule(
+            proprietaire=self.user,
+            nom_proprietaire=data.get("nom_proprietaire") or "",
+            plaque_immatriculation=plate,
+            marque=data.get("marque") or "",
+            modele=data.get("modele") or "",
+            vin=data.get("vin") or "",
+            couleur=data.get("couleur") or "",
+            puissance_fiscale_cv=data.get("puissance_fiscale_cv") or 1,
+            cylindree_cm3=data.get("cylindree_cm3") or 1000,
+            source_energie=data.get("source_energie"),
+            date_premiere_circulation=data.get("date_premiere_circulation"),
+            categorie_vehicule=data.get("categorie_vehicule") or "Personnel",
+            type_vehicule_id=type_id,
+            est_actif=True,
+        )
+        try:
+            vehicule.clean_fields(exclude=PREVALIDATION_EXCLUDE)
+            vehicule.clean()
+        except ValidationError as e:
+            return None, [f"{field}: {msg}" for field, messages in e.message_dict.items() for msg in messages]
+        return vehicule, []
+
+    def resolve_type(self, value):
+        if value in (None, ""):
+            return None
+        if isinstance(value, int) or str(value).isdigit():
+            type_id = int(value)
+            return type_id if type_id in self.type_ids else None
+        return self.type_ids_by_name.get(str(value).strip().lower())
+
+    def finalize(self):
+        batch = self.batch
+        batch.refresh_from_db()
+        batch.statut = "COMPLETED" if batch.echecs == 0 else "FAILED"
+        batch.termine_le = timezone.now()
+        batch.save(update_fields=["statut", "termine_le"])
+        log_action(
+            self.user,
+            "IMPORT_END",
+            lot_import=batch,
+            donnees_action={"success": batch.reussites, "failed": batch.echecs},
+        )
+        return batch
@@ -1,41 +1,83 @@
 import csv
+from datetime import date, datetime
 from io import TextIOWrapper
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterator, List, Tuple
 
 
-def read_csv(file) -> List[Dict[str, Any]]:
+def iter_csv(file) -> Iterator[Dict[str, Any]]:
     wrapper = TextIOWrapper(file, encoding="utf-8") if hasattr(file, "read") else file
     reader = csv.DictReader(wrapper)
-    return [dict(row) for row in reader]
+    for row in reader:
+        yield dict(row)
 
 
-def read_excel(file) -> List[Dict[str, Any]]:
+def iter_excel(file) -> Iterator[Dict[str, Any]]:
     try:
         from openpyxl import load_workbook
     except Exception:
-        return []
+        return
     wb = load_workbook(file, read_only=True, data_only=True)
-    ws = wb.active
-    headers = []
-    rows = []
-    for i, row in enumerate(ws.iter_rows(values_only=True)):
-        if i == 0:
-            headers = [str(h) if h is not None else "" for h in row]
-            continue
-        data = {}
-        for j, val in enumerate(row):
-            key = headers[j] if j < len(headers) else f"col_{j}"
-            data[key] = val
-        rows.append(data)
-    return rows
+    try:
+        ws = wb.active
+        headers = []
+        for i, row in enumerate(ws.iter_rows(values_only=True)):
+            if i == 0:
+                headers = [str(h) if h is not None else "" for h in row]
+                continue
+            data = {}
+            for j, val in enumerate(row):
+                key = headers[j] if j < len(headers) else f"col_{j}"
+                data[key] = val
+            yield data
+    finally:
+        wb.close()
+
+
+def iter_rows(file, file_type: str) -> Iterator[Dict[str, Any]]:
+    """Stream the data rows of an uploaded fleet file without materializing it."""
+    file_type = (file_type or "").lower()
+    if file_type in ["csv"]:
+        return iter_csv(file)
+    if file_type in ["xls", "xlsx", "excel"]:
+        return iter_excel(file)
+    return iter(())
+
+
+def count_rows(file, file_type: str) -> int:
+    """Cheap pre-pass returning the number of data rows (used for progress reporting)."""
+    file_type = (file_type or "").lower()
+    if file_type in ["csv"]:
+        wrapper = TextIOWrapper(file, encoding="utf-8")
+        try:
+            return max(sum(1 for _ in csv.reader(wrapper)) - 1, 0)
+        finally:
+            # Leave the underlying file open and rewound for the real pass
+            wrapper.detach()
+            file.seek(0)
+    if file_type in ["xls", "xlsx", "excel"]:
+        try:
+            from openpyxl import load_workbook
+        except Exception:
+            return 0
+        wb = load_workbook(file, read_only=True, data_only=True)
+        try:
+            return max((wb.active.max_row or 1) - 1, 0)
+        finally:
+            wb.close()
+            file.seek(0)
+    return 0
+
+
+def read_csv(file) -> List[Dict[str, Any]]:
+    return list(iter_csv(file))
+
+
+def read_excel(file) -> List[Dict[str, Any]]:
+    return list(iter_excel(file))
 
 
 def read_rows(file, file_type: str) -> List[Dict[str, Any]]:
-    if file_type.lower() in ["csv"]:
-        return read_csv(file)
-    if file_type.lower() in ["xls", "xlsx", "excel"]:
-        return read_excel(file)
-    return []
+    return list(iter_rows(file, file_type))
 
 
 def map_row(mapping: Dict[str, str], row: Dict[str, Any]) -> Dict[str, Any]:
@@ -61,6 +103,12 @@ def normalize_vehicle_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
             payload["cylindree_cm3"] = int(payload["cylindree_cm3"])
         except Exception:
             pass
+    # Excel cells come back as datetime objects; keep the payload JSON-serializable
+    circulation = payload.get("date_premiere_circulation")
+    if isinstance(circulation, datetime):
+        payload["date_premiere_circulation"] = circulation.date().isoformat()
+    elif isinstance(circulation, date):
+        payload["date_premiere_circulation"] = circulation.isoformat()
     return payload
 
 
@@ -0,0 +1,85 @@
+"""
+Management command to benchmark carte grise OCR
+
+Compares the legacy path (a new PyTessBaseAPI, and therefore a language model load, per image)
+with the pooled engines used by process_carte_grise_ocr.
+"""
+
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from vehicles.ocr_engine import OCREnginePool
+from vehicles.ocr_utils import CarteGriseOCR
+
+
+class Command(BaseCommand):
+    help = "Benchmark per-call latency and throughput of the OCR engine pool against per-call engines"
+
+    def add_arguments(self, parser):
+        parser.add_argument("images", nargs="+", help="Image files (JPG/PNG) to recognize")
+        parser.add_argument("--iterations", type=int, default=10, help="Recognitions per image (default: 10)")
+        parser.add_argument("--concurrency", type=int, default=2, help="Concurrent callers (default: 2)")
+        parser.add_argument("--lang", default="fra", help="Tesseract language (default: fra)")
+
+    def handle(self, *args, **options):
+        try:
+            import tesserocr
+        except ImportError as e:
+            raise CommandError("tesserocr is not installed") from e
+
+        images = []
+        for path in options["images"]:
+            with open(path, "rb") as f:
+                images.append(f.read())
+        lang = options["lang"]
+        concurrency = options["concurrency"]
+        jobs = images * options["iterations"]
+
+        def legacy(image_bytes):
+            img = CarteGriseOCR.preprocess_bytes(image_bytes)
+            with tesserocr.PyTessBaseAPI(lang=lang, psm=tesserocr.PSM.AUTO) as api:
+                api.SetImage(img)
+                return api.GetUTF8Text()
+
+        # Each job gets unique bytes (see run()), so the pool's result cache never short-circuits a call
+        pool = OCREnginePool(size=concurrency, queue_size=len(jobs), lang=lang, cache_timeout=1)
+
+        def pooled(image_bytes):
+            return pool.submit(image_bytes, CarteGriseOCR.preprocess_bytes).result()
+
+        self.stdout.write(f"{len(jobs)} recognitions, {concurrency} concurrent callers")
+        try:
+            for name, func in (("per-call engine", legacy), ("engine pool", pooled)):
+                self.report(name, self.run(func, jobs, concurrency))
+        finally:
+            pool.shutdown()
+
+    def run(self, func, jobs, concurrency):
+        latencies = []
+
+        def timed(index_and_bytes):
+            index, image_bytes = index_and_bytes
+            start = time.perf_counter()
+            # Trailing bytes are ignored by the image decoders but change the content hash
+            func(image_bytes + index.to_bytes(4, "big"))
+            latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(timed, enumerate(jobs)))
+        return latencies, time.perf_counter() - start
+
+    def report(self, name, measurements):
+        latencies, elapsed = measurements
+        latencies = sorted(latencies)
+        p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{name:>16}: mean {statistics.mean(latencies) * 1000:.1f} ms, "
+                f"p50 {statistics.median(latencies) * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms, "
+                f"throughput {len(latencies) / elapsed:.2f} images/s"
+            )
+        )
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vehicles", "0017_add_statut_declaration_field"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fleetimportbatch",
+            name="fichier",
+            field=models.FileField(blank=True, upload_to="fleet_imports/%Y/%m/"),
+        ),
+        migrations.AddField(
+            model_name="fleetimportbatch",
+            name="lignes_traitees",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="fleetimportbatch",
+            name="task_id",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vehicles", "0018_fleet_import_progress"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="documentvehicule",
+            name="variants_status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "En attente"),
+                    ("ready", "Prêts"),
+                    ("failed", "Échec"),
+                    ("skipped", "Non applicable"),
+                ],
+                default="skipped",
+                max_length=20,
+                verbose_name="Statut des dérivés",
+            ),
+        ),
+        migrations.CreateModel(
+            name="DocumentVehiculeVariant",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "variant",
+                    models.CharField(
+                        choices=[("optimized", "Optimisé"), ("preview", "Aperçu"), ("thumbnail", "Miniature")],
+                        max_length=20,
+                    ),
+                ),
+                ("fichier", models.FileField(upload_to="vehicle_documents/variants/%Y/%m/%d")),
+                ("width", models.PositiveIntegerField()),
+                ("height", models.PositiveIntegerField()),
+                ("taille_octets", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "document",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="variants",
+                        to="vehicles.documentvehicule",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Variante de document",
+                "verbose_name_plural": "Variantes de documents",
+                "constraints": [models.UniqueConstraint(fields=("document", "variant"), name="uniq_document_variant")],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-19 03:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+from core.utils.search import normalize_search_key, trigram_indexes
+
+
+def populate_vin_normalise(apps, schema_editor):
+    Vehicule = apps.get_model("vehicles", "Vehicule")
+    batch = []
+    for vehicule in Vehicule.objects.exclude(vin="").only("pk", "vin").iterator(chunk_size=2000):
+        vehicule.vin_normalise = normalize_search_key(vehicule.vin)
+        batch.append(vehicule)
+        if len(batch) >= 2000:
+            Vehicule.objects.bulk_update(batch, ["vin_normalise"])
+            batch = []
+    Vehicule.objects.bulk_update(batch, ["vin_normalise"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vehicles", "0019_document_variants"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="vehicule",
+            name="vin_normalise",
+            field=models.CharField(blank=True, default="", editable=False, max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name="vehicule",
+            index=models.Index(
+                fields=["plaque_immatriculation"], name="idx_vehicule_plaque_prefix", opclasses=["varchar_pattern_ops"]
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="vehicule",
+            index=models.Index(
+                fields=["vin_normalise"], name="idx_vehicule_vin_prefix", opclasses=["varchar_pattern_ops"]
+            ),
+        ),
+        migrations.RunPython(populate_vin_normalise, migrations.RunPython.noop),
+        trigram_indexes("vehicles_vehicule", ["plaque_immatriculation", "vin_normalise"]),
+    ]
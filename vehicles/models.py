@@ -7,6 +7,8 @@ from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
 from django.utils import timezone
 
+from core.utils.search import normalize_search_key
+
 from .utils import get_plage_cv_description, get_puissance_fiscale_from_cylindree, valider_coherence_cylindree_cv
 
 # Constantes pour les catégories exonérées (selon PLF 2026, Article 02.09.03)
@@ -138,6 +140,8 @@ class Vehicule(models.Model):
     vin = models.CharField(
         max_length=50, blank=True, verbose_name="VIN", help_text="Vehicle Identification Number (Numéro de châssis)"
     )
+    # Normalized copy of the VIN for prefix/trigram search (see core.utils.search)
+    vin_normalise = models.CharField(max_length=50, blank=True, default="", editable=False)
 
     puissance_fiscale_cv = models.PositiveIntegerField(
         validators=[MinValueValidator(1)],
@@ -261,6 +265,11 @@ class Vehicule(models.Model):
             models.Index(fields=["immatriculation_aerienne"], name="idx_immat_aerienne"),
             models.Index(fields=["numero_francisation"], name="idx_francisation"),
             models.Index(fields=["statut_declaration"], name="idx_statut_declaration"),
+            # Prefix search (LIKE 'X%'); trigram indexes for infix search are added by migration
+            models.Index(
+                fields=["plaque_immatriculation"], name="idx_vehicule_plaque_prefix", opclasses=["varchar_pattern_ops"]
+            ),
+            models.Index(fields=["vin_normalise"], name="idx_vehicule_vin_prefix", opclasses=["varchar_pattern_ops"]),
         ]
 
     def __str__(self):
@@ -351,6 +360,7 @@ class Vehicule(models.Model):
         # Normalize plate number (remove spaces)
         if self.plaque_immatriculation:
             self.plaque_immatriculation = self.normalize_plate(self.plaque_immatriculation)
+        self.vin_normalise = normalize_search_key(self.vin)
 
         # Only validate CV/cylindrée coherence for terrestrial vehicles
         if self.vehicle_category == "TERRESTRE" and self.cylindree_cm3 and self.puissance_fiscale_cv:
@@ -392,11 +402,16 @@ class Vehicule(models.Model):
             }
 
         # Get current year payment (check all statuses including EN_ATTENTE)
-        payment = (
-            PaiementTaxe.objects.filter(vehicule_plaque=self, annee_fiscale=current_year)
-            .exclude(statut="ANNULE")
-            .first()
-        )
+        prefetched = getattr(self, "_prefetched_objects_cache", {}).get("paiements")
+        if prefetched is not None:
+            candidates = [p for p in prefetched if p.annee_fiscale == current_year and p.statut != "ANNULE"]
+            payment = min(candidates, key=lambda p: p.pk) if candidates else None
+        else:
+            payment = (
+                PaiementTaxe.objects.filter(vehicule_plaque=self, annee_fiscale=current_year)
+                .exclude(statut="ANNULE")
+                .first()
+            )
 
         if not payment:
             return {
@@ -795,6 +810,12 @@ class DocumentVehicule(models.Model):
         ("verifie", "Vérifié"),
         ("rejete", "Rejeté"),
     ]
+    VARIANTS_STATUS_CHOICES = [
+        ("pending", "En attente"),
+        ("ready", "Prêts"),
+        ("failed", "Échec"),
+        ("skipped", "Non applicable"),
+    ]
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     vehicule = models.ForeignKey(Vehicule, on_delete=models.CASCADE, related_name="documents")
@@ -805,6 +826,9 @@ class DocumentVehicule(models.Model):
     expiration_date = models.DateField(null=True, blank=True)
     verification_status = models.CharField(max_length=20, choices=VERIFICATION_STATUS_CHOICES, default="soumis")
     verification_comment = models.TextField(blank=True)
+    variants_status = models.CharField(
+        max_length=20, choices=VARIANTS_STATUS_CHOICES, default="skipped", verbose_name="Statut des dérivés"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -821,41 +845,96 @@ class DocumentVehicule(models.Model):
     def __str__(self):
         return f"{self.get_document_type_display()} - {self.vehicule.plaque_immatriculation}"
 
+    IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff", ".webp"]
+
+    def is_image(self):
+        return bool(self.fichier) and any(self.fichier.name.lower().endswith(ext) for ext in self.IMAGE_EXTENSIONS)
+
+    def get_variant_specs(self):
+        """Sizes and encoder settings of the derivatives generated for this document"""
+        if self.document_type in ["carte_grise", "assurance", "controle_technique"]:
+            # High quality for official documents
+            optimized = {"size": (2048, 2048), "quality": 92, "method": 6}
+        elif self.document_type == "photo_plaque":
+            # Medium quality for photos
+            optimized = {"size": (1600, 1200), "quality": 88, "method": 6}
+        else:
+            optimized = {"size": (1920, 1920), "quality": 85, "method": 6}
+        return {
+            DocumentVehiculeVariant.OPTIMIZED: optimized,
+            DocumentVehiculeVariant.PREVIEW: {"size": (800, 800), "quality": 85, "method": 4},
+            DocumentVehiculeVariant.THUMBNAIL: {"size": (150, 150), "quality": 80, "method": 4},
+        }
+
+    def get_variant(self, name):
+        """Return a variant, using prefetched ``variants`` when available"""
+        for variant in self.variants.all():
+            if variant.variant == name:
+                return variant
+        return None
+
+    def get_variant_url(self, name):
+        """URL of a generated variant, falling back to the original file"""
+        variant = self.get_variant(name) if self.variants_status == "ready" else None
+        if variant:
+            return variant.fichier.url
+        return self.fichier.url if self.fichier else ""
+
+    @property
+    def thumbnail_url(self):
+        return self.get_variant_url(DocumentVehiculeVariant.THUMBNAIL)
+
+    @property
+    def preview_url(self):
+        return self.get_variant_url(DocumentVehiculeVariant.PREVIEW)
+
     def save(self, *args, **kwargs):
-        """Override save to optimize images before saving"""
-        # Check if this is an image file
-        if self.fichier and hasattr(self.fichier, "file"):
-            file_name = self.fichier.name.lower()
-            image_extensions = [".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff", ".webp"]
-
-            if any(file_name.endswith(ext) for ext in image_extensions):
-                try:
-                    from core.utils.image_optimizer import ImageOptimizer
-
-                    # Optimize based on document type
-                    if self.document_type in ["carte_grise", "assurance", "controle_technique"]:
-                        # High quality for official documents
-                        optimized = ImageOptimizer.optimize_document(self.fichier, document_type=self.document_type)
-                    elif self.document_type == "photo_plaque":
-                        # Medium quality for photos
-                        optimized = ImageOptimizer.optimize_image(
-                            self.fichier, max_width=1600, max_height=1200, quality=88
-                        )
-                    else:
-                        # Default optimization
-                        optimized = ImageOptimizer.optimize_image(self.fichier)
-
-                    self.fichier = optimized
-
-                except Exception as e:
-                    # Log error but don't block save
-                    import logging
-
-                    logger = logging.getLogger(__name__)
-                    logger.error(f"Error optimizing vehicle document image: {str(e)}")
+        """Store the original as-is; image derivatives are generated by a background worker"""
+        new_upload = bool(self.fichier) and not getattr(self.fichier, "_committed", True)
+        if new_upload:
+            self.variants_status = "pending" if self.is_image() else "skipped"
 
         super().save(*args, **kwargs)
 
+        if new_upload and self.variants_status == "pending":
+            from django.db import transaction
+
+            from .tasks import generate_document_variants
+
+            document_id = str(self.id)
+            transaction.on_commit(lambda: generate_document_variants.delay(document_id))
+
+
+class DocumentVehiculeVariant(models.Model):
+    """Pre-built derivative (optimized, preview, thumbnail) of a vehicle document image"""
+
+    OPTIMIZED = "optimized"
+    PREVIEW = "preview"
+    THUMBNAIL = "thumbnail"
+    VARIANT_CHOICES = [
+        (OPTIMIZED, "Optimisé"),
+        (PREVIEW, "Aperçu"),
+        (THUMBNAIL, "Miniature"),
+    ]
+
+    document = models.ForeignKey(DocumentVehicule, on_delete=models.CASCADE, related_name="variants")
+    variant = models.CharField(max_length=20, choices=VARIANT_CHOICES)
+    fichier = models.FileField(upload_to="vehicle_documents/variants/%Y/%m/%d")
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    taille_octets = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Variante de document"
+        verbose_name_plural = "Variantes de documents"
+        constraints = [
+            models.UniqueConstraint(fields=["document", "variant"], name="uniq_document_variant"),
+        ]
+
+    def __str__(self):
+        return f"{self.document_id} - {self.variant}"
+
 
 class FleetImportBatch(models.Model):
     STATUTS = (
@@ -868,16 +947,25 @@ class FleetImportBatch(models.Model):
     utilisateur = models.ForeignKey(User, on_delete=models.PROTECT)
     nom_fichier = models.CharField(max_length=255)
     type_fichier = models.CharField(max_length=16)
+    fichier = models.FileField(upload_to="fleet_imports/%Y/%m/", blank=True)
     mapping_colonnes = models.JSONField(default=dict)
     options = models.JSONField(default=dict)
     statut = models.CharField(max_length=16, choices=STATUTS, default="PENDING")
     total_lignes = models.PositiveIntegerField(default=0)
     reussites = models.PositiveIntegerField(default=0)
     echecs = models.PositiveIntegerField(default=0)
+    # Number of source rows already committed; the import task resumes after this offset
+    lignes_traitees = models.PositiveIntegerField(default=0)
+    task_id = models.CharField(max_length=64, blank=True)
     cree_le = models.DateTimeField(auto_now_add=True)
     termine_le = models.DateTimeField(null=True, blank=True)
     resume_erreurs = models.TextField(blank=True)
 
+    def get_progress_percent(self):
+        if not self.total_lignes:
+            return 100 if self.statut == "COMPLETED" else 0
+        return min(100, int(self.lignes_traitees * 100 / self.total_lignes))
+
 
 class FleetImportRow(models.Model):
     STATUTS = (
@@ -0,0 +1,183 @@
+"""
+Pooled Tesseract OCR engine
+
+Loading the Tesseract language model costs hundreds of milliseconds, so each worker thread
+keeps one long-lived ``PyTessBaseAPI`` instead of constructing it per image. Jobs go through
+a bounded queue: callers get ``OCRQueueFullError`` rather than piling up behind a saturated
+pool, and ``OCRTimeoutError`` when a result does not come back in time. Recognized text is
+cached by image content hash so re-uploads of the same carte grise skip Tesseract entirely.
+"""
+
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "ocr:text"
+
+
+class OCRQueueFullError(Exception):
+    """Raised when the OCR job queue is saturated"""
+
+
+class OCRTimeoutError(Exception):
+    """Raised when an OCR job does not finish within the allotted time"""
+
+
+def _default_engine_factory(lang):
+    import tesserocr
+
+    return tesserocr.PyTessBaseAPI(lang=lang, psm=tesserocr.PSM.AUTO)
+
+
+def image_hash(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+class OCREnginePool:
+    """Fixed set of worker threads, each owning a persistent Tesseract engine"""
+
+    def __init__(self, size=2, queue_size=8, lang="fra", engine_factory=None, cache_timeout=60 * 60 * 24):
+        self.size = size
+        self.lang = lang
+        self.cache_timeout = cache_timeout
+        self.engine_factory = engine_factory or _default_engine_factory
+        self._local = threading.local()
+        self._engines = []
+        self._engines_lock = threading.Lock()
+        # Running plus waiting jobs; a full semaphore means the queue is full
+        self._slots = threading.BoundedSemaphore(size + queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="ocr")
+
+    def _engine(self):
+        engine = getattr(self._local, "engine", None)
+        if engine is None:
+            engine = self.engine_factory(self.lang)
+            self._local.engine = engine
+            with self._engines_lock:
+                self._engines.append(engine)
+        return engine
+
+    def _recognize(self, image):
+        engine = self._engine()
+        try:
+            engine.SetImage(image)
+            return engine.GetUTF8Text()
+        finally:
+            engine.Clear()
+
+    def _cache_key(self, digest):
+        return f"{CACHE_PREFIX}:{self.lang}:{digest}"
+
+    def _cached_future(self, digest):
+        """Already-completed future holding the cached text of ``digest``, or None"""
+        cached = cache.get(self._cache_key(digest))
+        if cached is None:
+            return None
+        future = Future()
+        future.set_result(cached)
+        return future
+
+    def _run(self, image_bytes, digest, preprocess):
+        text = self._recognize(preprocess(image_bytes))
+        cache.set(self._cache_key(digest), text, self.cache_timeout)
+        return text
+
+    def submit(self, image_bytes, preprocess, queue_timeout=0):
+        """
+        Queue an image for recognition and return a ``Future`` resolving to its text.
+
+        ``preprocess`` turns the raw bytes into a PIL image; it runs on the worker thread.
+        Cached results are returned as an already-completed future.
+        """
+        digest = image_hash(image_bytes)
+        cached = self._cached_future(digest)
+        if cached is not None:
+            return cached
+
+        if queue_timeout:
+            acquired = self._slots.acquire(timeout=queue_timeout)
+        else:
+            acquired = self._slots.acquire(blocking=False)
+        if not acquired:
+            raise OCRQueueFullError("OCR queue is full")
+        try:
+            future = self._executor.submit(self._run, image_bytes, digest, preprocess)
+        except Exception:
+            self._slots.release()
+            raise
+        # Also fires for cancelled jobs, so a timed-out request never leaks its slot
+        future.add_done_callback(lambda _future: self._slots.release())
+        return future
+
+    def recognize_many(self, images, preprocess, timeout=None, return_exceptions=False):
+        """
+        Recognize several images in parallel and return their texts in order
+
+        With ``return_exceptions``, an image whose preprocessing or recognition failed gets its
+        exception in place of the text; pool saturation and timeouts always raise.
+        """
+        futures = self._submit_all(images, preprocess)
+        try:
+            return [self._result(future, timeout, return_exceptions) for future in futures]
+        except FutureTimeoutError as e:
+            for future in futures:
+                future.cancel()
+            raise OCRTimeoutError("OCR job timed out") from e
+
+    def _submit_all(self, images, preprocess):
+        futures = []
+        try:
+            for image_bytes in images:
+                futures.append(self.submit(image_bytes, preprocess))
+        except OCRQueueFullError:
+            # Do not leave the pages already queued running for a request that fails
+            for future in futures:
+                future.cancel()
+            raise
+        return futures
+
+    @staticmethod
+    def _result(future, timeout, return_exceptions):
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            return e
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+        with self._engines_lock:
+            for engine in self._engines:
+                try:
+                    engine.End()
+                except Exception:
+                    logger.debug("Error closing OCR engine", exc_info=True)
+            self._engines = []
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_ocr_pool():
+    """Return the process-wide OCR pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = OCREnginePool(
+                    size=getattr(settings, "OCR_POOL_SIZE", 2),
+                    queue_size=getattr(settings, "OCR_QUEUE_SIZE", 8),
+                    lang=getattr(settings, "OCR_LANGUAGE", "fra"),
+                )
+    return _pool
@@ -6,11 +6,15 @@ Uses Tesseract OCR (via tesserocr) for text extraction and pattern matching for
 import logging
 import re
 from datetime import datetime
-from typing import Any, Dict, Optional, Tuple
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
 
-import tesserocr
 from PIL import Image
 
+from .ocr_engine import get_ocr_pool
+
 logger = logging.getLogger(__name__)
 
 
@@ -42,9 +46,9 @@ class CarteGriseOCR:
     }
 
     @staticmethod
-    def preprocess_image(image_path: str) -> Image.Image:
+    def preprocess_image(image_path) -> Image.Image:
         """
-        Preprocess image to improve OCR accuracy
+        Preprocess image to improve OCR accuracy (accepts a path or a file object)
         """
         try:
             img = Image.open(image_path)
@@ -75,20 +79,32 @@ class CarteGriseOCR:
             logger.error(f"Error preprocessing image: {str(e)}")
             raise
 
+    @staticmethod
+    def preprocess_bytes(image_bytes: bytes) -> Image.Image:
+        return CarteGriseOCR.preprocess_image(BytesIO(image_bytes))
+
+    @staticmethod
+    def recognize(images: List[bytes], timeout: Optional[float] = None, return_exceptions: bool = False) -> List[str]:
+        """
+        Run OCR on several images in parallel through the shared engine pool
+
+        Raises OCRQueueFullError / OCRTimeoutError when the pool cannot serve the request. With
+        ``return_exceptions``, a page that failed gets its exception in place of the text.
+        """
+        if timeout is None:
+            timeout = getattr(settings, "OCR_TIMEOUT_SECONDS", 30)
+        return get_ocr_pool().recognize_many(
+            images, CarteGriseOCR.preprocess_bytes, timeout=timeout, return_exceptions=return_exceptions
+        )
+
     @staticmethod
     def extract_text(image_path: str, lang="fra") -> str:
         """
-        Extract text from image using Tesseract OCR (via tesserocr)
+        Extract text from image using Tesseract OCR (via the pooled tesserocr engines)
         """
         try:
-            img = CarteGriseOCR.preprocess_image(image_path)
-
-            # Use tesserocr API for better performance
-            with tesserocr.PyTessBaseAPI(lang=lang, psm=tesserocr.PSM.AUTO) as api:
-                api.SetImage(img)
-                text = api.GetUTF8Text()
-
-            return text
+            with open(image_path, "rb") as f:
+                return CarteGriseOCR.recognize([f.read()])[0]
 
         except Exception as e:
             logger.error(f"Error extracting text: {str(e)}")
@@ -240,6 +256,43 @@ class CarteGriseOCR:
 
         return None
 
+    @staticmethod
+    def parse_text(text: str) -> Dict[str, Any]:
+        """
+        Extract all carte grise fields from OCR text
+
+        Returns:
+            dict: Extracted information with confidence scores
+        """
+        if not text:
+            return {"success": False, "error": "Impossible d'extraire le texte de l'image", "data": {}}
+
+        # Extract all fields
+        data = {
+            "plaque_immatriculation": CarteGriseOCR.extract_plate_number(text),
+            "vin": CarteGriseOCR.extract_vin(text),
+            "nom_proprietaire": CarteGriseOCR.extract_owner_name(text),
+            "marque": CarteGriseOCR.extract_brand(text),
+            "modele": CarteGriseOCR.extract_model(text),
+            "couleur": CarteGriseOCR.extract_color(text),
+            "date_premiere_circulation": CarteGriseOCR.extract_date(text),
+            "puissance_fiscale_cv": CarteGriseOCR.extract_power_cv(text),
+            "cylindree_cm3": CarteGriseOCR.extract_cylindree(text),
+            "source_energie": CarteGriseOCR.detect_energy_source(text),
+        }
+
+        # Calculate confidence score (percentage of fields extracted)
+        total_fields = len(data)
+        extracted_fields = sum(1 for v in data.values() if v is not None)
+        confidence = (extracted_fields / total_fields) * 100
+
+        return {
+            "success": True,
+            "confidence": round(confidence, 2),
+            "data": data,
+            "raw_text": text,  # For debugging
+        }
+
     @staticmethod
     def process_carte_grise(image_path: str) -> Dict[str, Any]:
         """
@@ -249,38 +302,27 @@ class CarteGriseOCR:
             dict: Extracted information with confidence scores
         """
         try:
-            # Extract text
-            text = CarteGriseOCR.extract_text(image_path)
-
-            if not text:
-                return {"success": False, "error": "Impossible d'extraire le texte de l'image", "data": {}}
-
-            # Extract all fields
-            data = {
-                "plaque_immatriculation": CarteGriseOCR.extract_plate_number(text),
-                "vin": CarteGriseOCR.extract_vin(text),
-                "nom_proprietaire": CarteGriseOCR.extract_owner_name(text),
-                "marque": CarteGriseOCR.extract_brand(text),
-                "modele": CarteGriseOCR.extract_model(text),
-                "couleur": CarteGriseOCR.extract_color(text),
-                "date_premiere_circulation": CarteGriseOCR.extract_date(text),
-                "puissance_fiscale_cv": CarteGriseOCR.extract_power_cv(text),
-                "cylindree_cm3": CarteGriseOCR.extract_cylindree(text),
-                "source_energie": CarteGriseOCR.detect_energy_source(text),
-            }
-
-            # Calculate confidence score (percentage of fields extracted)
-            total_fields = len(data)
-            extracted_fields = sum(1 for v in data.values() if v is not None)
-            confidence = (extracted_fields / total_fields) * 100
-
-            return {
-                "success": True,
-                "confidence": round(confidence, 2),
-                "data": data,
-                "raw_text": text,  # For debugging
-            }
+            return CarteGriseOCR.parse_text(CarteGriseOCR.extract_text(image_path))
 
         except Exception as e:
             logger.error(f"Error processing carte grise: {str(e)}")
             return {"success": False, "error": str(e), "data": {}}
+
+    @staticmethod
+    def process_pages(images: List[bytes]) -> List[Dict[str, Any]]:
+        """
+        Process several pages (e.g. recto and verso) in parallel
+
+        Pool saturation and timeouts propagate to the caller; other errors are reported per page.
+        """
+        texts = CarteGriseOCR.recognize(images, return_exceptions=True)
+        results = []
+        for text in texts:
+            try:
+                if isinstance(text, Exception):
+                    raise text
+                results.append(CarteGriseOCR.parse_text(text))
+            except Exception as e:
+                logger.error(f"Error processing carte grise: {str(e)}")
+                results.append({"success": False, "error": str(e), "data": {}})
+        return results
@@ -0,0 +1,77 @@
+import logging
+
+from django.db import transaction
+
+from celery import shared_task
+
+from core.utils.image_optimizer import ImageOptimizer
+from vehicles.fleet_import import FleetImportEngine
+from vehicles.models import DocumentVehicule, DocumentVehiculeVariant, FleetImportBatch
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, acks_late=True, max_retries=3)
+def process_fleet_import(self, batch_id):
+    """
+    Run a fleet import batch in the background.
+
+    Progress is committed chunk by chunk on the batch row, so a retried or redelivered
+    task resumes after the last committed row instead of starting over.
+    """
+    try:
+        batch = FleetImportBatch.objects.select_related("utilisateur").get(id=batch_id)
+    except FleetImportBatch.DoesNotExist:
+        return None
+
+    try:
+        batch = FleetImportEngine(batch).run()
+    except Exception as exc:
+        logger.exception("Fleet import %s interrupted at row %s", batch_id, batch.lignes_traitees)
+        if self.request.called_directly or self.request.is_eager or self.request.retries >= self.max_retries:
+            FleetImportBatch.objects.filter(id=batch_id).update(statut="FAILED", resume_erreurs=str(exc)[:2000])
+            raise
+        raise self.retry(exc=exc, countdown=30)
+
+    return {"batch_id": batch.id, "success": batch.reussites, "failed": batch.echecs}
+
+
+@shared_task
+def generate_document_variants(document_id):
+    """
+    Generate the optimized, preview and thumbnail variants of a vehicle document image.
+
+    The original upload is left untouched; variants are decoded once and replace any
+    previously generated set for the document.
+    """
+    try:
+        document = DocumentVehicule.objects.get(id=document_id)
+    except DocumentVehicule.DoesNotExist:
+        return None
+
+    try:
+        with document.fichier.open("rb") as handle:
+            generated = ImageOptimizer.generate_variants(
+                handle, document.get_variant_specs(), prefix=document.document_type
+            )
+        variants = []
+        for name, (upload, width, height) in generated.items():
+            variant = DocumentVehiculeVariant(
+                document=document, variant=name, width=width, height=height, taille_octets=upload.size
+            )
+            variant.fichier.save(upload.name, upload, save=False)
+            variants.append(variant)
+    except Exception:
+        logger.exception("Could not generate variants for vehicle document %s", document_id)
+        DocumentVehicule.objects.filter(id=document_id).update(variants_status="failed")
+        return None
+
+    previous = list(document.variants.all())
+    with transaction.atomic():
+        DocumentVehiculeVariant.objects.filter(document=document).delete()
+        DocumentVehiculeVariant.objects.bulk_create(variants)
+        DocumentVehicule.objects.filter(id=document_id).update(variants_status="ready")
+    for variant in previous:
+        variant.fichier.delete(save=False)
+
+    return {name: variant.fichier.name for name, variant in zip(generated, variants)}
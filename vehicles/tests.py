@@ -906,3 +906,190 @@ class VehiculeMaritimeFormTests(TestCase):
         form = VehiculeMaritimeForm(data=form_data, user=self.user)
         self.assertTrue(form.is_valid())
         self.assertEqual(form.cleaned_data["vehicle_category"], "MARITIME")
+
+
+class OCREnginePoolTests(TestCase):
+    """Tests for the pooled OCR engines (with a fake Tesseract engine)"""
+
+    class FakeEngine:
+        instances = 0
+        recognitions = 0
+
+        def __init__(self, lang):
+            type(self).instances += 1
+            self.image = None
+
+        def SetImage(self, image):
+            self.image = image
+
+        def GetUTF8Text(self):
+            import time
+
+            type(self).recognitions += 1
+            time.sleep(0.01)
+            return f"text:{self.image}"
+
+        def Clear(self):
+            self.image = None
+
+        def End(self):
+            pass
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        from .ocr_engine import OCREnginePool
+
+        cache.clear()
+        self.FakeEngine.instances = 0
+        self.FakeEngine.recognitions = 0
+        self.pool = OCREnginePool(size=2, queue_size=1, engine_factory=self.FakeEngine)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_engines_are_reused_across_calls(self):
+        for i in range(6):
+            self.assertEqual(self.pool.recognize_many([b"img%d" % i], bytes.decode), ["text:img%d" % i])
+        self.assertLessEqual(self.FakeEngine.instances, 2)
+
+    def test_results_are_cached_by_content_hash(self):
+        self.assertEqual(self.pool.recognize_many([b"same"], bytes.decode), ["text:same"])
+        self.assertEqual(self.FakeEngine.recognitions, 1)
+
+        # The same bytes again are served from the cache without running the engine
+        self.assertEqual(self.pool.recognize_many([b"same"], bytes.decode), ["text:same"])
+        self.assertEqual(self.FakeEngine.recognitions, 1)
+        self.pool.recognize_many([b"other"], bytes.decode)
+        self.assertEqual(self.FakeEngine.recognitions, 2)
+
+    def test_pages_are_processed_in_parallel_and_in_order(self):
+        texts = self.pool.recognize_many([b"recto", b"verso"], bytes.decode)
+        self.assertEqual(texts, ["text:recto", "text:verso"])
+
+    def test_queue_is_bounded(self):
+        from .ocr_engine import OCRQueueFullError
+
+        with self.assertRaises(OCRQueueFullError):
+            self.pool.recognize_many([b"a", b"b", b"c", b"d"], bytes.decode)
+
+    def test_pages_queued_before_saturation_are_cancelled(self):
+        import threading
+
+        from .ocr_engine import OCRQueueFullError
+
+        release = threading.Event()
+        preprocessed = []
+
+        def preprocess(image_bytes):
+            release.wait(timeout=5)
+            preprocessed.append(image_bytes)
+            return image_bytes.decode()
+
+        # Two pages run, the third waits in the queue, the fourth does not fit
+        with self.assertRaises(OCRQueueFullError):
+            self.pool.recognize_many([b"a", b"b", b"c", b"d"], preprocess)
+        release.set()
+        self.pool.shutdown()
+
+        self.assertEqual(sorted(preprocessed), [b"a", b"b"])
+
+    def test_page_errors_are_returned_per_page(self):
+        from unittest import mock
+
+        from .ocr_utils import CarteGriseOCR
+
+        def preprocess(image_bytes):
+            if image_bytes == b"verso":
+                raise ValueError("unreadable page")
+            return image_bytes.decode()
+
+        with self.assertRaises(ValueError):
+            self.pool.recognize_many([b"recto", b"verso"], preprocess)
+
+        with (
+            mock.patch("vehicles.ocr_utils.get_ocr_pool", return_value=self.pool),
+            mock.patch.object(CarteGriseOCR, "preprocess_bytes", side_effect=preprocess),
+        ):
+            recto, verso = CarteGriseOCR.process_pages([b"recto", b"verso"])
+
+        self.assertTrue(recto["success"])
+        self.assertEqual(recto["raw_text"], "text:recto")
+        self.assertEqual(verso, {"success": False, "error": "unreadable page", "data": {}})
+
+
+class DocumentVariantsTests(TestCase):
+    """Tests for background generation of vehicle document image variants"""
+
+    def setUp(self):
+        import tempfile
+
+        from django.test import override_settings
+
+        self.media = tempfile.TemporaryDirectory()
+        self.override = override_settings(MEDIA_ROOT=self.media.name)
+        self.override.enable()
+        self.user = User.objects.create_user(username="docowner", password="testpass")
+        self.vehicle = Vehicule.objects.create(
+            plaque_immatriculation="4321TBB",
+            proprietaire=self.user,
+            marque="Toyota",
+            puissance_fiscale_cv=13,
+            cylindree_cm3=1500,
+            source_energie="Essence",
+            date_premiere_circulation=date(2020, 1, 1),
+            type_vehicule=VehicleType.objects.create(nom="Voiture"),
+        )
+
+    def tearDown(self):
+        self.override.disable()
+        self.media.cleanup()
+
+    def make_upload(self, name, fmt, size=(2400, 1600)):
+        import io
+
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new("RGB", size, (120, 30, 200)).save(buffer, format=fmt)
+        return SimpleUploadedFile(name, buffer.getvalue())
+
+    def test_original_is_kept_and_variants_generated_on_commit(self):
+        from .models import DocumentVehicule
+
+        with self.captureOnCommitCallbacks(execute=True):
+            document = DocumentVehicule.objects.create(
+                vehicule=self.vehicle,
+                uploaded_by=self.user,
+                document_type="carte_grise",
+                fichier=self.make_upload("cg.jpg", "JPEG"),
+            )
+
+        document.refresh_from_db()
+        self.assertEqual(document.variants_status, "ready")
+        self.assertTrue(document.fichier.name.endswith(".jpg"))
+        sizes = {v.variant: (v.width, v.height) for v in document.variants.all()}
+        self.assertEqual(sizes["optimized"], (2048, 1365))
+        self.assertEqual(max(sizes["preview"]), 800)
+        self.assertEqual(max(sizes["thumbnail"]), 150)
+        self.assertTrue(document.thumbnail_url.endswith(".webp"))
+
+    def test_non_image_documents_are_skipped(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        from .models import DocumentVehicule
+
+        with self.captureOnCommitCallbacks(execute=True):
+            document = DocumentVehicule.objects.create(
+                vehicule=self.vehicle,
+                uploaded_by=self.user,
+                document_type="assurance",
+                fichier=SimpleUploadedFile("police.pdf", b"%PDF-1.4"),
+            )
+
+        document.refresh_from_db()
+        self.assertEqual(document.variants_status, "skipped")
+        self.assertFalse(document.variants.exists())
+        self.assertEqual(document.thumbnail_url, document.fichier.url)
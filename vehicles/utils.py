@@ -3,6 +3,10 @@ Utilitaires pour la gestion des véhicules
 Contient la logique de conversion entre cylindrée (Cm3) et puissance fiscale (CV)
 """
 
+# Version de la table de conversion, utilisée comme validateur HTTP (ETag) par l'API :
+# à incrémenter à chaque modification des correspondances ci-dessous
+CONVERSION_TABLE_VERSION = "1"
+
 
 def get_puissance_fiscale_from_cylindree(cylindree_cm3):
     """
@@ -1430,8 +1430,6 @@ import json
 import logging
 import os
 
-from django.core.files.base import ContentFile
-from django.core.files.storage import default_storage
 from django.views.decorators.csrf import csrf_exempt
 
 # OCR Views for Carte Grise Biométrique
@@ -1513,43 +1511,39 @@ def process_carte_grise_ocr(request):
         if uploaded_file.size > 10 * 1024 * 1024:
             return JsonResponse({"success": False, "error": _("Fichier trop volumineux. Max 10MB.")}, status=400)
 
-    temp_paths = []
-
     try:
+        from .ocr_engine import OCRQueueFullError, OCRTimeoutError
         from .ocr_utils import CarteGriseOCR
 
-        # Save recto temporarily
-        recto_temp_path = default_storage.save(
-            f"temp/carte_grise_recto_{request.user.id}_{recto_file.name}", ContentFile(recto_file.read())
-        )
-        temp_paths.append(recto_temp_path)
-        recto_full_path = default_storage.path(recto_temp_path)
-
-        # Process recto
-        result = CarteGriseOCR.process_carte_grise(recto_full_path)
-
-        # If verso is provided, process it too and merge results
+        # Recto and verso are recognized in parallel by the shared OCR engine pool
+        pages = [recto_file.read()]
         if verso_file:
-            verso_temp_path = default_storage.save(
-                f"temp/carte_grise_verso_{request.user.id}_{verso_file.name}", ContentFile(verso_file.read())
+            pages.append(verso_file.read())
+        try:
+            results = CarteGriseOCR.process_pages(pages)
+        except OCRQueueFullError:
+            return JsonResponse(
+                {"success": False, "error": _("Service OCR momentanément saturé. Veuillez réessayer.")}, status=503
             )
-            temp_paths.append(verso_temp_path)
-            verso_full_path = default_storage.path(verso_temp_path)
+        except OCRTimeoutError:
+            return JsonResponse(
+                {"success": False, "error": _("Le traitement OCR a pris trop de temps. Veuillez réessayer.")},
+                status=504,
+            )
+
+        result = results[0]
 
-            verso_result = CarteGriseOCR.process_carte_grise(verso_full_path)
+        # If verso is provided, merge results (verso data supplements recto data)
+        if verso_file:
+            verso_result = results[1]
 
-            # Merge results (verso data supplements recto data)
             if verso_result["success"]:
                 for key, value in verso_result["data"].items():
                     if value and not result["data"].get(key):
                         result["data"][key] = value
 
                 # Update confidence
-                result["confidence"] = (result["confidence"] + verso_result["confidence"]) / 2
-
-        # Clean up temp files
-        for temp_path in temp_paths:
-            default_storage.delete(temp_path)
+                result["confidence"] = (result.get("confidence", 0) + verso_result["confidence"]) / 2
 
         if result["success"]:
             return JsonResponse(
@@ -1586,7 +1580,12 @@ def get_vehicle_documents(request, pk):
         if not (vehicule.proprietaire == request.user or is_admin_user(request.user)):
             return JsonResponse({"success": False, "error": _("Permission refusée")}, status=403)
 
-        documents = DocumentVehicule.objects.filter(vehicule=vehicule).order_by("-created_at")
+        documents = (
+            DocumentVehicule.objects.filter(vehicule=vehicule)
+            .select_related("uploaded_by")
+            .prefetch_related("variants")
+            .order_by("-created_at")
+        )
 
         documents_data = []
         for doc in documents:
@@ -1596,6 +1595,8 @@ def get_vehicle_documents(request, pk):
                     "document_type": doc.document_type,
                     "document_type_display": doc.get_document_type_display(),
                     "file_url": doc.fichier.url if doc.fichier else "",
+                    "thumbnail_url": doc.thumbnail_url,
+                    "preview_url": doc.preview_url,
                     "file_name": doc.fichier.name.split("/")[-1] if doc.fichier else "",
                     "note": doc.note or "",
                     "expiration_date": doc.expiration_date.isoformat() if doc.expiration_date else None,
@@ -1954,13 +1955,21 @@ class DeclarationHistoryView(LoginRequiredMixin, ListView):
         # Group vehicles by fiscal year and category
         from collections import defaultdict
 
-        from payments.models import PaiementTaxe
+        from payments.models import PaiementTaxe, QRCode
 
         grouped_vehicles = defaultdict(lambda: defaultdict(list))
 
+        # Payments are prefetched; QR codes are looked up once for all vehicles
+        self._qr_plates = set(
+            QRCode.objects.filter(
+                vehicule_plaque__in=all_vehicles.values("plaque_immatriculation"), type_code="TAXE_VEHICULE"
+            ).values_list("vehicule_plaque_id", flat=True)
+        )
+
         for vehicule in all_vehicles:
             # Get the most recent payment to determine fiscal year
-            latest_payment = vehicule.paiements.order_by("-annee_fiscale").first()
+            payments = vehicule.paiements.all()
+            latest_payment = max(payments, key=lambda p: p.annee_fiscale, default=None)
             fiscal_year = latest_payment.annee_fiscale if latest_payment else timezone.now().year
 
             # Get vehicle details
@@ -2033,11 +2042,14 @@ class DeclarationHistoryView(LoginRequiredMixin, ListView):
 
     def _get_tax_amount(self, vehicule, fiscal_year):
         """Get the tax amount for a vehicle for a given fiscal year"""
-        from payments.models import PaiementTaxe
-
-        payment = PaiementTaxe.objects.filter(
-            vehicule_plaque=vehicule, annee_fiscale=fiscal_year, type_paiement="TAXE_VEHICULE"
-        ).first()
+        payment = next(
+            (
+                p
+                for p in vehicule.paiements.all()
+                if p.annee_fiscale == fiscal_year and p.type_paiement == "TAXE_VEHICULE"
+            ),
+            None,
+        )
 
         if payment:
             return payment.montant_du_ariary
@@ -2051,20 +2063,11 @@ class DeclarationHistoryView(LoginRequiredMixin, ListView):
 
     def _has_qr_code(self, vehicule):
         """Check if vehicle has a valid QR code"""
-        try:
-            from payments.models import QRCode
-
-            return QRCode.objects.filter(vehicule_plaque=vehicule, type_code="TAXE_VEHICULE").exists()
-        except:
-            return False
+        return vehicule.plaque_immatriculation in self._qr_plates
 
     def _has_receipt(self, vehicule):
         """Check if vehicle has a paid receipt"""
-        from payments.models import PaiementTaxe
-
-        return PaiementTaxe.objects.filter(
-            vehicule_plaque=vehicule, statut="PAYE", type_paiement="TAXE_VEHICULE"
-        ).exists()
+        return any(p.statut == "PAYE" and p.type_paiement == "TAXE_VEHICULE" for p in vehicule.paiements.all())
 
 
 class DeclarationHistoryExportView(LoginRequiredMixin, View):